@@ -0,0 +1,239 @@
+import json
+from pathlib import Path
+from typing import Iterable, Iterator, List, Literal, Optional
+
+import numpy as np
+from eliot import start_action
+from pydantic import BaseModel, ConfigDict, Field
+
+from just_semantic_search.document import ArticleDocument, Document
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    ipc = None
+    pq = None
+
+
+VECTOR_COLUMN_PREFIX = "vector__"
+DOCUMENT_TYPE_KEY = b"just_semantic_search.document_type"
+
+# Plain columns shared by Document and ArticleDocument, in the order they are written
+_BASE_COLUMNS = ["hash", "text", "source", "token_count", "fragment_num", "total_fragments", "metadata"]
+_ARTICLE_COLUMNS = ["title", "abstract", "references"]
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError(
+            "pyarrow is required for the columnar document store, "
+            "install it with `pip install just-semantic-search[parquet]`"
+        )
+
+
+def _vector_column(embedder_name: str) -> str:
+    return f"{VECTOR_COLUMN_PREFIX}{embedder_name}"
+
+
+def documents_to_table(documents: List[Document]) -> "pa.Table":
+    """
+    Converts documents into an Arrow table.
+
+    Every embedder found in the documents gets its own ``vector__<embedder>`` column stored as
+    a fixed-size list of float32, so the vectors can be read back as one contiguous matrix.
+    Metadata dictionaries are stored as JSON strings because their shape differs between documents.
+    """
+    _require_pyarrow()
+    is_article = len(documents) > 0 and all(isinstance(doc, ArticleDocument) for doc in documents)
+
+    columns = {
+        "hash": pa.array([doc.hash for doc in documents], type=pa.string()),
+        "text": pa.array([doc.text for doc in documents], type=pa.string()),
+        "source": pa.array([doc.source for doc in documents], type=pa.string()),
+        "token_count": pa.array([doc.token_count for doc in documents], type=pa.int32()),
+        "fragment_num": pa.array([doc.fragment_num for doc in documents], type=pa.int32()),
+        "total_fragments": pa.array([doc.total_fragments for doc in documents], type=pa.int32()),
+        "metadata": pa.array([json.dumps(doc.metadata) if doc.metadata else None for doc in documents], type=pa.string()),
+    }
+    if is_article:
+        for name in _ARTICLE_COLUMNS:
+            columns[name] = pa.array([getattr(doc, name) for doc in documents], type=pa.string())
+
+    embedders = sorted({name for doc in documents for name in doc.vectors.keys()})
+    for embedder in embedders:
+        dimensions = next(len(doc.vectors[embedder]) for doc in documents if embedder in doc.vectors)
+        matrix = np.zeros((len(documents), dimensions), dtype=np.float32)
+        missing = np.zeros(len(documents), dtype=bool)
+        for i, doc in enumerate(documents):
+            vector = doc.vectors.get(embedder)
+            if vector is None:
+                missing[i] = True
+            elif len(vector) != dimensions:
+                raise ValueError(f"Document {doc.hash} has a {len(vector)}-dimensional vector for {embedder}, expected {dimensions}")
+            else:
+                matrix[i] = vector
+        values = pa.array(matrix.reshape(-1), type=pa.float32())
+        columns[_vector_column(embedder)] = pa.FixedSizeListArray.from_arrays(
+            values, dimensions, mask=pa.array(missing) if missing.any() else None
+        )
+
+    document_type = b"article" if is_article else b"document"
+    return pa.table(columns).replace_schema_metadata({DOCUMENT_TYPE_KEY: document_type})
+
+
+def table_to_documents(table: "pa.Table") -> List[Document]:
+    """Converts an Arrow table written by :func:`documents_to_table` back into documents."""
+    _require_pyarrow()
+    schema_metadata = table.schema.metadata or {}
+    is_article = schema_metadata.get(DOCUMENT_TYPE_KEY) == b"article"
+    document_class = ArticleDocument if is_article else Document
+
+    vector_columns = [name for name in table.column_names if name.startswith(VECTOR_COLUMN_PREFIX)]
+    plain_columns = [name for name in _BASE_COLUMNS + _ARTICLE_COLUMNS if name in table.column_names and name != "hash"]
+    rows = table.select(plain_columns).to_pylist()
+    vectors = {name[len(VECTOR_COLUMN_PREFIX):]: table.column(name).to_pylist() for name in vector_columns}
+
+    documents = []
+    for i, row in enumerate(rows):
+        metadata = row.pop("metadata", None)
+        row["metadata"] = json.loads(metadata) if metadata else {}
+        row["vectors"] = {embedder: values[i] for embedder, values in vectors.items() if values[i] is not None}
+        documents.append(document_class(**row))
+    return documents
+
+
+class ParquetDocumentStore(BaseModel):
+    """
+    Columnar on-disk store for split and embedded document fragments.
+
+    It allows to split the indexing into "embed once offline" and "load into the search backend many times".
+    Files ending with ``.arrow``/``.feather`` are written in Arrow IPC format and memory-mapped without copying on read,
+    everything else is written as Parquet.
+    """
+    path: Path = Field(description="Path to the .parquet or .arrow file")
+    row_group_size: int = Field(default=10_000, description="Number of documents written per row group / record batch")
+    compression: Optional[str] = Field(default="zstd", description="Compression codec used for Parquet files")
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def format(self) -> Literal["parquet", "arrow"]:
+        return "arrow" if self.path.suffix in {".arrow", ".feather", ".ipc"} else "parquet"
+
+    def write(self, documents: Iterable[Document]) -> Path:
+        """
+        Writes documents to the store, replacing existing content.
+        Documents are consumed in chunks of ``row_group_size`` so generators of any size can be written.
+        """
+        _require_pyarrow()
+        with start_action(action_type="document_store_write", path=str(self.path), format=self.format) as action:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            writer = None
+            schema = None
+            count = 0
+            try:
+                for chunk in self._chunks(documents):
+                    table = documents_to_table(chunk)
+                    if writer is None:
+                        schema = table.schema
+                        writer = self._open_writer(schema)
+                    elif table.schema.remove_metadata() != schema.remove_metadata():
+                        table = self._align(table, schema)
+                    writer.write_table(table) if self.format == "parquet" else writer.write(table)
+                    count += len(chunk)
+            finally:
+                if writer is not None:
+                    writer.close()
+            if writer is None:
+                empty = documents_to_table([])
+                self._open_writer(empty.schema).close()
+            action.add_success_fields(count=count)
+            return self.path
+
+    def read_table(self, columns: Optional[List[str]] = None) -> "pa.Table":
+        """Reads the whole store as an Arrow table using memory mapping."""
+        _require_pyarrow()
+        if self.format == "arrow":
+            source = pa.memory_map(str(self.path), "r")
+            table = ipc.open_file(source).read_all()
+            return table.select(columns) if columns is not None else table
+        return pq.read_table(self.path, columns=columns, memory_map=True)
+
+    def read_documents(self) -> List[Document]:
+        """Reads all documents from the store."""
+        return table_to_documents(self.read_table())
+
+    def iter_documents(self, batch_size: Optional[int] = None) -> Iterator[List[Document]]:
+        """Iterates over the store in batches of documents without loading the whole file into Python objects."""
+        _require_pyarrow()
+        batch_size = batch_size or self.row_group_size
+        if self.format == "parquet":
+            parquet_file = pq.ParquetFile(self.path, memory_map=True)
+            schema_metadata = parquet_file.schema_arrow.metadata
+            for batch in parquet_file.iter_batches(batch_size=batch_size):
+                yield table_to_documents(pa.Table.from_batches([batch]).replace_schema_metadata(schema_metadata))
+        else:
+            # slices are zero-copy views spanning record batches, to_batches would stop at every record batch boundary
+            table = self.read_table()
+            for offset in range(0, table.num_rows, batch_size):
+                yield table_to_documents(table.slice(offset, batch_size))
+
+    def vectors(self, embedder_name: str) -> np.ndarray:
+        """
+        Returns the vectors of one embedder as a (documents x dimensions) float32 matrix.
+        For Arrow IPC files without missing vectors the matrix is a zero-copy view of the memory-mapped file.
+        """
+        embedder_name = embedder_name.split("/")[-1]
+        column = self.read_table(columns=[_vector_column(embedder_name)]).column(0).combine_chunks()
+        dimensions = column.type.list_size
+        if column.null_count > 0:
+            return np.array([v if v is not None else [np.nan] * dimensions for v in column.to_pylist()], dtype=np.float32)
+        return column.flatten().to_numpy(zero_copy_only=False).reshape(-1, dimensions)
+
+    def embedders(self) -> List[str]:
+        """Returns names of the embedders that have vectors in the store."""
+        names = self._schema().names
+        return [name[len(VECTOR_COLUMN_PREFIX):] for name in names if name.startswith(VECTOR_COLUMN_PREFIX)]
+
+    def __len__(self) -> int:
+        _require_pyarrow()
+        if self.format == "parquet":
+            return pq.ParquetFile(self.path).metadata.num_rows
+        return self.read_table(columns=[]).num_rows
+
+    def _schema(self) -> "pa.Schema":
+        _require_pyarrow()
+        if self.format == "parquet":
+            return pq.read_schema(self.path)
+        return ipc.open_file(pa.memory_map(str(self.path), "r")).schema
+
+    def _open_writer(self, schema: "pa.Schema"):
+        if self.format == "parquet":
+            return pq.ParquetWriter(self.path, schema, compression=self.compression)
+        return ipc.new_file(str(self.path), schema)
+
+    @staticmethod
+    def _align(table: "pa.Table", schema: "pa.Schema") -> "pa.Table":
+        """Makes a chunk match the schema of the first chunk, filling absent columns with nulls."""
+        extra = set(table.column_names) - set(schema.names)
+        if extra:
+            raise ValueError(f"Documents introduce columns {sorted(extra)} that are not present in the first {len(table)} documents, "
+                             f"write documents with consistent embedders and types")
+        arrays = [
+            table.column(field.name).cast(field.type) if field.name in table.column_names else pa.nulls(len(table), type=field.type)
+            for field in schema
+        ]
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+    def _chunks(self, documents: Iterable[Document]) -> Iterator[List[Document]]:
+        chunk = []
+        for doc in documents:
+            chunk.append(doc)
+            if len(chunk) >= self.row_group_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
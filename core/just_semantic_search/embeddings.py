@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field
 from sentence_transformers import SentenceTransformer
 from transformers import AutoTokenizer, AutoModel, PreTrainedModel, PreTrainedTokenizer
-from typing import Tuple, Union
+from typing import Optional, Tuple, Union
 from enum import Enum
 
 def load_auto_model_tokenizer(model_name_or_path: str, trust_remote_code: bool = True) -> Tuple[PreTrainedModel, PreTrainedTokenizer]:
@@ -108,3 +108,34 @@ def load_sentence_transformer_from_enum(model: EmbeddingModel, **kwargs) -> Sent
         raise ValueError(f"{model.name} is not compatible with SentenceTransformer")
     return load_sentence_transformer_model(model.value, **kwargs)
 
+
+# Output dimensions of the supported models. Only a fallback for when no loaded model is at hand
+# (e.g. MedCPT, which is not a SentenceTransformer), the loaded model is the authoritative source.
+EMBEDDING_DIMENSIONS = {
+    EmbeddingModel.GTE_LARGE: 1024,
+    EmbeddingModel.GTE_MULTILINGUAL: 768,
+    EmbeddingModel.GTE_MULTILINGUAL_MLM: 768,
+    EmbeddingModel.GTE_MLM_EN: 1024,
+    EmbeddingModel.SPECTER: 768,
+    EmbeddingModel.BIOEMBEDDINGS: 768,
+    EmbeddingModel.MODERN_BERT_LARGE: 1024,
+    EmbeddingModel.JINA_EMBEDDINGS_V3: 1024,
+    EmbeddingModel.MEDCPT_QUERY: 768,
+    EmbeddingModel.MEDCPT_ARTICLE: 768,
+}
+
+
+def embedding_dimension(model: EmbeddingModel, sentence_transformer: Optional[SentenceTransformer] = None) -> int:
+    """
+    Returns the embedding dimension of the model: from the loaded sentence transformer if given (callers should
+    pass it whenever the model can be loaded), otherwise from EMBEDDING_DIMENSIONS, falling back to the hidden size
+    in the model config (no weights are loaded).
+    """
+    if sentence_transformer is not None:
+        dimension = sentence_transformer.get_sentence_embedding_dimension()
+        if dimension is not None:
+            return dimension
+    if model in EMBEDDING_DIMENSIONS:
+        return EMBEDDING_DIMENSIONS[model]
+    from transformers import AutoConfig
+    return AutoConfig.from_pretrained(model.value, trust_remote_code=True).hidden_size
@@ -0,0 +1,131 @@
+import os
+from pathlib import Path
+from typing import Any, Literal, Optional
+
+import numpy as np
+from eliot import start_action
+from pydantic import Field, PrivateAttr
+
+from just_semantic_search.reranking import AbstractReranker
+
+try:
+    import onnxruntime as ort
+except ImportError:  # pragma: no cover - optional dependency
+    ort = None
+
+
+DEFAULT_ONNX_CACHE_DIR = Path(os.getenv("RERANKER_ONNX_CACHE_DIR", Path.home() / ".cache" / "just_semantic_search" / "onnx"))
+ONNX_OPSET = 17
+
+
+def _require_onnxruntime() -> None:
+    if ort is None:
+        raise ImportError(
+            "onnxruntime is required for the ONNX reranker backend, "
+            "install it with `pip install just-semantic-search[onnx]`"
+        )
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def onnx_model_dir(model_name: str, cache_dir: Path = DEFAULT_ONNX_CACHE_DIR) -> Path:
+    return Path(cache_dir) / model_name.replace("/", "__")
+
+
+def export_onnx_reranker(model_name: str, quantization: Literal["fp32", "int8"] = "fp32",
+                         cache_dir: Path = DEFAULT_ONNX_CACHE_DIR, overwrite: bool = False) -> Path:
+    """
+    Exports a Hugging Face cross-encoder to ONNX once and returns the path of the cached graph.
+
+    The fp32 graph is exported with torch.onnx.export with dynamic batch and sequence axes,
+    the int8 graph is derived from it with onnxruntime dynamic quantization (int8 weights, fp32 activations).
+    Graphs are written to a temporary file first, so an interrupted export never leaves a broken cache entry.
+    """
+    _require_onnxruntime()
+    target_dir = onnx_model_dir(model_name, cache_dir)
+    fp32_path = target_dir / "model_fp32.onnx"
+    path = target_dir / f"model_{quantization}.onnx"
+    if path.exists() and not overwrite:
+        return path
+    target_dir.mkdir(parents=True, exist_ok=True)
+    with start_action(action_type="export_onnx_reranker", model_name=model_name, quantization=quantization, path=str(path)):
+        if not fp32_path.exists() or overwrite:
+            import torch
+            from transformers import AutoModelForSequenceClassification, AutoTokenizer
+            tokenizer = AutoTokenizer.from_pretrained(model_name, trust_remote_code=True)
+            model = AutoModelForSequenceClassification.from_pretrained(model_name, trust_remote_code=True, torch_dtype=torch.float32).eval()
+            sample = tokenizer([["query", "document"]], padding=True, truncation=True, return_tensors="pt")
+            tmp_path = fp32_path.with_suffix(".onnx.tmp")
+            with torch.no_grad():
+                torch.onnx.export(
+                    model,
+                    (sample["input_ids"], sample["attention_mask"]),
+                    str(tmp_path),
+                    input_names=["input_ids", "attention_mask"],
+                    output_names=["logits"],
+                    dynamic_axes={
+                        "input_ids": {0: "batch", 1: "sequence"},
+                        "attention_mask": {0: "batch", 1: "sequence"},
+                        "logits": {0: "batch"}
+                    },
+                    opset_version=ONNX_OPSET
+                )
+            tmp_path.replace(fp32_path)
+            tokenizer.save_pretrained(target_dir)
+        if quantization == "int8":
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            tmp_path = path.with_suffix(".onnx.tmp")
+            quantize_dynamic(str(fp32_path), str(tmp_path), weight_type=QuantType.QInt8)
+            tmp_path.replace(path)
+    return path
+
+
+class OnnxCrossEncoderReranker(AbstractReranker):
+    """
+    CPU reranker running a cross-encoder exported to ONNX with ONNX Runtime, in fp32 or int8 (dynamic quantization).
+    Scores match CrossEncoder.predict for single-logit models (sigmoid of the logit).
+    """
+    model_name: str = Field(default="jinaai/jina-reranker-v2-base-multilingual", description="Hugging Face model to export")
+    quantization: Literal["fp32", "int8"] = Field(default="int8", description="fp32 or int8 dynamically quantized graph")
+    cache_dir: Path = Field(default=DEFAULT_ONNX_CACHE_DIR, description="Directory where exported graphs are cached")
+    max_length: int = Field(default=int(os.getenv("RERANKER_MAX_LENGTH", 1024)), description="Maximum tokens per query-document pair")
+    batch_size: int = Field(default=int(os.getenv("RERANKER_BATCH_SIZE", 16)), description="Pairs per ONNX Runtime call")
+    intra_op_threads: Optional[int] = Field(default=None, description="ONNX Runtime intra-op threads, all cores if None")
+
+    _session: Any = PrivateAttr(default=None)
+    _tokenizer: Any = PrivateAttr(default=None)
+
+    def model_post_init(self, __context) -> None:
+        if not self.model_id:
+            self.model_id = f"{self.model_name}_onnx_{self.quantization}"
+        _require_onnxruntime()
+        from transformers import AutoTokenizer
+        path = export_onnx_reranker(self.model_name, self.quantization, self.cache_dir)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.intra_op_threads is not None:
+            options.intra_op_num_threads = self.intra_op_threads
+        self._session = ort.InferenceSession(str(path), sess_options=options, providers=["CPUExecutionProvider"])
+        self._tokenizer = AutoTokenizer.from_pretrained(path.parent)
+
+    def _compute_scores(self, query: str, documents: list[str]) -> list[float]:
+        """Scores the pairs in batches of similar length to minimize padding"""
+        order = sorted(range(len(documents)), key=lambda i: len(documents[i]))
+        scores = np.zeros(len(documents), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            encoded = self._tokenizer(
+                [[query, documents[i]] for i in batch],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np"
+            )
+            logits = self._session.run(["logits"], {
+                "input_ids": encoded["input_ids"].astype(np.int64),
+                "attention_mask": encoded["attention_mask"].astype(np.int64)
+            })[0]
+            scores[batch] = _sigmoid(logits.reshape(len(batch), -1)[:, 0])
+        return scores.tolist()
@@ -96,6 +96,11 @@ def jina_embed_query(text: str | list[str], model: str = "jina-embeddings-v3") -
     response = jina_embed_raw(text, model, "retrieval.query")
     return response.first_embedding()
 
+def jina_embed_queries(texts: list[str], model: str = "jina-embeddings-v3") -> List[List[float]]:
+    """Embeds several queries in one request, the embeddings are returned in the order of texts"""
+    response = jina_embed_raw(texts, model, "retrieval.query")
+    return [data.embedding for data in sorted(response.data, key=lambda d: d.index)]
+
 def jina_embed_passage(text: str | list[str], model: str = "jina-embeddings-v3") -> List[float]:
     response = jina_embed_raw(text, model, "retrieval.passage")
     return response.first_embedding()
@@ -1,52 +1,181 @@
-from abc import ABC
+from abc import ABC, abstractmethod
 from enum import Enum
+import hashlib
+import os
+import re
 from sentence_transformers import CrossEncoder
 from typing import Optional, Union
 from pydantic import BaseModel, Field
 from just_semantic_search.remote.jina_reranker import jina_rerank, RerankResult
+from just_semantic_search.utils.cache import LRUCache
 
 
 class RerankingModel(str, Enum):
     JINA_RERANKER_V2_BASE_MULTILINGUAL = "jinaai/jina-reranker-v2-base-multilingual"
     REMOTE_JINA_RERANKER_V2_BASE_MULTILINGUAL = "jinaai/jina-reranker-v2-base-multilingual_remote"
+
+
+class RerankerBackend(str, Enum):
+    TORCH = "torch"
+    ONNX = "onnx"  # ONNX Runtime, fp32
+    ONNX_INT8 = "onnx-int8"  # ONNX Runtime, int8 dynamic quantization
+
+
+def normalize_query(query: str) -> str:
+    """Lowercases the query and collapses whitespace, so trivially different spellings share cached scores"""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+def text_hash(text: str) -> str:
+    """MD5 of the text, the same hash Document.hash uses"""
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def passage_windows(query: str, text: str, window_words: int = 256, stride: Optional[int] = None, max_windows: int = 2) -> list[str]:
+    """
+    Selects the windows of text that best match the query with a cheap lexical scan.
+
+    The text is cut into windows of window_words words every stride words (window_words // 2 by default),
+    each window is scored by the number of distinct query terms it contains (term frequency breaks ties)
+    and the best max_windows non-overlapping windows are returned in text order. Texts shorter than one window are returned whole,
+    windows without any query term fall back to the beginning of the text.
+    """
+    words = list(WORD_PATTERN.finditer(text))
+    if len(words) <= window_words:
+        return [text]
+    stride = stride or max(1, window_words // 2)
+    terms = {word.lower() for word in WORD_PATTERN.findall(query) if len(word) > 1}
+    lowered = [word.group().lower() for word in words]
+    starts = list(range(0, len(words) - window_words + 1, stride))
+    if starts[-1] != len(words) - window_words:
+        starts.append(len(words) - window_words)
+    scored = []
+    for start in starts:
+        window = lowered[start:start + window_words]
+        matches = [word for word in window if word in terms]
+        scored.append((len(set(matches)), len(matches), -start, start))
+    best = []
+    for candidate in sorted(scored, reverse=True):
+        # overlapping windows would mostly score the same passage twice
+        if all(abs(candidate[3] - chosen[3]) >= window_words for chosen in best):
+            best.append(candidate)
+            if len(best) == max_windows:
+                break
+    if best[0][0] == 0:
+        best = [(0, 0, 0, 0)]
+    return [text[words[start].start():words[start + window_words - 1].end()] for *_, start in sorted(best, key=lambda item: item[3])]
     
 
 class AbstractReranker(BaseModel, ABC):
     """
     Abstract base class for reranking models.
+
+    Scores are cached per (model, normalized query, document hash), so overlapping candidate sets
+    only send unseen pairs to the model. Subclasses implement _compute_scores.
     """
     convert_to_tensor: bool = Field(default=False)
+    model_id: str = Field(default="", description="Identifier of the model, part of the score cache key")
+    cache: LRUCache = Field(
+        default_factory=lambda: LRUCache(int(os.getenv("RERANK_CACHE_SIZE", 10_000))),
+        exclude=True,
+        description="Bounded score cache, RERANK_CACHE_SIZE=0 disables it"
+    )
     
     model_config = {
         "arbitrary_types_allowed": True,
     }
+
+    @abstractmethod
+    def _compute_scores(self, query: str, documents: list[str]) -> list[float]:
+        """Scores the documents with the model, in the order of documents"""
     
-    def score(self, query: str, documents: list[str]) -> list[float]:
+    def score(self, query: str, documents: list[str], document_hashes: Optional[list[Optional[str]]] = None) -> list[float]:
         """
         Scores a list of documents based on their relevance to a given query.
+
+        Args:
+            query: The search query string.
+            documents: A list of document strings to be scored against the query.
+            document_hashes: Optional hashes identifying the documents (e.g. Document.hash), computed from the text if missing.
+
+        Returns:
+            A list of float scores in the order of documents.
         """
-        raise NotImplementedError("Subclasses must implement this method.")
+        if not documents:
+            return []
+        normalized = normalize_query(query)
+        hashes = document_hashes if document_hashes is not None else [None] * len(documents)
+        keys = [(self.model_id, normalized, doc_hash or text_hash(doc)) for doc, doc_hash in zip(documents, hashes)]
+        scores: list[Optional[float]] = [self.cache.get(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            computed = self._compute_scores(query, [documents[i] for i in missing])
+            for i, score in zip(missing, computed):
+                scores[i] = float(score)
+                self.cache.put(keys[i], scores[i])
+        return scores
     
-    def rank(self, query: str, documents: list[str], top_k: Optional[int] = None) -> list[str]:
+    def score_windows(self, query: str, documents: list[str], window_words: int = 256, max_windows: int = 2) -> list[float]:
+        """
+        Scores every document by its best matching passage window instead of the whole text.
+
+        Long chunks are truncated by the cross-encoder anyway, scoring a few query-matching windows costs
+        fewer tokens and finds facts deep inside a chunk. All windows of all documents are scored in one
+        score() call and every document gets the maximum over its windows.
+        """
+        windows = [passage_windows(query, doc, window_words=window_words, max_windows=max_windows) for doc in documents]
+        flat = [window for doc_windows in windows for window in doc_windows]
+        flat_scores = self.score(query, flat)
+        scores, offset = [], 0
+        for doc_windows in windows:
+            scores.append(max(flat_scores[offset:offset + len(doc_windows)]))
+            offset += len(doc_windows)
+        return scores
+
+    def rank(self, query: str, documents: list[str], top_n: Optional[int] = None) -> list[RerankResult]:
         """
         Reranks a list of documents based on their relevance to a given query.
+
+        Args:
+            query: The search query string.
+            documents: A list of document strings to be reranked.
+            top_n: Optional maximum number of documents to return. If None, all documents are returned.
+
+        Returns:
+            RerankResult items (index, relevance_score and, if return_documents is set, document) sorted by relevance.
         """
-        raise NotImplementedError("Subclasses must implement this method.")
+        scores = self.score(query, documents)
+        order = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)[:top_n]
+        return_documents = getattr(self, "return_documents", True)
+        return [RerankResult(index=i, relevance_score=scores[i], document=documents[i] if return_documents else None) for i in order]
+
+    def cache_stats(self) -> dict:
+        """Hit/miss metrics of the score cache"""
+        return self.cache.stats()
     
 
-def load_reranker(model: Union[RerankingModel, str]) -> AbstractReranker:
+def load_reranker(model: Union[RerankingModel, str], backend: Union[RerankerBackend, str] = os.getenv("RERANKER_BACKEND", RerankerBackend.TORCH.value)) -> AbstractReranker:
     """
     Loads a CrossEncoder model for reranking tasks.
 
     Args:
         model: The identifier of the model to load. Can be a RerankingModel enum member
                or a string representing the model name (e.g., from Hugging Face Hub).
+        backend: torch (default), onnx or onnx-int8 for CPU inference with ONNX Runtime, RERANKER_BACKEND env var.
 
     Returns:
         An instance of the CrossEncoder model.
     """
+    backend = RerankerBackend(backend)
     if model == RerankingModel.REMOTE_JINA_RERANKER_V2_BASE_MULTILINGUAL:
         return RemoteJinaReranker()
+    elif backend != RerankerBackend.TORCH:
+        from just_semantic_search.onnx_reranking import OnnxCrossEncoderReranker
+        model_id = model.value if isinstance(model, RerankingModel) else model
+        return OnnxCrossEncoderReranker(model_name=model_id, quantization="int8" if backend == RerankerBackend.ONNX_INT8 else "fp32")
     else: 
         model_id = model.value if isinstance(model, RerankingModel) else model
         cross_encoder = CrossEncoder(
@@ -56,7 +185,7 @@ def load_reranker(model: Union[RerankingModel, str]) -> AbstractReranker:
             },
             trust_remote_code=True,
         )
-        return CrossEncoderReranker(cross_encoder=cross_encoder)
+        return CrossEncoderReranker(cross_encoder=cross_encoder, model_id=model_id)
     
     
 class RemoteJinaReranker(AbstractReranker):
@@ -67,95 +196,49 @@ class RemoteJinaReranker(AbstractReranker):
     return_documents: bool = Field(default=True)
     
     def model_post_init(self, __context):
-        pass  # No need to load a model for remote reranking
+        if not self.model_id:
+            self.model_id = f"{self.model.value}_remote"
 
-    def score(self, query: str, documents: list[str], top_n: Optional[int]=None) -> list[float]:
+    def score(self, query: str, documents: list[str], document_hashes: Optional[list[Optional[str]]] = None, top_n: Optional[int] = None) -> list[float]:
         """
-        Calculates similarity scores between a query and a list of documents using a CrossEncoder model.
-
-        If no model is provided, it defaults to loading the JINA_RERANKER_V2_BASE_MULTILINGUAL model.
+        Calculates similarity scores between a query and a list of documents using the Jina rerank API.
 
         Args:
             query: The search query string.
             documents: A list of document strings to be scored against the query.
+            document_hashes: Optional hashes identifying the documents for the score cache.
+            top_n: Only score the top_n documents, the others get -inf. Bypasses the cache.
 
         Returns:
             A list of float scores representing the similarity between the query and each document.
         """
-        
-        # Get raw results with scores
-        results = jina_rerank(query, documents, return_documents=self.return_documents, top_n=top_n)
-        # Extract just the scores
-        return [result.relevance_score for result in results]
-
-    def rank(self, query: str, documents: list[str], top_n: Optional[int] = None) -> list[str]:
-        """
-        Reranks a list of documents based on their relevance to a given query using a Jina reranker model.
-
-        If no model is provided, it defaults to loading the JINA_RERANKER_V2_BASE_MULTILINGUAL model.
-
-        Args:
-            query: The search query string.
-            documents: A list of document strings to be reranked.
-            top_k: Optional maximum number of documents to return. If None, all documents are returned.
-
-        Returns:
-            A list containing the reranked results. The format depends on the `return_documents` parameter.
-            If `return_documents` is True, each item is a dictionary with 'corpus_id', 'score', and 'text'.
-            If `return_documents` is False, it's a list of scores.
-        """
-        rankings = jina_rerank(query, documents, return_documents=self.return_documents, top_n=top_n)
-        return rankings
+        if top_n is not None:
+            return self._compute_scores(query, documents, top_n=top_n)
+        return super().score(query, documents, document_hashes=document_hashes)
+
+    def _compute_scores(self, query: str, documents: list[str], top_n: Optional[int] = None) -> list[float]:
+        # Get raw results with scores, Jina returns them sorted by relevance
+        results = jina_rerank(query, documents, return_documents=False, top_n=top_n)
+        # Extract just the scores in the order of the documents
+        scores = [float("-inf")] * len(documents)
+        for result in results:
+            scores[result.index] = result.relevance_score
+        return scores
 
     
 
 class CrossEncoderReranker(AbstractReranker):
     """
-    Reranks a list of documents based on their relevance to a given query using a Jina reranker model.
+    Reranks a list of documents based on their relevance to a given query using a CrossEncoder model.
     """
     cross_encoder: Optional[CrossEncoder] = Field(exclude=True)
     return_documents: bool = Field(default=True)
-    
 
-    def score(self, query: str, documents: list[str]) -> list[float]:
-        """
-        Calculates similarity scores between a query and a list of documents using a CrossEncoder model.
-
-        If no model is provided, it defaults to loading the JINA_RERANKER_V2_BASE_MULTILINGUAL model.
-
-        Args:
-            query: The search query string.
-            documents: A list of document strings to be scored against the query.
-            convert_to_tensor: Whether to convert the output scores to PyTorch tensors before converting to list. Defaults to False.
-            model: An optional pre-loaded CrossEncoder model instance. If None, the default
-                Jina multilingual model is loaded.
+    def model_post_init(self, __context):
+        if not self.model_id and self.cross_encoder is not None:
+            self.model_id = getattr(getattr(self.cross_encoder, "config", None), "_name_or_path", "") or ""
 
-        Returns:
-            A list of float scores representing the similarity between the query and each document.
-        """
+    def _compute_scores(self, query: str, documents: list[str]) -> list[float]:
+        """Scores all query-document pairs in one batched CrossEncoder.predict call"""
         sentence_pairs = [[query, doc] for doc in documents]
-        scores = self.cross_encoder.predict(sentence_pairs, convert_to_tensor=self.convert_to_tensor).tolist()
-        return scores
-
-    def rank(self, query: str, documents: list[str], top_n: Optional[int] = None) -> list[str]:
-        """
-        Reranks a list of documents based on their relevance to a given query using a Jina reranker model.
-
-        If no model is provided, it defaults to loading the JINA_RERANKER_V2_BASE_MULTILINGUAL model.
-
-        Args:
-            query: The search query string.
-            documents: A list of document strings to be reranked.
-            convert_to_tensor: Whether to convert the output scores to PyTorch tensors. Defaults to False.
-            return_documents: If True (default), returns a list of dictionaries, each containing 'corpus_id',
-                            'score', and 'text'. If False, returns only the scores.
-            model: An optional pre-loaded CrossEncoder model instance. If None, the default
-                Jina multilingual model is loaded.
-
-        Returns:
-            A list containing the reranked results. The format depends on the `return_documents` parameter.
-            If `return_documents` is True, each item is a dictionary with 'corpus_id', 'score', and 'text'.
-            If `return_documents` is False, it's a list of scores.
-        """
-        rankings = self.cross_encoder.rank(query, documents, return_documents=self.return_documents, convert_to_tensor=self.convert_to_tensor, top_k=top_n)
-        return [RerankResult(index=result["corpus_id"], relevance_score=result["score"], document=result["text"]) for result in rankings]
\ No newline at end of file
+        return self.cross_encoder.predict(sentence_pairs, convert_to_tensor=self.convert_to_tensor).tolist()
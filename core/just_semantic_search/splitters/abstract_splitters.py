@@ -1,6 +1,6 @@
 from just_semantic_search.embeddings import EmbeddingModelParams
 from sentence_transformers import SentenceTransformer
-from typing import List, TypeAlias, TypeVar, Generic, Optional, Any, Callable, Union
+from typing import Iterator, List, TypeAlias, TypeVar, Generic, Optional, Any, Callable, Union
 import numpy as np
 from pathlib import Path
 import re
@@ -12,6 +12,7 @@ import torch
 import time
 from eliot import log_call, log_message, start_action
 from just_semantic_search.utils.models import get_sentence_transformer_model_name
+from just_semantic_search.utils.metrics import METRICS
 from pydantic import BaseModel, ConfigDict, Field
 
 from just_semantic_search.document import Document, IDocument
@@ -62,12 +63,29 @@ class AbstractSplitter(ABC, BaseModel, Generic[CONTENT, IDocument]):
             
         with start_action(action_type="processing_file", file_path=str(file_path.absolute())) as action:
             content: CONTENT = self._content_from_path(file_path)
-            documents = self.split(content, embed, 
-                               source=str(file_path.absolute()) if path_as_source else file_path.name,
-                               **kwargs)
+            with METRICS.timer("split"):
+                documents = self.split(content, embed, 
+                                   source=str(file_path.absolute()) if path_as_source else file_path.name,
+                                   **kwargs)
+            METRICS.inc("split_documents", len(documents))
             action.add_success_fields(num_documents=len(documents))
             return documents
 
+    def _check_folder(self, folder_path: Path | str) -> Path:
+        folder_path = Path(folder_path) if isinstance(folder_path, str) else folder_path
+        if not folder_path.exists() or not folder_path.is_dir():
+            raise ValueError(f"Invalid folder path: {folder_path}")
+        return folder_path
+
+    def _folder_files(self, folder_path: Path, filter: Optional[Callable[[Path], bool]] = None) -> List[Path]:
+        return [file_path for file_path in folder_path.iterdir() if file_path.is_file() and (filter is None or filter(file_path))]
+
+    def iter_split_folder(self, folder_path: Path | str, embed: bool = True, path_as_source: bool = True, filter: Optional[Callable[[Path], bool]] = None, **kwargs) -> Iterator[IDocument]:
+        """Lazily splits the files of a folder one after another, e.g. to pass them to add_documents without holding them all"""
+        folder_path = self._check_folder(folder_path)
+        for file_path in self._folder_files(folder_path, filter):
+            yield from self.split_file(file_path, embed, path_as_source, **kwargs)
+
     def split_folder(self, folder_path: Path | str, embed: bool = True, path_as_source: bool = True, filter: Optional[Callable[[Path], bool]] = None, **kwargs) -> List[IDocument]:
         """Split all files in a folder into documents.
         
@@ -78,20 +96,14 @@ class AbstractSplitter(ABC, BaseModel, Generic[CONTENT, IDocument]):
             filter: Optional function that takes a file path and returns True if the file should be processed
             **kwargs: Additional arguments to pass to split_file
         """
+        folder_path = Path(folder_path) if isinstance(folder_path, str) else folder_path
         with start_action(action_type="split_folder", folder_path=str(folder_path.absolute()), embed=embed, path_as_source=path_as_source) as action:
             start_time = time.time()
-            folder_path = Path(folder_path) if isinstance(folder_path, str) else folder_path
         
             # Log the folder path separately as a string
             action.log(message_type="processing_folder", folder_path=str(folder_path.absolute()))
-            
-            if not folder_path.exists() or not folder_path.is_dir():
-                raise ValueError(f"Invalid folder path: {folder_path}")
 
-            documents = []
-            for file_path in folder_path.iterdir():
-                if file_path.is_file() and (filter is None or filter(file_path)):
-                    documents.extend(self.split_file(file_path, embed, path_as_source, **kwargs))
+            documents = list(self.iter_split_folder(folder_path, embed, path_as_source, filter, **kwargs))
             
             elapsed_time = time.time() - start_time
             action.log(
@@ -1,12 +1,14 @@
 from abc import ABC
-import json
+from eliot import log_message, start_action
 from just_semantic_search.splitters.abstract_splitters import AbstractSplitter, SentenceTransformerMixin
-from typing import List, TypeAlias, Generic, Optional
+from just_semantic_search.utils.json_stream import iter_json_records
+from just_semantic_search.utils.metrics import METRICS
+from typing import Callable, Dict, Iterable, Iterator, List, TypeAlias, Generic, Optional
 import numpy as np
 from pathlib import Path
 import re
 from just_semantic_search.document import ArticleDocument, Document, IDocument
-from pydantic import Field
+from pydantic import Field, PrivateAttr
 
 from just_semantic_search.document import Document, IDocument
 from typing import Generic, List, Optional, TypeAlias
@@ -21,41 +23,33 @@ class AbstractDictionarySplitter(AbstractSplitter[dict, IDocument], ABC):
 
     content_key: str = "content"
     extend_content: bool = True
+    _overhead_cache: Dict[tuple, int] = PrivateAttr(default_factory=dict)
     
-    def compute_metadata_header(self, metadata: dict, source: str | None = None, fragment_num: int = None, total_fragments: int = None) -> str:
-        """
-        Creates a markdown header with metadata fields and fragment information
-        
-        Args:
-            metadata: Dictionary of metadata fields
-            source: Optional source information
-            fragment_num: Current fragment number
-            total_fragments: Total number of fragments
-            
-        Returns:
-            Text with metadata formatted as markdown
-        """
-        if not metadata and not source and fragment_num is None and not self.extend_content:
-            return ""
-            
-        # Start with a title if available
+    def _header_fields(self, metadata: dict) -> List[tuple[str, str]]:
+        """Metadata fields shown in the header, as (key, rendered value) without the title"""
+        fields = []
+        for key, value in metadata.items():
+            if key != "title" and value:  # Skip empty values
+                if isinstance(value, list):
+                    value = ", ".join(str(v) for v in value)
+                elif not isinstance(value, (str, int, float, bool)):
+                    continue  # Skip complex objects
+                fields.append((key, str(value)))
+        return fields
+
+    def _render_header(self, title: Optional[str], fields: List[tuple[str, str]], source: str | None = None,
+                       fragment_num: int = None, total_fragments: int = None) -> str:
         header = ""
-        if "title" in metadata:
-            header += f"# {metadata['title']}\n\n"
+        if title is not None:
+            header += f"# {title}\n\n"
             
         # Add fragment information if available
         if fragment_num is not None and total_fragments is not None:
             header += f"**Fragment:** {fragment_num} of {total_fragments}  \n"
             
         # Add other metadata fields
-        for key, value in metadata.items():
-            if key != "title" and value:  # Skip empty values
-                if isinstance(value, list):
-                    value = ", ".join(str(v) for v in value)
-                elif not isinstance(value, (str, int, float, bool)):
-                    continue  # Skip complex objects
-                
-                header += f"**{key.replace('_', ' ').title()}:** {value}  \n"
+        for key, value in fields:
+            header += f"**{key.replace('_', ' ').title()}:** {value}  \n"
         if source is not None:
             header += f"**Source:** {source}  \n"
             
@@ -64,23 +58,64 @@ class AbstractDictionarySplitter(AbstractSplitter[dict, IDocument], ABC):
             header += "\n## Content\n\n"
             
         return header
+
+    def compute_metadata_header(self, metadata: dict, source: str | None = None, fragment_num: int = None, total_fragments: int = None) -> str:
+        """
+        Creates a markdown header with metadata fields and fragment information
         
-  
+        Args:
+            metadata: Dictionary of metadata fields
+            source: Optional source information
+            fragment_num: Current fragment number
+            total_fragments: Total number of fragments
+            
+        Returns:
+            Text with metadata formatted as markdown
+        """
+        if not metadata and not source and fragment_num is None and not self.extend_content:
+            return ""
+        title = metadata["title"] if "title" in metadata else None
+        return self._render_header(title, self._header_fields(metadata), source, fragment_num, total_fragments)
+
+    def metadata_overhead(self, metadata: dict, source: str | None = None) -> int:
+        """
+        Number of tokens the metadata header takes in every chunk.
+
+        The tokens of the fixed part of the header (labels, fragment line, content heading) only depend on the metadata
+        shape, i.e. which fields are shown and whether there is a title and a source, so they are counted once per shape
+        and cached. Only the values of the record are tokenized on each call.
+        """
+        if not self.extend_content:
+            return 0
+        title = metadata["title"] if "title" in metadata else None
+        fields = self._header_fields(metadata)
+        shape = (title is not None, tuple(key for key, _ in fields), source is not None)
+        skeleton = self._overhead_cache.get(shape)
+        if skeleton is None:
+            empty_header = self._render_header("" if title is not None else None, [(key, "") for key, _ in fields],
+                                               "" if source is not None else None, 1, 1)
+            skeleton = len(self.tokenizer.tokenize(empty_header)) if empty_header else 0
+            self._overhead_cache[shape] = skeleton
+        values = [str(title)] if title is not None else []
+        values += [value for _, value in fields]
+        if source is not None:
+            values.append(source)
+        return skeleton + (len(self.tokenizer.tokenize("\n".join(values))) if values else 0)
 
     def split(self, text: dict, embed: bool = True, source: str | None = None, metadata: Optional[dict] = None, **kwargs) -> List[IDocument]:
-    
+        return list(self.split_records([text], embed=embed, source=source, metadata=metadata, **kwargs))
+
+    def _prepare_record(self, record: dict, source: str | None, metadata: Optional[dict]) -> List[IDocument]:
+        """Splits one record into documents without vectors"""
         # Extract all fields except content_key as metadata
-        extracted_metadata = {k: v for k, v in text.items() if k != self.content_key}
+        extracted_metadata = {k: v for k, v in record.items() if k != self.content_key}
         
         # Merge with optional metadata if provided
         if metadata:
             extracted_metadata.update(metadata)
             
-        content = text[self.content_key]
-        
-        # Calculate a sample metadata header to estimate overhead
-        sample_header = self.compute_metadata_header(extracted_metadata, source, 1, 1) if self.extend_content else ""
-        metadata_overhead = len(self.tokenizer.tokenize(sample_header)) if sample_header else 0
+        content = record[self.content_key]
+        metadata_overhead = self.metadata_overhead(extracted_metadata, source)
         
         # Get tokens and chunks with consideration for metadata overhead
         token_chunks, text_chunks = self.get_tokens_and_chunks(content, metadata_overhead=metadata_overhead)
@@ -92,23 +127,80 @@ class AbstractDictionarySplitter(AbstractSplitter[dict, IDocument], ABC):
                 self.compute_metadata_header(extracted_metadata, source, i+1, total_fragments) + chunk 
                 for i, chunk in enumerate(text_chunks)
             ]
-        
-        # Generate embeddings and create documents in one go
         return [
             Document(
                 text=chunk, 
-                vectors={self.model_name: vec} if vec is not None else {}, 
                 source=source,
                 metadata=extracted_metadata,
                 token_count=len(token_chunk) if self.write_token_counts else None,
                 fragment_num=i + 1,
                 total_fragments=total_fragments
-            ) for i, (chunk, token_chunk, vec) in enumerate(zip(
-                text_chunks,
-                token_chunks,
-                self.embed_content(text_chunks, batch_size=self.batch_size, normalize_embeddings=self.normalize_embeddings, **kwargs) if embed else [None] * len(text_chunks)
-            ))
+            ) for i, (chunk, token_chunk) in enumerate(zip(text_chunks, token_chunks))
         ]
+
+    def _embed_documents(self, documents: List[IDocument], **kwargs) -> List[IDocument]:
+        vectors = self.embed_content([doc.text for doc in documents], batch_size=self.batch_size,
+                                     normalize_embeddings=self.normalize_embeddings, **kwargs)
+        for doc, vec in zip(documents, vectors):
+            doc.with_vector(self.model_name, vec)
+        return documents
+
+    def split_stream(self, records: Iterable[tuple[dict, str | None]], embed: bool = True, metadata: Optional[dict] = None,
+                     skip_missing: bool = False, **kwargs) -> Iterator[IDocument]:
+        """
+        Lazily splits (record, source) pairs. Chunks of consecutive records are embedded together, batch_size at a time,
+        so that many small records do not each cost an encode call. A record without content_key raises KeyError like
+        split() does, with skip_missing it is logged and skipped instead (files are streamed that way).
+        """
+        pending: List[IDocument] = []
+        for record, source in records:
+            if skip_missing and (not isinstance(record, dict) or self.content_key not in record):
+                log_message(message_type="missing_content_field", field=self.content_key, source=source, document=str(record)[:100])
+                continue
+            documents = self._prepare_record(record, source, metadata)
+            if not embed:
+                yield from documents
+                continue
+            pending.extend(documents)
+            if len(pending) >= self.batch_size:
+                yield from self._embed_documents(pending, **kwargs)
+                pending = []
+        if pending:
+            yield from self._embed_documents(pending, **kwargs)
+
+    def split_records(self, records: Iterable[dict], embed: bool = True, source: str | None = None, metadata: Optional[dict] = None,
+                      skip_missing: bool = False, **kwargs) -> Iterator[IDocument]:
+        """Lazily splits records sharing one source, embedding chunks of many records in shared batches"""
+        return self.split_stream(((record, source) for record in records), embed=embed, metadata=metadata,
+                                 skip_missing=skip_missing, **kwargs)
+
+    def iter_split_file(self, file_path: Path | str, embed: bool = True, path_as_source: bool = True, **kwargs) -> Iterator[IDocument]:
+        """
+        Streams the documents of a JSON (object, array or concatenated objects) or JSONL file, one record at a time.
+        Records without content_key are logged and skipped, so that one bad record does not stop the file.
+        """
+        file_path = Path(file_path)
+        source = str(file_path.absolute()) if path_as_source else file_path.name
+        return self.split_records(iter_json_records(file_path), embed, source=source, skip_missing=True, **kwargs)
+
+    def split_file(self, file_path: Path | str, embed: bool = True, path_as_source: bool = True, **kwargs) -> List[IDocument]:
+        file_path = Path(file_path)
+        with start_action(action_type="processing_file", file_path=str(file_path.absolute())) as action:
+            with METRICS.timer("split"):
+                documents = list(self.iter_split_file(file_path, embed, path_as_source, **kwargs))
+            METRICS.inc("split_documents", len(documents))
+            action.add_success_fields(num_documents=len(documents))
+            return documents
+
+    def iter_split_folder(self, folder_path: Path | str, embed: bool = True, path_as_source: bool = True, filter: Optional[Callable[[Path], bool]] = None, **kwargs) -> Iterator[IDocument]:
+        """Streams the records of all files of the folder through shared embedding batches, files are never loaded whole"""
+        folder_path = self._check_folder(folder_path)
+        records = (
+            (record, str(file_path.absolute()) if path_as_source else file_path.name)
+            for file_path in self._folder_files(folder_path, filter)
+            for record in iter_json_records(file_path)
+        )
+        return self.split_stream(records, embed=embed, skip_missing=True, **kwargs)
     
     def split_documents(self, documents: List[IDocument], embed: bool = True, **kwargs) -> List[IDocument]:
         ### TODO: fix this
@@ -116,7 +208,8 @@ class AbstractDictionarySplitter(AbstractSplitter[dict, IDocument], ABC):
 
 
     def _content_from_path(self, file_path: Path) -> dict:
-        return json.loads(file_path.read_text())
+        """First record of the file, split_file streams all of them"""
+        return next(iter(iter_json_records(file_path)), {})
 
     def extend_text_with_metadata(self, content: str, metadata: dict, source: str | None = None, fragment_num: int = None, total_fragments: int = None) -> str:
         """
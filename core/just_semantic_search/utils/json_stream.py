@@ -0,0 +1,109 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterator
+
+from eliot import log_message
+
+JSON_LINES_SUFFIXES = (".jsonl", ".ndjson")
+DEFAULT_READ_SIZE = int(os.getenv("JSON_STREAM_READ_SIZE", 1024 * 1024))
+
+_WHITESPACE = " \t\n\r"
+
+
+def is_json_lines(path: Path | str) -> bool:
+    return Path(path).suffix.lower() in JSON_LINES_SUFFIXES
+
+
+def iter_json_lines(path: Path | str, skip_invalid: bool = False) -> Iterator[Any]:
+    """
+    Yields the values of a JSONL file one line at a time, blank lines are ignored.
+    With skip_invalid a malformed line is logged and skipped instead of raising ValueError.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                if not skip_invalid:
+                    raise ValueError(f"{path}:{line_number}: invalid JSON line: {e}") from e
+                log_message(message_type="invalid_json_line", path=str(path), line=line_number, error=str(e))
+
+
+def iter_json_values(path: Path | str, read_size: int = DEFAULT_READ_SIZE) -> Iterator[Any]:
+    """
+    Yields the records of a JSON file without loading it whole: the elements of a top-level array,
+    otherwise each top-level value (a single object, or concatenated/newline separated objects).
+
+    The file is read in read_size pieces and only the record being decoded is kept in memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = ""
+        pos = 0
+        eof = False
+
+        def more() -> bool:
+            # keeps the unread tail and reads at least as much again, so a huge record is decoded in O(n)
+            nonlocal buffer, pos, eof
+            if eof:
+                return False
+            piece = f.read(max(read_size, len(buffer) - pos))
+            buffer = buffer[pos:] + piece
+            pos = 0
+            eof = not piece
+            return not eof
+
+        def skip_whitespace() -> bool:
+            # moves pos to the next significant character, False at the end of the file
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                    pos += 1
+                if pos < len(buffer):
+                    return True
+                if not more():
+                    return False
+
+        if not skip_whitespace():
+            return
+        in_array = buffer[pos] == "["
+        if in_array:
+            pos += 1
+        first = True
+        while skip_whitespace():
+            if in_array:
+                if buffer[pos] == "]":
+                    return
+                if not first:
+                    if buffer[pos] != ",":
+                        raise ValueError(f"{path}: expected ',' or ']' between array elements")
+                    pos += 1
+                    if not skip_whitespace():
+                        break
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError as e:
+                    if more():
+                        continue
+                    raise ValueError(f"{path}: invalid JSON: {e}") from e
+                # a number at the end of the buffer may continue in the next piece
+                if end == len(buffer) and not eof:
+                    more()
+                    continue
+                break
+            pos = end
+            first = False
+            yield value
+        if in_array:
+            raise ValueError(f"{path}: unterminated JSON array")
+
+
+def iter_json_records(path: Path | str, read_size: int = DEFAULT_READ_SIZE, skip_invalid: bool = False) -> Iterator[Any]:
+    """Streams the records of a JSON (array, object or concatenated objects) or JSONL/NDJSON file"""
+    if is_json_lines(path):
+        return iter_json_lines(path, skip_invalid=skip_invalid)
+    return iter_json_values(path, read_size=read_size)
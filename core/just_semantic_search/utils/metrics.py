@@ -0,0 +1,228 @@
+import bisect
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from eliot import start_action
+
+# Upper bounds (seconds) of the latency histogram buckets, roughly x2.5 apart from 0.1 ms to 60 s
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+class Counter:
+    """Monotonic counter, increments take a lock because += is not atomic across threads"""
+
+    def __init__(self) -> None:
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with count and sum, cheap enough to update on every call"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile, None when nothing was observed"""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum_seconds": self.sum,
+            "mean_seconds": self.sum / self.count if self.count else None,
+            "p50_seconds": self.quantile(0.5),
+            "p95_seconds": self.quantile(0.95),
+            "p99_seconds": self.quantile(0.99)
+        }
+
+
+class _NullTimer:
+    """Context manager returned by disabled timers, does nothing"""
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class NullAction:
+    """Stands in for an Eliot action when a call is not sampled for tracing"""
+
+    def __enter__(self) -> "NullAction":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+    def log(self, *args: Any, **kwargs: Any) -> None:
+        return None
+
+    def add_success_fields(self, **fields: Any) -> None:
+        return None
+
+
+_NULL_ACTION = NullAction()
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and latency histograms for the hot paths (encode, Meilisearch round trip, rerank,
+    serialization, split).
+
+    Updating a metric is a dict lookup and an addition under the metric's own lock, and when the registry is disabled timer() returns a shared
+    no-op context manager. Per-call Eliot actions on these paths are sampled with trace_action instead of being
+    opened on every call: trace_sample_rate is the fraction of calls that are traced (1.0 traces everything).
+    """
+
+    def __init__(self,
+                 enabled: bool = _env_flag("METRICS_ENABLED", "true"),
+                 trace_sample_rate: float = float(os.getenv("METRICS_TRACE_SAMPLE_RATE", 0.01))):
+        self.enabled = enabled
+        self.trace_sample_rate = trace_sample_rate
+        self.counters: Dict[str, Counter] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self._gauges: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str) -> Counter:
+        counter = self.counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self.counters.setdefault(name, Counter())
+        return counter
+
+    def histogram(self, name: str) -> Histogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    def inc(self, name: str, amount: int = 1) -> None:
+        if self.enabled:
+            self.counter(name).inc(amount)
+
+    def observe(self, name: str, seconds: float) -> None:
+        if self.enabled:
+            self.histogram(name).observe(seconds)
+
+    def timer(self, name: str):
+        """Context manager recording the duration of its block in the named histogram"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self.histogram(name))
+
+    def register_gauges(self, name: str, collect: Callable[[], Dict[str, Any]]) -> None:
+        """Registers a callable returning current numeric values (cache sizes, hit rates...), collected on snapshot"""
+        self._gauges[name] = collect
+
+    def sampled(self) -> bool:
+        rate = self.trace_sample_rate
+        return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+    def trace_action(self, action_type: str, **fields: Any):
+        """An Eliot action for a sampled fraction of the calls, a no-op NullAction for the others"""
+        if self.sampled():
+            return start_action(action_type=action_type, **fields)
+        return _NULL_ACTION
+
+    def _collect_gauges(self) -> Dict[str, Dict[str, Any]]:
+        gauges = {}
+        for name, collect in list(self._gauges.items()):
+            try:
+                gauges[name] = collect()
+            except Exception as e:
+                gauges[name] = {"error": str(e)}
+        return gauges
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "counters": {name: counter.value for name, counter in sorted(self.counters.items())},
+            "histograms": {name: histogram.snapshot() for name, histogram in sorted(self.histograms.items())},
+            "gauges": self._collect_gauges()
+        }
+
+    def render_prometheus(self, prefix: str = "just_semantic_search") -> str:
+        """Renders all metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        for name, counter in sorted(self.counters.items()):
+            metric = f"{prefix}_{name}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {counter.value}"]
+        for name, histogram in sorted(self.histograms.items()):
+            metric = f"{prefix}_{name}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{metric}_bucket{{le="{le}"}} {cumulative}')
+            lines += [f"{metric}_sum {histogram.sum}", f"{metric}_count {histogram.count}"]
+        for group, values in sorted(self._collect_gauges().items()):
+            for key, value in sorted(values.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                metric = f"{prefix}_{group}_{key}"
+                lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+METRICS = MetricsRegistry()
+
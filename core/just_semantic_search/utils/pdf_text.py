@@ -0,0 +1,97 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from eliot import start_action
+
+try:
+    import pypdf
+except ImportError:  # pragma: no cover - optional dependency
+    pypdf = None
+
+# A page whose text layer has fewer characters than this is considered scanned and needs OCR
+MIN_PAGE_CHARACTERS = int(os.getenv("PDF_MIN_PAGE_CHARACTERS", 200))
+# Documents with fewer pages are extracted in the calling process, spawning workers would cost more than it saves
+PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 32))
+EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", min(8, os.cpu_count() or 1)))
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+def _require_pypdf() -> None:
+    if pypdf is None:
+        raise ImportError(
+            "pypdf is required for local PDF text extraction, "
+            "install it with `pip install just-semantic-search[pdf]`"
+        )
+
+
+def _pool() -> ProcessPoolExecutor:
+    # pypdf holds the GIL, so pages are extracted in processes. They are spawned (not forked from a threaded
+    # server) and only import this module, the pool is shared so that the start-up cost is paid once.
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _POOL
+
+
+def page_count(pdf_path: Path | str) -> int:
+    _require_pypdf()
+    return len(pypdf.PdfReader(str(pdf_path)).pages)
+
+
+def extract_page_range(pdf_path: str, start: int, end: int) -> List[str]:
+    """Text layer of pages [start, end), an empty string for a page whose text cannot be extracted"""
+    _require_pypdf()
+    reader = pypdf.PdfReader(pdf_path)
+    texts = []
+    for page in reader.pages[start:end]:
+        try:
+            texts.append(page.extract_text() or "")
+        except Exception:
+            texts.append("")
+    return texts
+
+
+def extract_text_layer(pdf_path: Path | str, workers: int = EXTRACT_WORKERS) -> List[str]:
+    """
+    Text layer of every page of the PDF. Large documents are split into page ranges extracted in parallel
+    by a shared process pool, small ones are extracted in place.
+    """
+    _require_pypdf()
+    pdf_path = str(pdf_path)
+    with start_action(action_type="extract_pdf_text_layer", pdf_path=pdf_path) as action:
+        pages = page_count(pdf_path)
+        if pages < PARALLEL_MIN_PAGES or workers <= 1:
+            texts = extract_page_range(pdf_path, 0, pages)
+        else:
+            step = -(-pages // workers)
+            futures = [_pool().submit(extract_page_range, pdf_path, start, min(start + step, pages))
+                       for start in range(0, pages, step)]
+            texts = [text for future in futures for text in future.result()]
+        action.add_success_fields(pages=pages, characters=sum(len(text) for text in texts))
+        return texts
+
+
+def needs_ocr(text: str, min_characters: int = MIN_PAGE_CHARACTERS) -> bool:
+    """True when a page has little or no extractable text, e.g. a scanned page"""
+    return len(text.strip()) < min_characters
+
+
+def write_pages(pdf_path: Path | str, page_numbers: Sequence[int], output_path: Path | str) -> Path:
+    """Writes the given (0-based) pages of a PDF to a new PDF file"""
+    _require_pypdf()
+    reader = pypdf.PdfReader(str(pdf_path))
+    writer = pypdf.PdfWriter()
+    for number in page_numbers:
+        writer.add_page(reader.pages[number])
+    output_path = Path(output_path)
+    with open(output_path, "wb") as f:
+        writer.write(f)
+    return output_path
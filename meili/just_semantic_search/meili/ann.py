@@ -0,0 +1,286 @@
+import json
+import math
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from eliot import start_action
+
+META_FILE = "ivfpq.json"
+_ARRAYS = ("centroids", "codebooks", "codes", "lists", "ids", "alive")
+# 256 codewords per subspace need about 40 training points each, more only slows training down
+PQ_TRAIN_SIZE = 256 * 40
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def _grow(array: Optional[np.ndarray], count: int, needed: int, shape: Tuple[int, ...], dtype) -> np.ndarray:
+    """Returns a writable array with room for needed rows, doubling the capacity (and copying memory-mapped arrays)"""
+    if array is not None and needed <= array.shape[0] and array.flags.writeable and not isinstance(array, np.memmap):
+        return array
+    grown = np.empty((max(needed, 2 * count, 1024), *shape), dtype=dtype)
+    if count:
+        grown[:count] = array[:count]
+    return grown
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+    """Index of the nearest centroid (L2) of every vector, computed in chunks to bound memory"""
+    squared = (centroids * centroids).sum(axis=1)
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk_size):
+        chunk = vectors[start:start + chunk_size]
+        assignments[start:start + chunk_size] = np.argmax(2 * chunk @ centroids.T - squared, axis=1)
+    return assignments
+
+
+def kmeans(vectors: np.ndarray, k: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """Lloyd's k-means with random initialization, empty clusters are re-seeded with random vectors"""
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=len(vectors) < k)].copy()
+    for _ in range(iterations):
+        assignments = _nearest(vectors, centroids)
+        counts = np.bincount(assignments, minlength=k)
+        empty = counts == 0
+        # per-cluster sums with one sort and reduceat, much faster than np.add.at
+        order = np.argsort(assignments, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        sums = np.add.reduceat(vectors[order], starts[~empty], axis=0)
+        centroids[~empty] = sums / counts[~empty, None]
+        if empty.any():
+            centroids[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()))]
+    return centroids
+
+
+def default_subquantizers(dimensions: int) -> int:
+    """Largest usual number of subquantizers that divides the dimension, 64 bytes per vector for 1024 dimensions"""
+    return next(m for m in (64, 48, 32, 24, 16, 12, 8, 4, 2, 1) if dimensions % m == 0)
+
+
+class IVFPQIndex:
+    """
+    Approximate nearest neighbour index for cosine similarity: an inverted file (IVF) over k-means lists
+    whose residuals are compressed with product quantization (PQ), in pure numpy.
+
+    A query scans only the nprobe lists with the closest centroids and scores their vectors from 8-bit PQ codes
+    with one lookup table per subspace, which costs about m bytes per vector instead of 4 * dimensions.
+    With refine_factor, the refine_factor * k best approximate candidates are rescored exactly against the
+    original vectors (if passed to search), which recovers most of the recall lost to quantization.
+
+    Vectors are identified by integer ids chosen by the caller. Deleted ids are tombstoned and skipped until
+    compact() drops them, re-adding an id replaces its previous vector. The index must be trained once on a
+    representative sample before vectors are added.
+    """
+
+    def __init__(self, dimensions: int, n_lists: Optional[int] = None, m: Optional[int] = None,
+                 nprobe: int = int(os.getenv("ANN_NPROBE", 16)),
+                 refine_factor: int = int(os.getenv("ANN_REFINE_FACTOR", 4)),
+                 train_iterations: int = 20, seed: int = 0):
+        self.dimensions = dimensions
+        self.n_lists = n_lists
+        self.m = m or default_subquantizers(dimensions)
+        if dimensions % self.m != 0:
+            raise ValueError(f"{dimensions} dimensions can not be split into {self.m} subquantizers")
+        self.nprobe = nprobe
+        self.refine_factor = refine_factor
+        self.train_iterations = train_iterations
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self.codebooks: Optional[np.ndarray] = None  # (m, 256, dimensions / m)
+        self.codes: Optional[np.ndarray] = None
+        self.lists: Optional[np.ndarray] = None
+        self.ids: Optional[np.ndarray] = None
+        self.alive: Optional[np.ndarray] = None
+        self.count = 0
+        self._slots: Dict[int, int] = {}
+        self._order: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def size(self) -> int:
+        """Number of live (not deleted) vectors"""
+        return len(self._slots)
+
+    @property
+    def tombstones(self) -> int:
+        return self.count - len(self._slots)
+
+    @staticmethod
+    def min_train_size(n_lists: int) -> int:
+        """k-means needs a few dozen points per list and PQ at least 256 points per subspace"""
+        return max(39 * n_lists, 1024)
+
+    def train(self, vectors: np.ndarray, max_train_size: int = 100_000) -> "IVFPQIndex":
+        """Learns the coarse centroids and the PQ codebooks from a sample of vectors"""
+        vectors = _normalize(vectors)
+        rng = np.random.default_rng(self.seed)
+        if len(vectors) > max_train_size:
+            vectors = vectors[np.sort(rng.choice(len(vectors), size=max_train_size, replace=False))]
+        if self.n_lists is None:
+            self.n_lists = max(1, min(int(4 * math.sqrt(len(vectors))), len(vectors) // 39))
+        with start_action(action_type="train_ivfpq", vectors=len(vectors), n_lists=self.n_lists, m=self.m):
+            self.centroids = kmeans(vectors, self.n_lists, self.train_iterations, self.seed)
+            residuals = vectors - self.centroids[_nearest(vectors, self.centroids)]
+            if len(residuals) > PQ_TRAIN_SIZE:
+                residuals = residuals[rng.choice(len(residuals), size=PQ_TRAIN_SIZE, replace=False)]
+            sub = self.dimensions // self.m
+            self.codebooks = np.stack([
+                kmeans(residuals[:, j * sub:(j + 1) * sub], 256, self.train_iterations, self.seed + j)
+                for j in range(self.m)
+            ])
+        return self
+
+    def _encode(self, residuals: np.ndarray) -> np.ndarray:
+        sub = self.dimensions // self.m
+        codes = np.empty((len(residuals), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = _nearest(residuals[:, j * sub:(j + 1) * sub], self.codebooks[j])
+        return codes
+
+    def add(self, ids: Iterable[int], vectors: np.ndarray) -> None:
+        """Adds vectors under the given ids, ids that are already present are replaced"""
+        if not self.is_trained:
+            raise ValueError("The index must be trained before vectors are added")
+        ids = np.asarray(list(ids), dtype=np.int64)
+        if len(ids) == 0:
+            return
+        vectors = _normalize(vectors)
+        lists = _nearest(vectors, self.centroids)
+        codes = self._encode(vectors - self.centroids[lists])
+        self.delete(ids)
+        needed = self.count + len(ids)
+        self.codes = _grow(self.codes, self.count, needed, (self.m,), np.uint8)
+        self.lists = _grow(self.lists, self.count, needed, (), np.int32)
+        self.ids = _grow(self.ids, self.count, needed, (), np.int64)
+        self.alive = _grow(self.alive, self.count, needed, (), bool)
+        end = self.count + len(ids)
+        self.codes[self.count:end] = codes
+        self.lists[self.count:end] = lists
+        self.ids[self.count:end] = ids
+        self.alive[self.count:end] = True
+        for slot, id in enumerate(ids.tolist(), start=self.count):
+            self._slots[id] = slot
+        self.count = end
+        self._order = None
+
+    def delete(self, ids: Iterable[int]) -> int:
+        """Tombstones the given ids, returns how many were present"""
+        slots = [self._slots.pop(int(id)) for id in ids if int(id) in self._slots]
+        if slots:
+            if not self.alive.flags.writeable or isinstance(self.alive, np.memmap):
+                self.alive = np.array(self.alive[:self.count])
+            self.alive[slots] = False
+        return len(slots)
+
+    def remap(self, mapping: np.ndarray) -> None:
+        """Renumbers ids after the caller compacted its storage, mapping[old_id] is the new id (or -1 if removed)"""
+        live = np.fromiter(self._slots.values(), dtype=np.int64, count=len(self._slots))
+        new_ids = mapping[self.ids[live]]
+        self.delete(self.ids[live[new_ids < 0]].tolist())
+        self.ids = np.array(self.ids[:self.count])
+        self.ids[live] = new_ids
+        self._slots = {int(self.ids[slot]): int(slot) for slot in live[new_ids >= 0]}
+
+    def compact(self) -> None:
+        """Drops tombstoned vectors from the lists"""
+        keep = np.flatnonzero(self.alive[:self.count])
+        self.codes = np.ascontiguousarray(self.codes[keep])
+        self.lists = np.ascontiguousarray(self.lists[keep])
+        self.ids = np.ascontiguousarray(self.ids[keep])
+        self.alive = np.ones(len(keep), dtype=bool)
+        self.count = len(keep)
+        self._slots = {int(id): slot for slot, id in enumerate(self.ids.tolist())}
+        self._order = None
+
+    def _inverted_lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Slots grouped by list (CSR layout), rebuilt lazily after adds"""
+        if self._order is None:
+            lists = self.lists[:self.count]
+            self._order = np.argsort(lists, kind="stable")
+            self._offsets = np.concatenate([[0], np.cumsum(np.bincount(lists, minlength=self.n_lists))])
+        return self._order, self._offsets
+
+    def search(self, query: np.ndarray, k: int = 10, nprobe: Optional[int] = None,
+               mask: Optional[np.ndarray] = None, vectors: Optional[np.ndarray] = None,
+               refine_factor: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the ids and cosine scores of the approximate k nearest neighbours, best first.
+
+        Args:
+            query: Query vector
+            k: Number of neighbours
+            nprobe: Number of lists scanned, more is slower and more accurate
+            mask: Optional boolean array indexed by id, ids where it is False are skipped (filters)
+            vectors: Optional original vectors indexed by id, used to rescore the best candidates exactly
+            refine_factor: Number of candidates rescored per neighbour when vectors are given
+        """
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        refine_factor = self.refine_factor if refine_factor is None else refine_factor
+        if self.count == 0 or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        query = _normalize(query)
+        order, offsets = self._inverted_lists()
+        coarse = self.centroids @ query
+        probed = np.argpartition(-coarse, nprobe - 1)[:nprobe] if nprobe < self.n_lists else np.arange(self.n_lists)
+        slots = np.concatenate([order[offsets[lst]:offsets[lst + 1]] for lst in probed])
+        slots = slots[self.alive[slots]]
+        ids = self.ids[slots]
+        if mask is not None:
+            keep = mask[ids]
+            slots, ids = slots[keep], ids[keep]
+        if len(slots) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        # q . x = q . centroid + sum over subspaces of q_j . codeword_j, one lookup table per subspace
+        sub = self.dimensions // self.m
+        lookup = np.einsum("jcs,js->jc", self.codebooks, query.reshape(self.m, sub))
+        scores = coarse[self.lists[slots]] + lookup[np.arange(self.m), self.codes[slots]].sum(axis=1)
+        candidates = min(len(slots), k * max(1, refine_factor) if vectors is not None else k)
+        top = np.argpartition(-scores, candidates - 1)[:candidates] if candidates < len(slots) else np.arange(len(slots))
+        ids, scores = ids[top], scores[top]
+        if vectors is not None and refine_factor > 0:
+            scores = _normalize(vectors[ids]) @ query
+        best = np.argsort(-scores, kind="stable")[:k]
+        return ids[best], scores[best].astype(np.float32)
+
+    def save(self, path: Path) -> Path:
+        """Writes one .npy file per array plus a JSON header, arrays are memory-mapped by load"""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in _ARRAYS:
+            array = getattr(self, name)
+            if name in ("codes", "lists", "ids", "alive") and array is not None:
+                array = array[:self.count]
+            tmp = path / f"{name}.npy.tmp"
+            with tmp.open("wb") as f:
+                np.save(f, array if array is not None else np.zeros(0, dtype=np.float32))
+            tmp.replace(path / f"{name}.npy")
+        meta = {"dimensions": self.dimensions, "n_lists": self.n_lists, "m": self.m, "nprobe": self.nprobe,
+                "refine_factor": self.refine_factor, "count": self.count, "trained": self.is_trained}
+        (path / META_FILE).write_text(json.dumps(meta), encoding="utf-8")
+        return path
+
+    @classmethod
+    def load(cls, path: Path) -> "IVFPQIndex":
+        """Loads an index written by save, arrays are memory-mapped and only copied when modified"""
+        path = Path(path)
+        meta = json.loads((path / META_FILE).read_text(encoding="utf-8"))
+        index = cls(meta["dimensions"], n_lists=meta["n_lists"], m=meta["m"], nprobe=meta["nprobe"], refine_factor=meta["refine_factor"])
+        if meta["trained"]:
+            for name in _ARRAYS:
+                setattr(index, name, np.load(path / f"{name}.npy", mmap_mode="r"))
+            index.centroids = np.array(index.centroids)
+            index.codebooks = np.array(index.codebooks)
+            index.count = meta["count"]
+            live = np.flatnonzero(index.alive[:index.count])
+            index._slots = dict(zip(index.ids[live].tolist(), live.tolist()))
+        return index
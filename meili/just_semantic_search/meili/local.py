@@ -0,0 +1,481 @@
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, ClassVar, Dict, Iterable, List, Literal, Optional, Union
+
+import numpy as np
+from eliot import start_action
+from meilisearch_python_sdk.models.documents import DocumentsInfo
+from meilisearch_python_sdk.models.search import SearchResults
+from meilisearch_python_sdk.models.task import TaskInfo
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+from sentence_transformers import SentenceTransformer
+
+from just_semantic_search.document import ArticleDocument, Document
+from just_semantic_search.embeddings import EmbeddingModel, EmbeddingModelParams, load_sentence_transformer_from_enum, load_sentence_transformer_params_from_enum
+from just_semantic_search.splitters.splitter_factory import SplitterType, create_splitter
+from just_semantic_search.splitters.text_splitters import TextSplitter
+from just_semantic_search.meili.utils.batches import DocumentsTasks
+from just_semantic_search.meili.utils.fusion import FusionMethod, fuse_hits
+from just_semantic_search.meili.ann import IVFPQIndex
+
+VECTORS_FILE = "vectors.npy"
+DOCUMENTS_FILE = "documents.jsonl"
+META_FILE = "meta.json"
+ANN_DIR = "ann"
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+_FILTER_CLAUSE = re.compile(r'^\s*([\w.]+)\s*(=|!=)\s*(?:"((?:[^"\\]|\\.)*)"|\'((?:[^\'\\]|\\.)*)\'|(\S+))\s*$')
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def _parse_filter(filter: Optional[str]) -> List[tuple]:
+    """
+    Parses the subset of the Meilisearch filter syntax the local backend supports:
+    clauses of the form attribute = value or attribute != value joined with AND (values may be quoted).
+    """
+    if not filter:
+        return []
+    clauses = []
+    for part in re.split(r"\s+AND\s+", filter.strip()):
+        match = _FILTER_CLAUSE.match(part)
+        if match is None:
+            raise ValueError(f"Unsupported filter for the local backend: {filter!r}, only 'attribute = value' clauses joined with AND are supported")
+        attribute, operator = match.group(1), match.group(2)
+        raw = next(value for value in match.group(3, 4, 5) if value is not None)
+        value = re.sub(r"\\(.)", r"\1", raw)
+        clauses.append((attribute, operator, value))
+    return clauses
+
+
+def _matches(document: dict, clauses: List[tuple]) -> bool:
+    for attribute, operator, value in clauses:
+        field = document.get(attribute)
+        values = [str(item) for item in field] if isinstance(field, list) else ([] if field is None else [str(field)])
+        if (value in values) != (operator == "="):
+            return False
+    return True
+
+
+class BM25Index:
+    """
+    Minimal in-memory BM25 inverted index over row numbers.
+    Postings map every term to the term frequency in each row containing it.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self.terms: Dict[int, List[str]] = {}
+        self.lengths: Dict[int, int] = {}
+        self.total_length = 0
+
+    def add(self, row: int, tokens: List[str]) -> None:
+        self.remove(row)
+        counts = Counter(tokens)
+        for term, count in counts.items():
+            self.postings[term][row] = count
+        self.terms[row] = list(counts)
+        self.lengths[row] = len(tokens)
+        self.total_length += len(tokens)
+
+    def remove(self, row: int) -> None:
+        if row not in self.lengths:
+            return
+        for term in self.terms.pop(row):
+            rows = self.postings[term]
+            rows.pop(row, None)
+            if not rows:
+                del self.postings[term]
+        self.total_length -= self.lengths.pop(row)
+
+    def scores(self, query: str, size: int) -> np.ndarray:
+        """BM25 score of every row for the query, rows without any query term score 0"""
+        scores = np.zeros(size, dtype=np.float32)
+        if not self.lengths:
+            return scores
+        documents_count = len(self.lengths)
+        average_length = self.total_length / documents_count or 1.0
+        for term in set(tokenize(query)):
+            rows = self.postings.get(term)
+            if not rows:
+                continue
+            idf = math.log(1.0 + (documents_count - len(rows) + 0.5) / (len(rows) + 0.5))
+            indices = np.fromiter(rows.keys(), dtype=np.int64, count=len(rows))
+            tf = np.fromiter(rows.values(), dtype=np.float32, count=len(rows))
+            lengths = np.fromiter((self.lengths[row] for row in rows), dtype=np.float32, count=len(rows))
+            scores[indices] += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * lengths / average_length))
+        return scores
+
+
+class LocalRAG(BaseModel):
+    """
+    In-process replacement for MeiliRAG that needs no running Meilisearch, meant for tests, CI and small deployments.
+
+    Vectors live in one contiguous float32 matrix of L2-normalized rows, so semantic search is a single
+    BLAS matrix-vector product followed by a partial sort. Keyword search uses a BM25 inverted index over
+    the searchable attributes and hybrid search fuses both rankings weighted by semanticRatio.
+    If path is set the index is persisted there as vectors.npy (memory-mapped on load) plus JSON metadata
+    by save(), or after every change with autosave.
+    Documents must carry a vector for the model (see Document.with_vector), as with MeiliRAG's userProvided embedder.
+    Filters support the subset 'attribute = value' / 'attribute != value' joined with AND.
+
+    With vector_index="ivfpq" semantic search goes through an IVF-PQ approximate index (see IVFPQIndex) once enough
+    vectors were added to train it, below that size brute force is used. nprobe and refine_factor trade speed for recall.
+    """
+    index_name: str = Field(description="Name of the local index")
+    path: Optional[Path] = Field(default=None, description="Directory where the index is persisted, in-memory only if None")
+    autosave: bool = Field(default=os.getenv("LOCAL_RAG_AUTOSAVE", "false").lower() in ("true", "1", "yes"),
+                           description="Save to path after every change. Each save rewrites the whole index, so when ingesting in batches leave it off and call save() once at the end")
+    model: EmbeddingModel = Field(default=EmbeddingModel.JINA_EMBEDDINGS_V3, description="Embedding model to use for vector search")
+    embedding_model_params: EmbeddingModelParams = Field(default_factory=EmbeddingModelParams, description="Embedding model parameters")
+    searchable_attributes: List[str] = Field(
+        default=['title', 'abstract', 'text', 'content', 'source', "authors", "references"],
+        description="List of attributes indexed for keyword search"
+    )
+    filterable_attributes: List[str] = Field(
+       default=['title', 'abstract', 'source', "authors", "references"],
+        description="List of attributes that can be used for filtering"
+    )
+    primary_key: str = Field(default="hash", description="Primary key field for documents")
+    vector_index: Literal["flat", "ivfpq"] = Field(default=os.getenv("LOCAL_RAG_VECTOR_INDEX", "flat"), description="Brute-force (flat) or approximate (ivfpq) semantic search")
+    ann_n_lists: Optional[int] = Field(default=None, description="Number of IVF lists, about 4 * sqrt(number of vectors) if None")
+    nprobe: int = Field(default=int(os.getenv("ANN_NPROBE", 16)), description="Number of IVF lists scanned per query")
+    refine_factor: int = Field(default=int(os.getenv("ANN_REFINE_FACTOR", 4)), description="Candidates rescored exactly per requested hit, 0 disables rescoring")
+    model_name: Optional[str] = Field(default=None, exclude=True)
+    st_model: Optional[SentenceTransformer] = Field(default=None, exclude=True)
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    transformer_lock: ClassVar[threading.RLock] = threading.RLock()
+
+    _matrix: Optional[np.ndarray] = PrivateAttr(default=None)
+    _count: int = PrivateAttr(default=0)
+    _documents: List[dict] = PrivateAttr(default_factory=list)
+    _rows: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _bm25: BM25Index = PrivateAttr(default_factory=BM25Index)
+    _ann: Optional[IVFPQIndex] = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default_factory=threading.RLock)
+    _task_uid: int = PrivateAttr(default=0)
+
+    def model_post_init(self, __context) -> None:
+        model_value = self.model.value
+        self.embedding_model_params = load_sentence_transformer_params_from_enum(self.model)
+        self.model_name = model_value.split("/")[-1].split("\\")[-1]
+        if self.path is not None and (Path(self.path) / META_FILE).exists():
+            self.load()
+
+    @property
+    def sentence_transformer(self) -> SentenceTransformer:
+        """Lazily load the sentence transformer model when it's first needed."""
+        if self.st_model is None:
+            with self.transformer_lock:
+                if self.st_model is None:
+                    self.st_model = load_sentence_transformer_from_enum(self.model)
+        return self.st_model
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Normalized vectors of all documents, row i belongs to the i-th stored document"""
+        if self._matrix is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._matrix[:self._count]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _keyword_text(self, document: dict) -> str:
+        parts = []
+        for attribute in self.searchable_attributes:
+            value = document.get(attribute)
+            if isinstance(value, list):
+                parts.extend(str(item) for item in value)
+            elif value is not None:
+                parts.append(str(value))
+        return " ".join(parts)
+
+    def _writable_matrix(self, needed: int, dimensions: int) -> np.ndarray:
+        """Returns a writable buffer with room for needed rows, growing it geometrically (and copying a memory-mapped matrix)"""
+        matrix = self._matrix
+        if matrix is not None and matrix.shape[1] != dimensions:
+            raise ValueError(f"Index {self.index_name} stores {matrix.shape[1]}-dimensional vectors, got {dimensions}")
+        if matrix is None or needed > matrix.shape[0] or not matrix.flags.writeable or isinstance(matrix, np.memmap):
+            capacity = max(needed, 2 * self._count, 1024)
+            grown = np.empty((capacity, dimensions), dtype=np.float32)
+            if self._count:
+                grown[:self._count] = matrix[:self._count]
+            self._matrix = grown
+        return self._matrix
+
+    def add_documents(self, documents: Iterable[ArticleDocument | Document | dict], compress: bool = False,
+                      splitter: Optional[SplitterType | TextSplitter] = None, wait: bool = False, **kwargs) -> DocumentsTasks:
+        """
+        Adds (or replaces, by primary key) documents. compress and wait are accepted for MeiliRAG compatibility,
+        changes are visible immediately.
+        """
+        with start_action(action_type="local_add_documents", index_name=self.index_name) as action:
+            if splitter is not None:
+                if isinstance(splitter, SplitterType):
+                    splitter = create_splitter(splitter, self.sentence_transformer)
+                documents = splitter.split_documents(documents)
+            documents_dict = [doc if isinstance(doc, dict) else doc.model_dump(by_alias=True) for doc in documents]
+            tasks = DocumentsTasks(index_name=self.index_name, documents_count=len(documents_dict))
+            if not documents_dict:
+                return tasks
+            vectors = []
+            for document in documents_dict:
+                vector = (document.get("_vectors") or {}).get(self.model_name)
+                if vector is None:
+                    raise ValueError(f"Document {document.get(self.primary_key)} has no vector for {self.model_name}")
+                vectors.append(vector)
+            batch = np.asarray(vectors, dtype=np.float32)
+            norms = np.linalg.norm(batch, axis=1, keepdims=True)
+            batch /= np.where(norms == 0, 1.0, norms)
+            with self._lock:
+                matrix = self._writable_matrix(self._count + len(documents_dict), batch.shape[1])
+                changed_rows = []
+                for document, vector in zip(documents_dict, batch):
+                    stored = {key: value for key, value in document.items() if key != "_vectors"}
+                    key = stored.get(self.primary_key)
+                    row = self._rows.get(key) if key is not None else None
+                    if row is None:
+                        row = self._count
+                        self._count += 1
+                        self._documents.append(stored)
+                        if key is not None:
+                            self._rows[key] = row
+                    else:
+                        self._documents[row] = stored
+                    matrix[row] = vector
+                    changed_rows.append(row)
+                    self._bm25.add(row, tokenize(self._keyword_text(stored)))
+                self._update_ann(changed_rows)
+                if self.autosave:
+                    self.save()
+            tasks.processed_seconds = time.perf_counter() - tasks.started_at
+            action.add_success_fields(count=len(documents_dict), total=self._count, documents_per_second=tasks.documents_per_second)
+            return tasks
+
+    def _update_ann(self, rows: List[int]) -> None:
+        """Adds the changed rows to the ANN index, training it first once there are enough vectors"""
+        if self.vector_index != "ivfpq":
+            return
+        if self._ann is None or not self._ann.is_trained:
+            if self._count < IVFPQIndex.min_train_size(self.ann_n_lists or 1):
+                return
+            self._ann = IVFPQIndex(self.vectors.shape[1], n_lists=self.ann_n_lists, nprobe=self.nprobe, refine_factor=self.refine_factor)
+            self._ann.train(self.vectors)
+            rows = list(range(self._count))
+        rows = sorted(set(rows))
+        self._ann.add(rows, self.vectors[rows])
+
+    def _task_info(self, task_type: str) -> TaskInfo:
+        """A TaskInfo like the ones MeiliRAG returns, local changes are applied synchronously so it already succeeded"""
+        self._task_uid += 1
+        return TaskInfo(task_uid=self._task_uid, index_uid=self.index_name, status="succeeded",
+                        task_type=task_type, enqueued_at=datetime.now(timezone.utc))
+
+    def delete_by_source(self, source: str) -> TaskInfo:
+        """Delete documents by their source, returns a TaskInfo as MeiliRAG.delete_by_source does."""
+        with start_action(action_type="local_delete_by_source", index_name=self.index_name, source=source) as action, self._lock:
+            keep = [row for row, document in enumerate(self._documents) if document.get("source") != source]
+            deleted = self._count - len(keep)
+            if deleted:
+                self._compact(keep)
+                if self.autosave:
+                    self.save()
+            action.add_success_fields(deleted=deleted)
+            return self._task_info("documentDeletion")
+
+    def _compact(self, keep: List[int]) -> None:
+        """Keeps only the given rows, renumbering them and rebuilding the keyword index"""
+        matrix = np.ascontiguousarray(self._matrix[keep], dtype=np.float32) if self._matrix is not None else None
+        if self._ann is not None and self._ann.is_trained:
+            mapping = np.full(self._count, -1, dtype=np.int64)
+            mapping[keep] = np.arange(len(keep))
+            self._ann.remap(mapping)
+            if self._ann.tombstones > self._ann.size // 4:
+                self._ann.compact()
+        self._matrix = matrix
+        self._documents = [self._documents[row] for row in keep]
+        self._count = len(keep)
+        self._rebuild_lookups()
+
+    def _rebuild_lookups(self) -> None:
+        self._rows = {document[self.primary_key]: row for row, document in enumerate(self._documents) if document.get(self.primary_key) is not None}
+        self._bm25 = BM25Index()
+        for row, document in enumerate(self._documents):
+            self._bm25.add(row, tokenize(self._keyword_text(document)))
+
+    def get_documents(self, limit: int = 100, offset: int = 0) -> DocumentsInfo:
+        with self._lock:
+            return DocumentsInfo(results=[dict(document) for document in self._documents[offset:offset + limit]],
+                                 offset=offset, limit=limit, total=self._count)
+
+    def delete_index(self) -> None:
+        """Removes all documents and the persisted files"""
+        with self._lock:
+            self._matrix = None
+            self._ann = None
+            self._documents = []
+            self._count = 0
+            self._rebuild_lookups()
+            if self.path is not None and Path(self.path).exists():
+                shutil.rmtree(self.path)
+
+    def save(self) -> Optional[Path]:
+        """Writes vectors.npy, documents.jsonl and meta.json to path, through temporary files so readers never see partial files"""
+        if self.path is None:
+            return None
+        path = Path(self.path)
+        path.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            tmp = path / f"{VECTORS_FILE}.tmp"
+            with tmp.open("wb") as f:
+                np.save(f, self.vectors)
+            tmp.replace(path / VECTORS_FILE)
+            tmp = path / f"{DOCUMENTS_FILE}.tmp"
+            with tmp.open("w", encoding="utf-8") as f:
+                for document in self._documents:
+                    f.write(json.dumps(document, ensure_ascii=False) + "\n")
+            tmp.replace(path / DOCUMENTS_FILE)
+            if self._ann is not None and self._ann.is_trained:
+                self._ann.save(path / ANN_DIR)
+            meta = {"index_name": self.index_name, "model": self.model.value, "primary_key": self.primary_key, "count": self._count}
+            (path / META_FILE).write_text(json.dumps(meta), encoding="utf-8")
+        return path
+
+    def load(self) -> None:
+        """Loads a persisted index, the vectors are memory-mapped and only copied once documents are added"""
+        path = Path(self.path)
+        with start_action(action_type="local_load_index", path=str(path)) as action, self._lock:
+            meta = json.loads((path / META_FILE).read_text(encoding="utf-8"))
+            if meta["model"] != self.model.value:
+                raise ValueError(f"Index at {path} was built with {meta['model']}, not {self.model.value}")
+            matrix = np.load(path / VECTORS_FILE, mmap_mode="r")
+            with (path / DOCUMENTS_FILE).open(encoding="utf-8") as f:
+                self._documents = [json.loads(line) for line in f if line.strip()]
+            self._matrix = matrix if matrix.size else None
+            self._count = len(self._documents)
+            self._rebuild_lookups()
+            if self.vector_index == "ivfpq" and (path / ANN_DIR).exists():
+                self._ann = IVFPQIndex.load(path / ANN_DIR)
+            action.add_success_fields(count=self._count)
+
+    def _semantic_scores(self, vector: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the query with every document, one BLAS matrix-vector product"""
+        norm = np.linalg.norm(vector)
+        query = (vector / norm if norm else vector).astype(np.float32)
+        return self.vectors @ query
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int, mask: Optional[np.ndarray]) -> np.ndarray:
+        """Indices of the k best scores in descending order, O(n) selection instead of a full sort"""
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+            k = min(k, int(mask.sum()))
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64)
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        return top[np.argsort(-scores[top], kind="stable")]
+
+    def _hit(self, row: int, score: float, attributes_to_retrieve: Optional[List[str]], show_ranking_score: bool) -> dict:
+        document = self._documents[row]
+        if attributes_to_retrieve is not None and "*" not in attributes_to_retrieve:
+            hit = {key: value for key, value in document.items() if key in attributes_to_retrieve}
+        else:
+            hit = dict(document)
+        if show_ranking_score:
+            hit["_rankingScore"] = float(score)
+        return hit
+
+    def search(self,
+            query: str | None = None,
+            vector: Optional[Union[List[float], 'np.ndarray']] = None,
+            semanticRatio: Optional[float] = float(os.getenv("MEILISEARCH_SEMANTIC_RATIO", 0.5)),
+            limit: int = int(os.getenv("MEILISEARCH_LIMIT", 100)),
+            offset: int = 0,
+            filter: Any | None = None,
+            attributes_to_retrieve: list[str] | None = None,
+            show_ranking_score: bool = True,
+            ranking_score_threshold: float | None = None,
+            matching_strategy: Literal["all", "last", "frequency"] = "last",
+            nprobe: Optional[int] = None,
+            refine_factor: Optional[int] = None,
+            **kwargs
+        ) -> SearchResults:
+        """Search the local index with the MeiliRAG.search arguments that apply to it.
+
+        Semantic scores are cosine similarities mapped to [0, 1], keyword scores are BM25 scores divided by the best one,
+        hybrid results fuse both rankings with weights semanticRatio and 1 - semanticRatio. Unsupported MeiliRAG
+        arguments (highlighting, cropping, facets, reranking...) are accepted and ignored.
+        nprobe and refine_factor override the ANN search parameters when vector_index is ivfpq.
+
+        Returns:
+            SearchResults: the same model MeiliRAG returns
+        """
+        start_time = time.perf_counter()
+        semanticRatio = 0.5 if semanticRatio is None else float(semanticRatio)
+        with start_action(action_type="local_search", index_name=self.index_name, query_text=query, semantic_ratio=semanticRatio) as action, self._lock:
+            clauses = _parse_filter(filter)
+            mask = np.fromiter((_matches(document, clauses) for document in self._documents), dtype=bool, count=self._count) if clauses else None
+            pool = offset + limit
+            use_keyword = bool(query) and semanticRatio < 1.0
+            use_semantic = semanticRatio > 0.0 and self._count > 0 and (vector is not None or bool(query))
+            hits_by_kind: Dict[str, List[dict]] = {}
+            if use_semantic:
+                if vector is None:
+                    vector = self.sentence_transformer.encode(query, **self.embedding_model_params.retrival_query)
+                vector = np.asarray(vector, dtype=np.float32)
+                if self._ann is not None and self._ann.is_trained:
+                    rows, similarities = self._ann.search(vector, pool, nprobe=nprobe or self.nprobe, mask=mask,
+                                                          vectors=self.vectors, refine_factor=refine_factor)
+                    hits_by_kind["semantic"] = [self._hit(row, (score + 1.0) / 2.0, attributes_to_retrieve, True) for row, score in zip(rows, similarities)]
+                else:
+                    scores = (self._semantic_scores(vector) + 1.0) / 2.0
+                    rows = self._top_k(scores, pool, mask)
+                    hits_by_kind["semantic"] = [self._hit(row, scores[row], attributes_to_retrieve, True) for row in rows]
+            if use_keyword:
+                scores = self._bm25.scores(query, self._count)
+                keyword_mask = scores > 0 if mask is None else mask & (scores > 0)
+                rows = self._top_k(scores, pool, keyword_mask)
+                best = float(scores[rows[0]]) if len(rows) else 1.0
+                hits_by_kind["keyword"] = [self._hit(row, scores[row] / best, attributes_to_retrieve, True) for row in rows]
+            if len(hits_by_kind) == 2:
+                fused = fuse_hits(hits_by_kind, method=FusionMethod.SCORE,
+                                  weights={"semantic": semanticRatio, "keyword": 1.0 - semanticRatio},
+                                  primary_key=self.primary_key)
+                hits = []
+                for hit in fused:
+                    hit.pop("_indexUid", None)
+                    hit["_rankingScore"] = hit.pop("_fusionScore")
+                    hits.append(hit)
+            else:
+                hits = next(iter(hits_by_kind.values()), [])
+            if ranking_score_threshold is not None:
+                hits = [hit for hit in hits if hit["_rankingScore"] >= float(ranking_score_threshold)]
+            hits = hits[offset:offset + limit]
+            if not show_ranking_score:
+                for hit in hits:
+                    hit.pop("_rankingScore", None)
+            action.add_success_fields(hits_count=len(hits))
+            return SearchResults(
+                hits=hits,
+                query=query or "",
+                offset=offset,
+                limit=limit,
+                estimated_total_hits=len(hits),
+                processing_time_ms=int((time.perf_counter() - start_time) * 1000),
+                semantic_hit_count=len(hits_by_kind.get("semantic", [])) if use_semantic else None
+            )
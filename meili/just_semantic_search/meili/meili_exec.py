@@ -1,6 +1,6 @@
 import pprint
-from just_semantic_search.splitter_factory import SplitterType, create_splitter
-from just_semantic_search.text_splitters import *
+from just_semantic_search.splitters.splitter_factory import SplitterType, create_splitter
+from just_semantic_search.splitters.text_splitters import *
 from pycomfort.logging import to_nice_file, to_nice_stdout
 from just_semantic_search.embeddings import *
 from just_semantic_search.utils.tokens import *
@@ -87,7 +87,8 @@ def index_folder_command(
     port: int = typer.Option(os.getenv("MEILI_PORT", 7700), "--port", "-p"),
     api_key: Optional[str] = typer.Option(os.getenv("MEILI_MASTER_KEY", "fancy_master_key"), "--api-key", "-k"),
     ensure_server: bool = typer.Option(False, "--ensure-server", "-e", help="Ensure Meilisearch server is running"),
-    recreate_index: bool = typer.Option(os.getenv("MEILI_RECREATE_INDEX", False), "--recreate-index", "-r", help="Recreate index")
+    recreate_index: bool = typer.Option(os.getenv("MEILI_RECREATE_INDEX", False), "--recreate-index", "-r", help="Recreate index"),
+    rebuild: bool = typer.Option(False, "--rebuild", help="Rebuild into a shadow index and swap it in when done, the live index keeps serving searches")
 ) -> None:
     with start_task(action_type="index_folder", 
                     index_name=index_name, model_name=str(model), host=host, port=port, 
@@ -104,9 +105,66 @@ def index_folder_command(
             port=port,
             api_key=api_key,
             create_index_if_not_exists=True,
-            recreate_index=recreate_index
+            recreate_index=recreate_index and not rebuild
+        )
+        if rebuild:
+            result = rag.rebuild(lambda shadow: shadow.index_folder(Path(folder), splitter))
+            action.add_success_fields(**result)
+        else:
+            rag.index_folder(Path(folder), splitter)
+
+
+@app.command("export-folder")
+def export_folder_command(
+    folder: Path = typer.Option(..., "--folder", "-f", help="Folder containing documents to split and embed"),
+    output: Path = typer.Option(..., "--output", "-o", help="Output .parquet or .arrow file"),
+    model: EmbeddingModel = typer.Option(EmbeddingModel.JINA_EMBEDDINGS_V3.value, "--model", "-m", help="Embedding model to use"),
+    splitter: SplitterType = typer.Option(SplitterType.TEXT.value, "--splitter", "-s", help="Splitter type to use")
+) -> None:
+    """Split and embed a folder once offline, the result can be loaded with index-store many times."""
+    with start_task(action_type="export_folder", folder=str(folder), output=str(output), model_name=str(model)) as action:
+        splitter_instance = create_splitter(splitter, model)
+        documents = splitter_instance.split_folder(Path(folder))
+        ParquetDocumentStore(path=output).write(documents)
+        action.add_success_fields(documents_count=len(documents))
+
+
+@app.command("index-store")
+def index_store_command(
+    path: Path = typer.Option(..., "--path", "-i", help="Path to a .parquet or .arrow file written by export-folder"),
+    index_name: str = typer.Option(os.getenv("MEILI_INDEX_NAME", "tacutopapers"), "--index-name", "-n"),
+    model: EmbeddingModel = typer.Option(EmbeddingModel.JINA_EMBEDDINGS_V3.value, "--model", "-m", help="Embedding model the store was embedded with"),
+    batch_size: int = typer.Option(1000, "--batch-size", "-b", help="Number of documents read from the store at once"),
+    host: str = typer.Option(os.getenv("MEILI_HOST", "127.0.0.1"), "--host"),
+    port: int = typer.Option(os.getenv("MEILI_PORT", 7700), "--port", "-p"),
+    api_key: Optional[str] = typer.Option(os.getenv("MEILI_MASTER_KEY", "fancy_master_key"), "--api-key", "-k"),
+    ensure_server: bool = typer.Option(False, "--ensure-server", "-e", help="Ensure Meilisearch server is running"),
+    recreate_index: bool = typer.Option(os.getenv("MEILI_RECREATE_INDEX", False), "--recreate-index", "-r", help="Recreate index"),
+    rebuild: bool = typer.Option(False, "--rebuild", help="Rebuild into a shadow index and swap it in when done, the live index keeps serving searches")
+) -> None:
+    with start_task(action_type="index_store", path=str(path), index_name=index_name, host=host, port=port) as action:
+        if ensure_server:
+            ensure_meili_is_running(meili_service_dir, host, port)
+        rag = MeiliRAG(
+            index_name=index_name,
+            model=model,
+            host=host,
+            port=port,
+            api_key=api_key,
+            create_index_if_not_exists=True,
+            recreate_index=recreate_index and not rebuild
+        )
+        if rebuild:
+            shadow = rag.start_rebuild()
+            tasks = shadow.index_store(path, batch_size=batch_size, wait=True)
+            action.add_success_fields(**rag.finish_rebuild(shadow))
+        else:
+            tasks = rag.index_store(path, batch_size=batch_size, wait=True)
+        action.add_success_fields(
+            documents_added_count=tasks.documents_count,
+            documents_per_second=tasks.documents_per_second,
+            failures=tasks.failures
         )
-        rag.index_folder(Path(folder), splitter, model)
 
 
 @app.command()
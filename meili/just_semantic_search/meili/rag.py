@@ -1,88 +1,91 @@
 from pathlib import Path
-from just_semantic_search.embeddings import EmbeddingModel, EmbeddingModelParams, load_sentence_transformer_from_enum, load_sentence_transformer_params_from_enum
-from just_semantic_search.reranking import RerankingModel, load_reranker
+from just_semantic_search.embeddings import EmbeddingModel, EmbeddingModelParams, embedding_dimension, load_sentence_transformer_from_enum, load_sentence_transformer_params_from_enum
+from just_semantic_search.reranking import AbstractReranker, RerankingModel, load_reranker
 from just_semantic_search.splitters.splitter_factory import create_splitter, SplitterType
 from just_semantic_search.document import ArticleDocument, Document
-from typing import Callable, List, Dict, Any, Literal, Optional, Union
+from just_semantic_search.document_store import ParquetDocumentStore
+from typing import Callable, Iterable, List, Dict, Any, Literal, Optional, Union
 from just_semantic_search.splitters.text_splitters import TextSplitter
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, PrivateAttr
 import numpy
 import os
-from just_semantic_search.remote.jina import jina_embed_query
+from just_semantic_search.remote.jina import jina_embed_query, jina_embed_queries
 
 from meilisearch_python_sdk import AsyncClient, AsyncIndex, Client, Index
-from meilisearch_python_sdk.errors import MeilisearchApiError
+from meilisearch_python_sdk.errors import MeilisearchApiError, MeilisearchTimeoutError
 from meilisearch_python_sdk.index import SearchResults, Hybrid
+from meilisearch_python_sdk.models.search import Federation, FederationOptions, SearchParams, SearchResultsWithUID
 from meilisearch_python_sdk.models.settings import MeilisearchSettings, UserProvidedEmbedder
+from meilisearch_python_sdk.models.task import TaskInfo
+from just_semantic_search.meili.utils.fusion import DEFAULT_RRF_K, FusionMethod, fuse_hits
+from just_semantic_search.meili.utils.search_cache import SEARCH_CACHE, cached_search
+from just_semantic_search.utils.metrics import METRICS
+from just_semantic_search.meili.utils.catalog import SHADOW_INDEX_SUFFIX, IndexCatalog, get_catalog, get_client, invalidate_catalog
+from just_semantic_search.meili.utils.settings import settings_diff
+from just_semantic_search.meili.utils.retry import DEFAULT_RETRY_POLICY, get_circuit_breaker, hedged_call
+from just_semantic_search.meili.utils.batches import DocumentsTasks, batch_by_size, DEFAULT_MAX_BATCH_BYTES, DEFAULT_MAX_BATCH_DOCUMENTS, DEFAULT_MAX_IN_FLIGHT
 
 import asyncio
 import eliot
 from eliot import start_action
 import pydantic
 from sentence_transformers import SentenceTransformer
-from tenacity import retry, stop_after_attempt, wait_exponential
-from functools import wraps
-import inspect
+from functools import partial
 import time
 import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import ClassVar
 from just_semantic_search.remote.jina import jina_embed_query
 
 
-# Define a retry decorator with exponential backoff using environment variables
-def create_retry_decorator(func):
-    return retry(
-        stop=stop_after_attempt(int(os.getenv('RETRY_ATTEMPTS', 5))),
-        wait=wait_exponential(
-            multiplier=float(os.getenv('RETRY_MULTIPLIER', 1)),
-            min=float(os.getenv('RETRY_MIN', 4)),
-            max=float(os.getenv('RETRY_MAX', 10))
-        ),
-        before=lambda retry_state: eliot.log_message(
-            message_type="retry_attempt",
-            function=func.__name__,
-            attempt=retry_state.attempt_number,
-            error_type=str(retry_state.outcome.exception.__class__.__name__) if retry_state.outcome and retry_state.outcome.exception else "None"
-        ) if retry_state.attempt_number > 1 else None
-    )
-
 def log_retry_errors(func):
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        retry_decorator = create_retry_decorator(func)
-        
-        if inspect.iscoroutinefunction(func):
-            @retry_decorator
-            async def async_wrapper(*args, **kwargs):
-                with start_action(action_type="retry_action", function=func.__name__) as action:
-                    try:
-                        return await func(*args, **kwargs)
-                    except Exception as e:
-                        action.log(
-                            message_type="retry_failed",
-                            error=str(e),
-                            error_type=str(type(e).__name__)
-                        )
-                        raise
-            return async_wrapper(*args, **kwargs)
-        else:
-            @retry_decorator
-            def sync_wrapper(*args, **kwargs):
-                with start_action(action_type="retry_action", function=func.__name__) as action:
-                    try:
-                        return func(*args, **kwargs)
-                    except Exception as e:
-                        action.log(
-                            message_type="retry_failed",
-                            error=str(e),
-                            error_type=str(type(e).__name__)
-                        )
-                        raise
-            return sync_wrapper(*args, **kwargs)
-    return wrapper
+    """
+    Retries transient Meilisearch errors of func with the shared DEFAULT_RETRY_POLICY, using the circuit breaker of the host.
+    Only for methods making a single request: methods composing several requests wrap each of them with _meili_call
+    instead, so that retries do not multiply and local work (encoding, diffing settings) is not repeated.
+    """
+    return DEFAULT_RETRY_POLICY.wrap(func)
 
 
-    
+# Loaded sentence transformers shared by all index instances of the process, one per model
+_SENTENCE_TRANSFORMERS: Dict[str, SentenceTransformer] = {}
+_SHARED_MODELS_LOCK = threading.Lock()
+
+
+def shared_sentence_transformer(model: EmbeddingModel) -> SentenceTransformer:
+    """Loads the model on first use and returns the same instance afterwards, so indexes using the same model share its weights"""
+    sentence_transformer = _SENTENCE_TRANSFORMERS.get(model.value)
+    if sentence_transformer is None:
+        with _SHARED_MODELS_LOCK:
+            sentence_transformer = _SENTENCE_TRANSFORMERS.get(model.value)
+            if sentence_transformer is None:
+                sentence_transformer = load_sentence_transformer_from_enum(model)
+                _SENTENCE_TRANSFORMERS[model.value] = sentence_transformer
+    return sentence_transformer
+
+
+# Loaded rerankers shared by all index instances of the process, one per model
+_RERANKERS: Dict[str, AbstractReranker] = {}
+
+
+def shared_reranker(model: RerankingModel | str) -> AbstractReranker:
+    """Loads the reranker on first use and returns the same instance (and score cache) afterwards"""
+    key = model.value if isinstance(model, RerankingModel) else model
+    reranker = _RERANKERS.get(key)
+    if reranker is None:
+        with _SHARED_MODELS_LOCK:
+            reranker = _RERANKERS.get(key)
+            if reranker is None:
+                reranker = load_reranker(model)
+                _RERANKERS[key] = reranker
+    return reranker
+
+
+def source_filter(source: str) -> str:
+    """Meilisearch filter matching documents of one source, quoted so that paths and urls are accepted"""
+    escaped = source.replace("\\", "\\\\").replace('"', '\\"')
+    return f'source = "{escaped}"'
 
 
 class MeiliBase(BaseModel):
@@ -92,6 +95,13 @@ class MeiliBase(BaseModel):
     port: int = Field(default=os.getenv("MEILISEARCH_PORT", 7700), description="Meilisearch port number")
     api_key: Optional[str] = Field(default=os.getenv("MEILISEARCH_API_KEY", "fancy_master_key"), description="Meilisearch API key for authentication")
     
+    hedge_after_ms: Optional[float] = Field(default=os.getenv("MEILISEARCH_HEDGE_AFTER_MS", None),
+                                            description="Send a duplicate search request if the first did not answer within this many ms, None disables hedging")
+    reranking_model: Optional[RerankingModel | AbstractReranker] = Field(default=None, description="Reranking model (or loaded reranker) applied to the candidate pool in search")
+    hybrid_fusion: FusionMethod = Field(default=os.getenv("MEILISEARCH_HYBRID_FUSION", FusionMethod.MEILI.value),
+                                        description="meili: server-side semanticRatio blend, rrf/score: client-side fusion of separate keyword and vector searches")
+    fusion_rrf_k: int = Field(default=int(os.getenv("MEILISEARCH_FUSION_RRF_K", DEFAULT_RRF_K)), description="RRF rank constant of client-side hybrid fusion")
+    
     client: Optional[Client] = Field(default=None, exclude=True)
     client_async: Optional[AsyncClient] = Field(default=None, exclude=True)
     
@@ -123,30 +133,37 @@ class MeiliBase(BaseModel):
                 base_url=base_url,
                 api_key=self.api_key
             )
-            self.client = Client(base_url, self.api_key)
+            self.client = get_client(base_url, self.api_key)
             action.add_success_fields(
                 message_type="clients_initialized",
                 base_url=base_url,
                 api_key=self.api_key
             )
+        if isinstance(self.reranking_model, AbstractReranker):
+            pass
+        elif self.reranking_model is not None:
+            self.reranking_model = shared_reranker(self.reranking_model)
+        else:
+            if os.getenv("RERANKING_MODEL") is not None:
+                self.reranking_model = shared_reranker(os.getenv("RERANKING_MODEL"))
+        if self.reranker is not None:
+            METRICS.register_gauges("rerank_cache", self.reranker.cache_stats)
         
-    @log_retry_errors
-    async def _configure_index(self):
-        embedder = UserProvidedEmbedder(
-            dimensions=1024,
-            source="userProvided"
-        )
-        embedders = {
-            self.model_name: embedder
-        }
-        settings = MeilisearchSettings(embedders=embedders, searchable_attributes=self.searchable_attributes)
-        return await self.index_async.update_settings(settings)
+    @property
+    def catalog(self) -> IndexCatalog:
+        """Shared cached index catalog of this host"""
+        return get_catalog(self.get_url(), self.api_key)
 
     def all_indexes(self):
-        return [key for key in self.client.get_all_stats().indexes.keys()]
+        return self.catalog.all_indexes()
     
     def non_empty_indexes(self):
-        return [key for key, value in self.client.get_all_stats().indexes.items() if value.number_of_documents > 0]
+        return self.catalog.non_empty_indexes()
+
+    def _index_changed(self, task_uids: Iterable[int] = ()) -> None:
+        """Invalidates the cached search results of the index and the catalog of the host after a local write"""
+        SEARCH_CACHE.invalidate((self.get_url(), self.index_name), task_uids)
+        invalidate_catalog(self.get_url())
 
 
     def delete_index(self):
@@ -154,11 +171,118 @@ class MeiliBase(BaseModel):
         synchronous version of delete_index_async
         """
         self.client.delete_index_if_exists(self.index_name)
+        self._index_changed()
     
 
     def get_url(self) -> str:
         return f'http://{self.host}:{self.port}'
-    
+
+    def _meili_call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Runs one Meilisearch request with the retry policy and circuit breaker of the host"""
+        return DEFAULT_RETRY_POLICY.call(func, *args, breaker=get_circuit_breaker(self.get_url()), **kwargs)
+
+    def _meili_read(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Runs an idempotent read with the retry policy and circuit breaker of the host, hedged if hedge_after_ms is set"""
+        if self.hedge_after_ms is None:
+            return self._meili_call(func, *args, **kwargs)
+        return self._meili_call(hedged_call, partial(func, *args, **kwargs), float(self.hedge_after_ms) / 1000)
+
+    @property
+    def reranker(self) -> Optional[AbstractReranker]:
+        """Reranker loaded from reranking_model or the RERANKING_MODEL environment variable, if any"""
+        return self.reranking_model if isinstance(self.reranking_model, AbstractReranker) else None
+
+    @staticmethod
+    def _rerank_text(hit: dict) -> str:
+        text = hit.get("text") or hit.get("content") or ""
+        return f"{hit['title']}\n{text}" if hit.get("title") else text
+
+    def _rerank_results(self, query: str, results: SearchResults, limit: int,
+                        min_candidates: int = 3,
+                        retrieval_seconds: float = 0.0,
+                        retrieval_budget_ms: Optional[float] = None,
+                        rerank_budget_ms: Optional[float] = None,
+                        batch_size: int = 32,
+                        window_words: Optional[int] = None,
+                        max_windows: int = 2) -> SearchResults:
+        """Second stage of search: scores the candidate pool with the reranker and keeps the top limit hits."""
+        hits = results.hits
+        with METRICS.trace_action("rerank_search_results", candidates=len(hits), limit=limit) as action:
+            if len(hits) < min_candidates:
+                METRICS.inc("rerank_skipped")
+                action.add_success_fields(skipped="small_candidate_pool")
+                results.hits = hits[:limit]
+                return results
+            if retrieval_budget_ms is not None and retrieval_seconds * 1000 > float(retrieval_budget_ms):
+                METRICS.inc("rerank_skipped")
+                action.add_success_fields(skipped="retrieval_over_budget", retrieval_time_seconds=retrieval_seconds)
+                results.hits = hits[:limit]
+                return results
+            METRICS.inc("reranked_searches")
+            rerank_start_time = time.perf_counter()
+            documents = [self._rerank_text(hit) for hit in hits]
+            hashes = [hit.get(self.primary_key) for hit in hits]
+            def score(documents: List[str], hashes: List[Optional[str]]) -> List[float]:
+                if window_words:
+                    return self.reranker.score_windows(query, documents, window_words=int(window_words), max_windows=max_windows)
+                return self.reranker.score(query, documents, document_hashes=hashes)
+
+            if rerank_budget_ms is None:
+                scores = score(documents, hashes)
+            else:
+                scores: List[float] = []
+                for i in range(0, len(documents), batch_size):
+                    if scores and (time.perf_counter() - rerank_start_time) * 1000 > float(rerank_budget_ms):
+                        break
+                    scores.extend(score(documents[i:i + batch_size], hashes[i:i + batch_size]))
+            order = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True) + list(range(len(scores), len(hits)))
+            reranked = []
+            for i in order[:limit]:
+                if i < len(scores):
+                    hits[i]["_rerankScore"] = scores[i]
+                reranked.append(hits[i])
+            results.hits = reranked
+            rerank_seconds = time.perf_counter() - rerank_start_time
+            METRICS.observe("rerank", rerank_seconds)
+            action.add_success_fields(
+                scored=len(scores),
+                windowed=bool(window_words),
+                retrieval_time_seconds=retrieval_seconds,
+                rerank_time_seconds=rerank_seconds,
+                rerank_cache=self.reranker.cache_stats()
+            )
+            return results
+
+    def _fused_search_queries(self, query: str, vector: List[float], pool: int, **search_kwargs) -> List[SearchParams]:
+        """Keyword and pure vector searches of client-side hybrid fusion, sent together in one multi-search request"""
+        return [
+            SearchParams(index_uid=self.index_name, query=query, limit=pool, show_ranking_score=True, **search_kwargs),
+            SearchParams(index_uid=self.index_name, query=query, limit=pool, show_ranking_score=True, vector=vector,
+                         hybrid=Hybrid(embedder=self.model_name, semanticRatio=1.0), **search_kwargs)
+        ]
+
+    def _fuse_results(self, query: str, keyword: SearchResultsWithUID, semantic: SearchResultsWithUID, semanticRatio: float,
+                      fusion: FusionMethod, offset: int, limit: int, show_ranking_score: bool, start_time: float) -> SearchResults:
+        """Fuses the keyword and vector rankings (weights 1 - semanticRatio and semanticRatio) into one page of results"""
+        pool = offset + limit
+        fused = fuse_hits({"keyword": keyword.hits, "semantic": semantic.hits}, method=fusion,
+                          weights={"keyword": 1.0 - semanticRatio, "semantic": semanticRatio},
+                          limit=pool, primary_key=self.primary_key, rrf_k=self.fusion_rrf_k)
+        hits = fused[offset:pool]
+        for hit in hits:
+            hit.pop("_indexUid", None)
+            if not show_ranking_score:
+                hit.pop("_rankingScore", None)
+        return SearchResults(
+            hits=hits,
+            query=query,
+            offset=offset,
+            limit=limit,
+            estimated_total_hits=max(keyword.estimated_total_hits or 0, semantic.estimated_total_hits or 0),
+            processing_time_ms=int((time.perf_counter() - start_time) * 1000),
+            semantic_hit_count=len(semantic.hits)
+        )
+
     
         
 
@@ -172,7 +296,6 @@ class MeiliRAG(MeiliBase):
     index_name: str = Field(description="Name of the Meilisearch index")
     index: Optional[Index] = Field(default=None, exclude=True)
     model: EmbeddingModel = Field(default=EmbeddingModel.JINA_EMBEDDINGS_V3, description="Embedding model to use for vector search")
-    reranking_model: Optional[RerankingModel] = Field(default=None, description="Reranking model to use for reranking")
     embedding_model_params: EmbeddingModelParams = Field(default_factory=EmbeddingModelParams, description="Embedding model parameters")
     create_index_if_not_exists: bool = Field(default=os.getenv("MEILISEARCH_CREATE_INDEX_IF_NOT_EXISTS", True), description="Create index if it doesn't exist")
     recreate_index: bool = Field(default=os.getenv("MEILISEARCH_RECREATE_INDEX", False), description="Force recreate the index even if it exists")
@@ -193,6 +316,10 @@ class MeiliRAG(MeiliBase):
     model_name: Optional[str] = Field(default=None, exclude=True)
     st_model: Optional[SentenceTransformer] = Field(default=None, exclude=True)
     transformer_lock: ClassVar[threading.RLock] = threading.RLock()
+    # dimension of the index embedder as last configured, checked against the model once it is loaded
+    _embedder_dimension: Optional[int] = PrivateAttr(default=None)
+    # uid of the newest task of the host when this instance was created as a rebuild shadow, older tasks are not its own
+    _rebuild_after_task_uid: Optional[int] = PrivateAttr(default=None)
   
     def model_post_init(self, __context) -> None:
         """Initialize clients and configure index after model initialization"""
@@ -204,14 +331,8 @@ class MeiliRAG(MeiliBase):
         self.model_name = model_value.split("/")[-1].split("\\")[-1] if "/" in model_value or "\\" in model_value else model_value
         
         super().model_post_init(__context)
-        if self.reranking_model is not None:
-            self.reranking_model = load_reranker(self.reranking_model)
-        else:
-            if os.getenv("RERANKING_MODEL") is not None:
-                self.reranking_model = load_reranker(os.getenv("RERANKING_MODEL"))
         # Instead of assigning, just call the method
-        self.index = self._init_index(self.create_index_if_not_exists, self.recreate_index, settings=self.settings)
-        self._configure_index()
+        self.index = self._init_index(self.create_index_if_not_exists, self.recreate_index)
     
     @property
     def sentence_transformer(self) -> SentenceTransformer:
@@ -225,11 +346,12 @@ class MeiliRAG(MeiliBase):
                             message_type="loading_sentence_transformer",
                             model=self.model.value
                         )
-                        self.st_model = load_sentence_transformer_from_enum(self.model)
+                        self.st_model = shared_sentence_transformer(self.model)
                         action.add_success_fields(
                             message_type="sentence_transformer_loaded",
                             model=self.model.value
                         )
+                        self._check_embedder_dimension(self.st_model.get_sentence_embedding_dimension())
         return self.st_model
 
     @classmethod
@@ -251,30 +373,31 @@ class MeiliRAG(MeiliBase):
             MEILIRAG_INSTANCES[index_name] = instance
             return instance
 
-    @log_retry_errors
     def _init_index(self, 
                          create_index_if_not_exists: bool = True, 
                          recreate_index: bool = False,
-                         settings: MeilisearchSettings | None = None,
                          ) -> Index:
+        """Gets the index and syncs its settings, or creates it with the full desired settings in one call."""
         with start_action(action_type="init_index_sync") as action:
             try:
-                index = self.client.get_index(self.index_name)
+                index = self._meili_call(self.client.get_index, self.index_name)
                 if recreate_index:
                     action.log(
                         message_type="index_exists",
                         index_name=self.index_name,
                         recreate_index=True
                     )
-                    self.client.delete_index_if_exists(self.index_name)
-                    index = self.client.create_index(self.index_name)
-                    return index
+                    self._meili_call(self.client.delete_index_if_exists, self.index_name)
+                    self._index_changed()
+                    return self._create_index()
                 else:
                     action.add_success_fields(
                         message_type="index_exists",
                         index_name=self.index_name,
                         recreate_index=False
                     )
+                    self.index = index
+                    self._configure_index()
                     return index
             except MeilisearchApiError:
                 if create_index_if_not_exists:
@@ -283,20 +406,45 @@ class MeiliRAG(MeiliBase):
                         index_name=self.index_name,
                         create_index_if_not_exists=True
                     )
-                    index = self.client.create_index(self.index_name, settings=settings)
-                    index.update_searchable_attributes(self.searchable_attributes)
-                    index.update_filterable_attributes(self.filterable_attributes)
-                    return index
+                    return self._create_index()
                 else:
                     action.log(
                         message_type="index_not_found",
                         index_name=self.index_name,
                         create_index_if_not_exists=False
                     )
-            return self.client.get_index(self.index_name)
+            return self._meili_call(self.client.get_index, self.index_name)
+
+    def _create_index(self) -> Index:
+        settings = self.desired_settings()
+        self._embedder_dimension = getattr(settings.embedders.get(self.model_name), "dimensions", None)
+        return self._meili_call(self.client.create_index, self.index_name, primary_key=self.primary_key, settings=settings, wait=True)
+
+    def add_documents(self, documents: Iterable[ArticleDocument | Document | dict], compress: bool = False,
+                      splitter: Optional[SplitterType | TextSplitter] = None,
+                      max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+                      max_batch_documents: int = DEFAULT_MAX_BATCH_DOCUMENTS,
+                      max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                      wait: bool = False,
+                      timeout_in_ms: Optional[int] = None) -> DocumentsTasks:
+        """Add documents to the index in size-capped batches.
 
-    def add_documents(self, documents: List[ArticleDocument | Document], compress: bool = False, splitter: Optional[SplitterType | TextSplitter] = None):
-        """Add documents synchronously by running the async method in the event loop."""
+        Documents are serialized lazily and uploaded in batches capped by payload size, with at most
+        max_in_flight uploads running concurrently, so preparing the next batch overlaps with sending the previous ones.
+
+        Args:
+            documents: Documents (or already serialized dictionaries) to add
+            compress: Whether to gzip the payloads
+            splitter: Optional splitter to split the documents before adding them
+            max_batch_bytes: Maximum JSON payload size of one request
+            max_batch_documents: Maximum number of documents in one request
+            max_in_flight: Maximum number of concurrent upload requests
+            wait: Whether to wait until Meilisearch processed all batches
+            timeout_in_ms: Timeout for waiting, None waits forever
+
+        Returns:
+            DocumentsTasks: handle that can wait for the tasks, report documents/sec and failed task details
+        """
         with start_action(action_type="add documents") as action:
             if splitter is not None:
                 action.log(
@@ -306,19 +454,42 @@ class MeiliRAG(MeiliBase):
                 if isinstance(splitter, SplitterType):
                     splitter = create_splitter(splitter, self.sentence_transformer)
                 documents = splitter.split_documents(documents)
-            documents_dict = [doc.model_dump(by_alias=True) for doc in documents]
-            count = len(documents)
-            result = self.index.add_documents(documents_dict, primary_key=self.primary_key, compress=compress)
+            documents_dict = (doc if isinstance(doc, dict) else doc.model_dump(by_alias=True) for doc in documents)
+            tasks = DocumentsTasks(client=self.client, index_name=self.index_name)
+            in_flight: deque[Future] = deque()
+            with ThreadPoolExecutor(max_workers=max(1, max_in_flight), thread_name_prefix="meili_upload") as executor:
+                for batch, size in batch_by_size(documents_dict, max_batch_bytes, max_batch_documents):
+                    if len(in_flight) >= max_in_flight:
+                        tasks.task_infos.append(in_flight.popleft().result())
+                    in_flight.append(executor.submit(self._add_batch, batch, compress))
+                    tasks.documents_count += len(batch)
+                    tasks.bytes_sent += size
+                while in_flight:
+                    tasks.task_infos.append(in_flight.popleft().result())
+            tasks.enqueued_seconds = time.perf_counter() - tasks.started_at
+            self._index_changed(tasks.task_uids)
+            if wait:
+                tasks.wait(timeout_in_ms=timeout_in_ms)
             action.add_success_fields(
-                status=result.status,
-                count = count
+                status=tasks.status,
+                count=tasks.documents_count,
+                batches=len(tasks.task_infos),
+                bytes_sent=tasks.bytes_sent,
+                documents_per_second=tasks.documents_per_second,
+                failures=tasks.failures if wait else None
             )
-            return result
+            return tasks
+
+    @log_retry_errors
+    def _add_batch(self, batch: List[dict], compress: bool = False) -> TaskInfo:
+        return self.index.add_documents(batch, primary_key=self.primary_key, compress=compress)
         
     
-    def delete_by_source(self, source:str):
+    def delete_by_source(self, source:str) -> TaskInfo:
         """Delete documents by their sources from the MeiliRAG index."""
-        self.index.delete_documents_by_filter(filters=f"source={source}")
+        task = self.index.delete_documents_by_filter(filter=source_filter(source))
+        self._index_changed([task.task_uid])
+        return task
 
 
     @log_retry_errors
@@ -329,7 +500,7 @@ class MeiliRAG(MeiliBase):
             return result
 
         
-    @log_retry_errors
+    @cached_search
     def search(self, 
             query: str | None = None,
             vector: Optional[Union[List[float], 'numpy.ndarray']] = None,
@@ -357,7 +528,15 @@ class MeiliRAG(MeiliBase):
             ranking_score_threshold: float | None = os.getenv("MEILISEARCH_RANKING_SCORE_THRESHOLD", None),
             locales: list[str] | None = None,
             remote_embedding: bool = False,
-            rerank_limit: int = os.getenv("RERANK_LIMIT", 10), # TODO: MAKE IT WORK, SO FAR NOT USED YET
+            rerank: Optional[bool] = None,
+            rerank_limit: int = int(os.getenv("RERANK_LIMIT", 50)),
+            rerank_min_candidates: int = int(os.getenv("RERANK_MIN_CANDIDATES", 3)),
+            rerank_batch_size: int = int(os.getenv("RERANK_BATCH_SIZE", 32)),
+            retrieval_budget_ms: Optional[float] = os.getenv("RETRIEVAL_BUDGET_MS", None),
+            rerank_budget_ms: Optional[float] = os.getenv("RERANK_BUDGET_MS", None),
+            rerank_window_words: Optional[int] = os.getenv("RERANK_WINDOW_WORDS", None),
+            rerank_max_windows: int = int(os.getenv("RERANK_MAX_WINDOWS", 2)),
+            fusion: Optional[FusionMethod | str] = None,
             **kwargs
         ) -> SearchResults:
         """Search for documents in the index.
@@ -370,10 +549,39 @@ class MeiliRAG(MeiliBase):
             semanticRatio (Optional[float]): Ratio between semantic and keyword search
             show_ranking_score (Optional[bool]): Show ranking scores in results
             show_matches_position (Optional[bool]): Show match positions in results
+            rerank (Optional[bool]): Rerank the hits with the configured reranker, by default whenever one is configured
+            rerank_limit (int): Size of the candidate pool retrieved from Meilisearch and passed to the reranker
+            rerank_min_candidates (int): Pools smaller than this are returned in Meilisearch order without reranking
+            rerank_batch_size (int): Number of candidates scored per reranker call when rerank_budget_ms is set
+            retrieval_budget_ms (Optional[float]): If retrieval (encoding and search) took longer, reranking is skipped
+            rerank_budget_ms (Optional[float]): Stop scoring further batches once exceeded, unscored candidates keep their order after the scored ones
+            rerank_window_words (Optional[int]): Score only the best matching windows of this many words of every hit (max over windows) instead of the whole chunk
+            rerank_max_windows (int): Number of windows scored per hit in windowed mode
+            fusion (Optional[FusionMethod | str]): meili blends keyword and vector results on the server with semanticRatio,
+                rrf or score run both searches in one multi-search request and fuse them on the client
+                (weights semanticRatio and 1 - semanticRatio, deduplicated by primary key). Defaults to hybrid_fusion
             
         Returns:
-            SearchResults: Search results including hits and metadata
+            SearchResults: Search results including hits and metadata, reranked hits carry _rerankScore
         """
+        METRICS.inc("search_requests")
+        retrieval_start_time = time.perf_counter()
+        use_reranker = (rerank is None or rerank) and self.reranker is not None and bool(query) and page is None and hits_per_page is None
+        if rerank and self.reranker is None:
+            eliot.log_message(message_type="rerank_requested_without_reranker", index_name=self.index_name)
+        pool_limit = max(limit, int(rerank_limit)) if use_reranker else limit
+
+        def finish(results: SearchResults) -> SearchResults:
+            if not use_reranker:
+                return results
+            return self._rerank_results(query, results, limit,
+                                        min_candidates=rerank_min_candidates,
+                                        retrieval_seconds=time.perf_counter() - retrieval_start_time,
+                                        retrieval_budget_ms=retrieval_budget_ms,
+                                        rerank_budget_ms=rerank_budget_ms,
+                                        batch_size=rerank_batch_size,
+                                        window_words=rerank_window_words,
+                                        max_windows=rerank_max_windows)
         if remote_embedding and vector is None:
             vector = jina_embed_query(query)
         
@@ -383,14 +591,11 @@ class MeiliRAG(MeiliBase):
         
         # First check if semanticRatio is 0.0 - no need for vectorization
         if semanticRatio <= 0.0:
-            with start_action(action_type="execute_search_query_text_only") as action:
-                action.log(message_type="search_query_start", 
-                          query_text=query, 
-                          limit=limit,
-                          semantic_ratio=semanticRatio)
-                results = self.index.search(query,
+            with METRICS.trace_action("execute_search_query_text_only", query_text=query, limit=pool_limit, semantic_ratio=semanticRatio) as action, \
+                    METRICS.timer("meili_search"):
+                results = self._meili_read(self.index.search, query,
                     offset=offset,
-                    limit=limit,
+                    limit=pool_limit,
                     filter=filter,
                     facets=facets,
                     attributes_to_retrieve=attributes_to_retrieve,
@@ -411,69 +616,58 @@ class MeiliRAG(MeiliBase):
                     show_ranking_score_details=show_ranking_score_details,
                     ranking_score_threshold=ranking_score_threshold,
                     locales=locales)
-                return results
+                action.add_success_fields(hits_count=len(results.hits))
+            return finish(results)
         
         # Only initialize sentence_transformer and generate vectors if semanticRatio > 0
         if vector is None:
             sentence_transformer = self.st_model if self.st_model is not None else self.sentence_transformer
             
             kwargs.update(self.embedding_model_params.retrival_query)
-            with start_action(action_type="encode_query") as action:
-                # Check if CUDA is available and being used
-                try:
-                    import torch
-                    device = next(sentence_transformer.parameters()).device
-                    is_cuda = device.type == 'cuda'
-                    cuda_device_name = torch.cuda.get_device_name(device) if is_cuda else "N/A"
-                except Exception as e:
-                    # Handle the error gracefully
-                    action.log(
-                        message_type="cuda_detection_error",
-                        error_type=str(type(e).__name__),
-                        error=str(e)
-                    )
-                    is_cuda = False
-                    cuda_device_name = "N/A"
-                
-                action.log(
-                    message_type="encoding_query_start", 
-                    query_length=len(query) if query else 0,
-                    device_type=device.type,
-                    is_cuda=is_cuda,
-                    cuda_device=cuda_device_name if is_cuda else None
-                )
-                
-                start_time = time.time()
-                vector = sentence_transformer.encode(query, **kwargs).tolist()
-                encoding_time = time.time() - start_time
-                # Format time as minutes:seconds
-                minutes = int(encoding_time // 60)
-                seconds = encoding_time % 60
-                time_formatted = f"{minutes}:{seconds:.2f}"
-                action.add_success_fields(
-                    message_type="encoding_query_complete",
-                    encoding_time=time_formatted,
-                    encoding_time_seconds=encoding_time,
-                    vector_dimensions=len(vector) if vector else 0,
-                    device_type=device.type
-                )
+            with METRICS.trace_action("encode_query", query_length=len(query) if query else 0) as action:
+                with METRICS.timer("encode"):
+                    vector = sentence_transformer.encode(query, **kwargs).tolist()
+                action.add_success_fields(vector_dimensions=len(vector) if vector else 0)
         
         hybrid = Hybrid(
             embedder=self.model_name,
             semanticRatio=semanticRatio
         )
+
+        fusion = FusionMethod(fusion or self.hybrid_fusion)
+        if fusion != FusionMethod.MEILI and query and semanticRatio < 1.0 and page is None and hits_per_page is None:
+            common = dict(
+                filter=filter,
+                attributes_to_crop=attributes_to_crop,
+                crop_length=crop_length,
+                attributes_to_highlight=attributes_to_highlight,
+                sort=sort,
+                show_matches_position=show_matches_position,
+                highlight_pre_tag=highlight_pre_tag,
+                highlight_post_tag=highlight_post_tag,
+                crop_marker=crop_marker,
+                matching_strategy=matching_strategy,
+                attributes_to_search_on=attributes_to_search_on,
+                distinct=distinct,
+                ranking_score_threshold=ranking_score_threshold,
+                locales=locales
+            )
+            if attributes_to_retrieve is not None:
+                common["attributes_to_retrieve"] = attributes_to_retrieve
+            with METRICS.trace_action("execute_fused_search_query", fusion=fusion.value, query_text=query, limit=pool_limit,
+                                      semantic_ratio=semanticRatio) as action, METRICS.timer("meili_search"):
+                results = self._meili_read(self._fused_search, query, vector, semanticRatio, fusion, offset=offset, limit=pool_limit,
+                                           show_ranking_score=show_ranking_score, **common)
+                action.add_success_fields(hits_count=len(results.hits))
+            return finish(results)
         
-        with start_action(action_type="execute_search_query") as action:
-            action.log(message_type="search_query_start", 
-                      query_text=query, 
-                      limit=limit,
-                      semantic_ratio=semanticRatio)
-            search_start_time = time.time()
-            
-            results: SearchResults = self.index.search(
+        with METRICS.trace_action("execute_search_query", query_text=query, limit=pool_limit, semantic_ratio=semanticRatio) as action, \
+                METRICS.timer("meili_search"):
+            results: SearchResults = self._meili_read(
+                self.index.search,
                 query,
                 offset=offset,
-                limit=limit,
+                limit=pool_limit,
                 filter=filter,
                 facets=facets,
                 attributes_to_retrieve=attributes_to_retrieve,
@@ -498,33 +692,349 @@ class MeiliRAG(MeiliBase):
                 locales=locales
             )
             
-            search_time = time.time() - search_start_time
-            # Format time as minutes:seconds
-            minutes = int(search_time // 60)
-            seconds = search_time % 60
-            search_time_formatted = f"{minutes}:{seconds:.2f}"
-            
+            action.add_success_fields(hits_count=len(results.hits))
+        return finish(results)
+
+    def _fused_search(self, query: str, vector: List[float], semanticRatio: float, fusion: FusionMethod,
+                      offset: int = 0, limit: int = 20, show_ranking_score: bool = True, **search_kwargs) -> SearchResults:
+        """Runs the keyword and the vector search in one multi-search request and fuses both rankings on the client."""
+        start_time = time.perf_counter()
+        keyword, semantic = self.client.multi_search(self._fused_search_queries(query, vector, offset + limit, **search_kwargs))
+        return self._fuse_results(query, keyword, semantic, semanticRatio, fusion, offset, limit, show_ranking_score, start_time)
+
+    def encode_queries(self, queries: List[str], remote_embedding: bool = False, **kwargs) -> List[List[float]]:
+        """Encode several queries with one batched model call (or one Jina request), duplicates are encoded once.
+
+        Returns:
+            List[List[float]]: one vector per query, in the order of queries
+        """
+        unique = list(dict.fromkeys(queries))
+        with start_action(action_type="encode_queries", queries=len(queries), unique_queries=len(unique), remote_embedding=remote_embedding) as action:
+            start_time = time.time()
+            if remote_embedding:
+                vectors = jina_embed_queries(unique)
+            else:
+                kwargs.update(self.embedding_model_params.retrival_query)
+                vectors = self.sentence_transformer.encode(unique, **kwargs).tolist()
+            by_query = dict(zip(unique, vectors))
+            action.add_success_fields(encoding_time_seconds=time.time() - start_time)
+            return [by_query[query] for query in queries]
+
+    def search_many(self,
+            queries: List[str],
+            semanticRatio: Optional[float] = float(os.getenv("MEILISEARCH_SEMANTIC_RATIO", 0.5)),
+            limit: int = int(os.getenv("MEILISEARCH_LIMIT", 100)),
+            offset: int = 0,
+            filter: Any | None = None,
+            attributes_to_retrieve: list[str] | None = None,
+            attributes_to_crop: list[str] | None = None,
+            crop_length: int = int(os.getenv("MEILISEARCH_CROP_LENGTH", 1000)),
+            show_matches_position: bool = os.getenv("MEILISEARCH_SHOW_MATCHES_POSITION", False),
+            matching_strategy: Literal["all", "last", "frequency"] = os.getenv("MEILISEARCH_MATCHING_STRATEGY", "last"),
+            show_ranking_score: bool = os.getenv("MEILISEARCH_SHOW_RANKING_SCORE", True),
+            show_ranking_score_details: bool = os.getenv("MEILISEARCH_SHOW_RANKING_SCORE_DETAILS", True),
+            ranking_score_threshold: float | None = os.getenv("MEILISEARCH_RANKING_SCORE_THRESHOLD", None),
+            remote_embedding: bool = False,
+            **kwargs
+        ) -> List[SearchResultsWithUID]:
+        """Run several related queries (e.g. query expansions) against the index at once.
+
+        All queries are encoded with one batched model call and sent in a single /multi-search request,
+        instead of one encode and one HTTP round-trip per query as with search().
+
+        Args:
+            queries: Search query texts
+            semanticRatio: Ratio between semantic and keyword search, 0.0 skips encoding
+            limit: Maximum number of results per query
+            filter: Filter applied to every query
+            remote_embedding: Embed the queries with the Jina API instead of the local model
+            **kwargs: Passed to the sentence transformer encode call
+
+        Returns:
+            List[SearchResultsWithUID]: one result per query, in the order of queries
+        """
+        if not queries:
+            return []
+        with start_action(action_type="search_many", index_name=self.index_name, queries=len(queries), limit=limit, semantic_ratio=semanticRatio) as action:
+            hybrid = None
+            vectors: List[Optional[List[float]]] = [None] * len(queries)
+            if semanticRatio is not None and semanticRatio > 0.0:
+                vectors = self.encode_queries(queries, remote_embedding=remote_embedding, **kwargs)
+                hybrid = Hybrid(embedder=self.model_name, semanticRatio=semanticRatio)
+            common = dict(
+                index_uid=self.index_name,
+                offset=offset,
+                limit=limit,
+                filter=filter,
+                attributes_to_crop=attributes_to_crop,
+                crop_length=crop_length,
+                show_matches_position=show_matches_position,
+                matching_strategy=matching_strategy,
+                show_ranking_score=show_ranking_score,
+                show_ranking_score_details=show_ranking_score_details,
+                ranking_score_threshold=ranking_score_threshold,
+                hybrid=hybrid
+            )
+            if attributes_to_retrieve is not None:
+                common["attributes_to_retrieve"] = attributes_to_retrieve
+            search_params = [SearchParams(query=query, vector=vector, **common) for query, vector in zip(queries, vectors)]
+            search_start_time = time.time()
+            results = self._meili_read(self.client.multi_search, search_params)
             action.add_success_fields(
-                message_type="search_query_complete",
-                search_time=search_time_formatted,
-                search_time_seconds=search_time,
-                hits_count=len(results.hits) if hasattr(results, 'hits') else 0
+                search_time_seconds=time.time() - search_start_time,
+                hits_counts=[len(result.hits) for result in results]
             )
-            
             return results
 
-    @log_retry_errors
-    def _configure_index(self):
-        embedder = UserProvidedEmbedder(
-            dimensions=1024,
-            source="userProvided"
-        )
+    def federated_search(self,
+            query: str,
+            indexes: List[str] | Dict[str, float],
+            method: FusionMethod = FusionMethod(os.getenv("MEILISEARCH_FUSION_METHOD", FusionMethod.RRF.value)),
+            limit: int = int(os.getenv("MEILISEARCH_LIMIT", 100)),
+            per_index_limit: Optional[int] = None,
+            semanticRatio: Optional[float] = float(os.getenv("MEILISEARCH_SEMANTIC_RATIO", 0.5)),
+            filter: Any | None = None,
+            attributes_to_retrieve: list[str] | None = None,
+            crop_length: int = int(os.getenv("MEILISEARCH_CROP_LENGTH", 1000)),
+            matching_strategy: Literal["all", "last", "frequency"] = os.getenv("MEILISEARCH_MATCHING_STRATEGY", "last"),
+            remote_embedding: bool = False,
+            **kwargs
+        ) -> List[dict]:
+        """Search one query across several indexes and merge the hits into a single ranking.
+
+        The query is encoded once with this instance's model and sent to all indexes in a single
+        /multi-search request, so the indexes must use the same embedder as this one.
+
+        Args:
+            query: Search query text
+            indexes: Index names, or a mapping of index name to fusion weight
+            method: RRF (rank based), SCORE (min-max normalized _rankingScore) or MEILI (Meilisearch federation)
+            limit: Number of merged hits to return
+            per_index_limit: Candidates taken from every index, defaults to limit
+            semanticRatio: Ratio between semantic and keyword search, 0.0 skips encoding
+            **kwargs: Passed to the sentence transformer encode call
+
+        Returns:
+            List[dict]: merged hits, each with _indexUid and, for client-side fusion, _fusionScore
+        """
+        weights = indexes if isinstance(indexes, dict) else {index_uid: 1.0 for index_uid in indexes}
+        if not weights:
+            return []
+        with start_action(action_type="federated_search", query_text=query, indexes=list(weights), method=method.value, limit=limit) as action:
+            vector = None
+            hybrid = None
+            if semanticRatio is not None and semanticRatio > 0.0:
+                vector = self.encode_queries([query], remote_embedding=remote_embedding, **kwargs)[0]
+                hybrid = Hybrid(embedder=self.model_name, semanticRatio=semanticRatio)
+            common = dict(
+                query=query,
+                limit=per_index_limit or limit,
+                filter=filter,
+                crop_length=crop_length,
+                matching_strategy=matching_strategy,
+                show_ranking_score=True,
+                vector=vector,
+                hybrid=hybrid
+            )
+            if attributes_to_retrieve is not None:
+                common["attributes_to_retrieve"] = attributes_to_retrieve
+            search_start_time = time.time()
+            if method == FusionMethod.MEILI:
+                common.pop("limit")
+                search_params = [
+                    SearchParams(index_uid=index_uid, federation_options=FederationOptions(weight=weight), **common)
+                    for index_uid, weight in weights.items()
+                ]
+                federated = self._meili_read(self.client.multi_search, search_params, federation=Federation(limit=limit))
+                hits = [{**hit, "_indexUid": hit.get("_federation", {}).get("indexUid")} for hit in federated.hits]
+            else:
+                search_params = [SearchParams(index_uid=index_uid, **common) for index_uid in weights]
+                results = self._meili_read(self.client.multi_search, search_params)
+                hits_by_index = {result.index_uid: result.hits for result in results}
+                hits = fuse_hits(hits_by_index, method=method, weights=weights, limit=limit, primary_key=self.primary_key)
+            action.add_success_fields(search_time_seconds=time.time() - search_start_time, hits_count=len(hits))
+            return hits
+
+    def model_dimension(self) -> int:
+        """Embedding dimension of the model without loading it: from the model if it is already loaded,
+        otherwise from EMBEDDING_DIMENSIONS or the model config. It is checked against the loaded model later."""
+        return embedding_dimension(self.model, self.st_model)
+
+    def desired_settings(self, current: Optional[MeilisearchSettings] = None) -> MeilisearchSettings:
+        """Index settings this instance needs: its embedder with the model dimension and the searchable/filterable attributes,
+        overridden by the fields set in settings. A user-provided embedder already in the current settings keeps its
+        dimension unless the loaded model says otherwise, so that no dimension has to be resolved."""
+        current_embedder = (current.embedders or {}).get(self.model_name) if current is not None else None
+        configured = getattr(current_embedder, "source", None) == "userProvided" and getattr(current_embedder, "dimensions", None)
+        if configured and self.st_model is None:
+            dimension = current_embedder.dimensions
+        else:
+            dimension = self.model_dimension()
         embedders = {
-            self.model_name: embedder
+            self.model_name: UserProvidedEmbedder(dimensions=dimension, source="userProvided")
         }
-        settings = MeilisearchSettings(embedders=embedders, searchable_attributes=self.searchable_attributes)
-        return self.index.update_settings(settings)
-        
+        values = {
+            "embedders": embedders,
+            "searchable_attributes": self.searchable_attributes,
+            "filterable_attributes": self.filterable_attributes
+        }
+        if self.settings is not None:
+            for name in self.settings.model_fields_set:
+                values[name] = getattr(self.settings, name)
+            if self.settings.embedders:
+                values["embedders"] = {**embedders, **self.settings.embedders}
+        return MeilisearchSettings(**values)
+
+    def _configure_index(self) -> Optional[TaskInfo]:
+        """Applies only the settings that differ from the index's current ones, so that constructing an instance
+        does not enqueue a settings task (and possibly a reindex) every time."""
+        with start_action(action_type="sync_index_settings", index_name=self.index_name) as action:
+            current = self._meili_call(self.index.get_settings)
+            desired = self.desired_settings(current)
+            self._embedder_dimension = getattr(desired.embedders.get(self.model_name), "dimensions", None)
+            diff = settings_diff(desired, current)
+            action.add_success_fields(changed_settings=sorted(diff))
+            if not diff:
+                return None
+            return self._meili_call(self.index.update_settings, MeilisearchSettings(**diff))
+
+    def _check_embedder_dimension(self, dimension: Optional[int]) -> None:
+        """Once the model is loaded, corrects an index embedder configured with a different dimension
+        (a wrong EMBEDDING_DIMENSIONS entry or model config), embedders given in settings are left alone."""
+        if dimension is None or self._embedder_dimension in (None, dimension) or self.index is None:
+            return
+        if self.settings is not None and self.model_name in (self.settings.embedders or {}):
+            return
+        with start_action(action_type="update_embedder_dimension", index_name=self.index_name,
+                          configured_dimension=self._embedder_dimension, model_dimension=dimension):
+            embedders = {self.model_name: UserProvidedEmbedder(dimensions=dimension, source="userProvided")}
+            self._meili_call(self.index.update_settings, MeilisearchSettings(embedders=embedders))
+            self._embedder_dimension = dimension
+            self._index_changed()
+
+    @property
+    def shadow_index_name(self) -> str:
+        return f"{self.index_name}{SHADOW_INDEX_SUFFIX}"
+
+    def start_rebuild(self) -> "MeiliRAG":
+        """
+        Starts a zero-downtime full rebuild: returns a MeiliRAG bound to an empty shadow index
+        (<index_name>__building) with the same model and settings. Index the complete document set into it
+        and call finish_rebuild, the live index keeps serving searches in the meantime.
+        A leftover shadow index of an interrupted rebuild is recreated.
+        """
+        with start_action(action_type="start_rebuild", index_name=self.index_name, shadow_index_name=self.shadow_index_name) as action:
+            # Meilisearch keeps the task history of deleted indexes, so the shadow's earlier rebuilds are told apart by uid
+            newest = self._meili_call(self.client.get_tasks, limit=1).results
+            after_task_uid = newest[0].uid if newest else -1
+            action.add_success_fields(after_task_uid=after_task_uid)
+            shadow = type(self)(
+                index_name=self.shadow_index_name,
+                model=self.model,
+                host=self.host,
+                port=self.port,
+                api_key=self.api_key,
+                reranking_model=self.reranking_model,
+                searchable_attributes=self.searchable_attributes,
+                filterable_attributes=self.filterable_attributes,
+                settings=self.settings,
+                primary_key=self.primary_key,
+                st_model=self.st_model,
+                create_index_if_not_exists=True,
+                recreate_index=True
+            )
+            shadow._rebuild_after_task_uid = after_task_uid
+            return shadow
+
+    def _wait_for_index_tasks(self, index_name: str, timeout_in_ms: Optional[int] = None, interval_in_ms: int = 500) -> None:
+        """Blocks until Meilisearch has no enqueued or processing tasks left for the index"""
+        deadline = None if timeout_in_ms is None else time.perf_counter() + timeout_in_ms / 1000
+        while self._meili_call(self.client.get_tasks, index_ids=[index_name], statuses=["enqueued", "processing"], limit=1).results:
+            if deadline is not None and time.perf_counter() > deadline:
+                raise MeilisearchTimeoutError(f"timeout of {timeout_in_ms}ms has exceeded waiting for the tasks of {index_name}")
+            time.sleep(interval_in_ms / 1000)
+
+    def finish_rebuild(self, shadow: "MeiliRAG",
+                       min_documents: int = int(os.getenv("MEILISEARCH_REBUILD_MIN_DOCUMENTS", 1)),
+                       min_ratio: Optional[float] = float(os.getenv("MEILISEARCH_REBUILD_MIN_RATIO", 0.0)) or None,
+                       expected_documents: Optional[int] = None,
+                       timeout_in_ms: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Completes a rebuild started with start_rebuild: waits for all tasks of the shadow index, validates that none
+        of the tasks since start_rebuild failed and its document count, atomically swaps it with the live index and
+        drops the old documents.
+        If validation fails a ValueError is raised, the live index is untouched and the shadow index is kept for inspection.
+
+        Args:
+            shadow: The MeiliRAG returned by start_rebuild
+            min_documents: Minimum number of documents the rebuilt index must contain
+            min_ratio: If set, the rebuilt index must contain at least this fraction of the live index documents
+            expected_documents: If set, the rebuilt index must contain at least this many documents
+            timeout_in_ms: Timeout for waiting for the shadow index tasks, None waits forever
+
+        Returns:
+            Dict with the document counts before and after the swap and the duration of the finishing steps
+        """
+        with start_action(action_type="finish_rebuild", index_name=self.index_name, shadow_index_name=shadow.index_name) as action:
+            start_time = time.perf_counter()
+            self._wait_for_index_tasks(shadow.index_name, timeout_in_ms=timeout_in_ms)
+            failed = [task for task in self.client.get_tasks(index_ids=[shadow.index_name], statuses=["failed"], limit=20).results
+                      if shadow._rebuild_after_task_uid is None or task.uid > shadow._rebuild_after_task_uid]
+            documents_count = self.client.get_index(shadow.index_name).get_stats().number_of_documents
+            try:
+                previous_count = self.client.get_index(self.index_name).get_stats().number_of_documents
+            except MeilisearchApiError:
+                self.index = self._create_index()
+                previous_count = 0
+            problems = []
+            if failed:
+                problems.append(f"{len(failed)} tasks failed, e.g. {failed[0].error}")
+            if documents_count < min_documents:
+                problems.append(f"{documents_count} documents, expected at least {min_documents}")
+            if expected_documents is not None and documents_count < expected_documents:
+                problems.append(f"{documents_count} documents, expected {expected_documents}")
+            if min_ratio is not None and documents_count < previous_count * min_ratio:
+                problems.append(f"{documents_count} documents is less than {min_ratio} of the {previous_count} live documents")
+            if problems:
+                action.log(message_type="rebuild_validation_failed", problems=problems)
+                raise ValueError(f"Rebuilt index {shadow.index_name} failed validation: {'; '.join(problems)}")
+            task = self.client.swap_indexes([(self.index_name, shadow.index_name)])
+            self.client.wait_for_task(task.task_uid, timeout_in_ms=timeout_in_ms, raise_for_status=True)
+            self.index = self.client.get_index(self.index_name)
+            self._index_changed()
+            # after the swap the shadow index holds the previous documents
+            self.client.delete_index_if_exists(shadow.index_name)
+            result = {
+                "index_name": self.index_name,
+                "documents_count": documents_count,
+                "previous_documents_count": previous_count,
+                "seconds": time.perf_counter() - start_time
+            }
+            action.add_success_fields(**result)
+            return result
+
+    def abort_rebuild(self, shadow: "MeiliRAG") -> None:
+        """Drops the shadow index of a rebuild, the live index is untouched"""
+        self.client.delete_index_if_exists(shadow.index_name)
+
+    def rebuild(self, build: Callable[["MeiliRAG"], Any], keep_failed: bool = False, **kwargs) -> Dict[str, Any]:
+        """
+        Rebuilds the index without downtime: build is called with the shadow MeiliRAG and must index the
+        complete document set into it, then the shadow index is validated and swapped in (see finish_rebuild,
+        which receives the keyword arguments). If build raises, the shadow index is dropped unless keep_failed.
+
+        Example:
+            rag.rebuild(lambda shadow: shadow.index_folder(folder))
+        """
+        shadow = self.start_rebuild()
+        try:
+            build(shadow)
+        except Exception:
+            if not keep_failed:
+                self.abort_rebuild(shadow)
+            raise
+        return self.finish_rebuild(shadow, **kwargs)
+
     def index_folder(
         self,
         folder: Path,
@@ -533,132 +1043,49 @@ class MeiliRAG(MeiliBase):
     ) -> None:
         """Index documents from a folder using the provided MeiliRAG instance."""
         with start_action(message_type="index_folder", folder=str(folder)) as action:
-            sentence_transformer_model = load_sentence_transformer_from_enum(self.model)
-            splitter_instance = create_splitter(splitter, sentence_transformer_model)
-            documents = splitter_instance.split_folder(folder, filter=filter)
+            splitter_instance = create_splitter(splitter, self.sentence_transformer)
+            # documents are split lazily while the previous batches upload
+            documents = splitter_instance.iter_split_folder(folder, filter=filter)
             result = self.add_documents(documents)
             action.add_success_fields(
                 message_type="index_folder_complete",
                 index_name=self.index_name,
-                documents_added_count=len(documents)
+                documents_added_count=result.documents_count
             )
             return result
 
+    def export_folder(
+        self,
+        folder: Path,
+        output: Path,
+        splitter: SplitterType = SplitterType.TEXT,
+        filter: Optional[Callable[[Path], bool]] = None
+    ) -> Path:
+        """Split and embed documents from a folder into a columnar document store without touching the index."""
+        with start_action(action_type="export_folder", folder=str(folder), output=str(output)) as action:
+            splitter_instance = create_splitter(splitter, self.sentence_transformer)
+            store = ParquetDocumentStore(path=Path(output))
+            path = store.write(splitter_instance.iter_split_folder(folder, filter=filter))
+            action.add_success_fields(documents_count=len(store))
+            return path
 
-    
-class MeiliAsyncRAG(MeiliBase):
-    # SO FOR NOT USED CAUSE IT IS UNPREDICTABLE
-    #WORK IN PROGRESS
-    #it will be future fixure
-
-    index_async: Optional[AsyncIndex] = Field(default=None, exclude=True)
-    
-
-    def get_loop(self):
-        """Helper to get or create an event loop that works in all environments"""
-        try:
-            loop = asyncio.get_running_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-        return loop
-    
-
-    def run_async(self, coro):
-        """Helper method to run async code safely in all environments"""
-        loop = self.get_loop()
-        if loop.is_running():
-            # Create a new loop for this operation if the current one is running
-            new_loop = asyncio.new_event_loop()
-            try:
-                asyncio.set_event_loop(new_loop)
-                return new_loop.run_until_complete(coro)
-            finally:
-                new_loop.close()
-                asyncio.set_event_loop(loop)
-        else:
-            return loop.run_until_complete(coro)
-
-
-    @log_retry_errors
-    async def _init_index_async(self, 
-                         create_index_if_not_exists: bool = True, 
-                         recreate_index: bool = False) -> AsyncIndex:
-        with start_action(action_type="init_index_async") as action:
-            try:
-                index = await self.client_async.get_index(self.index_name)
-                if recreate_index:
-                    action.log(
-                        message_type="index_exists",
-                        index_name=self.index_name,
-                        recreate_index=True
-                    )
-                    deleted = await self.delete_index_async()
-                    index = await self.client_async.create_index(self.index_name)
-                    return index
-                else:
-                    action.add_success_fields(
-                        message_type="index_exists",
-                        index_name=self.index_name,
-                        recreate_index=False
-                    )
-                    return index
-            except MeilisearchApiError:
-                if create_index_if_not_exists:
-                    action.add_success_fields(
-                        message_type="index_not_found",
-                        index_name=self.index_name,
-                        create_index_if_not_exists=True
-                    )
-                    index = await self.client_async.create_index(self.index_name)
-                    await index.update_searchable_attributes(self.searchable_attributes)
-                    await index.update_filterable_attributes(self.filterable_attributes)
-                    return index
-                else:
-                    action.log(
-                        message_type="index_not_found",
-                        index_name=self.index_name,
-                        create_index_if_not_exists=False
-                    )
-            return await self.client_async.get_index(self.index_name)
-
-
-    @log_retry_errors
-    async def add_documents_async(self, documents: List[ArticleDocument | Document], compress: bool = False) -> int:
-        """Add ArticleDocument objects to the index."""
-        with start_action(action_type="add documents") as action:
-            documents_dict = [doc.model_dump(by_alias=True) for doc in documents]
-            count = len(documents)
-            result = await self.index_async.add_documents(documents_dict, primary_key=self.primary_key, compress=compress)
-            action.add_success_fields(
-                status=result.status,
-                count = count
-            )
-            return result
-
-    def model_post_init(self, __context) -> None:
-        """Initialize clients and configure index after model initialization"""
-        super().model_post_init(__context)
-        self.client_async = AsyncClient(base_url=f'http://{self.host}:{self.port}', api_key=self.api_key)
-        self.index_async = self.client_async.index(self.index_name)
+    def index_store(self, path: Path | str, batch_size: int = 1000, compress: bool = False, wait: bool = False) -> DocumentsTasks:
+        """Load documents that were split and embedded offline (see export_folder) into the index.
 
-        #self.index_async = self.run_async(
-        #    self._init_index_async(self.create_index_if_not_exists, self.recreate_index)
-        #)
-        #self.run_async(self._configure_index())
+        Args:
+            path: Path to a .parquet or .arrow file written by ParquetDocumentStore
+            batch_size: Number of documents read from the store at once
+            compress: Whether to compress the payloads
+            wait: Whether to wait until Meilisearch processed all documents
 
-    @log_retry_errors
-    async def delete_index_async(self):
-        return await self.client_async.delete_index_if_exists(self.index_name)
-      
-    @log_retry_errors
-    async def _configure_async_index(self):
-        embedder = UserProvidedEmbedder(
-            dimensions=1024,
-            source="userProvided"
-        )
-        embedders = {
-            self.model_name: embedder
-        }
-        settings = MeilisearchSettings(embedders=embedders, searchable_attributes=self.searchable_attributes)
-        return await self.index_async.update_settings(settings)
\ No newline at end of file
+        Returns:
+            DocumentsTasks: handle for the enqueued tasks, documents_count is the number of documents loaded
+        """
+        with start_action(action_type="index_store", path=str(path), index_name=self.index_name) as action:
+            store = ParquetDocumentStore(path=Path(path))
+            if self.model_name not in store.embedders():
+                action.log(message_type="missing_embedder_vectors", model_name=self.model_name, embedders=store.embedders())
+            documents = (doc for batch in store.iter_documents(batch_size=batch_size) for doc in batch)
+            tasks = self.add_documents(documents, compress=compress, wait=wait)
+            action.add_success_fields(documents_added_count=tasks.documents_count)
+            return tasks
@@ -1,130 +1,480 @@
-from just_semantic_search.meili.rag import MeiliBase, log_retry_errors
+from just_semantic_search.meili.rag import MeiliBase, log_retry_errors, shared_sentence_transformer, source_filter
+from just_semantic_search.meili.utils.retry import DEFAULT_RETRY_POLICY, get_circuit_breaker, hedged_call_async
+from just_semantic_search.meili.utils.batches import DocumentsTasks, batch_by_size, DEFAULT_MAX_BATCH_BYTES, DEFAULT_MAX_BATCH_DOCUMENTS, DEFAULT_MAX_IN_FLIGHT
+from just_semantic_search.meili.utils.fusion import FusionMethod
+from just_semantic_search.meili.utils.search_cache import cached_search_async
+from just_semantic_search.utils.metrics import METRICS
 from just_semantic_search.document import ArticleDocument, Document
-from typing import List, Optional
-from pydantic import Field
+from just_semantic_search.embeddings import EmbeddingModel, EmbeddingModelParams, embedding_dimension, load_sentence_transformer_model, load_sentence_transformer_params_from_enum
+from just_semantic_search.remote.jina import jina_embed_query
+from typing import Any, AsyncIterator, Awaitable, Callable, ClassVar, Dict, Iterable, List, Literal, Optional, Tuple, Union
+from pydantic import Field, PrivateAttr
 
 from meilisearch_python_sdk import AsyncClient, AsyncIndex
 from meilisearch_python_sdk.errors import MeilisearchApiError
+from meilisearch_python_sdk.index import SearchResults, Hybrid
+from meilisearch_python_sdk.models.documents import DocumentsInfo
 from meilisearch_python_sdk.models.settings import MeilisearchSettings, UserProvidedEmbedder
+from meilisearch_python_sdk.models.task import TaskInfo
+from sentence_transformers import SentenceTransformer
 
 import asyncio
+import multiprocessing
+import os
+import threading
+import time
+import weakref
+import numpy
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+import eliot
 from eliot import start_action
 
 
-    
+# One AsyncClient (and its connection pool) per event loop and Meilisearch host. The clients of a loop are closed
+# when it shuts down its async generators (asyncio.run, uvicorn) and forgotten with the loop
+_ASYNC_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, Optional[str]], AsyncClient]]" = weakref.WeakKeyDictionary()
+_CLIENT_CLOSERS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncIterator[None]]" = weakref.WeakKeyDictionary()
+_ASYNC_CLIENTS_LOCK = threading.Lock()
+
+# Module-level dictionary to store async instances by index name
+MEILI_ASYNC_RAG_INSTANCES = {}
+ASYNC_INSTANCE_LOCK = threading.RLock()
+
+# Model loaded inside the worker processes of the process encoder
+_PROCESS_MODEL: Optional[SentenceTransformer] = None
+
+
+async def _close_clients_with_loop(clients: Dict[Tuple[str, Optional[str]], AsyncClient]) -> AsyncIterator[None]:
+    """Async generator parked at its yield, loop.shutdown_asyncgens() finalizes it while the loop can still close the clients"""
+    try:
+        yield
+    finally:
+        await asyncio.gather(*(client.aclose() for client in list(clients.values())), return_exceptions=True)
+        clients.clear()
+        loop = asyncio.get_running_loop()
+        with _ASYNC_CLIENTS_LOCK:
+            _ASYNC_CLIENTS.pop(loop, None)
+            # the generator refers to the loop through its finalizer
+            _CLIENT_CLOSERS.pop(loop, None)
+
+
+def _drop_closed_loops(loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]") -> None:
+    """Forgets the entries of loops closed without shutting down their async generators, their values may keep them alive"""
+    for loop in [loop for loop in list(loops.keys()) if loop.is_closed()]:
+        loops.pop(loop, None)
+
+
+def get_async_client(base_url: str, api_key: Optional[str] = None) -> AsyncClient:
+    """Returns the shared AsyncClient for the host, creating it for the running event loop if needed.
+    Clients are bound to the loop they are used in, so each loop gets its own pooled client."""
+    loop = asyncio.get_running_loop()
+    key = (base_url, api_key)
+    clients = _ASYNC_CLIENTS.get(loop)
+    client = clients.get(key) if clients is not None else None
+    if client is None:
+        with _ASYNC_CLIENTS_LOCK:
+            clients = _ASYNC_CLIENTS.get(loop)
+            if clients is None:
+                _drop_closed_loops(_ASYNC_CLIENTS)
+                _drop_closed_loops(_CLIENT_CLOSERS)
+                clients = _ASYNC_CLIENTS[loop] = {}
+                # the loop only keeps a weak reference to its async generators
+                closer = _CLIENT_CLOSERS[loop] = _close_clients_with_loop(clients)
+                asyncio.ensure_future(closer.__anext__())
+            client = clients.get(key)
+            if client is None:
+                client = clients[key] = AsyncClient(base_url, api_key)
+    return client
+
+
+def _init_process_encoder(model_name_or_path: str) -> None:
+    # the model travels by name or path, EmbeddingModel(value) would not resolve EmbeddingModel.OTHER models
+    global _PROCESS_MODEL
+    _PROCESS_MODEL = load_sentence_transformer_model(model_name_or_path)
+
+
+def _encode_in_process(query: str, encode_kwargs: dict) -> List[float]:
+    return _PROCESS_MODEL.encode(query, **encode_kwargs).tolist()
+
+
+
 class MeiliAsyncRAG(MeiliBase):
-    # SO FOR NOT USED CAUSE IT IS UNPREDICTABLE
-    #WORK IN PROGRESS
-    #it will be future fixure
-
-    index_async: Optional[AsyncIndex] = Field(default=None, exclude=True)
-    
-
-    def get_loop(self):
-        """Helper to get or create an event loop that works in all environments"""
-        try:
-            loop = asyncio.get_running_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-        return loop
-    
-
-    def run_async(self, coro):
-        """Helper method to run async code safely in all environments"""
-        loop = self.get_loop()
-        if loop.is_running():
-            # Create a new loop for this operation if the current one is running
-            new_loop = asyncio.new_event_loop()
-            try:
-                asyncio.set_event_loop(new_loop)
-                return new_loop.run_until_complete(coro)
-            finally:
-                new_loop.close()
-                asyncio.set_event_loop(loop)
+    """
+    Fully asynchronous counterpart of MeiliRAG that is safe to use inside a running event loop (e.g. FastAPI).
+
+    All Meilisearch calls go through a single pooled AsyncClient per host, while query encoding and reranking,
+    which are CPU/GPU bound, are offloaded to their own executors so that they never block the loop.
+    Searches share the result cache, the reranker and client-side fusion of MeiliRAG.
+    The index is resolved lazily on the first call.
+    """
+
+    index_name: str = Field(description="Name of the Meilisearch index")
+    model: EmbeddingModel = Field(default=EmbeddingModel.JINA_EMBEDDINGS_V3, description="Embedding model to use for vector search")
+    embedding_model_params: EmbeddingModelParams = Field(default_factory=EmbeddingModelParams, description="Embedding model parameters")
+    create_index_if_not_exists: bool = Field(default=os.getenv("MEILISEARCH_CREATE_INDEX_IF_NOT_EXISTS", True), description="Create index if it doesn't exist")
+    searchable_attributes: List[str] = Field(
+        default=['title', 'abstract', 'text', 'content', 'source', "authors", "references"],
+        description="List of attributes that can be searched"
+    )
+    filterable_attributes: List[str] = Field(
+       default=['title', 'abstract', 'source', "authors", "references"],
+        description="List of attributes that can be used for filtering"
+    )
+    primary_key: str = Field(default="hash", description="Primary key field for documents")
+    encoder_executor: Literal["thread", "process"] = Field(
+        default=os.getenv("MEILISEARCH_ENCODER_EXECUTOR", "thread"),
+        description="Where to run query encoding: a thread pool sharing the model or a process pool with a model per process"
+    )
+    encoder_workers: int = Field(default=int(os.getenv("MEILISEARCH_ENCODER_WORKERS", 1)), description="Number of encoder workers")
+    rerank_workers: int = Field(default=int(os.getenv("MEILISEARCH_RERANK_WORKERS", 2)), description="Number of threads scoring candidate pools with the reranker")
+
+    model_name: Optional[str] = Field(default=None, exclude=True)
+    st_model: Optional[SentenceTransformer] = Field(default=None, exclude=True)
+    transformer_lock: ClassVar[threading.RLock] = threading.RLock()
+
+    _executor: Optional[Executor] = PrivateAttr(default=None)
+    _rerank_executor: Optional[ThreadPoolExecutor] = PrivateAttr(default=None)
+    _index_ready: bool = PrivateAttr(default=False)
+    _dimension_checked: bool = PrivateAttr(default=False)
+    _index_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = PrivateAttr(default_factory=weakref.WeakKeyDictionary)
+
+    def model_post_init(self, __context) -> None:
+        """Resolve model parameters, no network calls are made here"""
+        model_value = self.model.value
+        self.embedding_model_params = load_sentence_transformer_params_from_enum(self.model)
+        self.model_name = model_value.split("/")[-1].split("\\")[-1] if "/" in model_value or "\\" in model_value else model_value
+        super().model_post_init(__context)
+
+    @classmethod
+    def get_instance(cls, index_name: str, **kwargs) -> "MeiliAsyncRAG":
+        """Thread-safe method to get a shared MeiliAsyncRAG instance for the index."""
+        if index_name in MEILI_ASYNC_RAG_INSTANCES:
+            return MEILI_ASYNC_RAG_INSTANCES[index_name]
+        with ASYNC_INSTANCE_LOCK:
+            if index_name not in MEILI_ASYNC_RAG_INSTANCES:
+                MEILI_ASYNC_RAG_INSTANCES[index_name] = cls(index_name=index_name, **kwargs)
+            return MEILI_ASYNC_RAG_INSTANCES[index_name]
+
+    @property
+    def client_async_pooled(self) -> AsyncClient:
+        """Shared AsyncClient for this host in the running event loop"""
+        return get_async_client(self.get_url(), self.api_key)
+
+    @property
+    def index_async(self) -> AsyncIndex:
+        return self.client_async_pooled.index(self.index_name)
+
+    @property
+    def sentence_transformer(self) -> SentenceTransformer:
+        """Lazily load the sentence transformer model when it's first needed."""
+        if self.st_model is None:
+            with self.transformer_lock:
+                if self.st_model is None:
+                    with start_action(action_type="lazy_load_sentence_transformer", model=self.model.value):
+                        self.st_model = shared_sentence_transformer(self.model)
+        return self.st_model
+
+    @property
+    def executor(self) -> Executor:
+        """Executor used for query encoding, created on first use"""
+        if self._executor is None:
+            with self.transformer_lock:
+                if self._executor is None:
+                    if self.encoder_executor == "process":
+                        if self.model in [EmbeddingModel.MEDCPT_QUERY, EmbeddingModel.MEDCPT_ARTICLE]:
+                            raise ValueError(f"{self.model.name} is not compatible with SentenceTransformer")
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.encoder_workers,
+                            mp_context=multiprocessing.get_context("spawn"),
+                            initializer=_init_process_encoder,
+                            initargs=(self.model.value,)
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.encoder_workers, thread_name_prefix=f"encoder_{self.index_name}")
+        return self._executor
+
+    @property
+    def rerank_executor(self) -> ThreadPoolExecutor:
+        """Executor used for reranking, separate from the encoder so that long candidate pools do not delay query encoding"""
+        if self._rerank_executor is None:
+            with self.transformer_lock:
+                if self._rerank_executor is None:
+                    self._rerank_executor = ThreadPoolExecutor(max_workers=self.rerank_workers, thread_name_prefix=f"reranker_{self.index_name}")
+        return self._rerank_executor
+
+    def _encode(self, query: str, encode_kwargs: dict) -> List[float]:
+        return self.sentence_transformer.encode(query, **encode_kwargs).tolist()
+
+    async def encode_query(self, query: str, remote_embedding: bool = False, **kwargs) -> List[float]:
+        """Encode the query without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        if remote_embedding:
+            return await loop.run_in_executor(None, jina_embed_query, query)
+        encode_kwargs = {**kwargs, **self.embedding_model_params.retrival_query}
+        if self.encoder_executor == "process":
+            vector = await loop.run_in_executor(self.executor, _encode_in_process, query, encode_kwargs)
         else:
-            return loop.run_until_complete(coro)
+            vector = await loop.run_in_executor(self.executor, self._encode, query, encode_kwargs)
+        if not self._dimension_checked:
+            await self._check_embedder_dimension(len(vector))
+        return vector
 
+    async def _check_embedder_dimension(self, dimension: int) -> None:
+        """At the first local encode, corrects the index embedder if it was configured with a different dimension
+        than the loaded model produces (a wrong EMBEDDING_DIMENSIONS entry or model config)"""
+        self._dimension_checked = True
+        index = await self.ensure_index()
+        settings = await self._meili_call_async(index.get_settings)
+        embedder = (settings.embedders or {}).get(self.model_name)
+        if embedder is not None and (getattr(embedder, "source", None) != "userProvided" or embedder.dimensions == dimension):
+            return
+        with start_action(action_type="update_embedder_dimension_async", index_name=self.index_name,
+                          configured_dimension=getattr(embedder, "dimensions", None), model_dimension=dimension):
+            embedders = {self.model_name: UserProvidedEmbedder(dimensions=dimension, source="userProvided")}
+            await self._meili_call_async(index.update_settings, MeilisearchSettings(embedders=embedders))
+            self._index_changed()
 
-    @log_retry_errors
-    async def _init_index_async(self, 
-                         create_index_if_not_exists: bool = True, 
-                         recreate_index: bool = False) -> AsyncIndex:
-        with start_action(action_type="init_index_async") as action:
+    async def ensure_index(self) -> AsyncIndex:
+        """Create and configure the index on first use"""
+        if self._index_ready:
+            return self.index_async
+        # asyncio locks are bound to one event loop, so like the pooled clients there is one per loop
+        loop = asyncio.get_running_loop()
+        with self.transformer_lock:
+            lock = self._index_locks.get(loop)
+            if lock is None:
+                _drop_closed_loops(self._index_locks)
+                lock = self._index_locks[loop] = asyncio.Lock()
+        async with lock:
+            if not self._index_ready:
+                await self._init_index_async(self.create_index_if_not_exists)
+                self._index_ready = True
+        # later callers return before taking a lock, and a lock that waited refers to its loop
+        self._index_locks.pop(loop, None)
+        return self.index_async
+
+    async def _init_index_async(self, create_index_if_not_exists: bool = True) -> AsyncIndex:
+        with start_action(action_type="init_index_async", index_name=self.index_name) as action:
+            client = self.client_async_pooled
             try:
-                index = await self.client_async.get_index(self.index_name)
-                if recreate_index:
-                    action.log(
-                        message_type="index_exists",
-                        index_name=self.index_name,
-                        recreate_index=True
-                    )
-                    deleted = await self.delete_index_async()
-                    index = await self.client_async.create_index(self.index_name)
-                    return index
-                else:
-                    action.add_success_fields(
-                        message_type="index_exists",
-                        index_name=self.index_name,
-                        recreate_index=False
-                    )
-                    return index
+                index = await self._meili_call_async(client.get_index, self.index_name)
+                action.add_success_fields(message_type="index_exists")
+                return index
             except MeilisearchApiError:
-                if create_index_if_not_exists:
-                    action.add_success_fields(
-                        message_type="index_not_found",
-                        index_name=self.index_name,
-                        create_index_if_not_exists=True
+                if not create_index_if_not_exists:
+                    raise
+                action.add_success_fields(message_type="index_not_found", create_index_if_not_exists=True)
+                settings = self._index_settings(await self.model_dimension())
+                return await self._meili_call_async(client.create_index, self.index_name, primary_key=self.primary_key, settings=settings)
+
+    async def model_dimension(self) -> int:
+        """Embedding dimension of the model without loading it: from the model if it is already loaded, otherwise
+        from EMBEDDING_DIMENSIONS or the model config (read off the loop). It is checked at the first encode."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, embedding_dimension, self.model, self.st_model)
+
+    def _index_settings(self, dimension: int) -> MeilisearchSettings:
+        embedders = {
+            self.model_name: UserProvidedEmbedder(dimensions=dimension, source="userProvided")
+        }
+        return MeilisearchSettings(
+            embedders=embedders,
+            searchable_attributes=self.searchable_attributes,
+            filterable_attributes=self.filterable_attributes
+        )
+
+    async def _meili_call_async(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Awaits one Meilisearch request with the retry policy and circuit breaker of the host"""
+        return await DEFAULT_RETRY_POLICY.call_async(func, *args, breaker=get_circuit_breaker(self.get_url()), **kwargs)
+
+    async def _meili_read_async(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Awaits an idempotent read with the retry policy and circuit breaker of the host, hedged if hedge_after_ms is set"""
+        if self.hedge_after_ms is None:
+            return await self._meili_call_async(func, *args, **kwargs)
+        return await self._meili_call_async(hedged_call_async, partial(func, *args, **kwargs), float(self.hedge_after_ms) / 1000)
+
+    @cached_search_async
+    async def search(self,
+            query: str | None = None,
+            vector: Optional[Union[List[float], 'numpy.ndarray']] = None,
+            semanticRatio: Optional[float] = float(os.getenv("MEILISEARCH_SEMANTIC_RATIO", 0.5)),
+            limit: int = int(os.getenv("MEILISEARCH_LIMIT", 100)),
+            offset: int = 0,
+            filter: Any | None = None,
+            attributes_to_retrieve: list[str] | None = None,
+            crop_length: int = int(os.getenv("MEILISEARCH_CROP_LENGTH", 1000)),
+            matching_strategy: Literal["all", "last", "frequency"] = os.getenv("MEILISEARCH_MATCHING_STRATEGY", "last"),
+            show_ranking_score: bool = os.getenv("MEILISEARCH_SHOW_RANKING_SCORE", True),
+            show_ranking_score_details: bool = os.getenv("MEILISEARCH_SHOW_RANKING_SCORE_DETAILS", True),
+            ranking_score_threshold: float | None = os.getenv("MEILISEARCH_RANKING_SCORE_THRESHOLD", None),
+            remote_embedding: bool = False,
+            rerank: Optional[bool] = None,
+            rerank_limit: int = int(os.getenv("RERANK_LIMIT", 50)),
+            rerank_min_candidates: int = int(os.getenv("RERANK_MIN_CANDIDATES", 3)),
+            rerank_batch_size: int = int(os.getenv("RERANK_BATCH_SIZE", 32)),
+            retrieval_budget_ms: Optional[float] = os.getenv("RETRIEVAL_BUDGET_MS", None),
+            rerank_budget_ms: Optional[float] = os.getenv("RERANK_BUDGET_MS", None),
+            rerank_window_words: Optional[int] = os.getenv("RERANK_WINDOW_WORDS", None),
+            rerank_max_windows: int = int(os.getenv("RERANK_MAX_WINDOWS", 2)),
+            fusion: Optional[FusionMethod | str] = None,
+            **search_params
+        ) -> SearchResults:
+        """Search for documents in the index, with the same result cache, reranking and fusion as MeiliRAG.search.
+
+        Args:
+            query: Search query text
+            vector: Precomputed query vector, computed in the encoder executor if omitted
+            semanticRatio: Ratio between semantic and keyword search, 0.0 skips encoding entirely
+            limit: Maximum number of results to return
+            remote_embedding: Embed the query with the Jina API instead of the local model
+            rerank, rerank_*, retrieval_budget_ms: see MeiliRAG.search, the candidate pool is scored in the rerank executor
+            fusion: meili, rrf or score, see MeiliRAG.search. Defaults to hybrid_fusion
+            **search_params: Any other AsyncIndex.search parameters (facets, sort, attributes_to_crop, ...)
+
+        Returns:
+            SearchResults: Search results including hits and metadata, reranked hits carry _rerankScore
+        """
+        METRICS.inc("search_requests")
+        retrieval_start_time = time.perf_counter()
+        paged = search_params.get("page") is not None or search_params.get("hits_per_page") is not None
+        use_reranker = (rerank is None or rerank) and self.reranker is not None and bool(query) and not paged
+        if rerank and self.reranker is None:
+            eliot.log_message(message_type="rerank_requested_without_reranker", index_name=self.index_name)
+        pool_limit = max(limit, int(rerank_limit)) if use_reranker else limit
+        index = await self.ensure_index()
+        with start_action(action_type="search_async", index_name=self.index_name, limit=pool_limit, semantic_ratio=semanticRatio) as action:
+            hybrid = None
+            if semanticRatio is not None and semanticRatio > 0.0:
+                if vector is None:
+                    with METRICS.timer("encode"):
+                        vector = await self.encode_query(query, remote_embedding=remote_embedding)
+                hybrid = Hybrid(embedder=self.model_name, semanticRatio=semanticRatio)
+            if vector is not None and hasattr(vector, 'tolist'):
+                vector = vector.tolist()
+            fusion = FusionMethod(fusion or self.hybrid_fusion)
+            with METRICS.timer("meili_search"):
+                if hybrid is not None and fusion != FusionMethod.MEILI and query and semanticRatio < 1.0 and not paged:
+                    if attributes_to_retrieve is not None:
+                        search_params["attributes_to_retrieve"] = attributes_to_retrieve
+                    results = await self._meili_read_async(
+                        self._fused_search, query, vector, semanticRatio, fusion,
+                        offset=offset,
+                        limit=pool_limit,
+                        show_ranking_score=show_ranking_score,
+                        filter=filter,
+                        crop_length=crop_length,
+                        matching_strategy=matching_strategy,
+                        ranking_score_threshold=ranking_score_threshold,
+                        **search_params
                     )
-                    index = await self.client_async.create_index(self.index_name)
-                    await index.update_searchable_attributes(self.searchable_attributes)
-                    await index.update_filterable_attributes(self.filterable_attributes)
-                    return index
                 else:
-                    action.log(
-                        message_type="index_not_found",
-                        index_name=self.index_name,
-                        create_index_if_not_exists=False
+                    results = await self._meili_read_async(
+                        index.search,
+                        query,
+                        offset=offset,
+                        limit=pool_limit,
+                        filter=filter,
+                        attributes_to_retrieve=attributes_to_retrieve,
+                        crop_length=crop_length,
+                        matching_strategy=matching_strategy,
+                        show_ranking_score=show_ranking_score,
+                        show_ranking_score_details=show_ranking_score_details,
+                        ranking_score_threshold=ranking_score_threshold,
+                        vector=vector if hybrid is not None else None,
+                        hybrid=hybrid,
+                        **search_params
                     )
-            return await self.client_async.get_index(self.index_name)
+            action.add_success_fields(hits_count=len(results.hits), fusion=fusion.value)
+        if not use_reranker:
+            return results
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.rerank_executor, partial(
+            self._rerank_results, query, results, limit,
+            min_candidates=rerank_min_candidates,
+            retrieval_seconds=time.perf_counter() - retrieval_start_time,
+            retrieval_budget_ms=retrieval_budget_ms,
+            rerank_budget_ms=rerank_budget_ms,
+            batch_size=rerank_batch_size,
+            window_words=rerank_window_words,
+            max_windows=rerank_max_windows
+        ))
 
+    async def _fused_search(self, query: str, vector: List[float], semanticRatio: float, fusion: FusionMethod,
+                            offset: int = 0, limit: int = 20, show_ranking_score: bool = True, **search_kwargs) -> SearchResults:
+        """Runs the keyword and the vector search in one multi-search request and fuses both rankings on the client."""
+        start_time = time.perf_counter()
+        keyword, semantic = await self.client_async_pooled.multi_search(self._fused_search_queries(query, vector, offset + limit, **search_kwargs))
+        return self._fuse_results(query, keyword, semantic, semanticRatio, fusion, offset, limit, show_ranking_score, start_time)
 
-    @log_retry_errors
-    async def add_documents_async(self, documents: List[ArticleDocument | Document], compress: bool = False) -> int:
-        """Add ArticleDocument objects to the index."""
-        with start_action(action_type="add documents") as action:
-            documents_dict = [doc.model_dump(by_alias=True) for doc in documents]
-            count = len(documents)
-            result = await self.index_async.add_documents(documents_dict, primary_key=self.primary_key, compress=compress)
+    async def add_documents(self, documents: Iterable[ArticleDocument | Document | dict], compress: bool = False,
+                            max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+                            max_batch_documents: int = DEFAULT_MAX_BATCH_DOCUMENTS,
+                            max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                            wait: bool = False,
+                            timeout_in_ms: Optional[int] = None) -> DocumentsTasks:
+        """Add documents in size-capped batches with at most max_in_flight concurrent uploads, see MeiliRAG.add_documents"""
+        index = await self.ensure_index()
+        with start_action(action_type="add_documents_async", index_name=self.index_name) as action:
+            tasks = DocumentsTasks(client=self.client_async_pooled, index_name=self.index_name)
+            semaphore = asyncio.Semaphore(max(1, max_in_flight))
+
+            async def upload(batch: List[dict]) -> TaskInfo:
+                try:
+                    return await self._add_batch(index, batch, compress)
+                finally:
+                    semaphore.release()
+
+            uploads = []
+            documents_dict = (doc if isinstance(doc, dict) else doc.model_dump(by_alias=True) for doc in documents)
+            for batch, size in batch_by_size(documents_dict, max_batch_bytes, max_batch_documents):
+                await semaphore.acquire()
+                uploads.append(asyncio.create_task(upload(batch)))
+                tasks.documents_count += len(batch)
+                tasks.bytes_sent += size
+            tasks.task_infos = list(await asyncio.gather(*uploads))
+            tasks.enqueued_seconds = time.perf_counter() - tasks.started_at
+            self._index_changed(tasks.task_uids)
+            if wait:
+                await tasks.wait_async(timeout_in_ms=timeout_in_ms)
             action.add_success_fields(
-                status=result.status,
-                count = count
+                status=tasks.status,
+                count=tasks.documents_count,
+                batches=len(tasks.task_infos),
+                documents_per_second=tasks.documents_per_second
             )
-            return result
+            return tasks
 
-    def model_post_init(self, __context) -> None:
-        """Initialize clients and configure index after model initialization"""
-        super().model_post_init(__context)
-        self.client_async = AsyncClient(base_url=f'http://{self.host}:{self.port}', api_key=self.api_key)
-        self.index_async = self.client_async.index(self.index_name)
+    @log_retry_errors
+    async def _add_batch(self, index: AsyncIndex, batch: List[dict], compress: bool = False) -> TaskInfo:
+        return await index.add_documents(batch, primary_key=self.primary_key, compress=compress)
 
-        #self.index_async = self.run_async(
-        #    self._init_index_async(self.create_index_if_not_exists, self.recreate_index)
-        #)
-        #self.run_async(self._configure_index())
+    async def get_documents(self, limit: int = 100, offset: int = 0) -> DocumentsInfo:
+        index = await self.ensure_index()
+        with start_action(action_type="get_documents_async", index_name=self.index_name) as action:
+            result = await self._meili_call_async(index.get_documents, offset=offset, limit=limit)
+            action.add_success_fields(count=len(result.results))
+            return result
+
+    async def delete_by_source(self, source: str) -> TaskInfo:
+        """Delete documents by their source from the index."""
+        index = await self.ensure_index()
+        task = await self._meili_call_async(index.delete_documents_by_filter, filter=source_filter(source))
+        self._index_changed([task.task_uid])
+        return task
 
     @log_retry_errors
     async def delete_index_async(self):
-        return await self.client_async.delete_index_if_exists(self.index_name)
-      
-    @log_retry_errors
-    async def _configure_async_index(self):
-        embedder = UserProvidedEmbedder(
-            dimensions=1024,
-            source="userProvided"
-        )
-        embedders = {
-            self.model_name: embedder
-        }
-        settings = MeilisearchSettings(embedders=embedders, searchable_attributes=self.searchable_attributes)
-        return await self.index_async.update_settings(settings)
\ No newline at end of file
+        self._index_ready = False
+        deleted = await self.client_async_pooled.delete_index_if_exists(self.index_name)
+        self._index_changed()
+        return deleted
+
+    def close(self) -> None:
+        """Shut down the encoder and rerank executors"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self._rerank_executor is not None:
+            self._rerank_executor.shutdown(wait=False)
+            self._rerank_executor = None
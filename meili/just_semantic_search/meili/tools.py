@@ -1,6 +1,10 @@
 import os
 from eliot import start_action
 from just_semantic_search.meili.rag import EmbeddingModel, MeiliBase, MeiliRAG
+from just_semantic_search.meili.rag_async import MeiliAsyncRAG
+from just_semantic_search.meili.utils.fusion import FusionMethod
+from just_semantic_search.meili.utils.catalog import get_catalog
+from just_semantic_search.utils.metrics import METRICS
 from typing import Optional
 from meilisearch_python_sdk.index import SearchResults
 
@@ -18,14 +22,13 @@ def all_indexes(non_empty: bool = True, debug: bool = True) -> list[str]:
     host = os.getenv("MEILISEARCH_HOST", "127.0.0.1")
     port = os.getenv("MEILISEARCH_PORT", 7700)
     api_key = os.getenv("MEILISEARCH_API_KEY", "fancy_master_key")
+    catalog = get_catalog(f"http://{host}:{port}", api_key)
     if debug:
         with start_action(action_type="all_indexes", host=host, port=port) as action:
-            db = MeiliBase(host=host, port=port, api_key=api_key)
-            action.log(message_type="all_indexes", count=len(db.all_indexes()))
-            return db.non_empty_indexes() if non_empty else db.all_indexes()
-    else:
-        db = MeiliBase(host=host, port=port, api_key=api_key)
-        return db.non_empty_indexes() if non_empty else db.all_indexes()
+            indexes = catalog.non_empty_indexes() if non_empty else catalog.all_indexes()
+            action.add_success_fields(count=len(indexes))
+            return indexes
+    return catalog.non_empty_indexes() if non_empty else catalog.all_indexes()
 
 
 def search_documents_raw(query: str, index: str, limit: Optional[int] = 8, semantic_ratio: Optional[float] = 0.5, debug: bool = True, remote_embedding: bool = False) -> SearchResults:
@@ -53,7 +56,7 @@ def search_documents_raw(query: str, index: str, limit: Optional[int] = 8, seman
         - 'remote_embedding': If True, the embedding was done remotely.
     """
     if semantic_ratio is None:
-        semantic_ratio = os.getenv("MEILISEARCH_SEMANTIC_RATIO", 0.5)    
+        semantic_ratio = float(os.getenv("MEILISEARCH_SEMANTIC_RATIO", 0.5))
     host = os.getenv("MEILISEARCH_HOST", "127.0.0.1")
     port = os.getenv("MEILISEARCH_PORT", 7700)
     api_key = os.getenv("MEILISEARCH_API_KEY", "fancy_master_key")
@@ -67,16 +70,16 @@ def search_documents_raw(query: str, index: str, limit: Optional[int] = 8, seman
         model=model,        # The embedding model used for the search
     )
     if debug:
-        with start_action(action_type="search_documents", query=query, index=index, limit=limit) as action:    
+        with METRICS.trace_action("search_documents", query=query, index=index, limit=limit) as action:
             action.log(message_type="search_documents", host=host, port=port, model_str=model_str, semantic_ratio=semantic_ratio, index=index)
             # Create and return RAG instance with conditional recreate_index
             # It should use default environment variables for host, port, api_key, create_index_if_not_exists, recreate_index
-            result = rag.search(query, limit=limit, semantic_ratio=semantic_ratio, remote_embedding=remote_embedding)
+            result = rag.search(query, limit=limit, semanticRatio=semantic_ratio, remote_embedding=remote_embedding)
             hits: list[dict] = result.hits
             action.log(message_type="search_documents_results_count", count=len(hits))
             return result
     else:
-        result = rag.search(query, limit=limit, semantic_ratio=semantic_ratio, remote_embedding=remote_embedding)
+        result = rag.search(query, limit=limit, semanticRatio=semantic_ratio, remote_embedding=remote_embedding)
         return result 
 
 def search_documents(query: str, index: str, limit: Optional[int] = 8, semantic_ratio: Optional[float] = 0.5, debug: bool = True, remote_embedding: bool = False) -> list[str]:
@@ -102,28 +105,93 @@ def search_documents(query: str, index: str, limit: Optional[int] = 8, semantic_
             "Another document content...\n SOURCE: /path/to/another/document.txt"
         ]
     """
-    result = []
-    for h in search_documents_raw(
+    hits = search_documents_raw(
             query,
             index,
             limit,
             semantic_ratio=semantic_ratio,
             debug=debug,
             remote_embedding=remote_embedding and os.getenv("JINA_API_KEY", None)
-    ).hits:
-        doc_info = h["text"]
-        # Add title if it exists
-        if "title" in h:
-            doc_info = f"Title: {h['title']}\n{doc_info}"
-        # Add fragment information
-        if "fragment_num" in h and "total_fragments" in h:
-            doc_info += f"\nFragment: {h['fragment_num']} out of {h['total_fragments']}"
-        if "token_count" in h:
-            doc_info += f"\nToken count: {h['token_count']}"
-        # Add source
-        doc_info += f"\nSOURCE: {h['source']}"
-        result.append(doc_info)
-    return result
+    ).hits
+    with METRICS.timer("serialize"):
+        return [format_hit(h) for h in hits]
+
+
+async def search_documents_async(query: str, index: str, limit: Optional[int] = 8, semantic_ratio: Optional[float] = 0.5, remote_embedding: bool = False) -> list[str]:
+    """
+    Async version of search_documents for servers: the query is encoded and the hits reranked in the executors of the index,
+    the search goes through the pooled AsyncClient and the result cache is shared with search_documents,
+    so the event loop is never blocked. The results are formatted as in search_documents.
+    """
+    if semantic_ratio is None:
+        semantic_ratio = float(os.getenv("MEILISEARCH_SEMANTIC_RATIO", 0.5))
+    model = EmbeddingModel(os.getenv("EMBEDDING_MODEL", EmbeddingModel.JINA_EMBEDDINGS_V3.value))
+    rag = MeiliAsyncRAG.get_instance(
+        index_name=index,
+        host=os.getenv("MEILISEARCH_HOST", "127.0.0.1"),
+        port=os.getenv("MEILISEARCH_PORT", 7700),
+        api_key=os.getenv("MEILISEARCH_API_KEY", "fancy_master_key"),
+        model=model
+    )
+    with METRICS.trace_action("search_documents_async", query=query, index=index, limit=limit) as action:
+        result = await rag.search(query, semanticRatio=semantic_ratio, limit=limit,
+                                  remote_embedding=bool(remote_embedding and os.getenv("JINA_API_KEY", None)))
+        action.log(message_type="search_documents_results_count", count=len(result.hits))
+    with METRICS.timer("serialize"):
+        return [format_hit(h) for h in result.hits]
+
+
+def format_hit(h: dict) -> str:
+    """Formats a search hit as the document text followed by its title, fragment information and source"""
+    doc_info = h["text"]
+    # Add title if it exists
+    if "title" in h:
+        doc_info = f"Title: {h['title']}\n{doc_info}"
+    # Add fragment information
+    if "fragment_num" in h and "total_fragments" in h:
+        doc_info += f"\nFragment: {h['fragment_num']} out of {h['total_fragments']}"
+    if "token_count" in h:
+        doc_info += f"\nToken count: {h['token_count']}"
+    # Add source
+    doc_info += f"\nSOURCE: {h['source']}"
+    return doc_info
+
+
+def search_documents_batch(queries: list[str], index: str, limit: Optional[int] = 8, semantic_ratio: Optional[float] = 0.5, debug: bool = True, remote_embedding: bool = False) -> list[list[str]]:
+    """
+    Search documents in MeiliSearch database with several queries at once.
+    Prefer it over calling search_documents repeatedly when you have several related queries (e.g. rephrasings of the question).
+
+    Args:
+        queries (list[str]): The search query strings, usually 2-10 related queries.
+        index (str): The name of the index to search within.
+                    It should be one of the allowed list of indexes.
+        limit (int): The number of documents to return per query. 8 by default.
+        semantic_ratio (float): The ratio of semantic search. 0.5 by default.
+        debug (bool): If True, print debug information. True by default.
+        remote_embedding (bool): If True and JINA_API_KEY is set, the embedding is done remotely.
+    Returns:
+        list[list[str]]: For each query, in the same order, a list of strings formatted as in search_documents.
+    """
+    if semantic_ratio is None:
+        semantic_ratio = float(os.getenv("MEILISEARCH_SEMANTIC_RATIO", 0.5))
+    model = EmbeddingModel(os.getenv("EMBEDDING_MODEL", EmbeddingModel.JINA_EMBEDDINGS_V3.value))
+    rag = MeiliRAG.get_instance(
+        host=os.getenv("MEILISEARCH_HOST", "127.0.0.1"),
+        port=os.getenv("MEILISEARCH_PORT", 7700),
+        api_key=os.getenv("MEILISEARCH_API_KEY", "fancy_master_key"),
+        index_name=index,
+        model=model
+    )
+    remote_embedding = bool(remote_embedding and os.getenv("JINA_API_KEY", None))
+    if debug:
+        with start_action(action_type="search_documents_batch", queries=queries, index=index, limit=limit) as action:
+            results = rag.search_many(queries, semanticRatio=semantic_ratio, limit=limit, remote_embedding=remote_embedding)
+            action.log(message_type="search_documents_batch_results_count", counts=[len(r.hits) for r in results])
+    else:
+        results = rag.search_many(queries, semanticRatio=semantic_ratio, limit=limit, remote_embedding=remote_embedding)
+    with METRICS.timer("serialize"):
+        return [[format_hit(h) for h in result.hits] for result in results]
     
 def search_documents_text(query: str, index: str, limit: Optional[int] = 8, debug: bool = True) -> list[str]:
     """
@@ -145,4 +213,44 @@ def search_documents_text(query: str, index: str, limit: Optional[int] = 8, debu
           "Deep learning models achieve state-of-the art results in predicting blood glucose trajectories, with a wide range of architectures being proposed....\n SOURCE:https://arxiv.org/abs/2209.04526",
           ]
     """
-    return search_documents(query, index, limit, semantic_ratio=0.0, debug=debug)
\ No newline at end of file
+    return search_documents(query, index, limit, semantic_ratio=0.0, debug=debug)
+
+
+def search_documents_federated(query: str, indexes: list[str], limit: Optional[int] = 8, semantic_ratio: Optional[float] = 0.5, weights: Optional[dict[str, float]] = None, debug: bool = True) -> list[str]:
+    """
+    Search documents in several MeiliSearch indexes at once and get one merged ranking.
+    Prefer it over calling search_documents for every index when the question can be answered from several indexes.
+
+    Args:
+        query (str): The search query string used to find relevant documents.
+        indexes (list[str]): The names of the indexes to search within.
+                    They should be from the allowed list of indexes.
+        limit (int): The number of documents to return in total. 8 by default.
+        semantic_ratio (float): The ratio of semantic search. 0.5 by default.
+        weights (dict[str, float]): Optional weight per index, indexes with higher weight rank higher. 1.0 by default.
+        debug (bool): If True, print debug information. True by default.
+    Returns:
+        list[str]: Strings formatted as in search_documents, best matches across all indexes first, each followed by its index.
+    """
+    if not indexes:
+        return []
+    if semantic_ratio is None:
+        semantic_ratio = float(os.getenv("MEILISEARCH_SEMANTIC_RATIO", 0.5))
+    model = EmbeddingModel(os.getenv("EMBEDDING_MODEL", EmbeddingModel.JINA_EMBEDDINGS_V3.value))
+    rag = MeiliRAG.get_instance(
+        host=os.getenv("MEILISEARCH_HOST", "127.0.0.1"),
+        port=os.getenv("MEILISEARCH_PORT", 7700),
+        api_key=os.getenv("MEILISEARCH_API_KEY", "fancy_master_key"),
+        index_name=indexes[0],
+        model=model
+    )
+    targets = {index: (weights or {}).get(index, 1.0) for index in indexes}
+    method = FusionMethod(os.getenv("MEILISEARCH_FUSION_METHOD", FusionMethod.RRF.value))
+    if debug:
+        with start_action(action_type="search_documents_federated", query=query, indexes=indexes, limit=limit) as action:
+            hits = rag.federated_search(query, targets, method=method, limit=limit, semanticRatio=semantic_ratio)
+            action.log(message_type="search_documents_federated_results_count", count=len(hits))
+    else:
+        hits = rag.federated_search(query, targets, method=method, limit=limit, semanticRatio=semantic_ratio)
+    with METRICS.timer("serialize"):
+        return [f"{format_hit(h)}\nINDEX: {h['_indexUid']}" for h in hits]
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from eliot import start_action
+from meilisearch_python_sdk.errors import MeilisearchTaskFailedError, MeilisearchTimeoutError
+from meilisearch_python_sdk.models.task import TaskInfo, TaskResult
+from pydantic import BaseModel, ConfigDict, Field
+
+# Meilisearch rejects payloads above 100MB by default, we stay well below it
+DEFAULT_MAX_BATCH_BYTES = int(os.getenv("MEILISEARCH_MAX_BATCH_BYTES", 20 * 1024 * 1024))
+DEFAULT_MAX_BATCH_DOCUMENTS = int(os.getenv("MEILISEARCH_MAX_BATCH_DOCUMENTS", 5000))
+DEFAULT_MAX_IN_FLIGHT = int(os.getenv("MEILISEARCH_MAX_IN_FLIGHT", 4))
+
+TERMINAL_TASK_STATUSES = ("succeeded", "failed", "canceled")
+
+
+def batch_by_size(
+    documents: Iterable[dict],
+    max_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+    max_documents: int = DEFAULT_MAX_BATCH_DOCUMENTS
+) -> Iterator[Tuple[List[dict], int]]:
+    """
+    Groups documents into batches whose JSON payload does not exceed max_bytes.
+
+    A single document that is larger than max_bytes is sent alone, so that Meilisearch reports
+    the failure for it instead of silently dropping it.
+
+    Yields:
+        Tuples of (batch, estimated payload size in bytes)
+    """
+    batch: List[dict] = []
+    size = 2  # surrounding brackets
+    for document in documents:
+        # measured as the SDK serializes it: json.dumps escapes non-ASCII characters and separates items with ", "
+        document_size = len(json.dumps(document)) + 2
+        if batch and (size + document_size > max_bytes or len(batch) >= max_documents):
+            yield batch, size
+            batch = []
+            size = 2
+        batch.append(document)
+        size += document_size
+    if batch:
+        yield batch, size
+
+
+class DocumentsTasks(BaseModel):
+    """
+    Aggregated handle for the Meilisearch tasks enqueued by one add_documents call.
+    Use wait() to block until Meilisearch processed all of them and check failures afterwards.
+    """
+    client: Optional[Any] = Field(default=None, exclude=True, description="Client used to poll the tasks")
+    index_name: str
+    task_infos: List[TaskInfo] = Field(default_factory=list)
+    results: List[TaskResult] = Field(default_factory=list)
+    documents_count: int = 0
+    bytes_sent: int = 0
+    started_at: float = Field(default_factory=time.perf_counter)
+    enqueued_seconds: Optional[float] = None
+    processed_seconds: Optional[float] = None
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def task_uids(self) -> List[int]:
+        return [info.task_uid for info in self.task_infos]
+
+    @property
+    def status(self) -> str:
+        """Aggregated status: enqueued until waited for, then succeeded or failed."""
+        if not self.results:
+            return "enqueued" if self.task_infos else "succeeded"
+        return "failed" if self.failed else "succeeded"
+
+    @property
+    def failed(self) -> List[TaskResult]:
+        return [result for result in self.results if result.status != "succeeded"]
+
+    @property
+    def failures(self) -> List[dict]:
+        """Details of the failed tasks as returned by Meilisearch"""
+        return [{"task_uid": result.uid, "status": result.status, "error": result.error} for result in self.failed]
+
+    @property
+    def elapsed_seconds(self) -> float:
+        if self.processed_seconds is not None:
+            return self.processed_seconds
+        if self.enqueued_seconds is not None:
+            return self.enqueued_seconds
+        return time.perf_counter() - self.started_at
+
+    @property
+    def documents_per_second(self) -> float:
+        """Throughput measured up to processing by Meilisearch if waited for, otherwise up to enqueueing."""
+        elapsed = self.elapsed_seconds
+        return self.documents_count / elapsed if elapsed > 0 else 0.0
+
+    def wait(self, timeout_in_ms: Optional[int] = None, interval_in_ms: int = 100, raise_for_status: bool = False) -> "DocumentsTasks":
+        """
+        Polls Meilisearch until all tasks reached a terminal status.
+
+        Args:
+            timeout_in_ms: Maximum time to wait, None waits forever
+            interval_in_ms: Polling interval
+            raise_for_status: Raise MeilisearchTaskFailedError if any of the tasks failed
+        """
+        with start_action(action_type="wait_for_documents_tasks", index_name=self.index_name, tasks=len(self.task_infos)) as action:
+            pending = self.task_uids
+            finished: dict[int, TaskResult] = {}
+            deadline = self._deadline(timeout_in_ms)
+            while pending:
+                for chunk in self._uid_chunks(pending):
+                    self._collect(self.client.get_tasks(uids=chunk, limit=len(chunk)), finished)
+                pending = self._still_pending(pending, finished, deadline, timeout_in_ms)
+                if pending:
+                    time.sleep(interval_in_ms / 1000)
+            return self._finish(finished, action, raise_for_status)
+
+    async def wait_async(self, timeout_in_ms: Optional[int] = None, interval_in_ms: int = 100, raise_for_status: bool = False) -> "DocumentsTasks":
+        """Same as wait() for handles created with an AsyncClient."""
+        with start_action(action_type="wait_for_documents_tasks_async", index_name=self.index_name, tasks=len(self.task_infos)) as action:
+            pending = self.task_uids
+            finished: dict[int, TaskResult] = {}
+            deadline = self._deadline(timeout_in_ms)
+            while pending:
+                for chunk in self._uid_chunks(pending):
+                    self._collect(await self.client.get_tasks(uids=chunk, limit=len(chunk)), finished)
+                pending = self._still_pending(pending, finished, deadline, timeout_in_ms)
+                if pending:
+                    await asyncio.sleep(interval_in_ms / 1000)
+            return self._finish(finished, action, raise_for_status)
+
+    @staticmethod
+    def _deadline(timeout_in_ms: Optional[int]) -> Optional[float]:
+        return None if timeout_in_ms is None else time.perf_counter() + timeout_in_ms / 1000
+
+    @staticmethod
+    def _uid_chunks(uids: List[int], size: int = 100) -> Iterator[List[int]]:
+        for i in range(0, len(uids), size):
+            yield uids[i:i + size]
+
+    @staticmethod
+    def _collect(status: Any, finished: dict) -> None:
+        for result in status.results:
+            if result.status in TERMINAL_TASK_STATUSES:
+                finished[result.uid] = result
+
+    @staticmethod
+    def _still_pending(pending: List[int], finished: dict, deadline: Optional[float], timeout_in_ms: Optional[int]) -> List[int]:
+        pending = [uid for uid in pending if uid not in finished]
+        if pending and deadline is not None and time.perf_counter() > deadline:
+            raise MeilisearchTimeoutError(f"timeout of {timeout_in_ms}ms has exceeded waiting for tasks {pending}")
+        return pending
+
+    def _finish(self, finished: dict, action: Any, raise_for_status: bool) -> "DocumentsTasks":
+        self.results = [finished[uid] for uid in self.task_uids]
+        self.processed_seconds = time.perf_counter() - self.started_at
+        action.add_success_fields(
+            status=self.status,
+            documents_count=self.documents_count,
+            documents_per_second=self.documents_per_second,
+            failures=self.failures
+        )
+        if raise_for_status and self.failed:
+            raise MeilisearchTaskFailedError(f"{len(self.failed)} of {len(self.results)} tasks failed: {self.failures}")
+        return self
@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from eliot import log_message, start_action
+from meilisearch_python_sdk import Client
+
+# Suffix of the shadow indexes used by zero-downtime rebuilds, they are hidden from the catalog
+SHADOW_INDEX_SUFFIX = os.getenv("MEILISEARCH_SHADOW_INDEX_SUFFIX", "__building")
+
+# One Client (and its connection pool) per Meilisearch host and key
+_CLIENTS: Dict[Tuple[str, Optional[str]], Client] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_client(base_url: str, api_key: Optional[str] = None) -> Client:
+    """Returns the shared Client for the host, creating it on first use"""
+    key = (base_url, api_key)
+    client = _CLIENTS.get(key)
+    if client is None:
+        with _CLIENTS_LOCK:
+            client = _CLIENTS.get(key)
+            if client is None:
+                client = Client(base_url, api_key)
+                _CLIENTS[key] = client
+    return client
+
+
+class IndexCatalog:
+    """
+    Thread-safe cache of the index names and document counts of one Meilisearch host.
+
+    The stats are fetched with one get_all_stats call and reused for ttl_seconds. Once they are older,
+    callers still get the cached stats while a background thread refreshes them. After invalidate()
+    (called on local writes) the next lookup fetches fresh stats synchronously.
+    """
+
+    def __init__(self, client: Client, ttl_seconds: float = float(os.getenv("MEILISEARCH_CATALOG_TTL_SECONDS", 30))):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self._documents: Optional[Dict[str, int]] = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._generation = 0
+
+    def refresh(self) -> Dict[str, int]:
+        """Fetches the stats of all indexes now"""
+        with start_action(action_type="refresh_index_catalog") as action:
+            fetched_at = time.monotonic()
+            generation = self._generation
+            stats = self.client.get_all_stats()
+            documents = {
+                name: index_stats.number_of_documents
+                for name, index_stats in stats.indexes.items()
+                if not name.endswith(SHADOW_INDEX_SUFFIX)
+            }
+            with self._lock:
+                # stats fetched before an invalidation are returned but not cached
+                if generation == self._generation:
+                    self._documents = documents
+                    self._fetched_at = fetched_at
+            action.add_success_fields(count=len(documents))
+            return documents
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            log_message(message_type="index_catalog_refresh_failed", error=str(e), error_type=type(e).__name__)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def documents(self) -> Dict[str, int]:
+        """Number of documents per index, possibly up to ttl_seconds (plus one refresh) old"""
+        documents = self._documents
+        if documents is None:
+            return self.refresh()
+        if time.monotonic() - self._fetched_at > self.ttl_seconds and not self._refreshing:
+            with self._lock:
+                start = not self._refreshing
+                self._refreshing = True
+            if start:
+                threading.Thread(target=self._refresh_in_background, name="meili_index_catalog", daemon=True).start()
+        return dict(documents)
+
+    def all_indexes(self) -> List[str]:
+        return list(self.documents())
+
+    def non_empty_indexes(self) -> List[str]:
+        return [name for name, count in self.documents().items() if count > 0]
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._documents = None
+            self._generation += 1
+
+
+_CATALOGS: Dict[Tuple[str, Optional[str]], IndexCatalog] = {}
+_CATALOGS_LOCK = threading.Lock()
+
+
+def get_catalog(base_url: str, api_key: Optional[str] = None) -> IndexCatalog:
+    """Returns the shared IndexCatalog of the host, using the pooled client"""
+    key = (base_url, api_key)
+    catalog = _CATALOGS.get(key)
+    if catalog is None:
+        with _CATALOGS_LOCK:
+            catalog = _CATALOGS.get(key)
+            if catalog is None:
+                catalog = IndexCatalog(get_client(base_url, api_key))
+                _CATALOGS[key] = catalog
+    return catalog
+
+
+def invalidate_catalog(base_url: str) -> None:
+    """Invalidates the catalogs of the host (whatever key they use), called after indexes or documents changed"""
+    for (url, _), catalog in list(_CATALOGS.items()):
+        if url == base_url:
+            catalog.invalidate()
@@ -0,0 +1,80 @@
+from enum import Enum
+from typing import Dict, List, Optional
+
+# k constant from the original reciprocal rank fusion paper, dampens the advantage of the very first ranks
+DEFAULT_RRF_K = 60
+
+
+class FusionMethod(str, Enum):
+    RRF = "rrf"  # reciprocal rank fusion, only uses ranks so it is robust to differently scaled scores
+    SCORE = "score"  # weighted sum of min-max normalized _rankingScore
+    MEILI = "meili"  # Meilisearch federated multi-search, merges by weighted _rankingScore on the server
+
+
+def _hit_key(hit: dict, index_uid: str, primary_key: Optional[str]) -> str:
+    """Hits sharing the primary key are considered duplicates, hits without it stay unique per index and position"""
+    if primary_key is not None and hit.get(primary_key) is not None:
+        return str(hit[primary_key])
+    return f"{index_uid}:{id(hit)}"
+
+
+def _normalized_scores(hits: List[dict]) -> List[float]:
+    scores = [hit.get("_rankingScore", 0.0) or 0.0 for hit in hits]
+    if not scores:
+        return []
+    low, high = min(scores), max(scores)
+    if high == low:
+        return [1.0 for _ in scores]
+    return [(score - low) / (high - low) for score in scores]
+
+
+def fuse_hits(
+    hits_by_index: Dict[str, List[dict]],
+    method: FusionMethod = FusionMethod.RRF,
+    weights: Optional[Dict[str, float]] = None,
+    limit: Optional[int] = None,
+    primary_key: Optional[str] = "hash",
+    rrf_k: int = DEFAULT_RRF_K
+) -> List[dict]:
+    """
+    Merges ranked hit lists from several indexes (or several searches) into one ranking.
+
+    With RRF a hit scores sum(weight / (rrf_k + rank)) over the lists it appears in, with SCORE it scores
+    the weighted sum of its min-max normalized _rankingScore. Duplicates (same primary key) are merged
+    and keep the first seen copy. Every returned hit is a copy annotated with _fusionScore and _indexUid
+    (the index of its best contribution).
+
+    Args:
+        hits_by_index: Ranked hits for every index (or search) name
+        method: FusionMethod.RRF or FusionMethod.SCORE
+        weights: Optional weight per index name, 1.0 for missing names
+        limit: Maximum number of hits to return, all hits if None
+        primary_key: Field used to detect duplicates, None disables deduplication
+        rrf_k: RRF rank constant
+    """
+    if method == FusionMethod.MEILI:
+        raise ValueError("FusionMethod.MEILI is done by Meilisearch federated search, not on the client")
+    weights = weights or {}
+    scores: Dict[str, float] = {}
+    best: Dict[str, float] = {}
+    fused: Dict[str, dict] = {}
+    for index_uid, hits in hits_by_index.items():
+        weight = weights.get(index_uid, 1.0)
+        if method == FusionMethod.RRF:
+            contributions = [weight / (rrf_k + rank) for rank in range(1, len(hits) + 1)]
+        else:
+            contributions = [weight * score for score in _normalized_scores(hits)]
+        for hit, contribution in zip(hits, contributions):
+            key = _hit_key(hit, index_uid, primary_key)
+            if key not in fused:
+                fused[key] = {**hit, "_indexUid": index_uid}
+                scores[key] = 0.0
+                best[key] = contribution
+            elif contribution > best[key]:
+                best[key] = contribution
+                fused[key]["_indexUid"] = index_uid
+            scores[key] += contribution
+    ranked = sorted(fused, key=lambda key: scores[key], reverse=True)
+    if limit is not None:
+        ranked = ranked[:limit]
+    return [{**fused[key], "_fusionScore": scores[key]} for key in ranked]
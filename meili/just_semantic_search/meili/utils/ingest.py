@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+from eliot import log_message, start_action
+from pydantic import BaseModel
+
+from just_semantic_search.splitters.text_splitters import TextSplitter
+from just_semantic_search.utils.json_stream import iter_json_records
+from just_semantic_search.utils.metrics import METRICS
+
+# Number of chunks embedded with one encode call, chunks of many records share a batch
+DEFAULT_EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", 64))
+
+
+class IngestStats(BaseModel):
+    """Counters of one streaming ingest run"""
+    files: int = 0
+    files_failed: int = 0
+    records: int = 0
+    records_skipped: int = 0
+    errors: int = 0
+    chunks: int = 0
+
+
+def chunk_hash(chunk: dict) -> str:
+    """Deterministic id of a chunk, so that re-ingesting the same file overwrites its chunks"""
+    return hashlib.md5(json.dumps(chunk, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+def chunk_records(records: Iterable[Any],
+                  splitter: TextSplitter,
+                  content_field: str,
+                  source_file: str,
+                  primary_key: str = "hash",
+                  required_fields: Optional[List[str]] = None,
+                  stats: Optional[IngestStats] = None) -> Iterator[dict]:
+    """
+    Splits the content_field of every record with the given splitter and yields one dict per chunk.
+
+    All the other fields of the record are kept as they are (shallow copied, chunks of one record share nested values),
+    and _chunk_id, _total_chunks, _source_file and the primary key are added. Records without the content field or
+    the required fields are skipped, a record that fails to split is counted as an error.
+    """
+    stats = stats if stats is not None else IngestStats()
+    for record in records:
+        stats.records += 1
+        if not isinstance(record, dict) or not isinstance(record.get(content_field), str):
+            stats.records_skipped += 1
+            log_message(message_type="missing_content_field", field=content_field, document=str(record)[:100])
+            continue
+        if required_fields:
+            missing_fields = [field for field in required_fields if field not in record]
+            if missing_fields:
+                stats.records_skipped += 1
+                log_message(message_type="missing_required_fields", fields=missing_fields, document=str(record)[:100])
+                continue
+        try:
+            _, text_chunks = splitter.get_tokens_and_chunks(record[content_field])
+        except Exception as e:
+            stats.errors += 1
+            log_message(message_type="document_processing_error", error=str(e), error_type=type(e).__name__,
+                        document=str(record)[:100])
+            continue
+        for i, text in enumerate(text_chunks):
+            chunk = dict(record)
+            chunk[content_field] = text
+            chunk["_chunk_id"] = i
+            chunk["_total_chunks"] = len(text_chunks)
+            chunk["_source_file"] = source_file
+            chunk[primary_key] = chunk_hash(chunk)
+            yield chunk
+
+
+def embed_chunks(chunks: Iterable[dict],
+                 splitter: TextSplitter,
+                 content_field: str,
+                 embedder_name: str,
+                 batch_size: int = DEFAULT_EMBED_BATCH_SIZE,
+                 stats: Optional[IngestStats] = None,
+                 progress: Optional[Callable[..., None]] = None) -> Iterator[dict]:
+    """Embeds the chunks batch_size at a time, whatever record they come from, and yields them with their _vectors"""
+    stats = stats if stats is not None else IngestStats()
+
+    def flush(batch: List[dict]) -> List[dict]:
+        with METRICS.timer("ingest_encode"):
+            vectors = splitter.embed_content([chunk[content_field] for chunk in batch],
+                                             batch_size=batch_size, normalize_embeddings=splitter.normalize_embeddings)
+        for chunk, vector in zip(batch, vectors):
+            chunk["_vectors"] = {embedder_name: vector.tolist()}
+        stats.chunks += len(batch)
+        METRICS.inc("ingest_chunks", len(batch))
+        if progress is not None:
+            progress(chunks=len(batch))
+        return batch
+
+    batch: List[dict] = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            yield from flush(batch)
+            batch = []
+    if batch:
+        yield from flush(batch)
+
+
+def ingest_json_files(rag: Any,
+                      paths: Iterable[Path],
+                      content_field: str,
+                      max_seq_length: Optional[int] = None,
+                      required_fields: Optional[List[str]] = None,
+                      embed_batch_size: int = DEFAULT_EMBED_BATCH_SIZE,
+                      skip_invalid: bool = True,
+                      progress: Optional[Callable[..., None]] = None,
+                      **add_documents_kwargs: Any) -> IngestStats:
+    """
+    Streams the records of JSON/JSONL files into a MeiliRAG index.
+
+    Records are parsed incrementally, split by one shared splitter, embedded in batches spanning many records and
+    uploaded by rag.add_documents in byte-capped batches while the next ones are embedded. Memory is bounded by the
+    embedding batch and the in-flight uploads, not by the size of the files.
+
+    Args:
+        rag: MeiliRAG (or the shadow index of a rebuild) to add the chunks to
+        paths: JSON or JSONL files
+        content_field: Field that is split and embedded, the other fields are kept as they are
+        max_seq_length: Maximum tokens per chunk, the model maximum when None
+        required_fields: Fields a record must have to be indexed
+        embed_batch_size: Number of chunks embedded with one encode call
+        skip_invalid: Skip malformed JSONL lines instead of failing the file
+        progress: Called with files_done=1 after each file and chunks=n after each embedding batch (e.g. report_progress of indexing jobs)
+        **add_documents_kwargs: Passed to rag.add_documents (max_batch_bytes, max_in_flight, wait...)
+    """
+    stats = IngestStats()
+    splitter = TextSplitter(model=rag.sentence_transformer, model_name=rag.model_name, max_seq_length=max_seq_length,
+                            model_params=rag.embedding_model_params, batch_size=embed_batch_size)
+    with start_action(action_type="ingest_json_files", index_name=rag.index_name, content_field=content_field,
+                      embed_batch_size=embed_batch_size) as action:
+
+        def chunks() -> Iterator[dict]:
+            for path in paths:
+                try:
+                    yield from chunk_records(iter_json_records(path, skip_invalid=skip_invalid), splitter, content_field,
+                                             path.name, rag.primary_key, required_fields, stats)
+                    stats.files += 1
+                except ValueError as e:
+                    # a malformed file stops at the first bad value, the records before it are indexed
+                    stats.files_failed += 1
+                    stats.errors += 1
+                    action.log(message_type="file_processing_error", file=str(path), error=str(e))
+                if progress is not None:
+                    progress(files_done=1)
+
+        tasks = rag.add_documents(
+            embed_chunks(chunks(), splitter, content_field, rag.model_name, batch_size=embed_batch_size,
+                         stats=stats, progress=progress),
+            **add_documents_kwargs
+        )
+        action.add_success_fields(**stats.model_dump(), batches=len(tasks.task_infos), bytes_sent=tasks.bytes_sent)
+    return stats
@@ -1,42 +1,326 @@
-from eliot import start_action
-from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
-from meilisearch_python_sdk.errors import MeilisearchApiError, MeilisearchCommunicationError
-
-def create_retry_decorator(
-    attempts: int = 5,
-    multiplier: float = 1,
-    min_wait: float = 4,
-    max_wait: float = 40
-) -> callable:
-    """Create a retry decorator with specified parameters"""
-    def log_retry_attempt(retry_state):
-        """Log retry attempt with Eliot action"""
-        with start_action(action_type="retry_attempt") as action:
-            if retry_state.outcome is not None:
-                exception = retry_state.outcome.exception()
-                action.add_success_fields(
-                    attempt_number=retry_state.attempt_number,
-                    exception_type=type(exception).__name__ if exception else None,
-                    exception_message=str(exception) if exception else None,
-                    next_attempt_in=retry_state.next_action.sleep if hasattr(retry_state.next_action, 'sleep') else None
-                )
-
-    def log_retry_done(retry_state):
-        """Log retry completion with Eliot action"""
-        with start_action(action_type="retry_done") as action:
-            action.add_success_fields(
-                attempt_number=retry_state.attempt_number,
-                was_successful=retry_state.outcome is not None and retry_state.outcome.exception() is None
-            )
-
-    return retry(
-        stop=stop_after_attempt(attempts),
-        wait=wait_exponential(
-            multiplier=multiplier,
-            min=min_wait,
-            max=max_wait
-        ),
-        retry=retry_if_exception_type((MeilisearchApiError, MeilisearchCommunicationError)),
-        before_sleep=log_retry_attempt,
-        after=log_retry_done
-    )
\ No newline at end of file
+import asyncio
+import inspect
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+from eliot import log_message
+from meilisearch_python_sdk.errors import MeilisearchApiError, MeilisearchCommunicationError, MeilisearchError
+
+from just_semantic_search.utils.metrics import METRICS
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: the request may succeed on another attempt
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    True for transient failures: connection errors, timeouts and 408/425/429/5xx responses.
+    Other API errors (bad filter, missing index, invalid api key...) fail the same way on every attempt.
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, MeilisearchApiError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS_CODES
+    if isinstance(error, (MeilisearchCommunicationError, httpx.TransportError, ConnectionError, TimeoutError)):
+        return True
+    if type(error) is MeilisearchError and error.__cause__ is not None:
+        # the SDK wraps transport errors raised before a response existed (read timeouts...) in a bare MeilisearchError
+        return is_retryable(error.__cause__)
+    return False
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a host whose circuit breaker is open"""
+
+    def __init__(self, name: str, retry_in_seconds: float):
+        self.name = name
+        self.retry_in_seconds = retry_in_seconds
+        super().__init__(f"Circuit breaker of {name} is open, next probe in {retry_in_seconds:.1f}s")
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker. After failure_threshold consecutive transient failures the circuit opens and
+    calls fail fast with CircuitOpenError for reset_timeout_seconds. Then a single probe call is let
+    through (half-open): its success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(self, name: str,
+                 failure_threshold: int = int(os.getenv("MEILISEARCH_BREAKER_FAILURES", 5)),
+                 reset_timeout_seconds: float = float(os.getenv("MEILISEARCH_BREAKER_RESET_SECONDS", 10))):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout_seconds:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """Raises CircuitOpenError unless the call may go through, returns True if the call is the half-open probe"""
+        if self.opened_at is None:
+            return False
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            elapsed = time.monotonic() - self.opened_at
+            if elapsed < self.reset_timeout_seconds or self._probing:
+                METRICS.inc("meili_circuit_rejected")
+                raise CircuitOpenError(self.name, max(self.reset_timeout_seconds - elapsed, 0.0))
+            self._probing = True
+            return True
+
+    def release_probe(self) -> None:
+        """Frees the probe slot of a probe that ended without an outcome (e.g. cancelled), so that another call can probe"""
+        if self._probing:
+            with self._lock:
+                self._probing = False
+
+    def record_success(self) -> None:
+        if self.failures or self.opened_at is not None:
+            with self._lock:
+                if self.opened_at is not None:
+                    log_message(message_type="circuit_breaker_closed", name=self.name)
+                self.failures = 0
+                self.opened_at = None
+                self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self._probing:
+                    METRICS.inc("meili_circuit_opened")
+                    log_message(message_type="circuit_breaker_opened", name=self.name, failures=self.failures)
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_circuit_breaker(base_url: str) -> CircuitBreaker:
+    """Returns the shared CircuitBreaker of the host"""
+    breaker = _BREAKERS.get(base_url)
+    if breaker is None:
+        with _BREAKERS_LOCK:
+            breaker = _BREAKERS.setdefault(base_url, CircuitBreaker(base_url))
+    return breaker
+
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of the calls so that a struggling host is not hit with a retry storm.
+    Every call deposits ratio tokens, every retry withdraws one, and the balance never exceeds max_tokens
+    (which is also the initial balance, allowing retries right after start).
+    """
+
+    def __init__(self,
+                 ratio: float = float(os.getenv("RETRY_BUDGET_RATIO", 0.2)),
+                 max_tokens: float = float(os.getenv("RETRY_BUDGET_TOKENS", 10))):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens < 1.0:
+                return False
+            self.tokens -= 1.0
+            return True
+
+
+class RetryPolicy:
+    """
+    Reusable retry policy for Meilisearch calls: only transient errors (see is_retryable) are retried,
+    with capped exponential backoff and full jitter, as long as the shared RetryBudget allows. When a
+    circuit breaker is given, calls fail fast while it is open and every transient failure is reported to it.
+
+    Use call()/call_async() directly, or wrap() to decorate a function once (MeiliBase methods use the
+    circuit breaker of their host).
+    """
+
+    def __init__(self,
+                 attempts: int = int(os.getenv("RETRY_ATTEMPTS", 3)),
+                 min_wait: float = float(os.getenv("RETRY_MIN", 0.1)),
+                 max_wait: float = float(os.getenv("RETRY_MAX", 2)),
+                 budget: Optional[RetryBudget] = None,
+                 classify: Callable[[BaseException], bool] = is_retryable):
+        self.attempts = max(1, attempts)
+        self.min_wait = min_wait
+        self.max_wait = max_wait
+        self.budget = budget if budget is not None else RetryBudget()
+        self.classify = classify
+
+    def backoff(self, attempt: int) -> float:
+        """Seconds to sleep before the given retry (1 for the first retry), full jitter"""
+        return random.uniform(0, min(self.max_wait, self.min_wait * 2 ** (attempt - 1)))
+
+    def _should_retry(self, error: BaseException, attempt: int, breaker: Optional[CircuitBreaker], name: str) -> bool:
+        retryable = self.classify(error)
+        if retryable and breaker is not None:
+            breaker.record_failure()
+        elif breaker is not None and not isinstance(error, CircuitOpenError):
+            breaker.record_success()  # the host answered, the request itself is wrong
+        if not retryable or attempt >= self.attempts:
+            return False
+        if not self.budget.withdraw():
+            METRICS.inc("meili_retry_budget_exhausted")
+            log_message(message_type="retry_budget_exhausted", function=name, error_type=type(error).__name__)
+            return False
+        METRICS.inc("meili_retries")
+        log_message(message_type="retry_attempt", function=name, attempt=attempt + 1,
+                    error_type=type(error).__name__, error=str(error))
+        return True
+
+    def call(self, func: Callable[..., T], *args: Any, breaker: Optional[CircuitBreaker] = None, **kwargs: Any) -> T:
+        name = getattr(func, "__name__", "call")
+        self.budget.deposit()
+        attempt = 1
+        while True:
+            probe = breaker.before_call() if breaker is not None else False
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if not self._should_retry(e, attempt, breaker, name):
+                    raise
+            else:
+                if breaker is not None:
+                    breaker.record_success()
+                return result
+            finally:
+                # a BaseException (cancellation, KeyboardInterrupt) records no outcome and must not keep the circuit open
+                if probe:
+                    breaker.release_probe()
+            time.sleep(self.backoff(attempt))
+            attempt += 1
+
+    async def call_async(self, func: Callable[..., Awaitable[T]], *args: Any,
+                         breaker: Optional[CircuitBreaker] = None, **kwargs: Any) -> T:
+        name = getattr(func, "__name__", "call")
+        self.budget.deposit()
+        attempt = 1
+        while True:
+            probe = breaker.before_call() if breaker is not None else False
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                if not self._should_retry(e, attempt, breaker, name):
+                    raise
+            else:
+                if breaker is not None:
+                    breaker.record_success()
+                return result
+            finally:
+                # asyncio.CancelledError is a BaseException and records no outcome, the probe slot is freed anyway
+                if probe:
+                    breaker.release_probe()
+            await asyncio.sleep(self.backoff(attempt))
+            attempt += 1
+
+    def wrap(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        """Decorates func once with this policy, the breaker is taken from the get_url() of the first argument if any"""
+        def breaker_of(args: tuple) -> Optional[CircuitBreaker]:
+            get_url = getattr(args[0], "get_url", None) if args else None
+            return get_circuit_breaker(get_url()) if callable(get_url) else None
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await self.call_async(func, *args, breaker=breaker_of(args), **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.call(func, *args, breaker=breaker_of(args), **kwargs)
+        return wrapper
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+_HEDGE_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_HEDGE_EXECUTOR_LOCK = threading.Lock()
+
+
+def _hedge_executor() -> ThreadPoolExecutor:
+    global _HEDGE_EXECUTOR
+    if _HEDGE_EXECUTOR is None:
+        with _HEDGE_EXECUTOR_LOCK:
+            if _HEDGE_EXECUTOR is None:
+                _HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.getenv("MEILISEARCH_HEDGE_WORKERS", 16)),
+                                                     thread_name_prefix="meili_hedge")
+    return _HEDGE_EXECUTOR
+
+
+def hedged_call(func: Callable[[], T], hedge_after_seconds: float) -> T:
+    """
+    Runs func and, if it has not finished after hedge_after_seconds, a duplicate of it, returning whichever
+    succeeds first. Only for idempotent reads such as searches. If both fail the error of the first is raised.
+    """
+    executor = _hedge_executor()
+    primary = executor.submit(func)
+    done, _ = wait([primary], timeout=hedge_after_seconds)
+    if done:
+        return primary.result()
+    METRICS.inc("meili_hedged_requests")
+    hedge = executor.submit(func)
+    pending = {primary, hedge}
+    errors: Dict[Future, BaseException] = {}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is hedge:
+                    METRICS.inc("meili_hedge_wins")
+                return future.result()
+            errors[future] = future.exception()
+    raise errors.get(primary) or errors[hedge]
+
+
+async def hedged_call_async(func: Callable[[], Awaitable[T]], hedge_after_seconds: float) -> T:
+    """Async version of hedged_call, the slower request is cancelled once one succeeded"""
+    primary = asyncio.ensure_future(func())
+    done, _ = await asyncio.wait({primary}, timeout=hedge_after_seconds)
+    if done:
+        return primary.result()
+    METRICS.inc("meili_hedged_requests")
+    hedge = asyncio.ensure_future(func())
+    pending = {primary, hedge}
+    errors: Dict[asyncio.Future, BaseException] = {}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        METRICS.inc("meili_hedge_wins")
+                    return task.result()
+                errors[task] = task.exception()
+        raise errors.get(primary) or errors[hedge]
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,242 @@
+import hashlib
+import inspect
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from eliot import log_message
+from meilisearch_python_sdk.errors import MeilisearchApiError
+
+from just_semantic_search.utils.cache import LRUCache
+from just_semantic_search.utils.metrics import METRICS
+from just_semantic_search.meili.utils.batches import TERMINAL_TASK_STATUSES
+
+IndexKey = Tuple[str, str]  # (Meilisearch url, index name)
+
+
+@dataclass
+class _IndexState:
+    generation: int = 0
+    pending_tasks: Set[int] = field(default_factory=set)
+    updated_at: Any = None
+    checked_at: float = 0.0
+    refreshing: bool = False
+
+
+class SearchResultCache:
+    """
+    Process-wide cache of search results keyed by the full normalized search request.
+
+    Every index has a generation that is bumped when it changes, cached results of older generations are ignored.
+    Changes made through MeiliRAG are tracked by their Meilisearch task uids: while such tasks are still
+    processing the cache is bypassed, and once they finished the generation is bumped. Changes made by other
+    processes are detected by polling the index updatedAt at most every check_interval_seconds, and ttl_seconds
+    bounds the age of any entry as a last resort.
+
+    All state changes happen under one lock. The polling requests run without it in a background thread,
+    one at a time per index, so searches never wait for them.
+    """
+
+    def __init__(self,
+                 max_size: int = int(os.getenv("SEARCH_CACHE_SIZE", 1000)),
+                 ttl_seconds: float = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", 300)),
+                 check_interval_seconds: float = float(os.getenv("SEARCH_CACHE_CHECK_INTERVAL_SECONDS", 5))):
+        self.entries = LRUCache(max_size)
+        self.ttl_seconds = ttl_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._states: Dict[IndexKey, _IndexState] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.entries.max_size > 0 and self.ttl_seconds > 0
+
+    def _state(self, index_key: IndexKey) -> _IndexState:
+        with self._lock:
+            return self._states.setdefault(index_key, _IndexState())
+
+    def invalidate(self, index_key: IndexKey, task_uids: Iterable[int] = ()) -> None:
+        """Marks the index as changed, results stay bypassed until the given tasks are processed"""
+        state = self._state(index_key)
+        with self._lock:
+            state.generation += 1
+            state.pending_tasks.update(task_uids)
+            state.checked_at = 0.0
+
+    def refresh(self, client: Any, index_key: IndexKey) -> None:
+        """Checks pending tasks and the index updatedAt, bumping the generation if the index changed"""
+        state = self._state(index_key)
+        with self._lock:
+            pending = list(state.pending_tasks)
+        finished: Set[int] = set()
+        try:
+            if pending:
+                finished = {task.uid for task in client.get_tasks(uids=pending, limit=len(pending)).results if task.status in TERMINAL_TASK_STATUSES}
+            info = client.get_raw_index(index_key[1])
+            updated_at = info.updated_at if info is not None else None
+        except MeilisearchApiError:
+            updated_at = None
+        with self._lock:
+            changed = bool(finished)
+            state.pending_tasks -= finished
+            if updated_at != state.updated_at:
+                changed = changed or state.updated_at is not None
+                state.updated_at = updated_at
+            if changed:
+                state.generation += 1
+
+    def _refresh_in_background(self, client: Any, index_key: IndexKey, state: _IndexState) -> None:
+        try:
+            self.refresh(client, index_key)
+        except Exception as e:
+            log_message(message_type="search_cache_refresh_failed", index_name=index_key[1], error=str(e), error_type=type(e).__name__)
+        finally:
+            with self._lock:
+                state.refreshing = False
+
+    def _schedule_refresh(self, client: Any, index_key: IndexKey, state: _IndexState) -> None:
+        """Starts a background refresh if the last check is older than check_interval_seconds and none is running"""
+        now = time.monotonic()
+        with self._lock:
+            if state.refreshing or now - state.checked_at < self.check_interval_seconds:
+                return
+            state.refreshing = True
+            state.checked_at = now
+        threading.Thread(target=self._refresh_in_background, args=(client, index_key, state),
+                         name="search_cache_refresh", daemon=True).start()
+
+    def get(self, client: Any, index_key: IndexKey, request_key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        state = self._state(index_key)
+        self._schedule_refresh(client, index_key, state)
+        entry = self.entries.get((index_key, request_key))
+        with self._lock:
+            if state.pending_tasks:
+                self.bypassed += 1
+                return None
+            if entry is None or entry[1] != state.generation or time.monotonic() - entry[0] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry[2].model_copy(deep=True)
+
+    def generation(self, index_key: IndexKey) -> int:
+        state = self._state(index_key)
+        with self._lock:
+            return state.generation
+
+    def put(self, index_key: IndexKey, request_key: str, value: Any, generation: int) -> None:
+        """Stores a result computed at the given generation, results of a generation that changed meanwhile are dropped"""
+        if not self.enabled:
+            return
+        state = self._state(index_key)
+        value = value.model_copy(deep=True)
+        with self._lock:
+            if state.pending_tasks or state.generation != generation:
+                return
+            self.entries.put((index_key, request_key), (time.monotonic(), generation, value))
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss metrics, bypassed counts lookups skipped while index tasks were processing"""
+        with self._lock:
+            hits, misses, bypassed = self.hits, self.misses, self.bypassed
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else None,
+            "bypassed": bypassed,
+            "size": len(self.entries),
+            "max_size": self.entries.max_size,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+
+SEARCH_CACHE = SearchResultCache()
+METRICS.register_gauges("search_cache", SEARCH_CACHE.stats)
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return re.sub(r"\s+", " ", value).strip()
+    if hasattr(value, "tolist"):
+        value = value.tolist()
+    if isinstance(value, (list, tuple)) and len(value) > 32 and all(isinstance(v, float) for v in value):
+        # vectors are hashed instead of being serialized into the key
+        return hashlib.md5(json.dumps(value).encode("utf-8")).hexdigest()
+    return value
+
+
+def request_key(arguments: Dict[str, Any]) -> str:
+    normalized = {name: _normalize(value) for name, value in sorted(arguments.items())}
+    return json.dumps(normalized, sort_keys=True, default=str)
+
+
+def _bound_request_key(signature: inspect.Signature, func, self, args, kwargs) -> str:
+    bound = signature.bind(self, *args, **kwargs)
+    bound.apply_defaults()
+    arguments = {name: value for name, value in bound.arguments.items() if name != "self"}
+    arguments.update(arguments.pop("kwargs", {}))
+    arguments.update(arguments.pop("search_params", {}))
+    return request_key({"method": func.__name__, **arguments})
+
+
+def cached_search(func):
+    """
+    Caches the SearchResults returned by a MeiliRAG search method in SEARCH_CACHE.
+    The key is built from all bound arguments with defaults applied, so equal requests hit the cache
+    however they were spelled. Pass use_cache=False to bypass it for a single call.
+    """
+    signature = inspect.signature(func)
+
+    @wraps(func)
+    def wrapper(self, *args, use_cache: bool = True, **kwargs):
+        if not use_cache or not SEARCH_CACHE.enabled:
+            return func(self, *args, **kwargs)
+        key = _bound_request_key(signature, func, self, args, kwargs)
+        index_key = (self.get_url(), self.index_name)
+        cached = SEARCH_CACHE.get(self.client, index_key, key)
+        if cached is not None:
+            METRICS.inc("search_cache_hits")
+            return cached
+        generation = SEARCH_CACHE.generation(index_key)
+        result = func(self, *args, **kwargs)
+        SEARCH_CACHE.put(index_key, key, result, generation)
+        return result
+    return wrapper
+
+
+def cached_search_async(func):
+    """
+    cached_search for the coroutine search methods of MeiliAsyncRAG. The lookup and the store are in-memory,
+    the index checks of SEARCH_CACHE run in its background thread with the synchronous client of the instance.
+    """
+    signature = inspect.signature(func)
+
+    @wraps(func)
+    async def wrapper(self, *args, use_cache: bool = True, **kwargs):
+        if not use_cache or not SEARCH_CACHE.enabled:
+            return await func(self, *args, **kwargs)
+        key = _bound_request_key(signature, func, self, args, kwargs)
+        index_key = (self.get_url(), self.index_name)
+        cached = SEARCH_CACHE.get(self.client, index_key, key)
+        if cached is not None:
+            METRICS.inc("search_cache_hits")
+            return cached
+        generation = SEARCH_CACHE.generation(index_key)
+        result = await func(self, *args, **kwargs)
+        SEARCH_CACHE.put(index_key, key, result, generation)
+        return result
+    return wrapper
@@ -0,0 +1,50 @@
+from typing import Any, Dict
+
+from pydantic import BaseModel
+from meilisearch_python_sdk.models.settings import MeilisearchSettings
+
+# Settings where Meilisearch does not care about the order of the values
+UNORDERED_SETTINGS = {"filterable_attributes", "sortable_attributes", "stop_words"}
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(by_alias=True, exclude_none=True)
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    return value
+
+
+def _differs(desired: Any, current: Any, unordered: bool = False) -> bool:
+    """True if current does not already contain what is desired, values Meilisearch adds on its own are ignored"""
+    if isinstance(desired, dict):
+        if not isinstance(current, dict):
+            return True
+        return any(_differs(value, current.get(key)) for key, value in desired.items())
+    if unordered and isinstance(desired, list) and isinstance(current, list):
+        if all(isinstance(item, str) for item in desired + current):
+            return set(desired) != set(current)
+    return desired != current
+
+
+def settings_diff(desired: MeilisearchSettings, current: MeilisearchSettings) -> Dict[str, Any]:
+    """
+    Returns the desired settings fields that differ from the current ones, as MeilisearchSettings keyword arguments.
+    Only fields set in desired are compared, embedders are compared one by one so that only changed ones are sent.
+    """
+    diff: Dict[str, Any] = {}
+    for name in desired.model_fields_set:
+        value = getattr(desired, name)
+        if value is None:
+            continue
+        current_value = getattr(current, name, None)
+        if name == "embedders":
+            current_embedders = current_value or {}
+            changed = {key: embedder for key, embedder in value.items() if _differs(_plain(embedder), _plain(current_embedders.get(key)))}
+            if changed:
+                diff[name] = changed
+        elif _differs(_plain(value), _plain(current_value), unordered=name in UNORDERED_SETTINGS):
+            diff[name] = value
+    return diff
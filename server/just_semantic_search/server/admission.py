@@ -0,0 +1,99 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from eliot import log_message
+from fastapi import HTTPException
+
+from just_semantic_search.utils.metrics import METRICS
+
+
+class ConcurrencyLimiter:
+    """
+    Admission control of one endpoint: at most max_concurrent requests run at once and at most max_queue wait
+    for a slot. A request arriving with a full queue is rejected right away with 429, a queued request that
+    did not get a slot within queue_timeout_seconds gets 503. Both carry a Retry-After header.
+
+    In-flight and queued requests are reported as METRICS gauges under admission_<name>.
+    """
+
+    def __init__(self, name: str,
+                 max_concurrent: int = 8,
+                 max_queue: int = 64,
+                 queue_timeout_seconds: float = 10.0):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        METRICS.register_gauges(f"admission_{name}", self.stats)
+
+    def _reject(self, status_code: int, reason: str) -> HTTPException:
+        METRICS.inc(f"admission_{self.name}_{reason}")
+        log_message(message_type="request_rejected", endpoint=self.name, reason=reason,
+                    in_flight=self.in_flight, queued=self.queued)
+        retry_after = max(1, int(self.queue_timeout_seconds))
+        return HTTPException(status_code=status_code, detail=f"{self.name} is overloaded ({reason}), retry later",
+                             headers={"Retry-After": str(retry_after)})
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Holds one of the max_concurrent slots for the duration of the block"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        if self._semaphore.locked():
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise self._reject(429, "queue_full")
+            self.queued += 1
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout_seconds)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise self._reject(503, "queue_timeout")
+            finally:
+                self.queued -= 1
+            METRICS.observe(f"admission_{self.name}_queue_wait", time.perf_counter() - start)
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out
+        }
+
+
+def limiter_from_env(name: str, max_concurrent: int, max_queue: int, queue_timeout_seconds: float) -> ConcurrencyLimiter:
+    """ConcurrencyLimiter whose settings can be overridden with <NAME>_MAX_CONCURRENT, <NAME>_MAX_QUEUE and <NAME>_QUEUE_TIMEOUT_SECONDS"""
+    prefix = name.upper()
+    return ConcurrencyLimiter(
+        name,
+        max_concurrent=int(os.getenv(f"{prefix}_MAX_CONCURRENT", max_concurrent)),
+        max_queue=int(os.getenv(f"{prefix}_MAX_QUEUE", max_queue)),
+        queue_timeout_seconds=float(os.getenv(f"{prefix}_QUEUE_TIMEOUT_SECONDS", queue_timeout_seconds))
+    )
+
+
+async def run_blocking(executor: ThreadPoolExecutor, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Runs a blocking call in the given executor without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, lambda: func(*args, **kwargs))
@@ -5,15 +5,23 @@ from just_semantic_search.splitters.article_splitter import ArticleSplitter
 from just_semantic_search.embeddings import EmbeddingModel
 from just_semantic_search.meili.rag import Document, EmbeddingModel, List, MeiliRAG, Path, os
 from just_semantic_search.server.indexing import Annotation, Indexing
+from just_semantic_search.server.rate_limiter import RateLimiter
+from just_semantic_search.server.jobs import report_progress
+from just_semantic_search.server.result_cache import ResultCache, content_hash
+from just_semantic_search.utils import pdf_text
+from just_semantic_search.utils.metrics import METRICS
 from just_semantic_search.splitters.text_splitters import Document, List, Path
 from pycomfort import files
+from pydantic import ConfigDict, Field, PrivateAttr
 
 
 import os
+import shutil
 import tempfile
 import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import List, Optional, Tuple, Callable
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Callable
 
 
 class OCRMixin:
@@ -45,29 +53,103 @@ class OCRMixin:
             text_content = markdown_path.read_text()
             return text_content
 
+    def _ocr_pages(self, pdf_path: Path, page_numbers: List[int], api_key: str) -> Dict[int, str]:
+        """OCRs the given pages, each sent as a one-page PDF, OCR_WORKERS at a time"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_dir_path = Path(temp_dir)
 
-class AgenticIndexing(Indexing, OCRMixin):
+            def ocr_page(number: int) -> str:
+                page_pdf = pdf_text.write_pages(pdf_path, [number], temp_dir_path / f"page_{number}.pdf")
+                return self._process_pdf_with_ocr(page_pdf, temp_dir_path / f"page_{number}.md", api_key)
 
-    annotation_agent: BaseAgent
+            with ThreadPoolExecutor(max_workers=int(os.getenv("OCR_WORKERS", 4)), thread_name_prefix="ocr") as executor:
+                return dict(zip(page_numbers, executor.map(ocr_page, page_numbers)))
 
-    def _process_single_paper(self, f: Path, rag: MeiliRAG, max_seq_length: int, characters_for_abstract: int, keep_memory: bool = False) -> List[dict]:
-        """Process a single paper file and add it to the RAG index.
-
-        Args:
-            f: Path to the file
-            rag: MeiliRAG instance for document storage
-            max_seq_length: Maximum sequence length for chunks
-            characters_for_abstract: Number of characters to use for extracting metadata
-            keep_memory: Whether to keep memory of the query
+    def _extract_pdf_markdown(self, pdf_path: Path, markdown_path: Path, api_key: Optional[str]) -> Optional[str]:
+        """
+        Markdown of a PDF: the local text layer of every page, pages with little or no text (scans) are OCRed.
+        Results are cached by the hash of the PDF bytes, so re-uploads cost nothing. Without pypdf the whole
+        document goes through OCR as before.
 
         Returns:
-            List of document chunks created from this paper
+            The markdown, or None when OCR is needed but no API key is available
         """
-        with start_task(message_type="process_paper", file=str(f.name)) as file_task:
+        with start_task(message_type="extract_pdf_markdown", pdf_path=str(pdf_path)) as task:
+            cache = pdf_markdown_cache()
+            cache_key = content_hash(pdf_path.read_bytes()) if cache is not None else None
+            cached = cache.get(cache_key) if cache is not None else None
+            if cached is not None:
+                task.add_success_fields(cached=True)
+                markdown_path.write_text(cached)
+                return cached
+
+            if pdf_text.pypdf is None:
+                if not api_key:
+                    return None
+                markdown = self._process_pdf_with_ocr(pdf_path, markdown_path, api_key)
+                complete = True
+                task.add_success_fields(pages_ocr="all")
+            else:
+                with METRICS.timer("pdf_text_layer"):
+                    pages = pdf_text.extract_text_layer(pdf_path)
+                sparse = [number for number, text in enumerate(pages) if pdf_text.needs_ocr(text)]
+                if sparse and api_key:
+                    with METRICS.timer("pdf_ocr"):
+                        for number, text in self._ocr_pages(pdf_path, sparse, api_key).items():
+                            pages[number] = text
+                elif sparse and len(sparse) == len(pages):
+                    # a scanned document without a key has nothing to index
+                    return None
+                elif sparse:
+                    task.log(message_type="ocr_skipped_without_api_key", pages=sparse)
+                # a result with pages left un-OCRed for lack of a key is not cached
+                complete = not sparse or bool(api_key)
+                METRICS.inc("pdf_pages", len(pages))
+                METRICS.inc("pdf_pages_ocr", len(sparse) if api_key else 0)
+                markdown = "\n\n".join(text.strip() for text in pages if text.strip())
+                markdown_path.write_text(markdown)
+                task.add_success_fields(pages=len(pages), pages_ocr=len(sparse) if api_key else 0)
+
+            if cache is not None and complete:
+                cache.put(cache_key, markdown)
+            return markdown
+
+
+_PDF_MARKDOWN_CACHE: Optional[ResultCache] = None
+
+
+def pdf_markdown_cache() -> Optional[ResultCache]:
+    """Shared cache of PDF markdown keyed by PDF content hash, None when PDF_MARKDOWN_CACHE is false"""
+    global _PDF_MARKDOWN_CACHE
+    if _PDF_MARKDOWN_CACHE is None and os.getenv("PDF_MARKDOWN_CACHE", "true").lower() in ("true", "1", "yes"):
+        _PDF_MARKDOWN_CACHE = ResultCache("pdf_markdown")
+    return _PDF_MARKDOWN_CACHE
+
+
+class AgenticIndexing(Indexing, OCRMixin):
+
+    annotation_agent: BaseAgent
+    annotation_workers: int = Field(default=int(os.getenv("ANNOTATION_WORKERS", 4)),
+                                    description="Number of files annotated by the LLM concurrently while earlier files are embedded")
+    annotation_rate_per_second: float = Field(default=float(os.getenv("ANNOTATION_RATE_PER_SECOND", 2.0)),
+                                              description="Maximum number of LLM annotation calls per second, 0 disables the limit")
+    annotation_cache: Optional[ResultCache] = Field(default=None, exclude=True,
+                                                    description="Disk cache of annotations keyed by the hash of the annotated text sample, "
+                                                                "created in INDEXING_RESULT_CACHE_DB unless ANNOTATION_CACHE is false")
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    _annotation_limiter: Optional[RateLimiter] = PrivateAttr(default=None)
+
+    def model_post_init(self, __context) -> None:
+        if self.annotation_cache is None and os.getenv("ANNOTATION_CACHE", "true").lower() in ("true", "1", "yes"):
+            self.annotation_cache = ResultCache("annotation")
+        self._annotation_limiter = RateLimiter(self.annotation_rate_per_second, burst=max(1, self.annotation_workers))
+
+    def _annotate_file(self, f: Path, characters_for_abstract: int) -> Tuple[str, str, str, str]:
+        """Reads a file and annotates it, returns (text, title, abstract, source)"""
+        with start_task(message_type="annotate_paper", file=str(f.name)) as file_task:
             text = f.read_text()
-            
-            # No need to wrap log function with SkipValidation
-            # Process metadata using parent method
             title, abstract, source = self._process_metadata(
                 text_content=text,
                 filename=f.name,
@@ -78,8 +160,36 @@ class AgenticIndexing(Indexing, OCRMixin):
                 characters_for_abstract=characters_for_abstract,
                 action_log=file_task.log
             )
-            
-            # Process and index the document using parent method
+            return text, title, abstract, source
+
+    def annotate_files(self, fs: Iterable[Path], characters_for_abstract: int) -> Iterator[Tuple[Path, Future]]:
+        """
+        Annotates the files in annotation_workers threads and yields (file, future) in completion order,
+        so the caller can embed a file as soon as its annotation is ready while the next ones are annotated.
+        At most twice annotation_workers annotated texts wait for the caller at any time.
+        """
+        workers = max(1, self.annotation_workers)
+        window = 2 * workers
+        remaining = iter(fs)
+        pending: Dict[Future, Path] = {}
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="annotation")
+        try:
+            while True:
+                for f in remaining:
+                    pending[executor.submit(self._annotate_file, f, characters_for_abstract)] = f
+                    if len(pending) >= window:
+                        break
+                if not pending:
+                    return
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _index_annotated(self, f: Path, text: str, title: str, abstract: str, source: str,
+                         rag: MeiliRAG, max_seq_length: int) -> List[dict]:
+        with start_task(message_type="process_paper", file=str(f.name)) as file_task:
             docs = self._process_and_index_document(
                 text_content=text,
                 title=title,
@@ -88,9 +198,24 @@ class AgenticIndexing(Indexing, OCRMixin):
                 rag=rag,
                 max_seq_length=max_seq_length
             )
-            
             file_task.log(message_type="process_paper.indexed", document_count=len(docs))
             return docs
+
+    def _process_single_paper(self, f: Path, rag: MeiliRAG, max_seq_length: int, characters_for_abstract: int, keep_memory: bool = False) -> List[dict]:
+        """Process a single paper file and add it to the RAG index.
+
+        Args:
+            f: Path to the file
+            rag: MeiliRAG instance for document storage
+            max_seq_length: Maximum sequence length for chunks
+            characters_for_abstract: Number of characters to use for extracting metadata
+            keep_memory: Whether to keep memory of the query
+
+        Returns:
+            List of document chunks created from this paper
+        """
+        text, title, abstract, source = self._annotate_file(f, characters_for_abstract)
+        return self._index_annotated(f, text, title, abstract, source, rag, max_seq_length)
         
     
     def annotate_metadata(self, text_content: str, filename: str,
@@ -118,16 +243,27 @@ class AgenticIndexing(Indexing, OCRMixin):
             action_log(message_type="auto_annotating_document")
             # Only use part of the text for annotation
             text_sample = text_content[:characters_for_abstract]
+            cache_key = content_hash(text_sample)
+            cached = self.annotation_cache.get(cache_key) if self.annotation_cache is not None else None
+            if cached is not None:
+                paper = Annotation.model_validate_json(cached)
+                action_log(message_type="auto_annotation_cached", title=paper.title)
+                return paper
             query = f"Extract the abstract, authors and title of the following document (from file {filename}):\n{text_sample}"
 
             try:
                 enforce_validation = os.environ.get("INDEXING_ENFORCE_VALIDATION", "False").lower() in ("true", "1", "yes")
-                response = self.annotation_agent.query_structural(
-                    query,
-                    Annotation,
-                    enforce_validation=enforce_validation)
+                if self._annotation_limiter is not None:
+                    METRICS.observe("annotation_rate_limit_wait", self._annotation_limiter.acquire())
+                with METRICS.timer("annotation"):
+                    response = self.annotation_agent.query_structural(
+                        query,
+                        Annotation,
+                        enforce_validation=enforce_validation)
 
                 paper = Annotation.model_validate(response)
+                if self.annotation_cache is not None:
+                    self.annotation_cache.put(cache_key, paper.model_dump_json())
                 action_log(message_type="auto_annotation_complete", title=paper.title)
                 return paper
             except Exception as e:
@@ -145,7 +281,7 @@ class AgenticIndexing(Indexing, OCRMixin):
     def index_md_txt(self, rag: MeiliRAG, folder: Path,
                      max_seq_length: Optional[int] = 10000,
                      characters_for_abstract: int = 20000, depth: int = -1, extensions: List[str] = [".md", ".txt"]
-                     ) -> List[dict]:
+                     ) -> Dict[Optional[str], int]:
         """
         Index markdown files from a folder into MeiliSearch.
 
@@ -155,18 +291,31 @@ class AgenticIndexing(Indexing, OCRMixin):
             characters_limit: Maximum number of characters to process per file
 
         Returns:
-            List of processed documents
+            Number of indexed document chunks per source
         """
         with start_task(message_type="index_markdown", folder=str(folder)) as task:
             fs = files.traverse(folder, lambda x: x.suffix in extensions, depth=depth)
-            documents = []
-            
-            # No need to wrap task.log with SkipValidation
-
-            for f in fs:
+            report_progress(files_total=len(fs))
+            chunks_per_source = self.index_paths(rag, fs, max_seq_length, characters_for_abstract)
+            task.add_success_fields(
+                message_type="index_markdown_complete",
+                index_name=rag.index_name,
+                documents_added_count=sum(chunks_per_source.values())
+            )
+            return chunks_per_source
+
+    def index_paths(self, rag: MeiliRAG, fs: Iterable[Path],
+                    max_seq_length: Optional[int], characters_for_abstract: int) -> Dict[Optional[str], int]:
+        """Annotate and index files, fs can be a lazy iterable (e.g. members of an upload being extracted).
+        Only the number of chunks per source is kept, not the embedded chunks."""
+        chunks_per_source: Dict[Optional[str], int] = {}
+        with start_task(message_type="index_paths", index_name=rag.index_name) as task:
+            # annotation runs ahead in worker threads, each file is embedded and indexed here once annotated
+            for f, annotation in self.annotate_files(fs, characters_for_abstract):
                 try:
-                    paper_docs = self._process_single_paper(f, rag, max_seq_length, characters_for_abstract)
-                    documents.extend(paper_docs)
+                    text, title, abstract, source = annotation.result()
+                    paper_docs = self._index_annotated(f, text, title, abstract, source, rag, max_seq_length)
+                    chunks_per_source[source] = chunks_per_source.get(source, 0) + len(paper_docs)
                 except Exception as e:
                     task.log(message_type="index_markdown.paper_processing_error",
                              file=str(f.name),
@@ -174,15 +323,11 @@ class AgenticIndexing(Indexing, OCRMixin):
                              error_type=str(type(e).__name__))
                     # Continue processing other papers
                     continue
+                finally:
+                    report_progress(files_done=1)
+        return chunks_per_source
 
-            task.add_success_fields(
-                message_type="index_markdown_complete",
-                index_name=rag.index_name,
-                documents_added_count=len(documents)
-            )
-            return documents
-
-    def index_markdown(self, folder: Path, index_name: str) -> List[dict]:
+    def index_markdown(self, folder: Path, index_name: str) -> Dict[Optional[str], int]:
         model_str = os.getenv("EMBEDDING_MODEL", EmbeddingModel.JINA_EMBEDDINGS_V3.value)
         model = EmbeddingModel(model_str)
 
@@ -217,7 +362,7 @@ class AgenticIndexing(Indexing, OCRMixin):
             autoannotate: Whether to auto-annotate the document if metadata is missing - 
                          when True, uses AI to extract metadata from the document content
                          (defaults to False)
-            mistral_api_key: Optional API key for Mistral OCR service - required for PDF parsing
+            mistral_api_key: Optional API key for Mistral OCR service - only needed for scanned pages without a text layer
                             (defaults to environment variable MISTRAL_API_KEY if not provided)
             api_key: Optional API key for authentication - used to secure the endpoint
                     (defaults to environment variable INDEXING_API_KEY if not provided)
@@ -250,8 +395,6 @@ class AgenticIndexing(Indexing, OCRMixin):
                     ocr_api_key = mistral_api_key
                     
                 action.log(f"Final ocr_api_key: {mask_api_key(ocr_api_key)}")
-                if not ocr_api_key:
-                    return "Error: Mistral API key is required for PDF processing. Please provide it as a parameter or set the MISTRAL_API_KEY environment variable."
 
                 # Save the uploaded PDF to a temporary file
                 filename = file.filename or "uploaded_file.pdf"
@@ -261,14 +404,15 @@ class AgenticIndexing(Indexing, OCRMixin):
                     markdown_path = temp_dir_path / f"{filename}.md"
 
                     # Save the PDF file
-                    content = file.file.read()
                     with open(pdf_path, "wb") as pdf_file:
-                        pdf_file.write(content)
+                        shutil.copyfileobj(file.file, pdf_file, 1024 * 1024)
 
                     action.log(message_type="pdf_saved", pdf_path=str(pdf_path))
 
-                    # Process PDF with OCR
-                    text_content = self._process_pdf_with_ocr(pdf_path, markdown_path, ocr_api_key)
+                    # Use the text layer, OCR only the pages without one
+                    text_content = self._extract_pdf_markdown(pdf_path, markdown_path, ocr_api_key)
+                    if text_content is None:
+                        return "Error: Mistral API key is required for PDF processing. Please provide it as a parameter or set the MISTRAL_API_KEY environment variable."
 
                     # Configure parameters
                     if max_seq_length is None:
@@ -291,6 +435,7 @@ class AgenticIndexing(Indexing, OCRMixin):
                         text_content, title, abstract, source,
                         rag, max_seq_length
                     )
+                    report_progress(files_done=1, files_total=1)
 
                     return f"Successfully indexed PDF document '{title}' with {len(docs)} chunks into index '{index_name}'"
 
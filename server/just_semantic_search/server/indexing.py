@@ -1,8 +1,12 @@
 from fastapi import UploadFile
 from just_semantic_search.splitters.article_splitter import ArticleSplitter
-from typing import List, Optional, Callable, Type, Any, Union, Tuple
+from typing import Dict, Iterable, List, Optional, Callable, Type, Any, Union, Tuple
 from just_semantic_search.meili.utils.services import ensure_meili_is_running
 from just_semantic_search.server.utils import default_annotation_agent, get_project_directories, load_environment_files
+from just_semantic_search.server.jobs import report_progress
+from just_semantic_search.server.zip_stream import ZipMembers, spool_upload
+from just_semantic_search.meili.utils.ingest import IngestStats, ingest_json_files
+from just_semantic_search.utils.json_stream import JSON_LINES_SUFFIXES
 from pydantic import BaseModel, Field, SkipValidation
 from just_semantic_search.splitters.text_splitters import *
 from just_semantic_search.embeddings import *
@@ -67,6 +71,7 @@ class Indexing(BaseModel):
             # Add documents to RAG
             rag.add_documents(docs)
             processing_task.log(message_type="document_indexed", chunks_count=len(docs))
+            report_progress(chunks=len(docs))
             
             return docs
 
@@ -91,8 +96,12 @@ class Indexing(BaseModel):
                 
                 # Delete the index using MeiliBase
                 from just_semantic_search.meili.rag import MeiliBase
+                from just_semantic_search.meili.utils.search_cache import SEARCH_CACHE
+                from just_semantic_search.meili.utils.catalog import invalidate_catalog
                 base = MeiliBase()
                 base.client.delete_index_if_exists(index_name)
+                SEARCH_CACHE.invalidate((base.get_url(), index_name))
+                invalidate_catalog(base.get_url())
                 
                 return f"Successfully deleted index '{index_name}'"
             except Exception as e:
@@ -123,9 +132,9 @@ class Indexing(BaseModel):
                     index_name=index_name
                 )
                 
-                deleted_count = rag.delete_by_source(source)
+                task = rag.delete_by_source(source)
                 
-                return f"Successfully deleted {deleted_count} documents with source '{source}' from index '{index_name}'"
+                return f"Successfully enqueued deletion of documents with source '{source}' from index '{index_name}' (task {task.task_uid})"
             except Exception as e:
                 error_msg = f"Error deleting documents: {str(e)}"
                 action.log(message_type="error", error=error_msg, error_type=str(type(e).__name__))
@@ -279,6 +288,7 @@ class Indexing(BaseModel):
                 splitter_instance: ArticleSplitter = create_splitter(splitter, rag.sentence_transformer)
                 docs = splitter_instance.split(text_content, source=source, title=title, abstract=abstract)
                 rag.add_documents(docs)
+                report_progress(files_done=1, chunks=len(docs), files_total=1)
 
                 return f"Successfully indexed document '{title}' with {len(docs)} chunks into index '{index_name}'"
 
@@ -289,8 +299,11 @@ class Indexing(BaseModel):
             
     def index_upload_markdown_folder(self, uploaded_file: UploadFile, index_name: str, api_key: Optional[str] = None) -> str:
         """
-        Accepts a zip file upload, extracts it to a temporary directory,
-        and indexes the markdown files within using index_markdown_folder.
+        Accepts a zip file upload and indexes the markdown and text files within.
+
+        The archive is read from the spooled upload and extracted member by member: each file is split,
+        embedded and uploaded as soon as it is extracted, so memory stays bounded and indexing starts
+        before a large archive is unpacked. Members above UPLOAD_ZIP_MAX_MEMBER_BYTES are skipped.
 
         Args:
             uploaded_file: The uploaded zip file (FastAPI UploadFile)
@@ -303,7 +316,6 @@ class Indexing(BaseModel):
         """
         import tempfile
         import zipfile
-        from fastapi import UploadFile
 
         with start_task(action_type="rag_server_upload_and_index_zip", index_name=index_name) as action:
             try:
@@ -312,29 +324,28 @@ class Indexing(BaseModel):
                 if env_api_key and (not api_key or api_key != env_api_key):
                     return "Error: Invalid or missing API key for indexing operations"
 
+                max_seq_length = int(os.getenv("INDEX_MAX_SEQ_LENGTH", 5000))
+                characters_for_abstract = int(os.getenv("INDEX_CHARACTERS_FOR_ABSTRACT", 20000))
+
                 # Create a temporary directory for extraction
                 with tempfile.TemporaryDirectory() as temp_dir:
                     temp_path = Path(temp_dir)
-
-                    # Save the uploaded file to temp location
-                    temp_zip_path = temp_path / "uploaded.zip"
-                    with open(temp_zip_path, "wb") as temp_file:
-                        content = uploaded_file.file.read()
-                        temp_file.write(content)
-
-                    # Extract the zip file
                     extraction_path = temp_path / "extracted"
                     extraction_path.mkdir(exist_ok=True)
 
-                    with zipfile.ZipFile(temp_zip_path, 'r') as zip_ref:
-                        zip_ref.extractall(extraction_path)
+                    with zipfile.ZipFile(spool_upload(uploaded_file.file, temp_path), 'r') as zip_ref:
+                        members = ZipMembers(zip_ref, extraction_path, extensions=[".md", ".txt"])
+                        action.log(message_type="zip_opened", members=len(members))
+                        report_progress(files_total=len(members))
 
-                    action.log(message_type="zip_extracted", extraction_path=str(extraction_path))
-
-                    # Index the extracted folder
-                    result = self.index_markdown_folder(extraction_path, index_name, api_key=api_key)
-                    action.log(message_type="indexing_complete")
+                        rag = self._create_rag_instance(index_name)
+                        chunks_per_source = self.index_paths(rag, members, max_seq_length, characters_for_abstract)
 
+                    action.log(message_type="indexing_complete", files=members.extracted, skipped=members.skipped,
+                               bytes_extracted=members.bytes_written)
+                    result = f"Indexed {sum(chunks_per_source.values())} document chunks from {members.extracted} files of the uploaded archive into index '{index_name}'."
+                    if members.skipped:
+                        result += f" Skipped {len(members.skipped)} files: {members.skipped}"
                     return result
 
             except zipfile.BadZipFile:
@@ -346,17 +357,18 @@ class Indexing(BaseModel):
                 action.log(message_type="error", error=error_msg, error_type=str(type(e).__name__))
                 return error_msg
             
-    def index_folder(self, folder: str | Path, index_name: str, api_key: Optional[str] = None, extensions: Optional[List[str]] = None, splitter: Optional[SplitterType] = SplitterType.ARTICLE) -> str:
+    def index_folder(self, folder: str | Path, index_name: str, api_key: Optional[str] = None, extensions: Optional[List[str]] = None, splitter: Optional[SplitterType] = SplitterType.ARTICLE,
+                     rebuild: bool = False) -> str:
         """
         Indexes a folder with markdown files. The server should have access to the folder.
-        Uses defensive checks for documents that might be either dicts or Document instances.
-        Reports errors to Eliot logs without breaking execution; problematic documents are skipped.
+        Documents without a source are reported as errors.
 
         Args:
             folder: Path to the folder containing markdown files
             index_name: Name of the index to create or update
             api_key: Optional API key for authentication - used to secure the endpoint
                     (defaults to environment variable INDEXING_API_KEY if not provided)
+            rebuild: Index into a shadow index and swap it with the live one when done (zero-downtime full reindex)
         """
         if extensions is None:
             extensions = [".md", ".txt"]
@@ -390,36 +402,24 @@ class Indexing(BaseModel):
                 rag_task.log(message_type="rag_created", index_name=index_name)
 
             with start_task(action_type="rag_server_index_markdown_folder.indexing") as indexing_task:
-                docs = self.index_md_txt(rag, folder_path, max_seq_length, characters_for_abstract)
-                indexing_task.log(message_type="indexing_complete", docs_count=len(docs))
-
-            sources = []
-            valid_docs_count = 0
-            error_count = 0
-
-            with start_task(action_type="rag_server_index_markdown_folder.validation") as validation_task:
-                for doc in docs:
+                if rebuild:
+                    built = []
                     try:
-                        if isinstance(doc, dict):
-                            source = doc.get("source")
-                            if source is None:
-                                raise ValueError(f"Document (dict) missing 'source' key: {doc}")
-                        elif isinstance(doc, Document):
-                            source = getattr(doc, "source", None)
-                            if source is None:
-                                raise ValueError(f"Document instance missing 'source' attribute: {doc}")
-                        else:
-                            raise TypeError(f"Unexpected document type: {type(doc)} encountered in documents list")
-
-                        sources.append(source)
-                        valid_docs_count += 1
-                    except Exception as e:
-                        error_count += 1
-                        validation_task.log(message="Error processing document", doc=str(doc)[:100], error=str(e))
-                        # Continue processing the next document
-                        continue
-
-                validation_task.log(message_type="validation_complete", valid_count=valid_docs_count, error_count=error_count)
+                        # rebuild drops the shadow index if indexing fails
+                        rebuilt = rag.rebuild(lambda shadow: built.append(
+                            self.index_md_txt(shadow, folder_path, max_seq_length, characters_for_abstract)))
+                    except ValueError as e:
+                        return f"Rebuild of {index_name} was not swapped in: {e}"
+                    indexing_task.log(message_type="rebuild_complete", **rebuilt)
+                    chunks_per_source = built[0]
+                else:
+                    chunks_per_source = self.index_md_txt(rag, folder_path, max_seq_length, characters_for_abstract)
+                indexing_task.log(message_type="indexing_complete", docs_count=sum(chunks_per_source.values()))
+
+            sources = [source for source in chunks_per_source if source is not None]
+            valid_docs_count = sum(chunks_per_source[source] for source in sources)
+            # chunks are counted while they are uploaded, the documents themselves are not kept
+            error_count = chunks_per_source.get(None, 0)
 
             result_msg = (
                 f"Indexed {valid_docs_count} valid documents from {folder} with sources: {sources}. "
@@ -433,10 +433,15 @@ class Indexing(BaseModel):
                          api_key: Optional[str] = None,
                          extension: str = ".json",
                          depth: int = -1,
-                         required_fields: Optional[List[str]] = None) -> str:
+                         required_fields: Optional[List[str]] = None,
+                         rebuild: bool = False) -> str:
         """
-        Indexes a folder with JSON files with fully custom fields. Each JSON file should be a document 
-        or contain an array of documents. All fields from the JSON will be preserved in the index.
+        Indexes a folder with JSON or JSONL files with fully custom fields. A JSON file can be a document,
+        an array of documents or concatenated documents, a .jsonl/.ndjson file has one document per line.
+        All fields from the JSON will be preserved in the index.
+
+        Records are streamed: files are parsed incrementally, chunks of many documents are embedded together
+        and uploaded in byte-capped batches, so memory does not grow with the size of the files.
         
         Args:
             folder: Path to the folder containing JSON files
@@ -444,16 +449,14 @@ class Indexing(BaseModel):
             content_field: Field name in the JSON that contains the document content (required for splitting)
             max_seq_length: Maximum sequence length for chunks
             api_key: Optional API key for authentication
-            extension: File extension to look for (default: .json)
+            extension: File extension to look for (default: .json), .jsonl and .ndjson files are always included
             depth: Depth of folder traversal (-1 for unlimited)
             required_fields: Optional list of field names that must be present in each document
+            rebuild: Index into a shadow index and swap it with the live one when done (zero-downtime full reindex)
                     
         Returns:
             str: Message describing the indexing results
         """
-        import json
-        from copy import deepcopy
-        
         with start_task(action_type="rag_server_index_json_files", folder=folder, index_name=index_name) as action:
             try:
                 # Verify API key if it's set in the environment
@@ -483,111 +486,40 @@ class Indexing(BaseModel):
                     )
                     rag_task.log(message_type="rag_created", index_name=index_name)
                 
-                # Process all JSON files in the folder
+                # Stream all JSON files in the folder
                 with start_task(action_type="rag_server_index_json_files.processing") as processing_task:
-                    json_files = files.traverse(folder_path, lambda x: x.suffix == extension, depth=depth)
+                    suffixes = {extension.lower(), *JSON_LINES_SUFFIXES}
+                    json_files = files.traverse(folder_path, lambda x: x.suffix.lower() in suffixes, depth=depth)
                     processing_task.log(message_type="found_json_files", count=len(json_files))
+                    report_progress(files_total=len(json_files))
+
+                    def ingest(target: MeiliRAG) -> IngestStats:
+                        return ingest_json_files(target, json_files, content_field,
+                                                 max_seq_length=max_seq_length,
+                                                 required_fields=required_fields,
+                                                 progress=report_progress)
+
+                    if rebuild:
+                        built = []
+                        # rebuild drops the shadow index if ingestion fails
+                        rebuilt = rag.rebuild(lambda shadow: built.append(ingest(shadow)))
+                        processing_task.log(message_type="rebuild_complete", **rebuilt)
+                        stats = built[0]
+                    else:
+                        stats = ingest(rag)
+                    processing_task.log(message_type="json_processing_complete", **stats.model_dump())
                     
-                    total_docs = 0
-                    errors = 0
-                    
-                    for json_file in json_files:
-                        try:
-                            with start_task(action_type="processing_json_file", file=str(json_file)) as file_task:
-                                # Load JSON content
-                                with open(json_file, 'r') as f:
-                                    json_content = json.load(f)
-                                
-                                # Check if it's a list or a single document
-                                if isinstance(json_content, list):
-                                    docs = json_content
-                                else:
-                                    docs = [json_content]
-                                
-                                file_task.log(message_type="json_loaded", documents=len(docs))
-                                
-                                # Process each document
-                                for doc in docs:
-                                    try:
-                                        # Check for required content field
-                                        if content_field not in doc:
-                                            file_task.log(message_type="missing_content_field", 
-                                                        field=content_field, 
-                                                        document=str(doc)[:100])
-                                            continue
-                                        
-                                        # Check for any other required fields
-                                        if required_fields:
-                                            missing_fields = [field for field in required_fields if field not in doc]
-                                            if missing_fields:
-                                                file_task.log(message_type="missing_required_fields", 
-                                                            fields=missing_fields, 
-                                                            document=str(doc)[:100])
-                                                continue
-                                        
-                                        # Get the main content for splitting
-                                        content = doc[content_field]
-                                        
-                                        # Create a copy of the document to preserve all original fields
-                                        metadata = deepcopy(doc)
-                                        # Create an empty list for chunks
-                                        chunks = []
-                                        
-                                        # Split the content field
-                                        splitter_instance = ArticleSplitter(model=rag.sentence_transformer, 
-                                                                        max_seq_length=max_seq_length)
-                                        
-                                        # Here, we're using a base document with all original fields
-                                        # and just splitting the content field
-                                        raw_splits = splitter_instance._split_text(content)
-                                        
-                                        # Create a chunk for each split with all the original metadata
-                                        for i, split in enumerate(raw_splits):
-                                            chunk = deepcopy(metadata)
-                                            # Replace the content with just this chunk
-                                            chunk[content_field] = split
-                                            # Add chunk metadata
-                                            chunk['_chunk_id'] = i
-                                            chunk['_total_chunks'] = len(raw_splits)
-                                            chunk['_source_file'] = str(json_file.name)
-                                            
-                                            # Convert to document format expected by MeiliRAG
-                                            chunks.append(chunk)
-                                        
-                                        # Add to index
-                                        rag.add_documents(chunks)
-                                        total_docs += len(chunks)
-                                        
-                                        file_task.log(message_type="document_processed", 
-                                                    chunks=len(chunks),
-                                                    fields=list(doc.keys()))
-                                    except Exception as e:
-                                        errors += 1
-                                        file_task.log(message_type="document_processing_error", 
-                                                    error=str(e), 
-                                                    error_type=str(type(e).__name__),
-                                                    document=str(doc)[:100])
-                                        continue
-                        except Exception as e:
-                            errors += 1
-                            processing_task.log(message_type="file_processing_error", 
-                                            file=str(json_file),
-                                            error=str(e), 
-                                            error_type=str(type(e).__name__))
-                            continue
-                    
-                    processing_task.log(message_type="json_processing_complete", 
-                                    total_documents=total_docs,
-                                    errors=errors)
-                    
-                    return f"Successfully indexed {total_docs} document chunks from JSON files in {folder_path}. Encountered {errors} errors."
+                    return (
+                        f"Successfully indexed {stats.chunks} document chunks from {stats.records} JSON records in {folder_path}. "
+                        f"Skipped {stats.records_skipped} records, encountered {stats.errors} errors."
+                    )
             except Exception as e:
                 error_msg = f"Error processing JSON files: {str(e)}"
                 action.log(message_type="error", error=error_msg, error_type=str(type(e).__name__))
                 return error_msg
 
     def index_md_txt(self, rag: MeiliRAG, folder: Path, 
-                max_seq_length: int, characters_for_abstract: int) -> List[dict]:
+                max_seq_length: int, characters_for_abstract: int) -> Dict[Optional[str], int]:
         """Index markdown/text files from a folder.
         
         Args:
@@ -597,26 +529,47 @@ class Indexing(BaseModel):
             characters_for_abstract: Number of characters to use for abstracts
             
         Returns:
-            List[dict]: List of document chunks that were indexed
+            Dict[Optional[str], int]: Number of indexed document chunks per source (None for chunks without a source)
         """
         from just_semantic_search.meili.utils.services import ensure_meili_is_running
         
         # Ensure MeiliSearch is running
         ensure_meili_is_running()
         
+        fs = [f for f in folder.iterdir() if f.is_file()]
+        report_progress(files_total=len(fs))
+        return self.index_paths(rag, fs, max_seq_length, characters_for_abstract)
+
+    def index_paths(self, rag: MeiliRAG, fs: Iterable[Path],
+                    max_seq_length: int, characters_for_abstract: int) -> Dict[Optional[str], int]:
+        """Split, embed and index files one after another, fs can be a lazy iterable (e.g. members of an upload being extracted).
+
+        Documents are uploaded in byte-capped batches while the next files are split, only their counts are kept.
+
+        Args:
+            rag: MeiliRAG instance for indexing
+            fs: Files to index
+            max_seq_length: Maximum sequence length for chunks
+            characters_for_abstract: Number of characters to use for abstracts
+
+        Returns:
+            Dict[Optional[str], int]: Number of indexed document chunks per source (None for chunks without a source)
+        """
         # Create a splitter
         splitter = ArticleSplitter(
             model=rag.sentence_transformer,
             max_seq_length=max_seq_length
         )
-        
-        # Split and index the documents
-        documents = splitter.split_folder(
-            folder_path=folder,
-            embed=True
-        )
-        
+        chunks_per_source: Dict[Optional[str], int] = {}
+
+        def split_files():
+            for f in fs:
+                file_docs = splitter.split_file(f, embed=True)
+                for doc in file_docs:
+                    chunks_per_source[doc.source] = chunks_per_source.get(doc.source, 0) + 1
+                report_progress(files_done=1, chunks=len(file_docs))
+                yield from file_docs
+
         # Add the documents to the index
-        rag.add_documents(documents)
-        
-        return documents
\ No newline at end of file
+        rag.add_documents(split_files())
+        return chunks_per_source
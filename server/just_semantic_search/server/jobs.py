@@ -0,0 +1,356 @@
+import contextvars
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from enum import Enum
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+
+from eliot import log_message, start_task
+from pydantic import BaseModel, Field, computed_field
+
+from just_semantic_search.utils.metrics import METRICS
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_JOB_STATUSES = {JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED}
+
+
+class JobCancelled(BaseException):
+    """
+    Raised inside a job handler by report_progress once the job was cancelled.
+    It derives from BaseException so that the per-file `except Exception` handlers of the indexing code do not swallow it.
+    """
+
+
+class Job(BaseModel):
+    """A background indexing job and its progress"""
+    id: str
+    kind: str
+    params: Dict[str, Any] = Field(default_factory=dict, description="Keyword arguments of the handler, secrets are not stored")
+    status: JobStatus = JobStatus.QUEUED
+    attempts: int = 0
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    files_total: Optional[int] = Field(default=None, description="Number of files to process, once known")
+    files_done: int = 0
+    chunks_embedded: int = 0
+    cancel_requested: bool = False
+    owner: Optional[str] = Field(default=None, description="host:pid of the process running the job")
+    result: Optional[str] = None
+    error: Optional[str] = None
+
+    @computed_field
+    @property
+    def docs_per_second(self) -> Optional[float]:
+        """Embedded chunks per second since the job started"""
+        if self.started_at is None:
+            return None
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return self.chunks_embedded / elapsed if elapsed > 0 else None
+
+
+_COLUMNS = ["id", "kind", "params", "status", "attempts", "created_at", "started_at", "finished_at",
+            "files_total", "files_done", "chunks_embedded", "cancel_requested", "owner", "result", "error"]
+
+
+class JobStore:
+    """SQLite table of jobs, safe to share between threads (and between processes using the same file)"""
+
+    def __init__(self, path: Path | str = os.getenv("INDEXING_JOBS_DB", str(Path.home() / ".cache" / "just_semantic_search" / "jobs.sqlite"))):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=30)
+        self._connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY, kind TEXT NOT NULL, params TEXT NOT NULL, status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, started_at REAL, finished_at REAL,
+                    files_total INTEGER, files_done INTEGER NOT NULL DEFAULT 0, chunks_embedded INTEGER NOT NULL DEFAULT 0,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0, owner TEXT, result TEXT, error TEXT
+                )""")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    @staticmethod
+    def _job(row: sqlite3.Row) -> Job:
+        data = dict(row)
+        data["params"] = json.loads(data["params"])
+        data["cancel_requested"] = bool(data["cancel_requested"])
+        return Job(**data)
+
+    def insert(self, job: Job) -> Job:
+        data = job.model_dump(include=set(_COLUMNS))
+        data["params"] = json.dumps(data["params"], default=str)
+        data["status"] = job.status.value
+        with self._lock:
+            self._connection.execute(f"INSERT INTO jobs ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' for _ in _COLUMNS)})",
+                                     [data[column] for column in _COLUMNS])
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row is not None else None
+
+    def list(self, status: Optional[JobStatus] = None, limit: int = 100) -> List[Job]:
+        with self._lock:
+            if status is None:
+                rows = self._connection.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+            else:
+                rows = self._connection.execute("SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?",
+                                                (JobStatus(status).value, limit)).fetchall()
+        return [self._job(row) for row in rows]
+
+    def update(self, job_id: str, where_status: Optional[JobStatus] = None, **fields: Any) -> bool:
+        """Updates fields of the job, only while its status is where_status if given. Returns whether the job was updated"""
+        if not fields:
+            return False
+        values = [value.value if isinstance(value, Enum) else value for value in fields.values()]
+        query = f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?"
+        values.append(job_id)
+        if where_status is not None:
+            query += " AND status = ?"
+            values.append(JobStatus(where_status).value)
+        with self._lock:
+            return self._connection.execute(query, values).rowcount > 0
+
+    def claim_next(self, kinds: List[str], owner: str) -> Optional[Job]:
+        """Atomically marks the oldest queued job of the given kinds as running and returns it"""
+        if not kinds:
+            return None
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._connection.execute(
+                    f"SELECT id FROM jobs WHERE status = ? AND kind IN ({', '.join('?' for _ in kinds)}) ORDER BY created_at LIMIT 1",
+                    [JobStatus.QUEUED.value] + list(kinds)).fetchone()
+                if row is not None:
+                    self._connection.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, owner = ? WHERE id = ?",
+                        (JobStatus.RUNNING.value, time.time(), owner, row["id"]))
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return self.get(row["id"]) if row is not None else None
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._connection.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+
+def _process_alive(owner: Optional[str]) -> bool:
+    """False if owner (host:pid) is a process of this host that no longer exists"""
+    if not owner or ":" not in owner:
+        return False
+    host, pid = owner.rsplit(":", 1)
+    if host != socket.gethostname():
+        return True  # cannot tell, leave it to its own host
+    try:
+        os.kill(int(pid), 0)
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+class JobContext:
+    """Progress of the job running in the current thread, flushed to the store at most every flush_interval seconds"""
+
+    def __init__(self, store: JobStore, job: Job, flush_interval: float = 1.0):
+        self.store = store
+        self.job = job
+        self.flush_interval = flush_interval
+        self.cancelled = False
+        self._flushed_at = 0.0
+
+    def report(self, files_done: int = 0, chunks: int = 0, files_total: Optional[int] = None) -> None:
+        if files_total is not None:
+            self.job.files_total = files_total
+        self.job.files_done += files_done
+        self.job.chunks_embedded += chunks
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+            self.cancelled = self.cancelled or self.store.cancel_requested(self.job.id)
+        if self.cancelled:
+            raise JobCancelled(self.job.id)
+
+    def flush(self) -> None:
+        self._flushed_at = time.monotonic()
+        self.store.update(self.job.id, files_total=self.job.files_total, files_done=self.job.files_done,
+                          chunks_embedded=self.job.chunks_embedded)
+
+
+_CURRENT_JOB: contextvars.ContextVar[Optional[JobContext]] = contextvars.ContextVar("current_indexing_job", default=None)
+
+
+def report_progress(files_done: int = 0, chunks: int = 0, files_total: Optional[int] = None) -> None:
+    """
+    Reports indexing progress of the current background job, a no-op outside of jobs.
+    files_done and chunks are increments, files_total is absolute. Raises JobCancelled once the job was cancelled.
+    """
+    context = _CURRENT_JOB.get()
+    if context is not None:
+        context.report(files_done=files_done, chunks=chunks, files_total=files_total)
+
+
+JobHandler = Callable[[Dict[str, Any]], Any]
+
+
+class JobQueue:
+    """
+    Persistent queue of indexing jobs executed by a pool of worker threads.
+
+    Handlers are registered per job kind and called with the job params (plus the secrets given at submission,
+    which are kept in memory only). A handler returning a string starting with "Error" (the convention of the
+    Indexing methods) marks the job as failed. Uploaded files are copied to spool_dir and removed once their job succeeded.
+    Jobs left running by a process that died are queued again when a queue on the same host starts.
+    """
+
+    def __init__(self, store: JobStore,
+                 workers: int = int(os.getenv("INDEXING_JOB_WORKERS", 1)),
+                 poll_interval: float = float(os.getenv("INDEXING_JOB_POLL_SECONDS", 2))):
+        self.store = store
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.spool_dir = store.path.parent / "uploads"
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._handlers: Dict[str, JobHandler] = {}
+        self._secrets: Dict[str, Dict[str, Any]] = {}
+        self._running: Dict[str, JobContext] = {}
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads: List[threading.Thread] = []
+        METRICS.register_gauges("indexing_jobs", self.stats)
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    def spool_path(self, job_id: str, filename: str) -> Path:
+        folder = self.spool_dir / job_id
+        folder.mkdir(parents=True, exist_ok=True)
+        return folder / Path(filename).name
+
+    def spool(self, job_id: str, filename: str, source: BinaryIO) -> Path:
+        """Copies an uploaded file to the spool folder of the job and returns its path"""
+        path = self.spool_path(job_id, filename)
+        with open(path, "wb") as target:
+            shutil.copyfileobj(source, target, length=1024 * 1024)
+        return path
+
+    def submit(self, kind: str, params: Dict[str, Any], secrets: Optional[Dict[str, Any]] = None, job_id: Optional[str] = None) -> Job:
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind {kind}")
+        job = self.store.insert(Job(id=job_id or uuid.uuid4().hex, kind=kind, params=params, created_at=time.time()))
+        if secrets:
+            self._secrets[job.id] = secrets
+        METRICS.inc("indexing_jobs_submitted")
+        self._wakeup.set()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        context = self._running.get(job_id)
+        if context is not None:
+            return self.store.get(job_id).model_copy(update={
+                "files_total": context.job.files_total,
+                "files_done": context.job.files_done,
+                "chunks_embedded": context.job.chunks_embedded
+            })
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancels a queued job at once, a running one stops at its next progress report"""
+        job = self.store.get(job_id)
+        if job is None or job.status in FINISHED_JOB_STATUSES:
+            return job
+        if job.status == JobStatus.QUEUED and self.store.update(job_id, where_status=JobStatus.QUEUED,
+                                                                status=JobStatus.CANCELLED, finished_at=time.time()):
+            return self.store.get(job_id)
+        # running, or claimed by a worker since it was read
+        self.store.update(job_id, cancel_requested=1)
+        context = self._running.get(job_id)
+        if context is not None:
+            context.cancelled = True
+        return self.store.get(job_id)
+
+    def retry(self, job_id: str) -> Optional[Job]:
+        """Queues a failed or cancelled job again, its progress is reset"""
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        if job.status not in (JobStatus.FAILED, JobStatus.CANCELLED):
+            raise ValueError(f"Only failed or cancelled jobs can be retried, job {job_id} is {job.status.value}")
+        self.store.update(job_id, status=JobStatus.QUEUED, started_at=None, finished_at=None, files_total=None, files_done=0,
+                          chunks_embedded=0, cancel_requested=0, owner=None, result=None, error=None)
+        self._wakeup.set()
+        return self.store.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"running": len(self._running), "workers": self.workers}
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        for job in self.store.list(JobStatus.RUNNING, limit=1000):
+            if not _process_alive(job.owner):
+                log_message(message_type="indexing_job_requeued", job_id=job.id, owner=job.owner)
+                self.store.update(job.id, where_status=JobStatus.RUNNING, status=JobStatus.QUEUED, owner=None)
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"indexing_job_worker_{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+
+    def _work(self) -> None:
+        while not self._stopped.is_set():
+            job = self.store.claim_next(list(self._handlers), self.owner)
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._run(job)
+
+    def _run(self, job: Job) -> None:
+        context = JobContext(self.store, job)
+        self._running[job.id] = context
+        token = _CURRENT_JOB.set(context)
+        status, result, error = JobStatus.SUCCEEDED, None, None
+        with start_task(action_type="indexing_job", job_id=job.id, kind=job.kind, attempt=job.attempts) as action:
+            try:
+                output = self._handlers[job.kind]({**job.params, **self._secrets.get(job.id, {})})
+                result = output if isinstance(output, str) else json.dumps(output, default=str)
+                if isinstance(output, str) and output.startswith("Error"):
+                    status = JobStatus.FAILED
+            except JobCancelled:
+                status = JobStatus.CANCELLED
+            except Exception as e:
+                status, error = JobStatus.FAILED, f"{type(e).__name__}: {e}"
+            finally:
+                _CURRENT_JOB.reset(token)
+                self._running.pop(job.id, None)
+                context.flush()
+                self.store.update(job.id, status=status, finished_at=time.time(), result=result, error=error)
+                METRICS.inc(f"indexing_jobs_{status.value}")
+            if status == JobStatus.SUCCEEDED:
+                self._secrets.pop(job.id, None)
+                shutil.rmtree(self.spool_dir / job.id, ignore_errors=True)
+            action.add_success_fields(status=status.value, files_done=context.job.files_done, chunks_embedded=context.job.chunks_embedded)
@@ -1,14 +1,17 @@
 from functools import cached_property
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 import os
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
 from just_semantic_search.embeddings import EmbeddingModel
 from just_semantic_search.meili.rag import MeiliRAG
-from just_semantic_search.meili.tools import search_documents, all_indexes
+from just_semantic_search.utils.metrics import METRICS
+from just_semantic_search.meili.tools import search_documents_async, search_documents_batch, search_documents_federated, all_indexes
 from just_semantic_search.server.rag_agent import default_annotation_agent, default_rag_agent
 from just_semantic_search.splitters.splitter_factory import SplitterType
 from pydantic import BaseModel, Field
-from fastapi import Body, UploadFile, Form
+from fastapi import Body, HTTPException, UploadFile, Form
 from just_agents.base_agent import BaseAgent
 from just_agents.web.chat_ui_rest_api import ChatUIAgentRestAPI, ChatUIAgentConfig
 from eliot import start_task
@@ -18,9 +21,11 @@ import uvicorn
 from just_semantic_search.server.agentic_indexing import AgenticIndexing
 from pathlib import Path
 from just_semantic_search.server.utils import load_environment_files
+from just_semantic_search.server.admission import limiter_from_env, run_blocking
+from just_semantic_search.server.jobs import Job, JobQueue, JobStatus, JobStore
 from starlette.middleware import Middleware
 from starlette.middleware.base import BaseHTTPMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import PlainTextResponse, RedirectResponse
 from starlette.requests import Request
 from starlette.responses import Response
 
@@ -77,6 +82,50 @@ class SearchRequest(BaseModel):
     }
    
 
+class SearchBatchRequest(BaseModel):
+    """Request model for running several semantic searches in one call"""
+    queries: List[str] = Field(min_length=1, example=["Glucose predictions models for CGM", "Time series forecasting for glucose"])
+    index: str = Field(example="glucosedao")
+    limit: int = Field(default=10, ge=1, example=30)
+    semantic_ratio: float = Field(default=0.5, ge=0.0, le=1.0, example=0.5)
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "queries": ["Glucose predictions models for CGM", "Time series forecasting for glucose"],
+                    "index": "glucosedao",
+                    "limit": 30,
+                    "semantic_ratio": 0.5
+                }
+            ]
+        }
+    }
+
+
+class SearchFederatedRequest(BaseModel):
+    """Request model for one semantic search across several indexes with merged results"""
+    query: str = Field(example="Glucose predictions models for CGM")
+    indexes: Optional[List[str]] = Field(default=None, example=["glucosedao", "lifespan"], description="Indexes to search, all non-empty indexes if None")
+    weights: Optional[Dict[str, float]] = Field(default=None, example={"glucosedao": 2.0}, description="Optional fusion weight per index, 1.0 by default")
+    limit: int = Field(default=10, ge=1, example=30)
+    semantic_ratio: float = Field(default=0.5, ge=0.0, le=1.0, example=0.5)
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "query": "Glucose predictions models for CGM",
+                    "indexes": ["glucosedao", "lifespan"],
+                    "weights": {"glucosedao": 2.0},
+                    "limit": 30,
+                    "semantic_ratio": 0.5
+                }
+            ]
+        }
+    }
+
+
 class SearchAgentRequest(BaseModel):
     """Request model for RAG-based advanced search"""
     query: str = Field(example="Glucose predictions models for CGM")
@@ -125,6 +174,8 @@ class IndexFolderRequest(BaseModel):
     extensions: Optional[List[str]] = Field(default=None, example=[".md", ".txt"])
     api_key: Optional[str] = Field(default=None, description="API key for securing indexing operations")
     splitter: Optional[SplitterType] = Field(default=SplitterType.ARTICLE, description="Splitter to use for indexing")
+    rebuild: bool = Field(default=False, description="Rebuild the whole index in a shadow index and swap it in when done, searches keep using the old index meanwhile")
+    background: bool = Field(default=False, description="Run the indexing as a background job and return the job (with its id) immediately, follow it with GET /jobs/{job_id}")
     
     model_config = {
         "json_schema_extra": {
@@ -198,10 +249,12 @@ class IndexJsonFilesRequest(BaseModel):
     index_name: str = Field(example="custom_docs")
     content_field: str = Field(example="content", description="Field name in JSON containing the document content (required for splitting)")
     max_seq_length: Optional[int] = Field(default=5000, example=5000, description="Maximum sequence length for chunks")
-    extension: str = Field(default=".json", example=".json", description="File extension to look for")
+    extension: str = Field(default=".json", example=".json", description="File extension to look for, .jsonl and .ndjson files are always included")
     depth: int = Field(default=-1, example=-1, description="Depth of folder traversal (-1 for unlimited)")
     required_fields: Optional[List[str]] = Field(default=None, example=["id", "type"], description="Optional list of field names that must be present in each document")
     api_key: Optional[str] = Field(default=None, description="API key for securing indexing operations")
+    rebuild: bool = Field(default=False, description="Rebuild the whole index in a shadow index and swap it in when done, searches keep using the old index meanwhile")
+    background: bool = Field(default=False, description="Run the indexing as a background job and return the job (with its id) immediately, follow it with GET /jobs/{job_id}")
     
     model_config = {
         "json_schema_extra": {
@@ -288,6 +341,16 @@ class RAGServer(ChatUIAgentRestAPI):
             embedding_model=config.embedding_model
         )
         self._indexes = None
+        self.jobs = JobQueue(JobStore())
+        self._register_job_handlers()
+        self.jobs.start()
+        # Admission control per endpoint group, blocking work runs in dedicated executors instead of the event loop
+        self.search_limiter = limiter_from_env("search", max_concurrent=16, max_queue=128, queue_timeout_seconds=5)
+        self.agent_limiter = limiter_from_env("search_agent", max_concurrent=4, max_queue=16, queue_timeout_seconds=30)
+        self.upload_limiter = limiter_from_env("upload", max_concurrent=2, max_queue=16, queue_timeout_seconds=60)
+        self.search_executor = ThreadPoolExecutor(max_workers=int(os.getenv("RAG_SERVER_SEARCH_WORKERS", 8)), thread_name_prefix="rag_search")
+        self.agent_executor = ThreadPoolExecutor(max_workers=int(os.getenv("RAG_SERVER_AGENT_WORKERS", 4)), thread_name_prefix="rag_agent")
+        self.upload_executor = ThreadPoolExecutor(max_workers=int(os.getenv("RAG_SERVER_UPLOAD_WORKERS", 2)), thread_name_prefix="rag_upload")
         self._configure_rag_routes()
         
         # Add a middleware to handle the root route with highest priority
@@ -349,21 +412,46 @@ class RAGServer(ChatUIAgentRestAPI):
         if "/search" not in route_paths:
             self.post("/search", tags=["Search Operations"], description="Perform semantic search")(self.search)
         
+        if "/search_batch" not in route_paths:
+            self.post("/search_batch", tags=["Search Operations"], description="Perform several semantic searches in one request")(self.search_batch)
+
+        if "/search_federated" not in route_paths:
+            self.post("/search_federated", tags=["Search Operations"], description="Perform one semantic search across several indexes")(self.search_federated)
+
         if "/search_agent" not in route_paths:
             self.post("/search_agent", tags=["Search Operations"], description="Perform advanced RAG-based search")(self.search_agent)
         
+        if "/metrics" not in route_paths:
+            self.get("/metrics", tags=["Monitoring"], description="Counters and latency histograms in the Prometheus text format",
+                     response_class=PlainTextResponse)(self.metrics)
+
+        if "/jobs" not in route_paths:
+            self.get("/jobs", tags=["Jobs"], description="List background indexing jobs, newest first")(self.list_jobs)
+
+        if "/jobs/{job_id}" not in route_paths:
+            self.get("/jobs/{job_id}", tags=["Jobs"], description="Status and progress of a background indexing job")(self.get_job)
+
+        if "/jobs/{job_id}/cancel" not in route_paths:
+            self.post("/jobs/{job_id}/cancel", tags=["Jobs"], description="Cancel a queued or running indexing job")(self.cancel_job)
+
+        if "/jobs/{job_id}/retry" not in route_paths:
+            self.post("/jobs/{job_id}/retry", tags=["Jobs"], description="Queue a failed or cancelled indexing job again")(self.retry_job)
+
         if "/list_indexes" not in route_paths:
             self.post("/list_indexes", tags=["Indexes Operations"], description="Get all indexes")(self.list_indexes)
         
         if "/index_folder" not in route_paths:
             @self.post("/index_folder", tags=["Upload Operations"], description="Index a folder, by default indexes md and txt files")
             def index_folder(request: IndexFolderRequest = Body()):
+                if request.background:
+                    return self._submit_job("index_folder", request.api_key, request.model_dump(mode="json", exclude={"api_key", "background"}))
                 return self.indexing.index_folder(
                     folder=request.folder, 
                     index_name=request.index_name,
                     api_key=request.api_key,
                     extensions=request.extensions,
-                    splitter=request.splitter
+                    splitter=request.splitter,
+                    rebuild=request.rebuild
                 )
         
         if "/upload_markdown_folder" not in route_paths:
@@ -371,13 +459,17 @@ class RAGServer(ChatUIAgentRestAPI):
             async def upload_markdown_folder(
                 uploaded_file: UploadFile, 
                 index_name: str = Form(default=get_default_index(), description="Name of the index to store the documents"), 
-                api_key: Optional[str] = Form(default="", description="API key for authentication (optional)")
+                api_key: Optional[str] = Form(default="", description="API key for authentication (optional)"),
+                background: bool = Form(default=False, description="Run the indexing as a background job and return the job (with its id) immediately")
             ):
-                return self.indexing.index_upload_markdown_folder(
-                    uploaded_file=uploaded_file,
-                    index_name=index_name,
-                    api_key=api_key
-                )
+                if background:
+                    return await self._submit_upload_job("upload_markdown_folder", uploaded_file, api_key, {"index_name": index_name})
+                async with self.upload_limiter.slot():
+                    return await run_blocking(self.upload_executor, self.indexing.index_upload_markdown_folder,
+                        uploaded_file=uploaded_file,
+                        index_name=index_name,
+                        api_key=api_key
+                    )
         
         # Add new routes for PDF and text file upload
         if "/upload_pdf" not in route_paths:
@@ -391,19 +483,25 @@ class RAGServer(ChatUIAgentRestAPI):
                 source: Optional[str] = Form(default="", description="Optional source identifier for the document"),
                 autoannotate: bool = Form(default=True, description="Whether to automatically annotate the document"),
                 mistral_api_key: Optional[str] = Form(default="", description="API key for Mistral OCR service (optional)"),
-                api_key: Optional[str] = Form(default="", description="API key for authentication (optional)")
+                api_key: Optional[str] = Form(default="", description="API key for authentication (optional)"),
+                background: bool = Form(default=False, description="Run the indexing as a background job and return the job (with its id) immediately")
             ):
-                return self.indexing.index_pdf_file(
-                    file=file,
-                    index_name=index_name,
-                    max_seq_length=max_seq_length,
-                    abstract=abstract,
-                    title=title,
-                    source=source,
-                    autoannotate=autoannotate,
-                    mistral_api_key=mistral_api_key,
-                    api_key=api_key
-                )
+                if background:
+                    return await self._submit_upload_job("upload_pdf", file, api_key, dict(
+                        index_name=index_name, max_seq_length=max_seq_length, abstract=abstract, title=title,
+                        source=source, autoannotate=autoannotate), secrets={"mistral_api_key": mistral_api_key} if mistral_api_key else None)
+                async with self.upload_limiter.slot():
+                    return await run_blocking(self.upload_executor, self.indexing.index_pdf_file,
+                        file=file,
+                        index_name=index_name,
+                        max_seq_length=max_seq_length,
+                        abstract=abstract,
+                        title=title,
+                        source=source,
+                        autoannotate=autoannotate,
+                        mistral_api_key=mistral_api_key,
+                        api_key=api_key
+                    )
         
         if "/upload_text" not in route_paths:
             @self.post("/upload_text", tags=["Upload Operations"], description="Upload and index a text file")
@@ -415,18 +513,24 @@ class RAGServer(ChatUIAgentRestAPI):
                 title: Optional[str] = Form(default="", description="Optional title for the document"),
                 source: Optional[str] = Form(default="", description="Optional source identifier for the document"),
                 autoannotate: bool = Form(default=False, description="Whether to automatically annotate the document"),
-                api_key: Optional[str] = Form(default="", description="API key for authentication (optional)")
+                api_key: Optional[str] = Form(default="", description="API key for authentication (optional)"),
+                background: bool = Form(default=False, description="Run the indexing as a background job and return the job (with its id) immediately")
             ):
-                return self.indexing.index_text_file(
-                    file=file,
-                    index_name=index_name,
-                    max_seq_length=max_seq_length,
-                    abstract=abstract,
-                    title=title,
-                    source=source,
-                    autoannotate=autoannotate,
-                    api_key=api_key
-                )
+                if background:
+                    return await self._submit_upload_job("upload_text", file, api_key, dict(
+                        index_name=index_name, max_seq_length=max_seq_length, abstract=abstract, title=title,
+                        source=source, autoannotate=autoannotate))
+                async with self.upload_limiter.slot():
+                    return await run_blocking(self.upload_executor, self.indexing.index_text_file,
+                        file=file,
+                        index_name=index_name,
+                        max_seq_length=max_seq_length,
+                        abstract=abstract,
+                        title=title,
+                        source=source,
+                        autoannotate=autoannotate,
+                        api_key=api_key
+                    )
 
         if "/delete_by_source" not in route_paths:
             @self.post("/delete_by_source", tags=["Delete Operations"], description="Delete documents by their sources")
@@ -448,6 +552,8 @@ class RAGServer(ChatUIAgentRestAPI):
         if "/index_json_files" not in route_paths:
             @self.post("/index_json_files", tags=["Upload Operations"], description="Index JSON files with custom fields")
             def index_json_files(request: IndexJsonFilesRequest):
+                if request.background:
+                    return self._submit_job("index_json_files", request.api_key, request.model_dump(mode="json", exclude={"api_key", "background"}))
                 return self.indexing.index_json_files(
                     folder=request.folder,
                     index_name=request.index_name,
@@ -456,14 +562,17 @@ class RAGServer(ChatUIAgentRestAPI):
                     api_key=request.api_key,
                     extension=request.extension,
                     depth=request.depth,
-                    required_fields=request.required_fields
+                    required_fields=request.required_fields,
+                    rebuild=request.rebuild
                 )
 
     
 
-    def search(self, request: SearchRequest) -> list[str]:
+    async def search(self, request: SearchRequest) -> list[str]:
         """
-        Perform a semantic search.
+        Perform a semantic search on the event loop with MeiliAsyncRAG (result cache, reranking, fusion and hedging included):
+        encoding and reranking run in their own executors and the search goes through the pooled async client.
+        Requests over the search concurrency limit wait in a bounded queue (429 when it is full, 503 after the queue timeout).
         
         Args:
             request: SearchRequest object containing search parameters
@@ -471,33 +580,72 @@ class RAGServer(ChatUIAgentRestAPI):
         Returns:
             List of matching documents with their metadata
         """
-        import time
-        start_time = time.time()
-        
         with start_task(action_type="rag_server_search", 
                        query=request.query, 
                        index=request.index, 
                        limit=request.limit) as action:
-            action.log(f"Search method entered, time since request: {time.time() - start_time:.2f}s")
-            
-            # Log before search_documents call
-            pre_search_time = time.time()
-            action.log(f"About to perform search, time so far: {pre_search_time - start_time:.2f}s")
-            
-            results = search_documents(
-                query=request.query,
-                index=request.index,
-                limit=request.limit,
-                semantic_ratio=request.semantic_ratio
-            )
-            
-            # Log after search_documents call
-            post_search_time = time.time()
-            action.log(f"Search completed in {post_search_time - pre_search_time:.2f}s, total time: {post_search_time - start_time:.2f}s")
-            
+            async with self.search_limiter.slot():
+                with METRICS.timer("server_search"):
+                    results = await search_documents_async(
+                        query=request.query,
+                        index=request.index,
+                        limit=request.limit,
+                        semantic_ratio=request.semantic_ratio
+                    )
+            action.add_success_fields(results_count=len(results))
+            return results
+
+    async def search_batch(self, request: SearchBatchRequest) -> list[list[str]]:
+        """
+        Perform several semantic searches at once, the queries are encoded together and sent in one multi-search request.
+
+        Args:
+            request: SearchBatchRequest object containing the queries and search parameters
+
+        Returns:
+            For each query, in the same order, the list of matching documents with their metadata
+        """
+        with start_task(action_type="rag_server_search_batch",
+                       queries=len(request.queries),
+                       index=request.index,
+                       limit=request.limit) as action:
+            async with self.search_limiter.slot():
+                results = await run_blocking(self.search_executor, search_documents_batch,
+                    queries=request.queries,
+                    index=request.index,
+                    limit=request.limit,
+                    semantic_ratio=request.semantic_ratio
+                )
+            action.add_success_fields(results_counts=[len(r) for r in results])
+            return results
+
+    async def search_federated(self, request: SearchFederatedRequest) -> list[str]:
+        """
+        Perform one semantic search across several indexes, encoding the query once and merging the hits into one ranking.
+
+        Args:
+            request: SearchFederatedRequest object containing the query, indexes and optional per-index weights
+
+        Returns:
+            List of matching documents from all indexes, best first, each mentioning its index
+        """
+        indexes = self.indexes if request.indexes is None else request.indexes
+        with start_task(action_type="rag_server_search_federated",
+                       query=request.query,
+                       indexes=indexes,
+                       limit=request.limit) as action:
+            async with self.search_limiter.slot():
+                results = await run_blocking(self.search_executor, search_documents_federated,
+                    query=request.query,
+                    indexes=indexes,
+                    limit=request.limit,
+                    semantic_ratio=request.semantic_ratio,
+                    weights=request.weights
+                )
+            action.add_success_fields(results_count=len(results))
             return results
 
-    def search_agent(self, request: SearchAgentRequest) -> str:
+    async def search_agent(self, request: SearchAgentRequest) -> str:
         """
         Perform an advanced search using the RAG agent that can provide contextual answers.
         
@@ -519,10 +667,87 @@ class RAGServer(ChatUIAgentRestAPI):
                 query += f"\nADDITIONAL INSTRUCTIONS: {request.additional_instructions}"
             
             action.log(f"[{request_id}] Querying RAG agent")
-            result = self.rag_agent.query(query)
+            async with self.agent_limiter.slot():
+                result = await run_blocking(self.agent_executor, self.rag_agent.query, query)
             action.log(f"[{request_id}] Completed search_agent request")
             return result
     
+    def _register_job_handlers(self) -> None:
+        """Background jobs run the same Indexing methods as the synchronous endpoints"""
+        def with_key(method):
+            # the API key was verified on submission and is not stored with the job
+            return lambda params: method(**params, api_key=os.getenv("INDEXING_API_KEY"))
+
+        def with_upload(method, file_param: str):
+            def handler(params: dict):
+                params = dict(params)
+                path = Path(params.pop("path"))
+                with open(path, "rb") as f:
+                    upload = UploadFile(file=f, filename=params.pop("filename"))
+                    return method(**{file_param: upload}, **params, api_key=os.getenv("INDEXING_API_KEY"))
+            return handler
+
+        self.jobs.register("index_folder", with_key(self.indexing.index_folder))
+        self.jobs.register("index_json_files", with_key(self.indexing.index_json_files))
+        self.jobs.register("upload_markdown_folder", with_upload(self.indexing.index_upload_markdown_folder, "uploaded_file"))
+        self.jobs.register("upload_pdf", with_upload(self.indexing.index_pdf_file, "file"))
+        self.jobs.register("upload_text", with_upload(self.indexing.index_text_file, "file"))
+
+    @staticmethod
+    def _check_indexing_key(api_key: Optional[str]) -> None:
+        env_api_key = os.getenv("INDEXING_API_KEY")
+        if env_api_key and api_key != env_api_key:
+            raise HTTPException(status_code=401, detail="Invalid or missing API key for indexing operations")
+
+    def _submit_job(self, kind: str, api_key: Optional[str], params: dict, secrets: Optional[dict] = None, job_id: Optional[str] = None) -> Job:
+        self._check_indexing_key(api_key)
+        return self.jobs.submit(kind, params, secrets=secrets, job_id=job_id)
+
+    async def _submit_upload_job(self, kind: str, file: UploadFile, api_key: Optional[str], params: dict, secrets: Optional[dict] = None) -> Job:
+        """Copies the upload to the job spool folder (off the event loop) and queues the job"""
+        self._check_indexing_key(api_key)
+        job_id = uuid.uuid4().hex
+        filename = file.filename or "uploaded_file"
+        path = await run_blocking(self.upload_executor, self.jobs.spool, job_id, filename, file.file)
+        return self._submit_job(kind, api_key, {"path": str(path), "filename": filename, **params}, secrets=secrets, job_id=job_id)
+
+    def list_jobs(self, status: Optional[JobStatus] = None, limit: int = 100) -> List[Job]:
+        """Background indexing jobs, optionally only those with the given status"""
+        return self.jobs.store.list(status, limit=limit)
+
+    def get_job(self, job_id: str) -> Job:
+        """Status and live progress of a job: files done out of files total, chunks embedded and docs per second"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+        return job
+
+    def cancel_job(self, job_id: str, api_key: Optional[str] = None) -> Job:
+        """Cancels a queued job at once, a running job stops at its next progress report (chunks indexed so far are kept)"""
+        self._check_indexing_key(api_key)
+        job = self.jobs.cancel(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+        return job
+
+    def retry_job(self, job_id: str, api_key: Optional[str] = None) -> Job:
+        """Queues a failed or cancelled job again with the same parameters"""
+        self._check_indexing_key(api_key)
+        try:
+            job = self.jobs.retry(job_id)
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+        return job
+
+    def metrics(self) -> str:
+        """
+        Hot-path metrics of this process: request counters, encode/search/rerank/serialize/split latency
+        histograms and cache gauges, rendered for a Prometheus scraper.
+        """
+        return METRICS.render_prometheus()
+
     def list_indexes(self, non_empty: bool = True) -> List[str]:
         """
         Get all indexes and update the cache.
@@ -0,0 +1,73 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from just_semantic_search.utils.metrics import METRICS
+
+
+def content_hash(content: str | bytes) -> str:
+    """SHA-256 hex digest of a text or of raw bytes, used as cache key"""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+class ResultCache:
+    """
+    Persistent cache of expensive indexing results (LLM annotations, OCR markdown) in a SQLite table, so that
+    re-indexing the same content never pays for them again. Entries of different producers are kept apart by namespace.
+    Safe to share between threads and between processes using the same file.
+    """
+
+    def __init__(self, namespace: str,
+                 path: Path | str = os.getenv("INDEXING_RESULT_CACHE_DB", str(Path.home() / ".cache" / "just_semantic_search" / "results.sqlite"))):
+        self.namespace = namespace
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )""")
+        METRICS.register_gauges(f"{namespace}_cache", self.stats)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM results WHERE namespace = ? AND key = ?",
+                                           (self.namespace, key)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO results (namespace, key, value, created_at) VALUES (?, ?, ?, ?)",
+                                     (self.namespace, key, value, time.time()))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM results WHERE namespace = ?", (self.namespace,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM results WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None
+        }
@@ -7,7 +7,7 @@ from eliot import start_action
 from just_agents import llm_options
 from just_agents.llm_options import LLAMA3_3
 from just_agents.web.chat_ui_agent import ChatUIAgent
-from just_semantic_search.meili.tools import search_documents, all_indexes
+from just_semantic_search.meili.tools import search_documents, search_documents_batch, search_documents_federated, all_indexes
 from just_semantic_search.meili.utils.services import ensure_meili_is_running
 
 def load_environment_files(env_path=None):
@@ -129,7 +129,7 @@ def default_rag_agent():
     
     return ChatUIAgent(
         llm_options=llm_options.GEMINI_2_5_FLASH,
-        tools=[search_documents, all_indexes],
+        tools=[search_documents, search_documents_batch, search_documents_federated, all_indexes],
         system_prompt=f"""
         You are a helpful assistant that can search for documents in a MeiliSearch database. 
         {call_indexes}
@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Sequence
+
+from eliot import log_message
+
+COPY_CHUNK_BYTES = 1024 * 1024
+# Members larger than this (uncompressed) are skipped
+MAX_MEMBER_BYTES = int(os.getenv("UPLOAD_ZIP_MAX_MEMBER_BYTES", 100 * 1024 * 1024))
+# Extraction stops once this many uncompressed bytes were written, protects against zip bombs
+MAX_TOTAL_BYTES = int(os.getenv("UPLOAD_ZIP_MAX_TOTAL_BYTES", 20 * 1024 * 1024 * 1024))
+
+
+def spool_upload(fileobj: BinaryIO, folder: Path) -> BinaryIO | Path:
+    """
+    A seekable source for zipfile: the upload itself when it is seekable (FastAPI spools large uploads to disk),
+    otherwise a copy written to folder in COPY_CHUNK_BYTES pieces.
+    """
+    if fileobj.seekable():
+        fileobj.seek(0)
+        return fileobj
+    fd, name = tempfile.mkstemp(suffix=".zip", dir=folder)
+    with os.fdopen(fd, "wb") as spooled:
+        shutil.copyfileobj(fileobj, spooled, COPY_CHUNK_BYTES)
+    return Path(name)
+
+
+class ZipMembers:
+    """
+    Extracts the members of a zip archive one at a time, yielding the path of each file as soon as it is written,
+    so that indexing starts with the first member instead of after the whole archive was unpacked.
+
+    Only files with the given extensions are extracted. Members larger than max_member_bytes, members whose path
+    would escape target_dir, corrupt, encrypted or unsupported members, and everything after max_total_bytes is
+    reached are skipped and listed in skipped.
+    """
+
+    def __init__(self, archive: zipfile.ZipFile, target_dir: Path, extensions: Sequence[str] = (".md", ".txt"),
+                 max_member_bytes: int = MAX_MEMBER_BYTES, max_total_bytes: int = MAX_TOTAL_BYTES):
+        self.archive = archive
+        self.target_dir = target_dir.resolve()
+        self.max_member_bytes = max_member_bytes
+        self.max_total_bytes = max_total_bytes
+        suffixes = {extension.lower() for extension in extensions}
+        self.members = [info for info in archive.infolist()
+                        if not info.is_dir() and Path(info.filename).suffix.lower() in suffixes]
+        self.skipped: List[str] = []
+        self.extracted = 0
+        self.bytes_written = 0
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def _skip(self, info: zipfile.ZipInfo, reason: str) -> None:
+        self.skipped.append(info.filename)
+        log_message(message_type="zip_member_skipped", member=info.filename, reason=reason, size=info.file_size)
+
+    def _extract(self, info: zipfile.ZipInfo, target: Path) -> bool:
+        # the declared size may lie, so the limits are enforced on the bytes actually read
+        target.parent.mkdir(parents=True, exist_ok=True)
+        written = 0
+        try:
+            with self.archive.open(info) as source, open(target, "wb") as destination:
+                while chunk := source.read(COPY_CHUNK_BYTES):
+                    written += len(chunk)
+                    if written > self.max_member_bytes or self.bytes_written + written > self.max_total_bytes:
+                        break
+                    destination.write(chunk)
+                else:
+                    self.bytes_written += written
+                    return True
+            reason = "too_large" if written > self.max_member_bytes else "total_limit"
+        except zipfile.BadZipFile:
+            # zipfile stops at the declared size and fails the CRC check of a member whose header understates it
+            reason = "corrupt"
+        except (RuntimeError, NotImplementedError):
+            # encrypted members (RuntimeError) and compression methods zipfile does not support
+            reason = "unsupported"
+        target.unlink(missing_ok=True)
+        self._skip(info, reason)
+        return False
+
+    def __iter__(self) -> Iterator[Path]:
+        for info in self.members:
+            target = (self.target_dir / info.filename).resolve()
+            if not target.is_relative_to(self.target_dir):
+                self._skip(info, "unsafe_path")
+                continue
+            if info.file_size > self.max_member_bytes:
+                self._skip(info, "too_large")
+                continue
+            if self._extract(info, target):
+                self.extracted += 1
+                yield target
@@ -0,0 +1,89 @@
+import hashlib
+import re
+import time
+from pathlib import Path
+from typing import List, Sequence
+
+import numpy as np
+
+from just_semantic_search.reranking import AbstractReranker
+
+
+class WordTokenizer:
+    """Whitespace tokenizer standing in for a Hugging Face tokenizer, one token per word"""
+
+    def tokenize(self, text: str) -> List[str]:
+        return re.findall(r"\S+", text)
+
+    def convert_tokens_to_string(self, tokens: List[str]) -> str:
+        return " ".join(tokens)
+
+
+class StandInSentenceTransformer:
+    """
+    Local replacement of a SentenceTransformer: word tokens and deterministic hash-seeded unit vectors,
+    so that splitters and indexes can be tested without downloading a model. encode_calls counts the encode calls.
+    """
+
+    def __init__(self, dimension: int = 16, max_seq_length: int = 32):
+        self.dimension = dimension
+        self.max_seq_length = max_seq_length
+        self.tokenizer = WordTokenizer()
+        self.encode_calls = 0
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def vector(self, text: str) -> np.ndarray:
+        seed = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+        vector = np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def encode(self, sentences, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        self.encode_calls += 1
+        if isinstance(sentences, str):
+            return self.vector(sentences)
+        return np.stack([self.vector(sentence) for sentence in sentences]) if sentences else np.zeros((0, self.dimension), dtype=np.float32)
+
+
+class StandInReranker(AbstractReranker):
+    """
+    Cross-encoder replacement scoring documents by how often they mention the query words.
+    calls and scored count the model calls and scored documents, latency_seconds is slept per call.
+    """
+    calls: int = 0
+    scored: int = 0
+    latency_seconds: float = 0.0
+
+    def _compute_scores(self, query: str, documents: list[str]) -> list[float]:
+        self.calls += 1
+        self.scored += len(documents)
+        time.sleep(self.latency_seconds)
+        words = query.lower().split()
+        return [float(sum(document.lower().count(word) for word in words)) for document in documents]
+
+
+def write_text_pdf(path: Path, page_texts: Sequence[str]) -> Path:
+    """Writes a PDF with one line of Helvetica text per page, an empty text gives a page without a text layer (like a scan)"""
+    pages = len(page_texts)
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(pages))
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>"]
+    for i, text in enumerate(page_texts):
+        escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        content = f"BT /F1 10 Tf 20 700 Td ({escaped}) Tj ET" if text else ""
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+                       f"/Resources << /Font << /F1 {3 + 2 * pages} 0 R >> >> >>")
+        objects.append(f"<< /Length {len(content)} >>\nstream\n{content}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    data += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(data)
+    return path
@@ -0,0 +1,70 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from just_semantic_search.splitters.structural_splitters import DictionarySplitter
+from tests.core.functions import StandInSentenceTransformer
+
+
+def make_splitter(model: StandInSentenceTransformer, batch_size: int = 32) -> DictionarySplitter:
+    return DictionarySplitter.model_construct(model=model, tokenizer=model.tokenizer, max_seq_length=model.max_seq_length,
+                                              model_name="stand-in", batch_size=batch_size)
+
+
+def record(i: int, words: int = 40) -> dict:
+    return {"title": f"Record {i}", "authors": ["A. Author", "B. Author"], "year": 2020 + i,
+            "content": " ".join(f"word{i}_{j}" for j in range(words))}
+
+
+def test_split_raises_on_missing_content_key():
+    splitter = make_splitter(StandInSentenceTransformer())
+    with pytest.raises(KeyError):
+        splitter.split({"title": "no content"})
+    with pytest.raises(KeyError):
+        list(splitter.split_records([record(0), {"title": "no content"}], embed=False))
+
+
+def test_metadata_overhead_matches_full_header_count():
+    splitter = make_splitter(StandInSentenceTransformer())
+    tokenizer = splitter.tokenizer
+    shapes = [
+        ({"title": "A long title of a paper", "authors": ["X", "Y"], "year": 2021}, "papers/a.json"),
+        ({"title": "Another title", "authors": ["Z"], "year": 1999}, "papers/b.json"),
+        ({"journal": "Nature Aging", "empty": "", "nested": {"skipped": True}}, None),
+        ({}, None),
+    ]
+    for metadata, source in shapes + shapes:  # second pass is served from the per-shape cache
+        header = splitter.compute_metadata_header(metadata, source, 1, 1)
+        assert splitter.metadata_overhead(metadata, source) == len(tokenizer.tokenize(header))
+    assert len(splitter._overhead_cache) == 3
+
+
+def test_split_stream_embeds_records_in_shared_batches():
+    model = StandInSentenceTransformer(max_seq_length=32)
+    splitter = make_splitter(model, batch_size=16)
+    records = [record(i) for i in range(10)]
+    documents = list(splitter.split_records(records, source="records.json"))
+
+    expected = [doc for r in records for doc in splitter.split(r, embed=False, source="records.json")]
+    assert [doc.text for doc in documents] == [doc.text for doc in expected]
+    assert all(len(splitter.tokenizer.tokenize(doc.text)) <= model.max_seq_length for doc in documents)
+    assert all(len(doc.vectors["stand-in"]) == model.dimension for doc in documents)
+    assert documents[0].fragment_num == 1 and documents[0].total_fragments > 1
+    # one encode per batch of 16 chunks (and the 10 split(embed=False) calls above do not encode)
+    assert model.encode_calls == -(-len(documents) // 16)
+
+
+def test_streamed_files_skip_records_without_content(tmp_path: Path):
+    splitter = make_splitter(StandInSentenceTransformer())
+    array_file = tmp_path / "records.json"
+    array_file.write_text(json.dumps([record(0), {"title": "no content"}, record(1)]))
+    lines_file = tmp_path / "records.jsonl"
+    lines_file.write_text("\n".join(json.dumps(r) for r in [record(2), ["not", "a", "dict"], record(3)]))
+
+    from_array = splitter.split_file(array_file, path_as_source=False)
+    assert {doc.metadata["title"] for doc in from_array} == {"Record 0", "Record 1"}
+    assert all(doc.source == "records.json" for doc in from_array)
+
+    from_folder = list(splitter.iter_split_folder(tmp_path, embed=False))
+    assert {doc.metadata["title"] for doc in from_folder} == {"Record 0", "Record 1", "Record 2", "Record 3"}
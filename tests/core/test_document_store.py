@@ -0,0 +1,69 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from just_semantic_search.document import ArticleDocument, Document
+from just_semantic_search.document_store import ParquetDocumentStore
+
+
+def fragments(count: int, article: bool = False) -> list:
+    rng = np.random.default_rng(7)
+    documents = []
+    for i in range(count):
+        fields = dict(text=f"Fragment {i} about glucose", source=f"paper_{i // 3}.md", token_count=5 + i,
+                      fragment_num=i % 3 + 1, total_fragments=3,
+                      metadata={"year": 2020 + i, "tags": ["aging", str(i)]} if i % 2 == 0 else {})
+        document = ArticleDocument(title=f"Paper {i // 3}", abstract="Abstract", **fields) if article else Document(**fields)
+        document = document.with_vector("jinaai/jina-embeddings-v3", rng.standard_normal(8).astype(np.float32))
+        if i % 4 != 3:  # some fragments were not embedded with the second model
+            document = document.with_vector("specter", rng.standard_normal(4).astype(np.float32))
+        documents.append(document)
+    return documents
+
+
+@pytest.mark.parametrize("file_name", ["fragments.parquet", "fragments.arrow"])
+@pytest.mark.parametrize("article", [False, True])
+def test_documents_round_trip(tmp_path: Path, file_name: str, article: bool):
+    documents = fragments(10, article=article)
+    store = ParquetDocumentStore(path=tmp_path / file_name, row_group_size=4)
+    store.write(iter(documents))
+    assert store.format == ("arrow" if file_name.endswith(".arrow") else "parquet")
+    assert len(store) == 10
+    assert store.embedders() == ["jina-embeddings-v3", "specter"], "one vector__<embedder> column per embedder"
+    assert "vector__specter" in store.read_table().column_names
+
+    read = store.read_documents()
+    assert all(type(doc) is type(documents[0]) for doc in read)
+    for original, restored in zip(documents, read):
+        assert restored.hash == original.hash
+        assert restored.model_dump(exclude={"vectors"}) == original.model_dump(exclude={"vectors"})
+        assert restored.vectors.keys() == original.vectors.keys(), "missing vectors stay missing"
+        for embedder, vector in original.vectors.items():
+            assert np.allclose(restored.vectors[embedder], vector)
+    assert read[1].metadata == {} and read[2].metadata == {"year": 2022, "tags": ["aging", "2"]}
+    assert store.read_table(columns=["hash"]).column("hash").to_pylist() == [doc.hash for doc in documents]
+
+    batches = list(store.iter_documents(batch_size=3))
+    assert [len(batch) for batch in batches] == [3, 3, 3, 1]
+    assert [doc.hash for batch in batches for doc in batch] == [doc.hash for doc in documents]
+    assert isinstance(batches[0][0], type(documents[0]))
+
+    matrix = store.vectors("jinaai/jina-embeddings-v3")
+    assert matrix.shape == (10, 8) and matrix.dtype == np.float32
+    assert np.allclose(matrix, [doc.vectors["jina-embeddings-v3"] for doc in documents])
+    specter = store.vectors("specter")
+    assert np.isnan(specter[3]).all() and np.allclose(specter[0], documents[0].vectors["specter"])
+
+
+def test_empty_store_and_inconsistent_chunks(tmp_path: Path):
+    empty = ParquetDocumentStore(path=tmp_path / "empty.parquet")
+    empty.write([])
+    assert len(empty) == 0 and empty.read_documents() == []
+
+    plain, embedded = Document(text="no vectors"), Document(text="embedded").with_vector("specter", [0.1, 0.2])
+    store = ParquetDocumentStore(path=tmp_path / "mixed.arrow", row_group_size=1)
+    with pytest.raises(ValueError):
+        store.write([plain, embedded])
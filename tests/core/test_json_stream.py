@@ -0,0 +1,53 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from just_semantic_search.utils.json_stream import iter_json_lines, iter_json_records, iter_json_values
+
+RECORDS = [
+    {"title": "Brackets ] and braces } inside strings, \"quoted\"", "year": 2021, "score": 0.125},
+    {"title": "Ünïcödé title", "authors": ["A", "B"], "nested": {"list": [1, 2, [3, 4]]}},
+    12345678901234567890,
+    {"title": "last", "empty": {}, "none": None},
+]
+
+
+def write(path: Path, text: str) -> Path:
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("read_size", [1, 7, 64, 1024 * 1024])
+def test_array_elements_are_streamed_across_read_boundaries(tmp_path: Path, read_size: int):
+    path = write(tmp_path / "records.json", json.dumps(RECORDS, indent=2, ensure_ascii=False))
+    assert list(iter_json_values(path, read_size=read_size)) == RECORDS
+    assert list(iter_json_values(write(tmp_path / "empty.json", " [ ] "), read_size=read_size)) == []
+
+
+def test_single_and_concatenated_values(tmp_path: Path):
+    assert list(iter_json_values(write(tmp_path / "one.json", json.dumps(RECORDS[0])))) == [RECORDS[0]]
+    concatenated = write(tmp_path / "many.json", "\n".join(json.dumps(r) for r in RECORDS) + "{\"glued\": true}")
+    assert list(iter_json_values(concatenated, read_size=5)) == RECORDS + [{"glued": True}]
+    assert list(iter_json_values(write(tmp_path / "blank.json", " \n\t"))) == []
+
+
+def test_truncated_and_malformed_input_raise_after_the_valid_records(tmp_path: Path):
+    text = json.dumps(RECORDS)
+    truncated = iter_json_values(write(tmp_path / "truncated.json", text[:text.index("last") - 10]), read_size=16)
+    assert next(truncated) == RECORDS[0] and next(truncated) == RECORDS[1]
+    with pytest.raises(ValueError, match="invalid JSON|unterminated"):
+        list(truncated)
+
+    with pytest.raises(ValueError, match="unterminated JSON array"):
+        list(iter_json_values(write(tmp_path / "open.json", "[{\"a\": 1}")))
+    with pytest.raises(ValueError, match="expected ','"):
+        list(iter_json_values(write(tmp_path / "comma.json", "[{\"a\": 1} {\"b\": 2}]")))
+
+
+def test_json_lines_skip_invalid_lines_on_request(tmp_path: Path):
+    path = write(tmp_path / "records.jsonl", "\n".join([json.dumps(RECORDS[0]), "{broken", "", json.dumps(RECORDS[1])]))
+    with pytest.raises(ValueError, match="records.jsonl:2"):
+        list(iter_json_lines(path))
+    assert list(iter_json_records(path, skip_invalid=True)) == RECORDS[:2]
+    assert list(iter_json_records(write(tmp_path / "records.json", json.dumps(RECORDS)))) == RECORDS
@@ -0,0 +1,30 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from just_semantic_search.utils.metrics import Counter, MetricsRegistry
+
+
+def test_counter_does_not_lose_concurrent_increments():
+    counter = Counter()
+
+    def work(_: int) -> None:
+        for _ in range(10000):
+            counter.inc()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(work, range(8)))
+    assert counter.value == 80000
+
+
+def test_registry_counts_and_renders():
+    metrics = MetricsRegistry(enabled=True, trace_sample_rate=0.0)
+    metrics.inc("search_requests")
+    metrics.inc("search_requests", 2)
+    metrics.observe("encode", 0.003)
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["search_requests"] == 3
+    assert snapshot["histograms"]["encode"]["count"] == 1
+    assert "just_semantic_search_search_requests_total 3" in metrics.render_prometheus()
+
+    disabled = MetricsRegistry(enabled=False)
+    disabled.inc("search_requests")
+    assert disabled.snapshot()["counters"] == {}
@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pypdf")
+
+from just_semantic_search.utils import pdf_text
+from tests.core.functions import write_text_pdf
+
+
+def page_text(number: int, words: int = 60) -> str:
+    return " ".join(f"page{number}word{i}" for i in range(words))
+
+
+def test_needs_ocr_thresholds():
+    assert pdf_text.needs_ocr("")
+    assert pdf_text.needs_ocr("  \n  " + "x" * 10 + "  \n", min_characters=11), "surrounding whitespace does not count"
+    assert not pdf_text.needs_ocr("x" * 10, min_characters=10)
+    assert pdf_text.needs_ocr("x" * (pdf_text.MIN_PAGE_CHARACTERS - 1))
+    assert not pdf_text.needs_ocr(page_text(0))
+
+
+def test_text_layer_marks_scanned_pages(tmp_path: Path):
+    texts = [page_text(0), "", page_text(2), "Figure 3"]
+    pdf_path = write_text_pdf(tmp_path / "mixed.pdf", texts)
+
+    pages = pdf_text.extract_text_layer(pdf_path)
+    assert [page.strip() for page in pages] == texts
+    assert [number for number, text in enumerate(pages) if pdf_text.needs_ocr(text)] == [1, 3]
+
+
+def test_large_documents_are_extracted_in_parallel_in_page_order(tmp_path: Path, monkeypatch):
+    texts = [page_text(i, words=5) if i % 3 else "" for i in range(7)]
+    pdf_path = write_text_pdf(tmp_path / "large.pdf", texts)
+    monkeypatch.setattr(pdf_text, "PARALLEL_MIN_PAGES", 4)
+
+    parallel = pdf_text.extract_text_layer(pdf_path, workers=3)
+    assert [page.strip() for page in parallel] == texts
+    assert pdf_text._POOL is not None, "ranges went to the shared process pool"
+    assert pdf_text.extract_text_layer(pdf_path, workers=1) == parallel
+
+
+def test_write_pages_keeps_only_the_given_pages(tmp_path: Path):
+    pdf_path = write_text_pdf(tmp_path / "source.pdf", [page_text(i) for i in range(4)])
+
+    subset = pdf_text.write_pages(pdf_path, [3, 1], tmp_path / "subset.pdf")
+    assert pdf_text.page_count(subset) == 2
+    assert [page.strip() for page in pdf_text.extract_text_layer(subset)] == [page_text(3), page_text(1)]
@@ -0,0 +1,35 @@
+from just_semantic_search.reranking import passage_windows
+from tests.core.functions import StandInReranker
+
+
+def filler(count: int, prefix: str = "filler") -> str:
+    return " ".join(f"{prefix}{i}" for i in range(count))
+
+
+def test_passage_windows_find_query_terms_deep_in_the_text():
+    assert passage_windows("glucose", "short text about glucose", window_words=16) == ["short text about glucose"]
+
+    text = " ".join([filler(100, "intro"), "continuous glucose monitoring predicts hypoglycemia", filler(100, "outro")])
+    windows = passage_windows("glucose hypoglycemia", text, window_words=16, max_windows=1)
+    assert len(windows) == 1 and "glucose monitoring predicts hypoglycemia" in windows[0]
+    assert len(windows[0].split()) == 16
+
+    two_facts = " ".join([filler(40, "a"), "insulin resistance", filler(80, "b"), "glucose uptake", filler(40, "c")])
+    windows = passage_windows("insulin glucose", two_facts, window_words=16, max_windows=2)
+    assert len(windows) == 2
+    assert "insulin" in windows[0] and "glucose" in windows[1], "windows are returned in text order"
+
+    no_match = passage_windows("metformin", text, window_words=16, max_windows=2)
+    assert no_match == [" ".join(text.split()[:16])], "without query terms the beginning of the text is scored"
+
+
+def test_score_windows_takes_the_best_window_in_one_call():
+    reranker = StandInReranker()
+    deep_fact = " ".join([filler(200), "glucose glucose glucose", filler(200)])
+    shallow = "glucose " + filler(50)
+    scores = reranker.score_windows("glucose", [deep_fact, shallow], window_words=32, max_windows=2)
+    assert scores == [3.0, 1.0]
+    assert reranker.calls == 1, "all windows of all documents are scored together"
+
+    reranker.score_windows("Glucose ", [deep_fact, shallow], window_words=32, max_windows=2)
+    assert reranker.calls == 1, "the normalized query reuses the cached window scores"
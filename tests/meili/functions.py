@@ -13,6 +13,7 @@ import time
 import os
 from just_semantic_search.meili.rag import *
 from just_semantic_search.meili.rag import *
+from just_semantic_search.meili.rag_async import MeiliAsyncRAG
 import time
 
 from eliot._output import *
@@ -21,6 +22,13 @@ from just_semantic_search.meili.utils.services import ensure_meili_is_running
 from tests.config import *
 from just_semantic_search.splitters.splitter_factory import SplitterType, create_splitter
 from rich.pretty import pprint
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from meilisearch_python_sdk.models.search import SearchResults, SearchResultsWithUID
+from httpx2 import Response
+from meilisearch_python_sdk.errors import MeilisearchApiError
+from meilisearch_python_sdk.models.settings import MeilisearchSettings, UserProvidedEmbedder
+from meilisearch_python_sdk.models.task import TaskInfo, TaskResult
 
 
 
@@ -222,3 +230,274 @@ def simulate_meilisearch_disconnection(duration: int = 10):
 
     # Run the disconnection and reconnection in a separate thread
     threading.Thread(target=disconnect_and_reconnect).start()
+
+
+class FaultInjectingMeili:
+    """
+    Local HTTP stub answering Meilisearch search requests with scripted faults, to test the retry policy,
+    circuit breaker and hedged reads without a real server.
+
+    Every request pops the next fault from faults: "ok", an HTTP status such as 503 or 400 (returned with a
+    Meilisearch error body), or ("slow", seconds) which answers normally after a delay. Once faults is empty
+    every request succeeds. requests counts the requests received.
+    """
+
+    def __init__(self, faults: list | None = None):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        import json
+
+        self.faults = list(faults or [])
+        self.requests = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with stub._lock:
+                    stub.requests += 1
+                    fault = stub.faults.pop(0) if stub.faults else "ok"
+                if isinstance(fault, tuple) and fault[0] == "slow":
+                    time.sleep(fault[1])
+                    fault = "ok"
+                if fault == "ok":
+                    status, body = 200, {"hits": [{"hash": "1", "text": "stub"}], "query": "", "offset": 0, "limit": 20,
+                                         "estimatedTotalHits": 1, "processingTimeMs": 1}
+                else:
+                    status, body = int(fault), {"message": "injected fault", "code": "injected", "type": "internal", "link": ""}
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class OfflineMeili:
+    """
+    In-memory stand-in for the Meilisearch Index and Client used by MeiliRAG, no server needed.
+
+    search and multi_search answer with hits (in that order) and are counted. multi_search answers a query
+    with hits_by_index[index_uid] if given, and a query carrying a vector with semantic_hits if given.
+    add_documents records the batches and enqueues one task per batch. get_tasks reports a task as
+    processing once, then as succeeded (or failed for the batch numbers in failing_batches).
+    As a client it serves itself as the only index, get_settings returns settings and update_settings records the updates.
+    """
+
+    def __init__(self, hits: list | None = None, failing_batches: tuple = (),
+                 hits_by_index: dict | None = None, semantic_hits: list | None = None,
+                 settings: MeilisearchSettings | None = None):
+        self.hits = hits or []
+        self.hits_by_index = hits_by_index or {}
+        self.semantic_hits = semantic_hits
+        self.failing_batches = set(failing_batches)
+        self.searches = 0
+        self.multi_searches: list = []
+        self.batches: list = []
+        self.task_status: dict = {}
+        self.settings = settings or MeilisearchSettings()
+        self.settings_updates: list = []
+        self._lock = threading.Lock()
+
+    def get_index(self, name: str):
+        return self
+
+    def create_index(self, name: str, primary_key: str | None = None, settings: MeilisearchSettings | None = None, **kwargs):
+        self.settings = settings or MeilisearchSettings()
+        return self
+
+    def get_settings(self) -> MeilisearchSettings:
+        return self.settings
+
+    def update_settings(self, settings: MeilisearchSettings):
+        self.settings_updates.append(settings)
+        self.settings = self.settings.model_copy(update={name: getattr(settings, name) for name in settings.model_fields_set})
+        return TaskInfo(task_uid=-len(self.settings_updates), index_uid="offline", status="enqueued", task_type="settingsUpdate",
+                        enqueued_at=datetime.now(timezone.utc))
+
+    def search(self, query: str, limit: int = 20, **kwargs):
+        self.searches += 1
+        return SearchResults(hits=[dict(hit) for hit in self.hits[:limit]], query=query or "", limit=limit,
+                             estimated_total_hits=len(self.hits), processing_time_ms=1)
+
+    def multi_search(self, queries: list, **kwargs):
+        self.multi_searches.append(queries)
+        results = []
+        for params in queries:
+            hits = self.hits_by_index.get(params.index_uid, self.hits)
+            if params.vector is not None and self.semantic_hits is not None:
+                hits = self.semantic_hits
+            results.append(SearchResultsWithUID(index_uid=params.index_uid, hits=[dict(hit) for hit in hits[:params.limit]],
+                                                query=params.query or "", limit=params.limit, processing_time_ms=1))
+        return results
+
+    def add_documents(self, documents: list, primary_key: str | None = None, compress: bool = False):
+        with self._lock:
+            uid = len(self.batches)
+            self.batches.append(documents)
+            self.task_status[uid] = "enqueued"
+        return TaskInfo(task_uid=uid, index_uid="offline", status="enqueued", task_type="documentAdditionOrUpdate",
+                        enqueued_at=datetime.now(timezone.utc))
+
+    def get_tasks(self, uids: list | None = None, limit: int = 20, **kwargs):
+        results = []
+        with self._lock:
+            for uid in uids or []:
+                status = self.task_status[uid]
+                error = {"message": "invalid document", "code": "invalid_document_fields"} if status == "failed" else None
+                results.append(TaskResult(uid=uid, status=status, task_type="documentAdditionOrUpdate",
+                                          enqueued_at=datetime.now(timezone.utc), error=error))
+                if status in ("enqueued", "processing"):
+                    self.task_status[uid] = "failed" if uid in self.failing_batches else "succeeded"
+        return SimpleNamespace(results=results)
+
+    def get_raw_index(self, name: str):
+        return SimpleNamespace(updated_at="2025-01-01T00:00:00Z")
+
+
+class OfflineRAG(MeiliRAG):
+    """MeiliRAG that resolves its model but does not connect to Meilisearch, set index and client to an OfflineMeili"""
+
+    def model_post_init(self, __context) -> None:
+        self.model_name = self.model.value.split("/")[-1]
+
+
+def offline_rag(meili: OfflineMeili, index_name: str, **kwargs) -> OfflineRAG:
+    rag = OfflineRAG(index_name=index_name, **kwargs)
+    rag.index, rag.client = meili, meili
+    return rag
+
+
+class AsyncOfflineMeili:
+    """Async facade of an OfflineMeili, serving as the pooled AsyncClient and the AsyncIndex of an OfflineAsyncRAG"""
+
+    def __init__(self, meili: OfflineMeili):
+        self.meili = meili
+
+    def index(self, name: str) -> "AsyncOfflineMeili":
+        return self
+
+    def __getattr__(self, name: str):
+        method = getattr(self.meili, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+
+class OfflineAsyncRAG(MeiliAsyncRAG):
+    """MeiliAsyncRAG whose index is ready and whose sync and async clients are an OfflineMeili"""
+
+    @property
+    def client_async_pooled(self) -> AsyncOfflineMeili:
+        return AsyncOfflineMeili(self.client)
+
+
+def offline_async_rag(meili: OfflineMeili, index_name: str, **kwargs) -> OfflineAsyncRAG:
+    rag = OfflineAsyncRAG(index_name=index_name, **kwargs)
+    rag.client, rag._index_ready = meili, True
+    return rag
+
+
+class OfflineMeiliIndex:
+    """One index of an OfflineMeiliServer: documents by primary key, settings and stats"""
+
+    def __init__(self, server: "OfflineMeiliServer", uid: str, primary_key: str | None = None,
+                 settings: MeilisearchSettings | None = None):
+        self.server = server
+        self.uid = uid
+        self.primary_key = primary_key or "hash"
+        self.documents: dict = {}
+        self.settings = settings or MeilisearchSettings()
+
+    def add_documents(self, documents: list, primary_key: str | None = None, compress: bool = False) -> TaskInfo:
+        with self.server._lock:
+            batch = self.server.batches
+            self.server.batches += 1
+            if batch in self.server.failing_batches:
+                return self.server._task(self.uid, "documentAdditionOrUpdate", error="invalid document")
+            self.documents.update({document[self.primary_key]: document for document in documents})
+            return self.server._task(self.uid, "documentAdditionOrUpdate")
+
+    def get_stats(self):
+        return SimpleNamespace(number_of_documents=len(self.documents))
+
+    def get_settings(self) -> MeilisearchSettings:
+        return self.settings
+
+    def update_settings(self, settings: MeilisearchSettings) -> TaskInfo:
+        self.settings = self.settings.model_copy(update={name: getattr(settings, name) for name in settings.model_fields_set})
+        return self.server._task(self.uid, "settingsUpdate")
+
+
+class OfflineMeiliServer:
+    """
+    In-memory stand-in for a Meilisearch Client with several indexes, no server needed. Every request is
+    finished at once and recorded in tasks (oldest first, the history outlives deleted indexes like in Meilisearch).
+    Document batches whose number (counted over the server) is in failing_batches fail and store nothing.
+    """
+
+    def __init__(self, failing_batches: tuple = ()):
+        self.indexes: dict = {}
+        self.tasks: list = []
+        self.failing_batches = set(failing_batches)
+        self.batches = 0
+        self._lock = threading.RLock()
+
+    def _task(self, index_uid: str | None, task_type: str, error: str | None = None) -> TaskInfo:
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            uid = len(self.tasks)
+            self.tasks.append(TaskResult(uid=uid, index_uid=index_uid, status="failed" if error else "succeeded", task_type=task_type,
+                                         enqueued_at=now, finished_at=now,
+                                         error={"message": error, "code": "invalid_document_fields"} if error else None))
+        return TaskInfo(task_uid=uid, index_uid=index_uid, status="enqueued", task_type=task_type, enqueued_at=now)
+
+    def get_index(self, uid: str) -> OfflineMeiliIndex:
+        if uid not in self.indexes:
+            raise MeilisearchApiError(f"Index `{uid}` not found", Response(404, json={"message": f"Index `{uid}` not found",
+                                                                                     "code": "index_not_found"}))
+        return self.indexes[uid]
+
+    def create_index(self, uid: str, primary_key: str | None = None, settings: MeilisearchSettings | None = None,
+                     wait: bool = False, **kwargs) -> OfflineMeiliIndex:
+        self.indexes[uid] = OfflineMeiliIndex(self, uid, primary_key, settings)
+        self._task(uid, "indexCreation")
+        return self.indexes[uid]
+
+    def delete_index_if_exists(self, uid: str) -> bool:
+        if self.indexes.pop(uid, None) is None:
+            return False
+        self._task(uid, "indexDeletion")
+        return True
+
+    def swap_indexes(self, pairs: list) -> TaskInfo:
+        for first, second in pairs:
+            self.indexes[first], self.indexes[second] = self.indexes[second], self.indexes[first]
+            self.indexes[first].uid, self.indexes[second].uid = first, second
+        return self._task(None, "indexSwap")
+
+    def wait_for_task(self, task_uid: int, timeout_in_ms: int | None = None, raise_for_status: bool = False) -> TaskResult:
+        return self.tasks[task_uid]
+
+    def get_tasks(self, index_ids: list | None = None, statuses: list | None = None, uids: list | None = None,
+                  limit: int = 20, **kwargs):
+        tasks = [task for task in reversed(self.tasks)
+                 if (index_ids is None or task.index_uid in index_ids)
+                 and (statuses is None or task.status in statuses)
+                 and (uids is None or task.uid in uids)]
+        return SimpleNamespace(results=tasks[:limit])
+
+    def get_all_stats(self):
+        return SimpleNamespace(indexes={uid: index.get_stats() for uid, index in self.indexes.items()})
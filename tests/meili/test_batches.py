@@ -0,0 +1,78 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from meilisearch_python_sdk.errors import MeilisearchTaskFailedError, MeilisearchTimeoutError
+
+from just_semantic_search.meili.utils.batches import DocumentsTasks, batch_by_size
+from tests.core.functions import StandInSentenceTransformer
+from tests.meili.functions import OfflineMeili, offline_rag
+
+
+def document(i: int, words: int = 20) -> dict:
+    return {"hash": f"h{i}", "text": " ".join(f"word{j}" for j in range(words)), "source": f"paper_{i}.md"}
+
+
+def test_batch_by_size_caps_payload_and_documents():
+    documents = [document(i) for i in range(40)] + [document(40, words=2000)] + [document(i) for i in range(41, 45)]
+    documents[3]["text"] = "Glukose-Stoffwechsel und Alterung, Ünterschiede zwischen Geweben"
+    batches = list(batch_by_size(documents, max_bytes=2000, max_documents=8))
+
+    assert [doc for batch, _ in batches for doc in batch] == documents, "order and content are preserved"
+    for batch, size in batches:
+        payload = len(json.dumps(batch).encode("utf-8"))  # as the Meilisearch client sends it
+        assert size >= payload, "the estimate never undercounts the JSON payload"
+        assert len(batch) <= 8
+        assert size <= 2000 or len(batch) == 1
+    oversized = [batch for batch, size in batches if size > 2000]
+    assert oversized == [[documents[40]]], "a document above max_bytes is sent alone"
+    assert list(batch_by_size([])) == []
+
+
+def test_add_documents_reports_tasks_in_order():
+    meili = OfflineMeili(failing_batches=(2,))
+    rag = offline_rag(meili, "batches-add")
+    documents = [document(i) for i in range(50)]
+
+    tasks = rag.add_documents(documents, max_batch_documents=8, max_in_flight=3)
+    assert tasks.status == "enqueued"
+    assert tasks.documents_count == 50 and len(meili.batches) == 7
+    assert tasks.task_uids == list(range(7))
+    assert [doc["hash"] for batch in meili.batches for doc in batch] == [doc["hash"] for doc in documents]
+    assert tasks.bytes_sent > 0
+
+    tasks.wait(interval_in_ms=1)
+    assert tasks.status == "failed"
+    assert [failure["task_uid"] for failure in tasks.failures] == [2]
+    assert tasks.documents_per_second > 0
+    with pytest.raises(MeilisearchTaskFailedError):
+        DocumentsTasks(client=meili, index_name="batches-add", task_infos=tasks.task_infos).wait(interval_in_ms=1, raise_for_status=True)
+
+
+def test_wait_times_out_on_unfinished_tasks():
+    meili = OfflineMeili()
+    task_infos = [meili.add_documents([document(0)])]
+    never_finishes = SimpleNamespace(get_tasks=lambda uids, limit: SimpleNamespace(results=[]))
+    with pytest.raises(MeilisearchTimeoutError):
+        DocumentsTasks(client=never_finishes, index_name="batches-timeout", task_infos=task_infos).wait(timeout_in_ms=20, interval_in_ms=5)
+
+
+def test_search_many_encodes_once_and_sends_one_request():
+    meili = OfflineMeili(hits=[document(i) for i in range(5)])
+    rag = offline_rag(meili, "batches-search-many")
+    rag.st_model = model = StandInSentenceTransformer()
+    queries = ["glucose", "insulin resistance", "glucose"]
+
+    results = rag.search_many(queries, semanticRatio=0.5, limit=3)
+    assert len(results) == 3 and all(len(result.hits) == 3 for result in results)
+    assert model.encode_calls == 1, "all queries are encoded in one batch"
+    assert len(meili.multi_searches) == 1
+    params = meili.multi_searches[0]
+    assert [p.query for p in params] == queries
+    assert params[0].vector == params[2].vector == model.vector("glucose").tolist()
+    assert params[0].hybrid.semantic_ratio == 0.5
+
+    keyword = rag.search_many(queries, semanticRatio=0.0, limit=3)
+    assert len(keyword) == 3 and model.encode_calls == 1, "keyword-only searches skip encoding"
+    assert all(p.vector is None and p.hybrid is None for p in meili.multi_searches[1])
+    assert rag.search_many([]) == []
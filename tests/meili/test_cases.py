@@ -3,14 +3,18 @@ from just_semantic_search.reranking import CrossEncoderReranker, RemoteJinaReran
 import pytest
 import random
 import concurrent.futures
-from just_semantic_search.splitters.splitter_factory import SplitterType
+from just_semantic_search.splitters.splitter_factory import SplitterType, create_splitter
 from just_semantic_search.meili.rag import MeiliRAG, SearchResults
 from just_semantic_search.meili.utils.services import ensure_meili_is_running
 from eliot import start_action
 from tests.config import *
 from just_semantic_search.embeddings import EmbeddingModel, load_sentence_transformer_from_enum
 from pycomfort.logging import to_nice_stdout
-from tests.meili.functions import index_file, simulate_meilisearch_disconnection
+from tests.meili.functions import FaultInjectingMeili, index_file, simulate_meilisearch_disconnection
+from just_semantic_search.meili.utils.retry import CircuitBreaker, CircuitOpenError, RetryBudget, RetryPolicy, hedged_call
+from meilisearch_python_sdk import Client
+from meilisearch_python_sdk.errors import MeilisearchApiError
+import time
 
 to_nice_stdout()
 
@@ -391,4 +395,222 @@ def test_reranking():
         # Skip remote tests if API is not available or there's an error
         import pytest
         pytest.skip(f"Skipping remote reranker tests due to error: {str(e)}")
-    
\ No newline at end of file
+    
+
+RERANK_QUERY = "Organic skincare products for sensitive skin"
+RERANK_SENTENCES = [
+    "Organic skincare for sensitive skin with aloe vera and chamomile.",
+    "New makeup trends focus on bold colors and innovative techniques",
+    "Bio-Hautpflege für empfindliche Haut mit Aloe Vera und Kamille",
+    "Neue Make-up-Trends setzen auf kräftige Farben und innovative Techniken",
+    "Cuidado de la piel orgánico para piel sensible con aloe vera y manzanilla",
+    "Las nuevas tendencias de maquillaje se centran en colores vivos y técnicas innovadoras",
+    "Continuous glucose monitors report interstitial glucose every five minutes.",
+    "Caloric restriction extends lifespan in many model organisms.",
+]
+
+
+def rerank_candidates(count: int, sentences_per_candidate: int = 60, seed: int = 42) -> list[str]:
+    """Chunk-sized candidates (around the 1024 token reranker limit) mixing relevant and irrelevant sentences in different proportions"""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(RERANK_SENTENCES) for _ in range(sentences_per_candidate)) for _ in range(count)]
+
+
+@pytest.mark.parametrize("quantization", ["fp32", "int8"])
+def test_onnx_reranker_parity(quantization: str):
+    """ONNX Runtime scores must rank candidates like the PyTorch CrossEncoder (Spearman >= 0.98)."""
+    pytest.importorskip("onnxruntime")
+    from scipy.stats import spearmanr
+    from just_semantic_search.onnx_reranking import OnnxCrossEncoderReranker
+
+    torch_reranker = load_reranker(RerankingModel.JINA_RERANKER_V2_BASE_MULTILINGUAL)
+    onnx_reranker = OnnxCrossEncoderReranker(model_name=RerankingModel.JINA_RERANKER_V2_BASE_MULTILINGUAL.value, quantization=quantization)
+    documents = [*RERANK_SENTENCES, *rerank_candidates(40, sentences_per_candidate=8)]
+
+    torch_scores = torch_reranker.score(RERANK_QUERY, documents)
+    onnx_scores = onnx_reranker.score(RERANK_QUERY, documents)
+    correlation = spearmanr(torch_scores, onnx_scores).correlation
+    assert correlation >= 0.98, f"Spearman correlation {correlation:.4f} between torch and onnx {quantization} scores is too low"
+
+
+@pytest.mark.parametrize("candidates", [50, 100])
+def test_onnx_reranker_latency(candidates: int):
+    """Latency benchmark of torch vs ONNX fp32/int8 reranking of chunk-sized candidates, results are logged."""
+    pytest.importorskip("onnxruntime")
+    import time
+    from just_semantic_search.onnx_reranking import OnnxCrossEncoderReranker
+
+    documents = rerank_candidates(candidates)
+    rerankers = {
+        "torch": load_reranker(RerankingModel.JINA_RERANKER_V2_BASE_MULTILINGUAL),
+        "onnx_fp32": OnnxCrossEncoderReranker(model_name=RerankingModel.JINA_RERANKER_V2_BASE_MULTILINGUAL.value, quantization="fp32"),
+        "onnx_int8": OnnxCrossEncoderReranker(model_name=RerankingModel.JINA_RERANKER_V2_BASE_MULTILINGUAL.value, quantization="int8"),
+    }
+    with start_action(action_type="test_onnx_reranker_latency", candidates=candidates) as action:
+        latencies = {}
+        for name, reranker in rerankers.items():
+            reranker.cache.max_size = 0  # measure the model, not the score cache
+            reranker.score(RERANK_QUERY, documents[:2])  # warm up
+            start = time.perf_counter()
+            scores = reranker.score(RERANK_QUERY, documents)
+            latencies[name] = time.perf_counter() - start
+            assert len(scores) == candidates
+        action.add_success_fields(latencies_seconds=latencies)
+        print(f"Reranking {candidates} candidates: " + ", ".join(f"{name}={seconds:.2f}s" for name, seconds in latencies.items()))
+
+
+def test_ivfpq_recall_latency(model: EmbeddingModel):
+    """Recall@10 and latency of the IVF-PQ index against exact search on chunk embeddings of the test papers, results are logged."""
+    import time
+    import numpy as np
+    from just_semantic_search.meili.ann import IVFPQIndex
+
+    splitter = create_splitter(SplitterType.TEXT, load_sentence_transformer_from_enum(model))
+    documents = splitter.split_folder(tacutopapers_dir)
+    model_name = model.value.split("/")[-1]
+    vectors = np.asarray([doc.vectors[model_name] for doc in documents], dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    rng = np.random.default_rng(42)
+    held_out = rng.permutation(len(vectors))
+    queries, corpus = vectors[held_out[:100]], vectors[held_out[100:]]  # held-out chunks act as queries
+
+    index = IVFPQIndex(corpus.shape[1]).train(corpus)
+    index.add(range(len(corpus)), corpus)
+    exact = [set(np.argsort(-(corpus @ query))[:10].tolist()) for query in queries]
+    with start_action(action_type="test_ivfpq_recall_latency", corpus=len(corpus), n_lists=index.n_lists, m=index.m) as action:
+        results = {}
+        for nprobe in (1, 4, 16, 64):
+            for refine_factor in (0, 4):
+                start = time.perf_counter()
+                found = [index.search(query, 10, nprobe=nprobe, vectors=corpus if refine_factor else None, refine_factor=refine_factor)[0] for query in queries]
+                latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+                recall = float(np.mean([len(expected & set(ids.tolist())) / 10 for expected, ids in zip(exact, found)]))
+                results[f"nprobe={nprobe},refine={refine_factor}"] = {"recall@10": recall, "latency_ms": latency_ms}
+                print(f"nprobe={nprobe} refine_factor={refine_factor}: recall@10={recall:.3f} latency={latency_ms:.2f}ms")
+        action.add_success_fields(results=results)
+    assert results["nprobe=64,refine=4"]["recall@10"] >= 0.9
+
+
+def test_client_side_fusion_latency(rag: MeiliRAG):
+    """Latency of server-side hybrid search vs client-side RRF/score fusion of separate keyword and vector searches, results are logged."""
+    import time
+    from just_semantic_search.meili.utils.fusion import FusionMethod
+
+    queries = ["rs123456 longevity association", "caloric restriction lifespan", "glucose metabolism genes", "FOXO3 variants in centenarians"]
+    vectors = rag.encode_queries(queries)
+    with start_action(action_type="test_client_side_fusion_latency", index_name=rag.index_name) as action:
+        latencies = {}
+        for fusion in (FusionMethod.MEILI, FusionMethod.RRF, FusionMethod.SCORE):
+            rag.search(queries[0], vector=vectors[0], limit=10, fusion=fusion, rerank=False, use_cache=False)  # warm up
+            start = time.perf_counter()
+            for query, vector in zip(queries, vectors):
+                results = rag.search(query, vector=vector, limit=10, fusion=fusion, rerank=False, use_cache=False)
+                assert len(results.hits) > 0
+                hashes = [hit["hash"] for hit in results.hits]
+                assert len(hashes) == len(set(hashes))
+            latencies[fusion.value] = (time.perf_counter() - start) * 1000 / len(queries)
+        action.add_success_fields(latencies_ms=latencies)
+        print("Hybrid search latency: " + ", ".join(f"{name}={ms:.1f}ms" for name, ms in latencies.items()))
+
+
+def test_retry_policy_against_fault_injecting_stub():
+    """Transient errors are retried within the budget, client errors fail at once, the breaker fails fast once open."""
+    policy = RetryPolicy(attempts=3, min_wait=0.01, max_wait=0.05, budget=RetryBudget(ratio=0.0, max_tokens=2))
+
+    stub = FaultInjectingMeili([503, 503])
+    try:
+        index = Client(stub.url, "key").index("stub")
+        results = policy.call(index.search, "query", breaker=CircuitBreaker(stub.url))
+        assert len(results.hits) == 1 and stub.requests == 3
+
+        # the budget (2 tokens, no deposits) is spent: the next transient error is not retried
+        stub.faults = [503]
+        with pytest.raises(MeilisearchApiError):
+            policy.call(index.search, "query")
+        assert stub.requests == 4
+    finally:
+        stub.close()
+
+    stub = FaultInjectingMeili([400])
+    try:
+        index = Client(stub.url, "key").index("stub")
+        with pytest.raises(MeilisearchApiError):
+            RetryPolicy(attempts=3, min_wait=0.01).call(index.search, "query")
+        assert stub.requests == 1, "client errors must not be retried"
+    finally:
+        stub.close()
+
+    stub = FaultInjectingMeili([500] * 4)
+    try:
+        index = Client(stub.url, "key").index("stub")
+        breaker = CircuitBreaker(stub.url, failure_threshold=2, reset_timeout_seconds=0.3)
+        policy = RetryPolicy(attempts=1)
+        for _ in range(2):
+            with pytest.raises(MeilisearchApiError):
+                policy.call(index.search, "query", breaker=breaker)
+        with pytest.raises(CircuitOpenError):
+            policy.call(index.search, "query", breaker=breaker)
+        assert stub.requests == 2 and breaker.state == "open"
+
+        time.sleep(0.35)
+        stub.faults = []
+        policy.call(index.search, "query", breaker=breaker)  # half-open probe succeeds
+        assert breaker.state == "closed" and stub.requests == 3
+    finally:
+        stub.close()
+
+
+class Cancelled(BaseException):
+    """Stands in for JobCancelled/KeyboardInterrupt: a BaseException that records no outcome on the breaker"""
+
+
+def test_cancelled_half_open_probe_releases_the_breaker():
+    """A probe interrupted by a BaseException must not leave the circuit open forever."""
+    import asyncio
+
+    def down():
+        raise ConnectionError("down")
+
+    def cancelled():
+        raise Cancelled()
+
+    breaker = CircuitBreaker("probe", failure_threshold=1, reset_timeout_seconds=0.05)
+    policy = RetryPolicy(attempts=1)
+    with pytest.raises(ConnectionError):
+        policy.call(down, breaker=breaker)
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    with pytest.raises(Cancelled):
+        policy.call(cancelled, breaker=breaker)
+    assert policy.call(lambda: "answered", breaker=breaker) == "answered"  # the next call may probe again
+    assert breaker.state == "closed"
+
+    with pytest.raises(ConnectionError):
+        policy.call(down, breaker=breaker)
+    time.sleep(0.06)
+
+    async def probe_cancelled_by_timeout():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(policy.call_async(asyncio.sleep, 1, breaker=breaker), timeout=0.01)
+
+        async def answer():
+            return "answered"
+        return await policy.call_async(answer, breaker=breaker)
+
+    assert asyncio.run(probe_cancelled_by_timeout()) == "answered"
+    assert breaker.state == "closed"
+
+
+def test_hedged_search_cuts_tail_latency():
+    """A search stuck on a slow replica is answered by the hedged duplicate request."""
+    stub = FaultInjectingMeili([("slow", 2.0)])
+    try:
+        index = Client(stub.url, "key").index("stub")
+        start = time.perf_counter()
+        results = hedged_call(lambda: index.search("query"), hedge_after_seconds=0.1)
+        elapsed = time.perf_counter() - start
+        print(f"hedged search answered in {elapsed * 1000:.0f} ms with {stub.requests} requests")
+        assert len(results.hits) == 1 and stub.requests == 2
+        assert elapsed < 1.0
+    finally:
+        stub.close()
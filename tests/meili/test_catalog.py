@@ -0,0 +1,99 @@
+import threading
+import time
+
+import just_semantic_search.meili.utils.catalog as catalog_module
+from just_semantic_search.meili.utils.catalog import IndexCatalog, get_catalog, invalidate_catalog
+from tests.meili.functions import OfflineMeiliServer
+
+
+class GatedMeiliServer(OfflineMeiliServer):
+    """OfflineMeiliServer counting get_all_stats calls, which wait for gate and raise while failing is set"""
+
+    def __init__(self):
+        super().__init__()
+        self.stats_calls = 0
+        self.gate = threading.Event()
+        self.gate.set()
+        self.failing = False
+
+    def get_all_stats(self):
+        self.stats_calls += 1
+        assert self.gate.wait(5)
+        if self.failing:
+            raise ConnectionError("meilisearch is down")
+        return super().get_all_stats()
+
+
+def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def add(server: OfflineMeiliServer, uid: str, count: int) -> None:
+    if uid not in server.indexes:
+        server.create_index(uid)
+    start = len(server.indexes[uid].documents)
+    server.indexes[uid].add_documents([{"hash": f"{uid}{i}"} for i in range(start, start + count)])
+
+
+def test_stale_stats_are_served_while_one_background_refresh_runs():
+    server = GatedMeiliServer()
+    add(server, "papers", 2)
+    add(server, "papers__building", 5)
+    catalog = IndexCatalog(server, ttl_seconds=0.05)
+    assert catalog.documents() == {"papers": 2}, "rebuild shadows are hidden"
+    add(server, "papers", 1)
+    assert catalog.documents() == {"papers": 2} and server.stats_calls == 1, "fresh stats are reused"
+
+    time.sleep(0.1)
+    server.gate.clear()
+    assert [catalog.documents() for _ in range(5)] == [{"papers": 2}] * 5, "callers do not wait for the refresh"
+    wait_for(lambda: server.stats_calls == 2)
+    server.gate.set()
+    wait_for(lambda: not catalog._refreshing)
+    assert server.stats_calls == 2, "one refresh at a time"
+    assert catalog.non_empty_indexes() == ["papers"] and catalog.documents() == {"papers": 3}
+
+
+def test_failed_background_refresh_is_retried_at_the_next_expiry():
+    server = GatedMeiliServer()
+    add(server, "papers", 1)
+    catalog = IndexCatalog(server, ttl_seconds=0.05)
+    catalog.documents()
+    server.failing = True
+    time.sleep(0.1)
+    assert catalog.documents() == {"papers": 1}
+    wait_for(lambda: not catalog._refreshing)
+    server.failing = False
+    add(server, "notes", 0)
+    catalog.documents()
+    wait_for(lambda: server.stats_calls == 3 and not catalog._refreshing)
+    assert catalog.all_indexes() == ["papers", "notes"] and catalog.non_empty_indexes() == ["papers"]
+
+
+def test_invalidated_catalog_fetches_at_once_and_drops_older_stats(monkeypatch):
+    server = GatedMeiliServer()
+    monkeypatch.setattr(catalog_module, "_CATALOGS", {})
+    monkeypatch.setattr(catalog_module, "get_client", lambda base_url, api_key=None: server)
+    catalog = get_catalog("http://offline:7700", "key")
+    assert get_catalog("http://offline:7700", "key") is catalog
+    add(server, "papers", 1)
+    assert catalog.documents() == {"papers": 1}
+
+    add(server, "papers", 2)
+    invalidate_catalog("http://offline:7700")
+    assert catalog.documents() == {"papers": 3} and server.stats_calls == 2, "a local write is visible at once"
+
+    # stats fetched while an invalidation happens are returned to their caller but not cached
+    server.gate.clear()
+    refreshed = []
+    refresh = threading.Thread(target=lambda: refreshed.append(catalog.refresh()))
+    refresh.start()
+    wait_for(lambda: server.stats_calls == 3)
+    invalidate_catalog("http://offline:7700")
+    server.gate.set()
+    refresh.join()
+    assert refreshed == [{"papers": 3}]
+    assert catalog.documents() == {"papers": 3} and server.stats_calls == 4, "the next lookup fetches again"
@@ -0,0 +1,72 @@
+import pytest
+
+from just_semantic_search.meili.utils.fusion import DEFAULT_RRF_K, FusionMethod, fuse_hits
+from tests.core.functions import StandInSentenceTransformer
+from tests.meili.functions import OfflineMeili, offline_rag
+
+
+def hits(*keys: str, scores: list | None = None) -> list:
+    scores = scores or [1.0 - 0.1 * i for i in range(len(keys))]
+    return [{"hash": key, "text": f"text of {key}", "_rankingScore": score} for key, score in zip(keys, scores)]
+
+
+def test_rrf_sums_reciprocal_ranks_and_merges_duplicates():
+    papers, reviews = hits("a", "b", "c"), hits("c", "d")
+    fused = fuse_hits({"papers": papers, "reviews": reviews}, method=FusionMethod.RRF)
+
+    assert [hit["hash"] for hit in fused] == ["c", "a", "b", "d"]
+    by_key = {hit["hash"]: hit for hit in fused}
+    assert by_key["c"]["_fusionScore"] == pytest.approx(1 / (DEFAULT_RRF_K + 3) + 1 / (DEFAULT_RRF_K + 1))
+    assert by_key["a"]["_fusionScore"] == pytest.approx(1 / (DEFAULT_RRF_K + 1))
+    assert by_key["c"]["_indexUid"] == "reviews", "attributed to the index of its best contribution"
+    assert by_key["a"]["_indexUid"] == "papers"
+    assert "_fusionScore" not in papers[0] and "_indexUid" not in papers[0], "input hits are not modified"
+
+    weighted = fuse_hits({"papers": papers, "reviews": reviews}, method=FusionMethod.RRF, weights={"reviews": 0.0}, limit=2)
+    assert [hit["hash"] for hit in weighted] == ["a", "b"]
+    assert len(fuse_hits({"papers": papers, "reviews": reviews}, primary_key=None)) == 5, "no deduplication without a primary key"
+
+
+def test_score_fusion_uses_min_max_normalized_scores():
+    keyword = hits("a", "b", "c", scores=[12.0, 8.0, 4.0])  # differently scaled scores do not matter after normalization
+    semantic = hits("c", "b", scores=[0.9, 0.3])
+    fused = fuse_hits({"keyword": keyword, "semantic": semantic}, method=FusionMethod.SCORE,
+                      weights={"keyword": 0.5, "semantic": 0.5})
+    scores = {hit["hash"]: hit["_fusionScore"] for hit in fused}
+    assert scores == pytest.approx({"a": 0.5, "b": 0.25, "c": 0.5})
+    assert [hit["hash"] for hit in fused][-1] == "b"
+
+    tied = fuse_hits({"keyword": hits("x", "y", scores=[0.7, 0.7])}, method=FusionMethod.SCORE)
+    assert [hit["_fusionScore"] for hit in tied] == [1.0, 1.0]
+    assert fuse_hits({"keyword": []}, method=FusionMethod.SCORE) == []
+    with pytest.raises(ValueError):
+        fuse_hits({"keyword": keyword}, method=FusionMethod.MEILI)
+
+
+def test_client_side_hybrid_fusion_in_search():
+    meili = OfflineMeili(hits=hits("a", "b", "c"), semantic_hits=hits("c", "d"))
+    rag = offline_rag(meili, "fusion-hybrid")
+    rag.st_model = StandInSentenceTransformer()
+
+    results = rag.search("glucose", semanticRatio=0.5, limit=3, fusion="rrf", use_cache=False)
+    assert [hit["hash"] for hit in results.hits] == ["c", "a", "b"]
+    assert all("_indexUid" not in hit and "_rankingScore" in hit for hit in results.hits)
+    keyword, semantic = meili.multi_searches[0]
+    assert keyword.vector is None and semantic.vector is not None and semantic.hybrid.semantic_ratio == 1.0
+    assert meili.searches == 0, "both searches go in one multi-search request"
+
+    rag.search("glucose", semanticRatio=0.5, limit=3, fusion="meili", use_cache=False)
+    assert meili.searches == 1 and len(meili.multi_searches) == 1, "meili fusion blends on the server"
+
+
+def test_federated_search_fuses_indexes_on_the_client():
+    meili = OfflineMeili(hits_by_index={"papers": hits("a", "b"), "reviews": hits("b", "c")})
+    rag = offline_rag(meili, "papers")
+    rag.st_model = model = StandInSentenceTransformer()
+
+    merged = rag.federated_search("glucose", {"papers": 1.0, "reviews": 2.0}, method=FusionMethod.RRF, limit=10)
+    assert [hit["hash"] for hit in merged] == ["b", "c", "a"]
+    assert [hit["_indexUid"] for hit in merged] == ["reviews", "reviews", "papers"]
+    assert model.encode_calls == 1, "the query is encoded once for all indexes"
+    assert [params.index_uid for params in meili.multi_searches[0]] == ["papers", "reviews"]
+    assert rag.federated_search("glucose", []) == []
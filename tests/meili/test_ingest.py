@@ -0,0 +1,69 @@
+import json
+from pathlib import Path
+
+import just_semantic_search.meili.utils.ingest as ingest
+from just_semantic_search.meili.utils.ingest import IngestStats, chunk_records, embed_chunks, ingest_json_files
+from just_semantic_search.splitters.text_splitters import TextSplitter
+from tests.core.functions import StandInSentenceTransformer
+from tests.meili.functions import OfflineMeili, offline_rag
+
+
+def record(i: int, words: int = 50) -> dict:
+    return {"id": i, "title": f"Record {i}", "tags": ["a", "b"], "content": " ".join(f"w{i}_{j}" for j in range(words))}
+
+
+def make_splitter(model: StandInSentenceTransformer, batch_size: int = 8) -> TextSplitter:
+    return TextSplitter.model_construct(model=model, model_name="stand-in", max_seq_length=None, batch_size=batch_size)
+
+
+def test_chunk_records_keeps_fields_and_skips_bad_records():
+    splitter = make_splitter(StandInSentenceTransformer(max_seq_length=20))
+    stats = IngestStats()
+    records = [record(0), {"title": "no content"}, ["not", "a", "record"], {"content": "x", "title": "t"}, record(1, words=10)]
+    chunks = list(chunk_records(records, splitter, "content", "records.json", required_fields=["id"], stats=stats))
+
+    assert stats.records == 5 and stats.records_skipped == 3
+    assert [(chunk["id"], chunk["_chunk_id"], chunk["_total_chunks"]) for chunk in chunks] == [(0, 0, 3), (0, 1, 3), (0, 2, 3), (1, 0, 1)]
+    assert all(chunk["_source_file"] == "records.json" and chunk["title"].startswith("Record") for chunk in chunks)
+    assert chunks[0]["content"].split() == record(0)["content"].split()[:20]
+    assert chunks[0]["tags"] is chunks[1]["tags"], "chunks share the nested values of their record"
+    assert len({chunk["hash"] for chunk in chunks}) == 4
+    again = list(chunk_records([record(0)], splitter, "content", "records.json"))
+    assert [chunk["hash"] for chunk in again] == [chunk["hash"] for chunk in chunks[:3]], "hashes are deterministic"
+
+
+def test_embed_chunks_batches_across_records():
+    model = StandInSentenceTransformer(max_seq_length=20)
+    splitter = make_splitter(model)
+    stats = IngestStats()
+    progress = []
+    chunks = chunk_records([record(i) for i in range(7)], splitter, "content", "records.json")
+    embedded = list(embed_chunks(chunks, splitter, "content", "stand-in", batch_size=8, stats=stats,
+                                 progress=lambda **counts: progress.append(counts["chunks"])))
+
+    assert len(embedded) == 21 and stats.chunks == 21
+    assert model.encode_calls == 3 and progress == [8, 8, 5]
+    assert embedded[4]["_vectors"]["stand-in"] == model.vector(embedded[4]["content"]).tolist()
+
+
+def test_ingest_json_files_streams_into_the_index(tmp_path: Path, monkeypatch):
+    # the stand-in model does not pass TextSplitter's SentenceTransformer validation
+    monkeypatch.setattr(ingest, "TextSplitter", TextSplitter.model_construct)
+    (tmp_path / "array.json").write_text(json.dumps([record(i) for i in range(3)]))
+    (tmp_path / "lines.jsonl").write_text("\n".join([json.dumps(record(3)), "{broken", json.dumps(record(4))]))
+    (tmp_path / "truncated.json").write_text(json.dumps([record(5), record(6)])[:-20])
+
+    meili = OfflineMeili()
+    rag = offline_rag(meili, "ingest-json")
+    rag.st_model = StandInSentenceTransformer(max_seq_length=20)
+    files_done = []
+    stats = ingest_json_files(rag, sorted(tmp_path.iterdir()), "content", embed_batch_size=4, max_batch_documents=5,
+                              progress=lambda **counts: files_done.append(counts.get("files_done", 0)))
+
+    assert stats.files == 2 and stats.files_failed == 1 and stats.records == 6
+    uploaded = [chunk for batch in meili.batches for chunk in batch]
+    assert len(uploaded) == stats.chunks == 18
+    assert {chunk["id"] for chunk in uploaded} == {0, 1, 2, 3, 4, 5}, "records before the truncation are indexed"
+    assert all(len(batch) <= 5 for batch in meili.batches)
+    assert all(list(chunk["_vectors"]) == [rag.model_name] for chunk in uploaded)
+    assert sum(files_done) == 3
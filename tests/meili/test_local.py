@@ -0,0 +1,106 @@
+from pathlib import Path
+
+import numpy as np
+from meilisearch_python_sdk.models.task import TaskInfo
+
+from just_semantic_search.meili.local import LocalRAG
+from tests.core.functions import StandInSentenceTransformer
+
+TOPICS = ["aging", "cancer", "sleep", "diet"]
+
+
+def make_rag(model: StandInSentenceTransformer, **kwargs) -> LocalRAG:
+    rag = LocalRAG(index_name="local-test", **kwargs)
+    rag.st_model = model  # stands in for the lazily loaded sentence transformer
+    return rag
+
+
+def make_documents(model: StandInSentenceTransformer, count: int, model_name: str) -> list:
+    documents = []
+    for i in range(count):
+        topic = TOPICS[i % len(TOPICS)]
+        text = f"paper {i} about {topic}"
+        documents.append({"hash": f"h{i}", "text": text, "source": f"{topic}.pdf",
+                          "_vectors": {model_name: model.vector(text).tolist()}})
+    return documents
+
+
+def test_add_search_filter_and_delete():
+    model = StandInSentenceTransformer()
+    rag = make_rag(model)
+    documents = make_documents(model, 40, rag.model_name)
+    tasks = rag.add_documents(documents[:20])
+    rag.add_documents(documents[20:])
+    assert tasks.status == "succeeded" and tasks.documents_count == 20
+    assert len(rag) == 40
+
+    semantic = rag.search("paper 7 about diet", semanticRatio=1.0, limit=3)
+    assert semantic.hits[0]["hash"] == "h7"
+    assert 0.0 <= semantic.hits[-1]["_rankingScore"] <= semantic.hits[0]["_rankingScore"] <= 1.0
+    by_vector = rag.search(vector=model.vector("paper 7 about diet"), semanticRatio=1.0, limit=1)
+    assert by_vector.hits[0]["hash"] == "h7"
+
+    keyword = rag.search("sleep", semanticRatio=0.0, limit=100)
+    assert {hit["source"] for hit in keyword.hits} == {"sleep.pdf"} and len(keyword.hits) == 10
+    hybrid = rag.search("paper 13 about cancer", semanticRatio=0.5, limit=5)
+    assert hybrid.hits[0]["hash"] == "h13"
+
+    filtered = rag.search("paper 7 about diet", semanticRatio=1.0, limit=100, filter='source = "aging.pdf"')
+    assert len(filtered.hits) == 10 and all(hit["source"] == "aging.pdf" for hit in filtered.hits)
+
+    replaced = dict(documents[0], text="paper 0 revised")
+    rag.add_documents([replaced])
+    assert len(rag) == 40 and rag.get_documents(limit=1).results[0]["text"] == "paper 0 revised"
+
+    task = rag.delete_by_source("aging.pdf")
+    assert isinstance(task, TaskInfo) and task.status == "succeeded" and task.index_uid == "local-test"
+    assert len(rag) == 30
+    assert rag.search("aging", semanticRatio=0.0).hits == []
+    assert rag.search("paper 7 about diet", semanticRatio=1.0, limit=1).hits[0]["hash"] == "h7"
+    assert rag.delete_by_source("aging.pdf").task_uid == task.task_uid + 1
+
+
+def test_index_is_saved_once_and_reloaded(tmp_path: Path):
+    model = StandInSentenceTransformer()
+    path = tmp_path / "index"
+    rag = make_rag(model, path=path, autosave=False)
+    documents = make_documents(model, 12, rag.model_name)
+    for i in range(0, 12, 4):
+        rag.add_documents(documents[i:i + 4])
+    assert not path.exists(), "without autosave batches are not written"
+    rag.save()
+
+    reloaded = make_rag(model, path=path)
+    assert len(reloaded) == 12
+    assert isinstance(reloaded._matrix, np.memmap)
+    assert reloaded.search("paper 5 about cancer", semanticRatio=1.0, limit=1).hits[0]["hash"] == "h5"
+    assert {hit["hash"] for hit in reloaded.search("sleep", semanticRatio=0.0).hits} == {"h2", "h6", "h10"}
+
+    reloaded.autosave = True
+    reloaded.delete_by_source("sleep.pdf")
+    assert len(make_rag(model, path=path)) == 9
+
+
+def test_ivfpq_index_agrees_with_brute_force(tmp_path: Path):
+    model = StandInSentenceTransformer()
+    flat = make_rag(model)
+    approximate = make_rag(model, path=tmp_path / "ivfpq", vector_index="ivfpq", ann_n_lists=8, nprobe=8, refine_factor=8)
+    documents = make_documents(model, 1100, flat.model_name)
+    flat.add_documents(documents)
+    approximate.add_documents(documents[:100])
+    assert approximate._ann is None, "too few vectors to train, brute force is used"
+    approximate.add_documents(documents[100:])
+    assert approximate._ann is not None and approximate._ann.is_trained
+
+    queries = [f"paper {i} about {TOPICS[i % len(TOPICS)]}" for i in range(0, 1100, 110)]
+    for query in queries:
+        expected = [hit["hash"] for hit in flat.search(query, semanticRatio=1.0, limit=5).hits]
+        found = [hit["hash"] for hit in approximate.search(query, semanticRatio=1.0, limit=5).hits]
+        assert found[0] == expected[0]  # nprobe covers every list and the candidates are rescored exactly
+
+    approximate.delete_by_source("cancer.pdf")
+    assert all(hit["source"] != "cancer.pdf" for hit in approximate.search(queries[1], semanticRatio=1.0, limit=20).hits)
+    approximate.save()
+    reloaded = make_rag(model, path=tmp_path / "ivfpq", vector_index="ivfpq")
+    assert reloaded._ann is not None and len(reloaded) == len(approximate)
+    assert reloaded.search(queries[0], semanticRatio=1.0, limit=1).hits[0]["hash"] == "h0"
@@ -0,0 +1,97 @@
+import gc
+import asyncio
+import threading
+
+import just_semantic_search.meili.rag_async as rag_async
+from just_semantic_search.embeddings import EmbeddingModel
+from just_semantic_search.meili.rag_async import MeiliAsyncRAG
+from tests.core.functions import StandInReranker, StandInSentenceTransformer
+from tests.meili.functions import OfflineMeili, offline_async_rag
+
+
+class CountingAsyncRAG(MeiliAsyncRAG):
+    """Counts index initializations instead of talking to Meilisearch"""
+
+    def model_post_init(self, __context) -> None:
+        super().model_post_init(__context)
+        self._initializations = 0
+
+    async def _init_index_async(self, create_index_if_not_exists: bool = True):
+        self._initializations += 1
+        await asyncio.sleep(0.05)
+
+
+def test_process_encoder_loads_custom_models_by_path(monkeypatch):
+    loaded = []
+    monkeypatch.setattr(rag_async, "load_sentence_transformer_model", lambda name_or_path: loaded.append(name_or_path) or name_or_path)
+    custom = EmbeddingModel.OTHER("/models/my-finetuned-encoder")
+    rag_async._init_process_encoder(custom.value)
+    assert loaded == ["/models/my-finetuned-encoder"]
+    assert rag_async._PROCESS_MODEL == "/models/my-finetuned-encoder"
+
+
+def test_index_is_initialized_once_per_event_loop():
+    rag = CountingAsyncRAG(index_name="async-loops")
+    both_started = threading.Barrier(2)
+    errors = []
+
+    def run_loop() -> None:
+        async def main():
+            both_started.wait()
+            await asyncio.gather(*(rag.ensure_index() for _ in range(5)))
+        try:
+            asyncio.run(main())
+        except Exception as e:  # a lock shared between loops raises RuntimeError here
+            errors.append(e)
+
+    threads = [threading.Thread(target=run_loop) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert 1 <= rag._initializations <= 2, "concurrent callers in one loop wait for the same initialization"
+    assert len(rag._index_locks) == 0, "the locks are dropped once the index is ready"
+
+
+def test_async_clients_are_closed_with_their_loop():
+    async def client():
+        return rag_async.get_async_client("http://offline:7700", "key")
+    first = asyncio.run(client())
+    assert first.http_client.is_closed, "asyncio.run closes the clients of its loop before closing it"
+    second = asyncio.run(client())
+    assert second is not first, "a new loop never gets the client of a finished one"
+    gc.collect()
+    assert not any(loop.is_closed() for loop in rag_async._ASYNC_CLIENTS), "entries go away with their loop"
+
+
+def test_async_search_fuses_reranks_and_caches(monkeypatch):
+    """MeiliAsyncRAG.search fuses on the client, reranks in its own executor and shares the result cache of MeiliRAG"""
+    # Meilisearch order puts the best matches for "glucose" last
+    hits = [{"hash": f"h{i}", "text": " ".join(["glucose"] * i + ["notes"])} for i in range(6)]
+    meili = OfflineMeili(hits=hits, semantic_hits=hits[:2])
+    reranker = StandInReranker()
+    rag = offline_async_rag(meili, "async-search", reranking_model=reranker)
+    rag.st_model, rag._dimension_checked = StandInSentenceTransformer(), True
+    rerank_threads = []
+    rerank_results = MeiliAsyncRAG._rerank_results
+
+    def record_thread(self, *args, **kwargs):
+        rerank_threads.append(threading.current_thread().name)
+        return rerank_results(self, *args, **kwargs)
+    monkeypatch.setattr(MeiliAsyncRAG, "_rerank_results", record_thread)
+
+    async def search(**kwargs):
+        return await rag.search("glucose", limit=3, rerank_limit=6, fusion="rrf", **kwargs)
+    try:
+        first = asyncio.run(search())
+        second = asyncio.run(search())
+        plain = asyncio.run(search(rerank=False, use_cache=False))
+    finally:
+        rag.close()
+    assert [hit["hash"] for hit in first.hits] == ["h5", "h4", "h3"]
+    assert [hit["_rerankScore"] for hit in first.hits] == [5.0, 4.0, 3.0]
+    assert second.hits == first.hits, "the repeated request is served from the result cache"
+    assert reranker.calls == 1 and rerank_threads == ["reranker_async-search_0"]
+    assert len(meili.multi_searches) == 2 and meili.searches == 0, "both searches go in one multi-search request"
+    assert [hit["hash"] for hit in plain.hits] == ["h0", "h1", "h2"], "hits found by both searches rank first"
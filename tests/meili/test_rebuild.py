@@ -0,0 +1,65 @@
+import pytest
+
+import just_semantic_search.meili.rag as rag_module
+from just_semantic_search.meili.rag import MeiliRAG
+from tests.meili.functions import OfflineMeiliServer
+
+
+def documents(count: int, prefix: str = "new") -> list:
+    return [{"hash": f"{prefix}{i}", "text": f"{prefix} document {i}", "source": f"{prefix}_{i}.md"} for i in range(count)]
+
+
+@pytest.fixture
+def server(monkeypatch) -> OfflineMeiliServer:
+    server = OfflineMeiliServer()
+    monkeypatch.setattr(rag_module, "get_client", lambda base_url, api_key=None: server)
+    return server
+
+
+def live_rag(server: OfflineMeiliServer, count: int = 3) -> MeiliRAG:
+    rag = MeiliRAG(index_name="papers")
+    rag.add_documents(documents(count, prefix="old"))
+    return rag
+
+
+def test_rebuild_swaps_the_shadow_index_in(server: OfflineMeiliServer):
+    rag = live_rag(server)
+
+    result = rag.rebuild(lambda shadow: shadow.add_documents(documents(5)))
+    assert result["documents_count"] == 5 and result["previous_documents_count"] == 3
+    assert sorted(server.indexes) == ["papers"], "the shadow index holding the old documents is dropped"
+    assert sorted(server.indexes["papers"].documents) == [f"new{i}" for i in range(5)]
+    assert rag.index is server.indexes["papers"]
+
+
+def test_failed_validation_leaves_the_live_index_alone(server: OfflineMeiliServer):
+    rag = live_rag(server)
+
+    server.failing_batches = {server.batches + 1}
+    with pytest.raises(ValueError, match="1 tasks failed"):
+        rag.rebuild(lambda shadow: [shadow.add_documents(batch) for batch in (documents(2), documents(2, prefix="more"))])
+    assert sorted(server.indexes["papers"].documents) == ["old0", "old1", "old2"]
+    assert sorted(server.indexes["papers__building"].documents) == ["new0", "new1"], "kept for inspection"
+
+    with pytest.raises(ValueError, match="expected 10"):
+        rag.rebuild(lambda shadow: shadow.add_documents(documents(5)), expected_documents=10)
+    assert sorted(server.indexes["papers"].documents) == ["old0", "old1", "old2"]
+
+    # the failed task of the first rebuild stays in the history of the shadow index but is not held against later ones
+    assert rag.rebuild(lambda shadow: shadow.add_documents(documents(4)))["documents_count"] == 4
+    assert len(server.indexes["papers"].documents) == 4
+
+
+def test_failing_build_drops_the_shadow_index(server: OfflineMeiliServer):
+    rag = live_rag(server)
+
+    def build(shadow: MeiliRAG):
+        shadow.add_documents(documents(2))
+        raise RuntimeError("splitting failed")
+    with pytest.raises(RuntimeError):
+        rag.rebuild(build)
+    assert sorted(server.indexes) == ["papers"] and len(server.indexes["papers"].documents) == 3
+
+    with pytest.raises(RuntimeError):
+        rag.rebuild(build, keep_failed=True)
+    assert len(server.indexes["papers__building"].documents) == 2
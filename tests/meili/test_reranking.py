@@ -0,0 +1,65 @@
+from tests.core.functions import StandInReranker, StandInSentenceTransformer
+from tests.meili.functions import OfflineMeili, offline_rag
+
+
+def candidates(count: int) -> list:
+    # Meilisearch order puts the best matches for "glucose" last
+    return [{"hash": f"h{i}", "text": " ".join(["glucose"] * i + ["notes"])} for i in range(count)]
+
+
+def reranking_rag(meili: OfflineMeili, index_name: str, reranker: StandInReranker):
+    rag = offline_rag(meili, index_name, reranking_model=reranker)
+    rag.st_model = StandInSentenceTransformer()
+    return rag
+
+
+def test_search_reranks_the_candidate_pool():
+    meili = OfflineMeili(hits=candidates(10))
+    reranker = StandInReranker()
+    rag = reranking_rag(meili, "rerank-pool", reranker)
+
+    results = rag.search("glucose", limit=3, rerank_limit=10, use_cache=False)
+    assert [hit["hash"] for hit in results.hits] == ["h9", "h8", "h7"]
+    assert [hit["_rerankScore"] for hit in results.hits] == [9.0, 8.0, 7.0]
+    assert reranker.scored == 10, "the whole pool of rerank_limit candidates is scored"
+
+    plain = rag.search("glucose", limit=3, rerank=False, use_cache=False)
+    assert [hit["hash"] for hit in plain.hits] == ["h0", "h1", "h2"]
+
+
+def test_small_pools_and_slow_retrieval_skip_reranking():
+    meili = OfflineMeili(hits=candidates(2))
+    reranker = StandInReranker()
+    rag = reranking_rag(meili, "rerank-skip", reranker)
+
+    small = rag.search("glucose", limit=5, rerank_min_candidates=3, use_cache=False)
+    assert [hit["hash"] for hit in small.hits] == ["h0", "h1"] and reranker.calls == 0
+
+    meili.hits = candidates(10)
+    late = rag.search("glucose", limit=5, retrieval_budget_ms=0, use_cache=False)
+    assert [hit["hash"] for hit in late.hits] == ["h0", "h1", "h2", "h3", "h4"] and reranker.calls == 0
+
+
+def test_rerank_budget_keeps_unscored_candidates_in_order():
+    meili = OfflineMeili(hits=candidates(12))
+    reranker = StandInReranker(latency_seconds=0.05)
+    rag = reranking_rag(meili, "rerank-budget", reranker)
+
+    results = rag.search("glucose", limit=12, rerank_limit=12, rerank_batch_size=4, rerank_budget_ms=30, use_cache=False)
+    scored = [hit for hit in results.hits if "_rerankScore" in hit]
+    unscored = [hit for hit in results.hits if "_rerankScore" not in hit]
+    assert reranker.calls == 1 and len(scored) == 4, "the first batch is always scored, the budget stops the rest"
+    assert [hit["hash"] for hit in scored] == ["h3", "h2", "h1", "h0"]
+    assert [hit["hash"] for hit in unscored] == [f"h{i}" for i in range(4, 12)]
+    assert results.hits[:4] == scored
+
+
+def test_windowed_reranking_scores_passages():
+    long_hit = {"hash": "long", "text": " ".join(["notes"] * 300 + ["glucose"] * 5 + ["notes"] * 300)}
+    meili = OfflineMeili(hits=candidates(4) + [long_hit])
+    reranker = StandInReranker()
+    rag = reranking_rag(meili, "rerank-windows", reranker)
+
+    results = rag.search("glucose", limit=2, rerank_window_words=32, rerank_max_windows=1, use_cache=False)
+    assert [hit["hash"] for hit in results.hits] == ["long", "h3"]
+    assert reranker.scored == 5, "one window per candidate"
@@ -0,0 +1,156 @@
+import threading
+import time
+from types import SimpleNamespace
+from typing import List
+
+from pydantic import BaseModel
+
+from just_semantic_search.meili.utils.search_cache import SearchResultCache, request_key
+
+INDEX = ("http://stub", "papers")
+
+
+class Result(BaseModel):
+    hits: List[dict]
+
+
+class StubTasksClient:
+    """Answers the two requests SearchResultCache.refresh makes: task statuses and the index updatedAt"""
+
+    def __init__(self):
+        self.task_status = {}
+        self.updated_at = "2025-01-01T00:00:00Z"
+        self.index_requests = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def get_tasks(self, uids: List[int], limit: int):
+        return SimpleNamespace(results=[SimpleNamespace(uid=uid, status=self.task_status[uid]) for uid in uids])
+
+    def get_raw_index(self, name: str):
+        self.index_requests += 1
+        self.release.wait()
+        return SimpleNamespace(updated_at=self.updated_at)
+
+
+def wait_for_refresh(cache: SearchResultCache, index_key=INDEX, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while cache._state(index_key).refreshing:
+        assert time.monotonic() < deadline, "background refresh did not finish"
+        time.sleep(0.005)
+
+
+def cache_result(cache: SearchResultCache, key: str, hits: List[dict]) -> None:
+    cache.put(INDEX, key, Result(hits=hits), cache.generation(INDEX))
+
+
+def test_results_are_invalidated_by_generation():
+    cache = SearchResultCache(max_size=10, ttl_seconds=60, check_interval_seconds=3600)
+    client = StubTasksClient()
+    key = request_key({"method": "search", "query": "longevity  genes", "limit": 10})
+    assert key == request_key({"limit": 10, "method": "search", "query": " longevity genes"})
+
+    assert cache.get(client, INDEX, key) is None
+    wait_for_refresh(cache)
+    cache_result(cache, key, [{"hash": "1"}])
+    cached = cache.get(client, INDEX, key)
+    assert cached.hits == [{"hash": "1"}]
+    cached.hits.append({"hash": "mutated"})  # callers get copies
+    assert cache.get(client, INDEX, key).hits == [{"hash": "1"}]
+
+    generation = cache.generation(INDEX)
+    cache.invalidate(INDEX)
+    wait_for_refresh(cache)
+    assert cache.get(client, INDEX, key) is None
+    cache.put(INDEX, key, Result(hits=[{"hash": "stale"}]), generation)  # computed before the change, dropped
+    assert cache.get(client, INDEX, key) is None
+    assert cache.stats()["hits"] == 2
+
+
+def test_entries_expire_after_ttl():
+    cache = SearchResultCache(max_size=10, ttl_seconds=0.05, check_interval_seconds=3600)
+    client = StubTasksClient()
+    cache.get(client, INDEX, "warm up")
+    wait_for_refresh(cache)
+    cache_result(cache, "key", [{"hash": "1"}])
+    assert cache.get(client, INDEX, "key") is not None
+    time.sleep(0.06)
+    assert cache.get(client, INDEX, "key") is None
+
+
+def test_cache_is_bypassed_until_index_tasks_finish():
+    cache = SearchResultCache(max_size=10, ttl_seconds=60, check_interval_seconds=3600)
+    client = StubTasksClient()
+    cache.get(client, INDEX, "warm up")
+    wait_for_refresh(cache)
+    cache_result(cache, "key", [{"hash": "old"}])
+
+    client.task_status[7] = "processing"
+    cache.invalidate(INDEX, [7])
+    assert cache.get(client, INDEX, "key") is None
+    wait_for_refresh(cache)
+    cache_result(cache, "key", [{"hash": "partial"}])  # not stored while the task is processing
+    assert cache.get(client, INDEX, "key") is None  # still pending, the next check is an interval away
+    assert cache.stats()["bypassed"] == 2
+
+    client.task_status[7] = "succeeded"
+    generation = cache.generation(INDEX)
+    cache.refresh(client, INDEX)
+    assert cache.generation(INDEX) == generation + 1
+    cache_result(cache, "key", [{"hash": "new"}])
+    assert cache.get(client, INDEX, "key").hits == [{"hash": "new"}]
+
+
+def test_external_changes_are_detected_by_updated_at():
+    cache = SearchResultCache(max_size=10, ttl_seconds=60, check_interval_seconds=0.05)
+    client = StubTasksClient()
+    cache.get(client, INDEX, "warm up")
+    wait_for_refresh(cache)
+    cache_result(cache, "key", [{"hash": "1"}])
+    assert cache.get(client, INDEX, "key") is not None
+
+    client.updated_at = "2025-01-02T00:00:00Z"  # another process wrote to the index
+    time.sleep(0.06)
+    cache.get(client, INDEX, "key")  # schedules the check
+    wait_for_refresh(cache)
+    assert cache.get(client, INDEX, "key") is None
+
+
+def test_refresh_runs_off_the_search_path_once_per_index():
+    cache = SearchResultCache(max_size=100, ttl_seconds=60, check_interval_seconds=0.0)
+    client = StubTasksClient()
+    client.release.clear()  # updatedAt requests hang until released
+
+    start = time.perf_counter()
+    for _ in range(20):
+        assert cache.get(client, INDEX, "key") is None
+    assert time.perf_counter() - start < 0.5, "lookups must not wait for the index check"
+    while client.index_requests == 0:
+        time.sleep(0.005)
+    assert client.index_requests == 1, "one check at a time per index"
+    client.release.set()
+    wait_for_refresh(cache)
+
+
+def test_concurrent_lookups_keep_consistent_counters():
+    cache = SearchResultCache(max_size=100, ttl_seconds=60, check_interval_seconds=3600)
+    client = StubTasksClient()
+    cache.get(client, INDEX, "warm up")
+    wait_for_refresh(cache)
+    for i in range(10):
+        cache_result(cache, f"key {i}", [{"hash": str(i)}])
+
+    def lookups(worker: int) -> None:
+        for i in range(500):
+            key = f"key {(worker + i) % 20}"
+            if cache.get(client, INDEX, key) is None:
+                cache_result(cache, key, [{"hash": key}])
+
+    threads = [threading.Thread(target=lookups, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = cache.stats()
+    assert stats["hits"] + stats["misses"] == 8 * 500 + 1
+    assert stats["size"] == 20
@@ -0,0 +1,93 @@
+import asyncio
+
+from meilisearch_python_sdk.models.settings import MeilisearchSettings, UserProvidedEmbedder
+
+import just_semantic_search.meili.rag as rag_module
+from just_semantic_search.embeddings import EMBEDDING_DIMENSIONS, EmbeddingModel
+from just_semantic_search.meili.rag import MeiliRAG
+from just_semantic_search.meili.rag_async import MeiliAsyncRAG
+from just_semantic_search.meili.utils.settings import settings_diff
+from tests.core.functions import StandInSentenceTransformer
+from tests.meili.functions import OfflineMeili
+
+
+def embedder(dimensions: int) -> UserProvidedEmbedder:
+    return UserProvidedEmbedder(dimensions=dimensions, source="userProvided")
+
+
+def test_settings_diff_only_reports_changed_fields():
+    desired = MeilisearchSettings(embedders={"jina": embedder(1024), "specter": embedder(768)},
+                                  searchable_attributes=["title", "text"], filterable_attributes=["source", "title"])
+    current = MeilisearchSettings(embedders={"jina": embedder(1024), "specter": embedder(768)},
+                                  searchable_attributes=["title", "text"], filterable_attributes=["title", "source"],
+                                  sortable_attributes=["year"], ranking_rules=["words", "typo"])
+    assert settings_diff(desired, current) == {}, "order of filterable attributes and fields set only on the server are ignored"
+
+    current.embedders["specter"] = embedder(512)
+    current.searchable_attributes = ["text", "title"]  # the searchable order is the ranking order
+    diff = settings_diff(desired, current)
+    assert set(diff) == {"embedders", "searchable_attributes"}
+    assert list(diff["embedders"]) == ["specter"] and diff["embedders"]["specter"].dimensions == 768
+    assert settings_diff(desired, MeilisearchSettings()).keys() == {"embedders", "searchable_attributes", "filterable_attributes"}
+
+
+def test_construction_does_not_load_the_model(monkeypatch):
+    loaded = []
+
+    def load(model: EmbeddingModel) -> StandInSentenceTransformer:
+        loaded.append(model)
+        return StandInSentenceTransformer(dimension=48)
+    monkeypatch.setattr(rag_module, "load_sentence_transformer_from_enum", load)
+    monkeypatch.setattr(rag_module, "_SENTENCE_TRANSFORMERS", {})
+    meili = OfflineMeili(settings=MeilisearchSettings(embedders={"jina-embeddings-v3": embedder(48)},
+                                                      searchable_attributes=MeiliRAG.model_fields["searchable_attributes"].default,
+                                                      filterable_attributes=MeiliRAG.model_fields["filterable_attributes"].default))
+    monkeypatch.setattr(rag_module, "get_client", lambda base_url, api_key=None: meili)
+
+    rag = MeiliRAG(index_name="settings-existing", model=EmbeddingModel.JINA_EMBEDDINGS_V3)
+    assert loaded == [] and meili.settings_updates == [], "the configured embedder is kept without resolving the dimension"
+    rag.sentence_transformer
+    assert loaded == [EmbeddingModel.JINA_EMBEDDINGS_V3] and meili.settings_updates == []
+
+    meili.settings = MeilisearchSettings()
+    other = MeiliRAG(index_name="settings-new", model=EmbeddingModel.JINA_EMBEDDINGS_V3)
+    assert len(loaded) == 1, "a missing embedder takes the dimension of the table"
+    assert meili.settings.embedders["jina-embeddings-v3"].dimensions == EMBEDDING_DIMENSIONS[EmbeddingModel.JINA_EMBEDDINGS_V3]
+    assert other.sentence_transformer is rag.sentence_transformer and len(loaded) == 1, "indexes of one model share its weights"
+
+
+def test_wrong_dimension_is_corrected_when_the_model_loads(monkeypatch):
+    monkeypatch.setattr(rag_module, "load_sentence_transformer_from_enum", lambda model: StandInSentenceTransformer(dimension=48))
+    monkeypatch.setattr(rag_module, "_SENTENCE_TRANSFORMERS", {})
+    meili = OfflineMeili()
+    monkeypatch.setattr(rag_module, "get_client", lambda base_url, api_key=None: meili)
+
+    rag = MeiliRAG(index_name="settings-mismatch", model=EmbeddingModel.JINA_EMBEDDINGS_V3)
+    assert meili.settings.embedders["jina-embeddings-v3"].dimensions == 1024
+    updates = len(meili.settings_updates)
+    rag.search("glucose", semanticRatio=0.5, use_cache=False)
+    assert len(meili.settings_updates) == updates + 1
+    assert meili.settings_updates[-1].embedders["jina-embeddings-v3"].dimensions == 48
+    rag.search("insulin", semanticRatio=0.5, use_cache=False)
+    assert len(meili.settings_updates) == updates + 1, "checked once"
+
+
+def test_async_dimension_is_checked_at_the_first_encode(monkeypatch):
+    meili = OfflineMeili(settings=MeilisearchSettings(embedders={"jina-embeddings-v3": embedder(1024)}))
+
+    async def call(method, *args, **kwargs):
+        return method(*args, **kwargs)
+    rag = MeiliAsyncRAG(index_name="settings-async")
+    rag.st_model, rag._index_ready = StandInSentenceTransformer(dimension=48), True
+    monkeypatch.setattr(MeiliAsyncRAG, "index_async", property(lambda self: meili))
+    monkeypatch.setattr(MeiliAsyncRAG, "_meili_call_async", lambda self, method, *args, **kwargs: call(method, *args, **kwargs))
+    try:
+        assert asyncio.run(rag.model_dimension()) == 48, "an already loaded model is asked directly"
+        rag.st_model = None
+        assert asyncio.run(rag.model_dimension()) == 1024
+        rag.st_model = StandInSentenceTransformer(dimension=48)
+        asyncio.run(rag.encode_query("glucose"))
+        asyncio.run(rag.encode_query("insulin"))
+    finally:
+        rag.close()
+    assert [update.embedders["jina-embeddings-v3"].dimensions for update in meili.settings_updates] == [48]
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+import just_semantic_search.meili.rag_async as rag_async_module
+import just_semantic_search.server.agentic_indexing as agentic_indexing
+from just_semantic_search.server.admission import ConcurrencyLimiter
+from just_semantic_search.server.agentic_indexing import AgenticIndexing
+from just_semantic_search.server.rag_server import RAGServer, SearchRequest
+from just_semantic_search.server.result_cache import ResultCache
+from just_semantic_search.utils import pdf_text
+from tests.core.functions import StandInReranker, StandInSentenceTransformer, write_text_pdf
+from tests.meili.functions import OfflineMeili, offline_async_rag
+
+
+class StandInAnnotationAgent:
+    """Local replacement of the LLM annotation agent: answers after a fixed latency and counts its calls"""
+
+    def __init__(self, latency_seconds: float = 0.2):
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+        self.max_concurrent = 0
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def query_structural(self, query: str, response_format, enforce_validation: bool = False) -> dict:
+        with self._lock:
+            self.calls += 1
+            self._running += 1
+            self.max_concurrent = max(self.max_concurrent, self._running)
+        time.sleep(self.latency_seconds)
+        with self._lock:
+            self._running -= 1
+        first_line = query.splitlines()[1]
+        return {"title": first_line, "abstract": f"Abstract of {first_line}", "authors": ["Stand In"], "source": "stand-in"}
+
+
+def test_concurrent_annotation_is_cached(tmp_path: Path):
+    """Files are annotated concurrently and re-annotating the same texts is served from the disk cache."""
+    papers = []
+    for i in range(8):
+        paper = tmp_path / f"paper_{i}.md"
+        paper.write_text(f"Paper {i}\n\nBody of paper {i}")
+        papers.append(paper)
+
+    agent = StandInAnnotationAgent(latency_seconds=0.2)
+    cache = ResultCache("annotation", path=tmp_path / "results.sqlite")
+    indexing = AgenticIndexing.model_construct(annotation_agent=agent, annotation_workers=4,
+                                               annotation_rate_per_second=0, annotation_cache=cache)
+
+    start = time.perf_counter()
+    annotated = {f.name: future.result() for f, future in indexing.annotate_files(papers, characters_for_abstract=1000)}
+    elapsed = time.perf_counter() - start
+    print(f"annotated {len(annotated)} files in {elapsed * 1000:.0f} ms, {agent.max_concurrent} concurrent calls")
+    assert len(annotated) == len(papers) and agent.calls == len(papers)
+    assert agent.max_concurrent > 1
+    assert elapsed < len(papers) * agent.latency_seconds / 2
+    text, title, abstract, source = annotated["paper_3.md"]
+    assert title == "Paper 3" and text.startswith("Paper 3")
+
+    # a new indexing instance on the same cache file never calls the agent again
+    reindexing = AgenticIndexing.model_construct(annotation_agent=agent, annotation_workers=4,
+                                                 annotation_rate_per_second=0,
+                                                 annotation_cache=ResultCache("annotation", path=tmp_path / "results.sqlite"))
+    again = {f.name: future.result() for f, future in reindexing.annotate_files(papers, characters_for_abstract=1000)}
+    assert again == annotated and agent.calls == len(papers)
+
+
+def test_search_endpoint_reranks_and_caches(monkeypatch):
+    """/search awaits MeiliAsyncRAG.search: hits are reranked and a repeated request is served from the result cache."""
+    hits = [{"hash": f"h{i}", "text": text, "source": f"paper_{i}.md"} for i, text in enumerate([
+        "Unrelated notes on cell culture",
+        "Glucose appears once",
+        "Continuous glucose monitoring predicts glucose levels with glucose models",
+        "Nothing relevant here",
+    ])]
+    meili = OfflineMeili(hits)
+    reranker = StandInReranker()
+    rag = offline_async_rag(meili, "server-search-endpoint", reranking_model=reranker)
+    rag.st_model, rag._dimension_checked = StandInSentenceTransformer(), True
+    monkeypatch.setitem(rag_async_module.MEILI_ASYNC_RAG_INSTANCES, rag.index_name, rag)
+
+    server = SimpleNamespace(search_limiter=ConcurrencyLimiter("search_endpoint_test"))
+    request = SearchRequest(query="glucose models", index=rag.index_name, limit=2)
+    try:
+        first = asyncio.run(RAGServer.search(server, request))
+        second = asyncio.run(RAGServer.search(server, request))
+    finally:
+        rag.close()
+    assert len(first) == 2
+    assert first[0].startswith("Continuous glucose monitoring") and first[1].startswith("Glucose appears once")
+    assert second == first
+    assert meili.searches == 1 and reranker.calls == 1
+
+
+def test_only_pages_without_text_layer_are_ocred(tmp_path: Path, monkeypatch):
+    """PDF pages with a text layer are read locally, scanned pages are OCRed one by one and complete results are cached."""
+    pytest.importorskip("pypdf")
+    cache = ResultCache("pdf_markdown", path=tmp_path / "results.sqlite")
+    monkeypatch.setattr(agentic_indexing, "pdf_markdown_cache", lambda: cache)
+    ocred = []
+
+    def ocr(self, pdf_path: Path, markdown_path: Path, api_key: str) -> str:
+        assert pdf_text.page_count(pdf_path) == 1
+        ocred.append(pdf_path.stem)
+        return f"OCR text of {pdf_path.stem}"
+    monkeypatch.setattr(AgenticIndexing, "_process_pdf_with_ocr", ocr)
+
+    texts = [" ".join(f"page{number}word{i}" for i in range(60)) if number != 1 else "" for number in range(3)]
+    mixed = write_text_pdf(tmp_path / "mixed.pdf", texts)
+    indexing = AgenticIndexing.model_construct()
+
+    without_key = indexing._extract_pdf_markdown(mixed, tmp_path / "mixed.md", api_key=None)
+    assert without_key == texts[0] + "\n\n" + texts[2] and ocred == []
+    assert cache.get(agentic_indexing.content_hash(mixed.read_bytes())) is None, "a result missing OCR pages is not cached"
+
+    markdown = indexing._extract_pdf_markdown(mixed, tmp_path / "mixed.md", api_key="key")
+    assert markdown.split("\n\n") == [texts[0], "OCR text of page_1", texts[2]]
+    assert ocred == ["page_1"]
+    assert (tmp_path / "mixed.md").read_text() == markdown
+    assert indexing._extract_pdf_markdown(mixed, tmp_path / "again.md", api_key="key") == markdown
+    assert ocred == ["page_1"], "the second extraction is served from the cache"
+
+    scanned = write_text_pdf(tmp_path / "scanned.pdf", ["", ""])
+    assert indexing._extract_pdf_markdown(scanned, tmp_path / "scanned.md", api_key=None) is None
@@ -0,0 +1,114 @@
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from just_semantic_search.server.jobs import Job, JobQueue, JobStatus, JobStore, report_progress
+
+
+def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def job_queue(tmp_path: Path) -> JobQueue:
+    return JobQueue(JobStore(tmp_path / "jobs.sqlite"), workers=1, poll_interval=0.05)
+
+
+def test_claim_takes_the_oldest_queued_job_of_registered_kinds(tmp_path: Path):
+    queue = job_queue(tmp_path)
+    queue.register("index_folder", lambda params: "done")
+    queue.register("upload_pdf", lambda params: "done")
+    first = queue.submit("index_folder", {"folder": "a"})
+    second = queue.submit("upload_pdf", {"path": "b.pdf"})
+
+    assert queue.store.claim_next(["upload_pdf"], "host:1").id == second.id
+    claimed = queue.store.claim_next(["index_folder", "upload_pdf"], "host:1")
+    assert claimed.id == first.id and claimed.status == JobStatus.RUNNING
+    assert claimed.attempts == 1 and claimed.owner == "host:1" and claimed.started_at is not None
+    assert queue.store.claim_next(["index_folder", "upload_pdf"], "host:1") is None
+
+
+def test_cancel_does_not_overwrite_a_job_claimed_meanwhile(tmp_path: Path, monkeypatch):
+    queue = job_queue(tmp_path)
+    queue.register("index_folder", lambda params: "done")
+    queued = queue.submit("index_folder", {})
+    cancelled = queue.cancel(queued.id)
+    assert cancelled.status == JobStatus.CANCELLED and cancelled.finished_at is not None
+
+    job = queue.submit("index_folder", {})
+    stale = queue.store.get(job.id)
+    queue.store.claim_next(["index_folder"], "host:1")
+    store_get = queue.store.get
+    reads = []
+
+    def get(job_id: str):
+        reads.append(job_id)
+        return stale if len(reads) == 1 else store_get(job_id)
+    monkeypatch.setattr(queue.store, "get", get)
+    raced = queue.cancel(job.id)
+    assert raced.status == JobStatus.RUNNING and raced.cancel_requested, "the worker stops it at its next progress report"
+
+
+def test_running_job_is_cancelled_at_its_next_progress_report_and_retried(tmp_path: Path):
+    queue = job_queue(tmp_path)
+    started = threading.Event()
+    runs = []
+
+    def handler(params: dict) -> str:
+        runs.append(params)
+        if len(runs) > 1:
+            report_progress(files_done=1, chunks=3, files_total=1)
+            return "Indexed 1 file"
+        started.set()
+        for _ in range(500):
+            report_progress(files_done=1, chunks=2)
+            time.sleep(0.01)
+        return "not cancelled"
+    queue.register("index_folder", handler)
+    queue.start()
+    try:
+        job = queue.submit("index_folder", {"folder": "papers"})
+        assert started.wait(5)
+        queue.cancel(job.id)
+        wait_for(lambda: queue.get(job.id).status == JobStatus.CANCELLED)
+        cancelled = queue.get(job.id)
+        assert cancelled.result is None and cancelled.files_done > 0
+
+        retried = queue.retry(job.id)
+        assert retried.status in (JobStatus.QUEUED, JobStatus.RUNNING)
+        wait_for(lambda: queue.get(job.id).status == JobStatus.SUCCEEDED)
+        succeeded = queue.get(job.id)
+        assert succeeded.attempts == 2 and succeeded.result == "Indexed 1 file"
+        assert succeeded.files_done == 1 and succeeded.chunks_embedded == 3 and not succeeded.cancel_requested, "progress is reset on retry"
+        with pytest.raises(ValueError):
+            queue.retry(job.id)
+    finally:
+        queue.stop()
+
+
+def test_jobs_of_dead_processes_are_requeued_on_start(tmp_path: Path):
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    store = JobStore(tmp_path / "jobs.sqlite")
+    host = socket.gethostname()
+    store.insert(Job(id="orphan", kind="index_folder", status=JobStatus.RUNNING, owner=f"{host}:{dead.pid}", created_at=time.time()))
+    store.insert(Job(id="alive", kind="upload_pdf", status=JobStatus.RUNNING, owner=f"{host}:{os.getpid()}", created_at=time.time()))
+
+    queue = JobQueue(store, workers=1, poll_interval=0.05)
+    queue.register("index_folder", lambda params: "done")
+    queue.start()
+    try:
+        wait_for(lambda: queue.get("orphan").status == JobStatus.SUCCEEDED)
+        assert queue.get("orphan").owner == queue.owner
+        assert queue.get("alive").status == JobStatus.RUNNING, "jobs of a live process are left to it"
+    finally:
+        queue.stop()
+
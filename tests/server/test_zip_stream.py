@@ -0,0 +1,126 @@
+import io
+import struct
+import zipfile
+from pathlib import Path
+
+import just_semantic_search.server.indexing as indexing_module
+from just_semantic_search.server.indexing import Indexing
+from just_semantic_search.server.zip_stream import ZipMembers, spool_upload
+from just_semantic_search.splitters.text_splitters import TextSplitter
+from tests.core.functions import StandInSentenceTransformer
+from tests.meili.functions import OfflineMeili, offline_rag
+
+
+def make_zip(members: dict) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+class NonSeekable(io.RawIOBase):
+    """An upload stream that can only be read forward"""
+
+    def __init__(self, data: bytes):
+        self._source = io.BytesIO(data)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        chunk = self._source.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+
+def test_members_are_extracted_lazily_and_filtered(tmp_path: Path):
+    archive = zipfile.ZipFile(make_zip({"papers/a.md": "# A", "papers/b.TXT": "B", "figure.png": b"\x89PNG", "papers/": ""}))
+    members = ZipMembers(archive, tmp_path / "out")
+    assert len(members) == 2
+
+    iterator = iter(members)
+    first = next(iterator)
+    assert first == (tmp_path / "out" / "papers" / "a.md").resolve() and first.read_text() == "# A"
+    assert not (tmp_path / "out" / "papers" / "b.TXT").exists(), "the next member is written only when it is requested"
+    assert [path.name for path in iterator] == ["b.TXT"]
+    assert members.extracted == 2 and members.bytes_written == 4 and members.skipped == []
+    assert not (tmp_path / "out" / "figure.png").exists()
+
+
+def test_paths_escaping_the_target_are_skipped(tmp_path: Path):
+    target = tmp_path / "out"
+    archive = zipfile.ZipFile(make_zip({"../evil.md": "x", "notes/../../evil2.md": "x", str(tmp_path / "absolute.md"): "x",
+                                        "notes/../safe.md": "ok"}))
+    members = ZipMembers(archive, target)
+
+    assert [path.name for path in members] == ["safe.md"]
+    assert len(members.skipped) == 3 and members.extracted == 1
+    assert not (tmp_path / "evil.md").exists() and not (tmp_path / "evil2.md").exists()
+    assert not (tmp_path / "absolute.md").exists()
+
+
+def test_size_limits_skip_members_and_stop_at_the_total(tmp_path: Path):
+    archive = zipfile.ZipFile(make_zip({"a.md": "a" * 400, "huge.md": "h" * 5000, "b.md": "b" * 400, "c.md": "c" * 400}))
+    members = ZipMembers(archive, tmp_path, max_member_bytes=1000, max_total_bytes=1000)
+
+    assert [path.name for path in members] == ["a.md", "b.md"]
+    assert members.skipped == ["huge.md", "c.md"], "too large by its declared size, then over the total limit"
+    assert members.bytes_written == 800 and members.extracted == 2
+    assert not (tmp_path / "huge.md").exists() and not (tmp_path / "c.md").exists(), "partial files are removed"
+
+
+def test_member_with_understated_size_is_skipped(tmp_path: Path):
+    data = bytearray(make_zip({"lying.md": "x" * 5000, "honest.md": "fine"}).getvalue())
+    # the local and the central directory headers of the first member claim 100 uncompressed bytes
+    struct.pack_into("<I", data, data.find(b"PK\x03\x04") + 22, 100)
+    struct.pack_into("<I", data, data.find(b"PK\x01\x02") + 24, 100)
+    members = ZipMembers(zipfile.ZipFile(io.BytesIO(bytes(data))), tmp_path, max_member_bytes=1000)
+
+    assert [path.name for path in members] == ["honest.md"]
+    assert members.skipped == ["lying.md"] and members.bytes_written == 4
+    assert not (tmp_path / "lying.md").exists()
+
+
+def test_encrypted_and_unsupported_members_are_skipped(tmp_path: Path):
+    data = bytearray(make_zip({"encrypted.md": "secret", "wavpack.md": "sound", "plain.md": "fine"}).getvalue())
+    local_headers = [i for i in range(len(data)) if data.startswith(b"PK\x03\x04", i)]
+    central_headers = [i for i in range(len(data)) if data.startswith(b"PK\x01\x02", i)]
+    # the encryption flag of the first member and an unsupported compression method (WavPack) for the second
+    for header, offset in ((local_headers[0], 6), (central_headers[0], 8)):
+        struct.pack_into("<H", data, header + offset, struct.unpack_from("<H", data, header + offset)[0] | 0x1)
+    for header, offset in ((local_headers[1], 8), (central_headers[1], 10)):
+        struct.pack_into("<H", data, header + offset, 97)
+    members = ZipMembers(zipfile.ZipFile(io.BytesIO(bytes(data))), tmp_path)
+
+    assert [path.name for path in members] == ["plain.md"]
+    assert members.skipped == ["encrypted.md", "wavpack.md"]
+    assert not (tmp_path / "encrypted.md").exists() and not (tmp_path / "wavpack.md").exists()
+
+
+def test_spool_upload_keeps_seekable_uploads_and_copies_streams(tmp_path: Path):
+    upload = make_zip({"a.md": "# A"})
+    upload.read(10)
+    assert spool_upload(upload, tmp_path) is upload and upload.tell() == 0
+
+    data = make_zip({"a.md": "# A"}).getvalue()
+    spooled = spool_upload(NonSeekable(data), tmp_path)
+    assert isinstance(spooled, Path) and spooled.parent == tmp_path and spooled.read_bytes() == data
+    with zipfile.ZipFile(spooled) as archive:
+        assert [path.read_text() for path in ZipMembers(archive, tmp_path / "out")] == ["# A"]
+
+
+def test_index_paths_counts_chunks_without_keeping_them(tmp_path: Path, monkeypatch):
+    # the stand-in model has neither the SentenceTransformer type nor the torch parameters ArticleSplitter needs
+    monkeypatch.setattr(indexing_module, "ArticleSplitter", lambda **kwargs: TextSplitter.model_construct(model_name="stand-in", **kwargs))
+    archive = zipfile.ZipFile(make_zip({f"paper_{i}.md": " ".join(f"word{j}" for j in range(30 * (i + 1))) for i in range(3)}))
+    meili = OfflineMeili()
+    rag = offline_rag(meili, "zip-index-paths")
+    rag.st_model = StandInSentenceTransformer(max_seq_length=40)
+
+    members = ZipMembers(archive, tmp_path)
+    chunks_per_source = Indexing.model_construct().index_paths(rag, members, max_seq_length=40, characters_for_abstract=100)
+    uploaded = [chunk for batch in meili.batches for chunk in batch]
+    assert sum(chunks_per_source.values()) == len(uploaded) > 3 and members.extracted == 3
+    assert {chunk["source"] for chunk in uploaded} == set(chunks_per_source)